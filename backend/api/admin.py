@@ -3,7 +3,7 @@ Admin API Endpoints - Super Admin (God Mode)
 Requires super_admin role for all endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy import func, select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -17,9 +17,12 @@ import os
 
 from database import (
     async_session, Tenant, Lead, ConversationState,
-    LeadStatus, SubscriptionStatus, TenantFeature, FeatureFlag
+    LeadStatus, SubscriptionStatus, TenantFeature, FeatureFlag, LeadDailyRollup
 )
+from lead_rollups import LEAD_TABLE
 from auth_config import JWT_SECRET, JWT_ALGORITHM, PASSWORD_SALT
+from tenant_cache import tenant_cache
+from entitlements import entitlement_cache
 
 router = APIRouter(prefix="/admin", tags=["Admin - God Mode"])
 security = HTTPBearer(auto_error=False)
@@ -95,6 +98,7 @@ async def create_tenant(
         session.add(new_tenant)
         await session.commit()
         await session.refresh(new_tenant)
+        await tenant_cache.invalidate(new_tenant.id)
         
         return {
             "message": "✅ Tenant created successfully",
@@ -108,24 +112,73 @@ async def create_tenant(
         }
 
 
+# Sort keys accepted by get_all_tenants
+TENANT_SORT_FIELDS = ("created_at", "name", "total_leads", "subscription_status")
+# Paging headers of get_all_tenants (the body stays a plain JSON array)
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_OFFSET_HEADER = "X-Next-Offset"
+
+
 @router.get("/tenants")
 async def get_all_tenants(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    sort_by: str = "created_at",
+    order: str = "desc",
     current_admin: int = Depends(get_current_super_admin)
 ):
-    """Get list of all tenants with stats"""
+    """
+    Get list of all tenants with stats (paginated)
+    
+    Sorting: sort_by = created_at | name | total_leads | subscription_status, order = asc | desc
+    Paging: X-Total-Count is the number of tenants; while more remain, X-Next-Offset is
+    the offset of the next page (pass it as ?offset=)
+    """
+    if sort_by not in TENANT_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(TENANT_SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    
     async with async_session() as session:
-        # Get tenants
-        result = await session.execute(select(Tenant))
-        tenants = result.scalars().all()
+        # Lead counts for every tenant in one grouped query over the daily lead rollups
+        lead_counts = (
+            select(
+                LeadDailyRollup.tenant_id,
+                func.sum(LeadDailyRollup.lead_count).label("total_leads")
+            )
+            .where(LeadDailyRollup.lead_table == LEAD_TABLE)
+            .group_by(LeadDailyRollup.tenant_id)
+            .subquery()
+        )
+        total_leads = func.coalesce(lead_counts.c.total_leads, 0)
+        
+        sort_column = {
+            "created_at": Tenant.created_at,
+            "name": func.coalesce(Tenant.name, Tenant.company_name),
+            "total_leads": total_leads,
+            "subscription_status": Tenant.subscription_status,
+        }[sort_by]
+        sort_column = sort_column.asc() if order == "asc" else sort_column.desc()
+        tiebreak = Tenant.id.asc() if order == "asc" else Tenant.id.desc()
+        
+        # Get tenants (one page) together with their lead counts
+        result = await session.execute(
+            select(Tenant, total_leads)
+            .outerjoin(lead_counts, lead_counts.c.tenant_id == Tenant.id)
+            .order_by(sort_column, tiebreak)
+            .offset(offset)
+            .limit(limit)
+        )
+        
+        rows = result.all()
+        total = await session.scalar(select(func.count(Tenant.id)))
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+        if offset + len(rows) < total:
+            response.headers[NEXT_OFFSET_HEADER] = str(offset + len(rows))
         
         tenant_list = []
-        for tenant in tenants:
-            # Count leads
-            leads_result = await session.execute(
-                select(func.count(Lead.id)).where(Lead.tenant_id == tenant.id)
-            )
-            leads_count = leads_result.scalar()
-            
+        for tenant, leads_count in rows:
             # Agents count - simplified (no User table, set to 0 for now)
             agents_count = 0  # TODO: Implement agents table if needed
             
@@ -135,7 +188,7 @@ async def get_all_tenants(
                 "email": tenant.email,
                 "company_name": tenant.company_name,
                 "subscription_status": tenant.subscription_status.value if tenant.subscription_status else "trial",
-                "total_leads": leads_count,
+                "total_leads": int(leads_count or 0),
                 "agents_count": agents_count,
                 "created_at": tenant.created_at.isoformat()
             })
@@ -197,6 +250,7 @@ async def suspend_tenant(
         tenant.subscription_status = SubscriptionStatus.SUSPENDED
         tenant.is_active = False
         await session.commit()
+        await entitlement_cache.invalidate(tenant_id)
         
         tenant_name = tenant.name or tenant.company_name
         return {"message": f"✅ Tenant {tenant_name} suspended", "tenant_id": tenant_id}
@@ -218,6 +272,7 @@ async def activate_tenant(
         tenant.subscription_status = SubscriptionStatus.ACTIVE
         tenant.is_active = True
         await session.commit()
+        await entitlement_cache.invalidate(tenant_id)
         
         tenant_name = tenant.name or tenant.company_name
         return {"message": f"✅ Tenant {tenant_name} activated", "tenant_id": tenant_id}
@@ -253,6 +308,7 @@ async def update_tenant_subscription(
         
         tenant.subscription_status = SubscriptionStatus[status.upper()]
         await session.commit()
+        await entitlement_cache.invalidate(tenant_id)
         
         return {"message": f"✅ Subscription updated to {status}", "tenant_id": tenant_id}
 
@@ -293,6 +349,7 @@ async def update_tenant_credentials(
         
         tenant.updated_at = datetime.utcnow()
         await session.commit()
+        await tenant_cache.invalidate(tenant_id)
         
         return {
             "message": "✅ Tenant credentials updated successfully",
@@ -563,6 +620,7 @@ async def toggle_feature(
             session.add(tenant_feature)
         
         await session.commit()
+        await entitlement_cache.invalidate(tenant_id)
         
         action = "enabled" if request.enabled else "disabled"
         return {
@@ -620,6 +678,7 @@ async def bulk_toggle_features(
             updated.append(feature_str)
         
         await session.commit()
+        await entitlement_cache.invalidate(tenant_id)
         
         action = "enabled" if enabled else "disabled"
         return {
@@ -4,7 +4,7 @@ Allows platform owner to manage all tenant subscriptions
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import List, Optional
@@ -12,6 +12,7 @@ from pydantic import BaseModel, EmailStr
 
 from database import get_db, Tenant, SubscriptionPlan, SubscriptionStatus
 from auth_config import verify_super_admin
+from entitlements import entitlement_cache
 
 router = APIRouter(prefix="/api/admin/subscriptions", tags=["Admin - Subscriptions"])
 
@@ -127,96 +128,44 @@ async def get_subscription_stats(
     Requires: Super Admin authentication
     """
     
-    # Count total tenants
-    total_result = await db.execute(select(func.count(Tenant.id)))
-    total_tenants = total_result.scalar() or 0
-    
-    # Count by status
-    active_result = await db.execute(
-        select(func.count(Tenant.id)).where(Tenant.subscription_status == SubscriptionStatus.ACTIVE)
-    )
-    active_count = active_result.scalar() or 0
-    
-    trial_result = await db.execute(
-        select(func.count(Tenant.id)).where(Tenant.subscription_status == SubscriptionStatus.TRIAL)
+    # One grouped query; every count below is summed from its (few) rows
+    result = await db.execute(
+        select(
+            Tenant.subscription_status,
+            Tenant.subscription_plan,
+            Tenant.billing_cycle,
+            func.count(Tenant.id)
+        ).group_by(Tenant.subscription_status, Tenant.subscription_plan, Tenant.billing_cycle)
     )
-    trial_count = trial_result.scalar() or 0
+    groups = result.all()
+    
+    def count(status=None, plan=None, billing_cycle=None) -> int:
+        return sum(
+            n for row_status, row_plan, row_cycle, n in groups
+            if (status is None or row_status == status)
+            and (plan is None or row_plan == plan)
+            and (billing_cycle is None or row_cycle == billing_cycle)
+        )
     
-    expired_result = await db.execute(
-        select(func.count(Tenant.id)).where(Tenant.subscription_status == SubscriptionStatus.EXPIRED)
-    )
-    expired_count = expired_result.scalar() or 0
+    total_tenants = count()
     
-    cancelled_result = await db.execute(
-        select(func.count(Tenant.id)).where(Tenant.subscription_status == SubscriptionStatus.CANCELLED)
-    )
-    cancelled_count = cancelled_result.scalar() or 0
-    
-    suspended_result = await db.execute(
-        select(func.count(Tenant.id)).where(Tenant.subscription_status == SubscriptionStatus.SUSPENDED)
-    )
-    suspended_count = suspended_result.scalar() or 0
+    # Count by status
+    active_count = count(status=SubscriptionStatus.ACTIVE)
+    trial_count = count(status=SubscriptionStatus.TRIAL)
+    expired_count = count(status=SubscriptionStatus.EXPIRED)
+    cancelled_count = count(status=SubscriptionStatus.CANCELLED)
+    suspended_count = count(status=SubscriptionStatus.SUSPENDED)
     
     # Count by plan
-    free_result = await db.execute(
-        select(func.count(Tenant.id)).where(Tenant.subscription_plan == SubscriptionPlan.FREE)
-    )
-    free_count = free_result.scalar() or 0
-    
-    basic_result = await db.execute(
-        select(func.count(Tenant.id)).where(Tenant.subscription_plan == SubscriptionPlan.BASIC)
-    )
-    basic_count = basic_result.scalar() or 0
+    free_count = count(plan=SubscriptionPlan.FREE)
+    basic_count = count(plan=SubscriptionPlan.BASIC)
+    pro_count = count(plan=SubscriptionPlan.PRO)
     
-    pro_result = await db.execute(
-        select(func.count(Tenant.id)).where(Tenant.subscription_plan == SubscriptionPlan.PRO)
-    )
-    pro_count = pro_result.scalar() or 0
-    
-    # Calculate revenue (active subscriptions only)
-    basic_monthly_result = await db.execute(
-        select(func.count(Tenant.id)).where(
-            and_(
-                Tenant.subscription_plan == SubscriptionPlan.BASIC,
-                Tenant.subscription_status == SubscriptionStatus.ACTIVE,
-                Tenant.billing_cycle == "monthly"
-            )
-        )
-    )
-    basic_monthly = basic_monthly_result.scalar() or 0
-    
-    basic_yearly_result = await db.execute(
-        select(func.count(Tenant.id)).where(
-            and_(
-                Tenant.subscription_plan == SubscriptionPlan.BASIC,
-                Tenant.subscription_status == SubscriptionStatus.ACTIVE,
-                Tenant.billing_cycle == "yearly"
-            )
-        )
-    )
-    basic_yearly = basic_yearly_result.scalar() or 0
-    
-    pro_monthly_result = await db.execute(
-        select(func.count(Tenant.id)).where(
-            and_(
-                Tenant.subscription_plan == SubscriptionPlan.PRO,
-                Tenant.subscription_status == SubscriptionStatus.ACTIVE,
-                Tenant.billing_cycle == "monthly"
-            )
-        )
-    )
-    pro_monthly = pro_monthly_result.scalar() or 0
-    
-    pro_yearly_result = await db.execute(
-        select(func.count(Tenant.id)).where(
-            and_(
-                Tenant.subscription_plan == SubscriptionPlan.PRO,
-                Tenant.subscription_status == SubscriptionStatus.ACTIVE,
-                Tenant.billing_cycle == "yearly"
-            )
-        )
-    )
-    pro_yearly = pro_yearly_result.scalar() or 0
+    # Active subscriptions by billing cycle (for revenue)
+    basic_monthly = count(SubscriptionStatus.ACTIVE, SubscriptionPlan.BASIC, "monthly")
+    basic_yearly = count(SubscriptionStatus.ACTIVE, SubscriptionPlan.BASIC, "yearly")
+    pro_monthly = count(SubscriptionStatus.ACTIVE, SubscriptionPlan.PRO, "monthly")
+    pro_yearly = count(SubscriptionStatus.ACTIVE, SubscriptionPlan.PRO, "yearly")
     
     # Revenue calculation
     basic_revenue = (basic_monthly * 99) + (basic_yearly * 999 / 12)
@@ -362,6 +311,7 @@ async def update_tenant_plan(
     
     await db.commit()
     await db.refresh(tenant)
+    await entitlement_cache.invalidate(tenant.id)
     
     return {
         "status": "success",
@@ -402,6 +352,7 @@ async def extend_trial_period(
     
     await db.commit()
     await db.refresh(tenant)
+    await entitlement_cache.invalidate(tenant.id)
     
     return {
         "status": "success",
@@ -442,6 +393,7 @@ async def manually_activate_subscription(
     
     await db.commit()
     await db.refresh(tenant)
+    await entitlement_cache.invalidate(tenant.id)
     
     return {
         "status": "success",
@@ -482,6 +434,7 @@ async def suspend_tenant(
     
     await db.commit()
     await db.refresh(tenant)
+    await entitlement_cache.invalidate(tenant.id)
     
     return {
         "status": "success",
@@ -514,6 +467,7 @@ async def delete_tenant(
     # Delete
     await db.delete(tenant)
     await db.commit()
+    await entitlement_cache.invalidate(tenant_id)
     
     return {
         "status": "success",
@@ -3,18 +3,18 @@ Tenant Analytics API Endpoints
 Sales funnel, agent performance, and lead export
 """
 
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func, select, and_, case
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
-import io
-import pandas as pd
 
 from database import (
     async_session, Lead, User, LeadStatus, ConversationState
 )
 from auth import get_current_user, get_current_tenant_id
+from lead_rollups import lead_rollups, LEAD_TABLE
+from lead_export import lead_export_response, ANALYTICS_EXPORT_COLUMNS, EXPORT_FORMATS
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -41,49 +41,22 @@ async def get_sales_funnel(
     start_date = datetime.utcnow() - timedelta(days=days)
     
     async with async_session() as session:
-        # Total started
-        started_result = await session.execute(
-            select(func.count(Lead.id))
-            .where(and_(
-                Lead.tenant_id == tenant_id,
-                Lead.created_at >= start_date
-            ))
+        # Read from the daily lead rollups (day granularity) instead of counting lead rows
+        rows = await lead_rollups.totals(
+            session, tenant_id, LEAD_TABLE, group_by=("status",), since=start_date.date()
         )
-        started = started_result.scalar() or 0
         
-        # Qualified (has filled_slots with at least budget, property_type, transaction_type)
-        qualified_result = await session.execute(
-            select(func.count(Lead.id))
-            .where(and_(
-                Lead.tenant_id == tenant_id,
-                Lead.created_at >= start_date,
-                Lead.budget_min.isnot(None),
-                Lead.property_type.isnot(None)
-            ))
-        )
-        qualified = qualified_result.scalar() or 0
+        # Total started
+        started = sum(row["lead_count"] for row in rows)
+        
+        # Qualified (has budget and property type)
+        qualified = sum(row["qualified"] for row in rows)
         
         # Phone captured
-        phone_result = await session.execute(
-            select(func.count(Lead.id))
-            .where(and_(
-                Lead.tenant_id == tenant_id,
-                Lead.created_at >= start_date,
-                Lead.phone_number.isnot(None)
-            ))
-        )
-        phone_captured = phone_result.scalar() or 0
+        phone_captured = sum(row["with_phone"] for row in rows)
         
         # Closed won
-        closed_result = await session.execute(
-            select(func.count(Lead.id))
-            .where(and_(
-                Lead.tenant_id == tenant_id,
-                Lead.created_at >= start_date,
-                Lead.status == LeadStatus.CLOSED_WON
-            ))
-        )
-        closed = closed_result.scalar() or 0
+        closed = sum(row["lead_count"] for row in rows if row["status"] == LeadStatus.CLOSED_WON.value)
         
         return {
             "funnel": [
@@ -198,77 +171,31 @@ async def get_agent_performance(
 async def export_leads(
     period: str = "30d",
     status: Optional[str] = None,
+    export_format: str = Query("xlsx", alias="format"),
     tenant_id: int = Depends(get_current_tenant_id),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Export leads to Excel file
+    Export leads to Excel (or csv / ndjson), streamed in batches
     CRITICAL: This is essential for agency's internal reporting
     """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    
     days = int(period.replace('d', ''))
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    async with async_session() as session:
-        # Build query
-        query = select(Lead).where(and_(
-            Lead.tenant_id == tenant_id,
-            Lead.created_at >= start_date
-        ))
-        
-        if status:
-            query = query.where(Lead.status == status)
-        
-        result = await session.execute(query)
-        leads = result.scalars().all()
-        
-        # Convert to DataFrame
-        data = []
-        for lead in leads:
-            data.append({
-                "ID": lead.id,
-                "Name": lead.name or "N/A",
-                "Phone": lead.phone_number or "N/A",
-                "Email": lead.email or "N/A",
-                "Language": lead.language.value if lead.language else "N/A",
-                "Status": lead.status.value if lead.status else "new",
-                "Property Type": lead.property_type.value if lead.property_type else "N/A",
-                "Transaction Type": lead.transaction_type.value if lead.transaction_type else "N/A",
-                "Budget Min": lead.budget_min or 0,
-                "Budget Max": lead.budget_max or 0,
-                "Purpose": lead.purpose.value if lead.purpose else "N/A",
-                "Conversation State": lead.conversation_state.value if lead.conversation_state else "start",
-                "Created At": lead.created_at.strftime("%Y-%m-%d %H:%M"),
-                "Last Message At": lead.last_message_at.strftime("%Y-%m-%d %H:%M") if lead.last_message_at else "N/A"
-            })
-        
-        df = pd.DataFrame(data)
-        
-        # Create Excel file in memory
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Leads')
-            
-            # Auto-adjust column widths
-            worksheet = writer.sheets['Leads']
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except Exception as e:
-                        logger.debug(f"Could not calculate cell width: {e}")
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        output.seek(0)
-        
-        return Response(
-            content=output.getvalue(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={
-                "Content-Disposition": f"attachment; filename=leads_export_{datetime.now().strftime('%Y%m%d')}.xlsx"
-            }
-        )
+    filters = [Lead.created_at >= start_date]
+    if status:
+        try:
+            filters.append(Lead.status == LeadStatus(status))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Unknown status: {status}")
+    
+    return lead_export_response(
+        tenant_id,
+        export_format,
+        ANALYTICS_EXPORT_COLUMNS,
+        filters=filters,
+        filename=f"leads_export_{datetime.now().strftime('%Y%m%d')}"
+    )
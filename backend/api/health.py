@@ -9,7 +9,21 @@ from typing import Dict, Any, Optional
 from datetime import datetime
 import os
 
-from database import async_session
+from database import async_session, get_pool_metrics
+from tenant_cache import tenant_cache
+from context_cache import tenant_context_cache
+from property_index import property_index
+from lead_preference_index import qualified_lead_index, unified_lead_index
+from dashboard_stats import dashboard_stats_cache
+from lead_rollups import lead_rollups
+from entitlements import entitlement_cache
+from brain_registry import brain_registry
+from chat_history import chat_history
+from entity_extractor import entity_extractor
+from turn_planner import turn_planner
+from llm_cache import llm_response_cache
+from knowledge_answers import knowledge_answerer
+from utils.gemini_utils import gemini_client_pool_stats
 from sqlalchemy import select, text
 
 router = APIRouter(prefix="/api/health", tags=["Health Check"])
@@ -193,3 +207,44 @@ async def ping():
         "timestamp": datetime.utcnow().isoformat(),
         "message": "🚀 ArtinSmartRealty is running"
     }
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Runtime performance metrics
+    
+    - database_pool: connection pool utilisation and checkout wait times
+    - tenant_cache: webhook tenant resolution cache hit rate
+    - tenant_context_cache: AI context snapshot hit rate and version bumps
+    - property_index: in-memory property index size, loads and query latency
+    - lead_preference_index: reverse lead-preference index size and probe latency
+    - dashboard_stats_cache: dashboard stats cache hit rate
+    - lead_rollups: incremental rollup updates and rebuilds
+    - entitlement_cache: feature flag / plan limit resolution hit rate
+    - brain_registry: per-tenant Brain reuse
+    - chat_history: leads with conversation memory, expirations and evictions
+    - gemini: shared clients and per-key health (in-flight, tokens, cooldowns, 429s, latency)
+    - entity_extractor: messages parsed by rules alone vs. sent to the LLM extractor
+    """
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "database_pool": get_pool_metrics(),
+        "tenant_cache": tenant_cache.stats(),
+        "tenant_context_cache": tenant_context_cache.stats(),
+        "property_index": property_index.stats(),
+        "lead_preference_index": {
+            "qualified_leads": qualified_lead_index.stats(),
+            "unified_leads": unified_lead_index.stats(),
+        },
+        "dashboard_stats_cache": dashboard_stats_cache.stats(),
+        "lead_rollups": lead_rollups.stats(),
+        "entitlement_cache": entitlement_cache.stats(),
+        "brain_registry": brain_registry.stats(),
+        "chat_history": chat_history.stats(),
+        "gemini": gemini_client_pool_stats(),
+        "entity_extractor": entity_extractor.stats(),
+        "turn_planner": turn_planner.stats(),
+        "llm_cache": llm_response_cache.stats(),
+        "knowledge_answers": knowledge_answerer.stats(),
+    }
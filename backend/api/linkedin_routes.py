@@ -4,32 +4,30 @@ Connects Chrome Extension to Unified System
 ⚠️ PRO PLAN ONLY - Requires subscription check
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-import google.generativeai as genai
 import os
 
-from database import async_session, Tenant
+from database import async_session
 from unified_database import (
     UnifiedLead, LeadSource, LeadStatus,
     find_or_create_lead, log_interaction,
     InteractionChannel, InteractionDirection
 )
 from followup_engine import schedule_linkedin_lead_followup
-from subscription_guard import check_feature_access, check_subscription_active
+from entitlements import entitlement_cache
+from keyset_pagination import NEXT_CURSOR_HEADER, keyset_order, keyset_after, next_cursor
 from sqlalchemy import select, func, and_
+from sqlalchemy.orm import load_only
+from utils.gemini_utils import get_gemini_client
 
 router = APIRouter(prefix="/api/linkedin", tags=["LinkedIn Scraper"])
 
-# Initialize Gemini AI (FREE API)
+# Gemini AI (FREE API) - shared client: key pool, retries, identical concurrent prompts coalesced
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)  # type: ignore
-    gemini_model = genai.GenerativeModel('gemini-pro')  # type: ignore
-else:
-    gemini_model = None
+gemini_client = get_gemini_client('gemini-pro') if GEMINI_API_KEY else None
 
 
 # ==================== HELPER FUNCTIONS ====================
@@ -139,6 +137,11 @@ class LeadResponse(BaseModel):
     next_followup_at: Optional[datetime]
 
 
+# Lead list: columns loaded for LeadResponse and the keyset (newest first, id tie-breaker)
+LINKEDIN_LIST_COLUMNS = [getattr(UnifiedLead, field) for field in LeadResponse.model_fields]
+LINKEDIN_LIST_KEYSET = [UnifiedLead.created_at, UnifiedLead.id]
+
+
 # ==================== ENDPOINTS ====================
 
 @router.post("/generate-message", response_model=GenerateMessageResponse)
@@ -148,46 +151,40 @@ async def generate_linkedin_message(request: GenerateMessageRequest):
     ⚠️ PRO PLAN ONLY - Requires active Pro subscription.
     """
     
-    # ✅ STEP 1: Check Subscription & Feature Access
-    async with async_session() as session:
-        # Get tenant
-        result = await session.execute(
-            select(Tenant).where(Tenant.id == request.tenantId)
+    # ✅ STEP 1: Check Subscription & Feature Access (cached entitlements, no DB query)
+    entitlements = await entitlement_cache.get(request.tenantId)
+    if entitlements is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    
+    # Check subscription active
+    if not entitlements.subscription_active():
+        raise HTTPException(
+            status_code=403,
+            detail={
+                "error": "subscription_expired",
+                "message": "Your subscription has expired. Please renew to continue using LinkedIn Scraper.",
+                "message_fa": "اشتراک شما منقضی شده است. برای استفاده از اسکرپر لینکدین، لطفا اشتراک خود را تمدید کنید.",
+                "upgrade_url": "/subscription/pricing"
+            }
+        )
+    
+    # Check Pro plan access
+    if not entitlements.allows("linkedin_scraper"):
+        raise HTTPException(
+            status_code=403,
+            detail={
+                "error": "upgrade_required",
+                "feature": "linkedin_scraper",
+                "current_plan": entitlements.plan.value if entitlements.plan else "free",
+                "required_plan": "pro",
+                "message": "LinkedIn Scraper is a Pro Plan feature. Upgrade to unlock lead generation!",
+                "message_fa": "اسکرپر لینکدین ویژگی پلن Pro است. برای دسترسی به لید جنریشن، ارتقا دهید!",
+                "upgrade_url": "/subscription/pricing"
+            }
         )
-        tenant = result.scalar_one_or_none()
-        
-        if not tenant:
-            raise HTTPException(status_code=404, detail="Tenant not found")
-        
-        # Check subscription active
-        if not check_subscription_active(tenant):
-            raise HTTPException(
-                status_code=403,
-                detail={
-                    "error": "subscription_expired",
-                    "message": "Your subscription has expired. Please renew to continue using LinkedIn Scraper.",
-                    "message_fa": "اشتراک شما منقضی شده است. برای استفاده از اسکرپر لینکدین، لطفا اشتراک خود را تمدید کنید.",
-                    "upgrade_url": "/subscription/pricing"
-                }
-            )
-        
-        # Check Pro plan access
-        if not check_feature_access(tenant, "linkedin_scraper"):
-            raise HTTPException(
-                status_code=403,
-                detail={
-                    "error": "upgrade_required",
-                    "feature": "linkedin_scraper",
-                    "current_plan": tenant.subscription_plan.value if tenant.subscription_plan else "free",  # type: ignore
-                    "required_plan": "pro",
-                    "message": "LinkedIn Scraper is a Pro Plan feature. Upgrade to unlock lead generation!",
-                    "message_fa": "اسکرپر لینکدین ویژگی پلن Pro است. برای دسترسی به لید جنریشن، ارتقا دهید!",
-                    "upgrade_url": "/subscription/pricing"
-                }
-            )
     
     # ✅ STEP 2: Validate Gemini API
-    if not GEMINI_API_KEY or not gemini_model:
+    if not GEMINI_API_KEY or not gemini_client:
         raise HTTPException(
             status_code=500,
             detail="Gemini API key not configured. Get free key at: https://aistudio.google.com/app/apikey"
@@ -281,7 +278,7 @@ Write the cold DM now. Remember: Under 75 words, reference their background, end
 OUTPUT ONLY THE MESSAGE - NO EXPLANATIONS OR EXTRA TEXT."""
         
         # Generate message using Gemini
-        response = gemini_model.generate_content(prompt)
+        response = await gemini_client.generate_content_async(prompt)
         generated_message = response.text.strip()
         
         # ✅ Save lead to unified system
@@ -450,12 +447,15 @@ async def add_linkedin_lead(request: SaveLeadRequest):
 
 @router.get("/leads", response_model=List[LeadResponse])
 async def get_linkedin_leads(
+    response: Response,
     tenant_id: int = 1,
     limit: int = 100,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
     """
     Get all LinkedIn leads for a tenant
+    Keyset paginated: pass the X-Next-Cursor header of a page as ?cursor=
     """
     
     if limit > 1000:
@@ -463,8 +463,8 @@ async def get_linkedin_leads(
     
     try:
         async with async_session() as session:
-            # Build query
-            query = select(UnifiedLead).where(
+            # Build query - only the columns the response is built from
+            query = select(UnifiedLead).options(load_only(*LINKEDIN_LIST_COLUMNS)).where(
                 and_(
                     UnifiedLead.tenant_id == tenant_id,
                     UnifiedLead.source == LeadSource.LINKEDIN
@@ -479,12 +479,22 @@ async def get_linkedin_leads(
                 except ValueError:
                     raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
             
+            if cursor:
+                try:
+                    query = query.where(keyset_after(LINKEDIN_LIST_KEYSET, cursor))
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            
             # Order by created date descending
-            query = query.order_by(UnifiedLead.created_at.desc()).limit(limit)
+            query = query.order_by(*keyset_order(LINKEDIN_LIST_KEYSET)).limit(limit)
             
             result = await session.execute(query)
             leads = result.scalars().all()
             
+            next_page = next_cursor(leads, LINKEDIN_LIST_KEYSET, limit)
+            if next_page:
+                response.headers[NEXT_CURSOR_HEADER] = next_page
+            
             return [
                 LeadResponse(
                     id=lead.id,
@@ -591,7 +601,7 @@ async def linkedin_health():
     """Health check for LinkedIn integration"""
     return {
         "status": "healthy",
-        "gemini_configured": bool(GEMINI_API_KEY and gemini_model),
+        "gemini_configured": bool(GEMINI_API_KEY and gemini_client),
         "model": "gemini-pro (FREE)",
         "endpoints": [
             "/api/linkedin/generate-message",
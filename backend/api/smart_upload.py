@@ -18,6 +18,7 @@ import logging
 from database import async_session, Tenant, TenantProperty, get_db
 from property_extractor import PropertyExtractor
 from followup_matcher import get_matching_leads_count  # For preview count
+from property_index import property_changed
 
 router = APIRouter(prefix="/api/tenants", tags=["Smart Upload"])
 security = HTTPBearer()
@@ -462,6 +463,7 @@ async def _save_property_to_db(
     db.add(new_property)
     await db.commit()
     await db.refresh(new_property)
+    await property_changed(tenant_id, new_property.id)
     
     logger.info(f"💾 Saved property: {new_property.name} (ID: {new_property.id})")
     logger.info(f"📸 Images: {len(image_urls)} | 📄 PDF: {'Yes' if brochure_pdf else 'No'}")
@@ -14,6 +14,7 @@ from database import (
     async_session, Tenant, SubscriptionPlan, SubscriptionStatus,
     Language
 )
+from entitlements import entitlement_cache
 # hash_password is in main.py, not auth_config
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -272,6 +273,7 @@ async def confirm_payment(data: PaymentRequest):
         tenant.next_payment_date = next_payment  # type: ignore
         
         await session.commit()
+        await entitlement_cache.invalidate(tenant.id)
         
         return {
             "status": "success",
@@ -308,6 +310,7 @@ async def upgrade_plan(tenant_id: int, new_plan: str = "pro"):
         
         tenant.subscription_plan = SubscriptionPlan.PRO  # type: ignore
         await session.commit()
+        await entitlement_cache.invalidate(tenant_id)
         
         return {
             "status": "success",
@@ -377,6 +380,7 @@ async def cancel_subscription(tenant_id: int):
         
         tenant.subscription_status = SubscriptionStatus.CANCELLED  # type: ignore
         await session.commit()
+        await entitlement_cache.invalidate(tenant_id)
         
         return {
             "status": "cancelled",
@@ -534,6 +538,7 @@ async def verify_payment(data: VerifyPaymentRequest):
         tenant.next_payment_date = next_payment  # type: ignore
         
         await session.commit()
+        await entitlement_cache.invalidate(tenant.id)
         
         # Send payment success email
         try:
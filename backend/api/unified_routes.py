@@ -3,7 +3,7 @@ Unified API Routes for Lead Management
 Connects LinkedIn Scraper + Bot into one system
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -16,7 +16,10 @@ from unified_database import (
     find_or_create_lead, log_interaction
 )
 from followup_engine import schedule_linkedin_lead_followup, notify_property_added
+from lead_rollups import lead_rollups, UNIFIED_LEAD_TABLE
+from keyset_pagination import NEXT_CURSOR_HEADER, keyset_order, keyset_after, next_cursor
 from sqlalchemy import select, func, and_
+from sqlalchemy.orm import load_only
 
 router = APIRouter(prefix="/api/unified", tags=["Unified Leads"])
 
@@ -60,6 +63,11 @@ class LeadResponse(BaseModel):
         from_attributes = True
 
 
+# Lead list: columns loaded for LeadResponse and the keyset (newest first, id tie-breaker)
+LEAD_LIST_COLUMNS = [getattr(UnifiedLead, field) for field in LeadResponse.model_fields]
+LEAD_LIST_KEYSET = [UnifiedLead.created_at, UnifiedLead.id]
+
+
 class LeadStatsResponse(BaseModel):
     """Dashboard statistics"""
     total_leads: int
@@ -139,17 +147,22 @@ async def add_linkedin_lead(lead_data: LinkedInLeadCreate, tenant_id: int = 1):
 
 @router.get("/leads", response_model=List[LeadResponse])
 async def get_all_leads(
+    response: Response,
     tenant_id: int = 1,
     source: Optional[str] = None,
     status: Optional[str] = None,
     grade: Optional[str] = None,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
 ):
     """
     Get all leads with optional filtering
+    Keyset paginated: pass the X-Next-Cursor header of a page as ?cursor=
     """
     async with async_session() as session:
-        query = select(UnifiedLead).where(UnifiedLead.tenant_id == tenant_id)
+        query = select(UnifiedLead).options(load_only(*LEAD_LIST_COLUMNS)).where(
+            UnifiedLead.tenant_id == tenant_id
+        )
         
         if source:
             query = query.where(UnifiedLead.source == source)
@@ -160,12 +173,20 @@ async def get_all_leads(
             from unified_database import LeadGrade
             grade_enum = LeadGrade(grade) if isinstance(grade, str) else grade
             query = query.where(UnifiedLead.grade == grade_enum)  # type: ignore
+        if cursor:
+            try:
+                query = query.where(keyset_after(LEAD_LIST_KEYSET, cursor))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
-        query = query.order_by(UnifiedLead.created_at.desc()).limit(limit)
+        query = query.order_by(*keyset_order(LEAD_LIST_KEYSET)).limit(limit)
         
         result = await session.execute(query)
         leads = result.scalars().all()
         
+        next_page = next_cursor(leads, LEAD_LIST_KEYSET, limit)
+        if next_page:
+            response.headers[NEXT_CURSOR_HEADER] = next_page
         return leads
 
 
@@ -190,35 +211,23 @@ async def get_lead_stats(tenant_id: int = 1):
     Get dashboard statistics
     """
     async with async_session() as session:
-        # Total leads
-        result = await session.execute(
-            select(func.count(UnifiedLead.id)).where(UnifiedLead.tenant_id == tenant_id)
+        # Totals by source and status come from the daily lead rollups
+        rows = await lead_rollups.totals(
+            session, tenant_id, UNIFIED_LEAD_TABLE, group_by=("source", "status")
         )
-        total_leads = result.scalar()
+        total_leads = sum(row["lead_count"] for row in rows)
         
         # By source
-        result = await session.execute(
-            select(
-                UnifiedLead.source,
-                func.count(UnifiedLead.id)
-            ).where(
-                UnifiedLead.tenant_id == tenant_id
-            ).group_by(UnifiedLead.source)
-        )
-        by_source = {row[0].value: row[1] for row in result.all()}
+        by_source: Dict[str, int] = {}
+        for row in rows:
+            by_source[row["source"]] = by_source.get(row["source"], 0) + row["lead_count"]
         
         # By status
-        result = await session.execute(
-            select(
-                UnifiedLead.status,
-                func.count(UnifiedLead.id)
-            ).where(
-                UnifiedLead.tenant_id == tenant_id
-            ).group_by(UnifiedLead.status)
-        )
-        by_status = {row[0].value: row[1] for row in result.all()}
+        by_status: Dict[str, int] = {}
+        for row in rows:
+            by_status[row["status"]] = by_status.get(row["status"], 0) + row["lead_count"]
         
-        # By grade
+        # By grade (score-based, not a rollup dimension - counted live)
         result = await session.execute(
             select(
                 UnifiedLead.grade,  # type: ignore
@@ -230,7 +239,7 @@ async def get_lead_stats(tenant_id: int = 1):
         )
         by_grade = {row[0].value: row[1] for row in result.all()}
         
-        # Pending followups
+        # Pending followups (time-based - counted live)
         result = await session.execute(
             select(func.count(UnifiedLead.id)).where(
                 and_(
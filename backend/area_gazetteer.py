@@ -0,0 +1,414 @@
+"""
+Dubai Area Gazetteer
+Canonical area IDs for free-text locations in any of the bot languages
+
+Property locations and lead preferences arrive as free text - "Dubai Marina",
+"دبی مارینا", "Marina", "JLT", "Дубай Марина". resolve_area() maps them to one
+stable integer id so properties/projects/leads store `area_id` on write and every
+search path filters on that indexed column instead of `ilike '%location%'`.
+
+find_area_mention() is the strict variant for whole chat messages (no fuzzy step).
+
+Resolution order (on text normalised by text_normalizer):
+    1. exact alias
+    2. longest alias contained as whole words ("2BR apartment in Dubai Marina")
+    3. fuzzy match of the text / its 1-3 word windows against aliases (typos: "dubai marrina")
+
+IDs are persisted in the database: never renumber or reuse an id, only append.
+"""
+
+import difflib
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple, Iterable
+
+from text_normalizer import normalize_text
+
+# Fuzzy matching: minimum similarity, and minimum alias length considered
+FUZZY_CUTOFF = 0.85
+FUZZY_MIN_LENGTH = 5
+
+# (area_id, canonical name, aliases in EN / FA / AR / RU)
+DUBAI_AREAS: List[Tuple[int, str, Tuple[str, ...]]] = [
+    (1, "Dubai Marina", (
+        "dubai marina", "marina",
+        "دبی مارینا", "مارینا",
+        "دبي مارينا", "مرسى دبي",
+        "дубай марина", "марина",
+    )),
+    (2, "Downtown Dubai", (
+        "downtown dubai", "downtown", "burj khalifa",
+        "داون تاون", "داونتاون", "داون تاون دبی", "برج خلیفه",
+        "وسط مدينة دبي", "داون تاون دبي", "برج خليفة",
+        "даунтаун", "даунтаун дубай", "бурдж халифа",
+    )),
+    (3, "Palm Jumeirah", (
+        "palm jumeirah", "the palm", "palm",
+        "پالم جمیرا", "پالم", "نخل جمیرا",
+        "نخلة جميرا",
+        "пальма джумейра", "пальма",
+    )),
+    (4, "Jumeirah Village Circle", (
+        "jumeirah village circle", "jvc",
+        "جی وی سی", "جمیرا ویلج سیرکل",
+        "قرية جميرا الدائرية",
+        "джи ви си", "джумейра виллидж серкл",
+    )),
+    (5, "Jumeirah Village Triangle", (
+        "jumeirah village triangle", "jvt",
+        "جی وی تی",
+        "قرية جميرا المثلثة",
+        "джи ви ти",
+    )),
+    (6, "Jumeirah Lake Towers", (
+        "jumeirah lake towers", "jumeirah lakes towers", "jlt",
+        "جی ال تی", "جی ال تی دبی",
+        "أبراج بحيرات جميرا",
+        "джи эл ти", "джумейра лейк тауэрс",
+    )),
+    (7, "Jumeirah Beach Residence", (
+        "jumeirah beach residence", "jbr",
+        "جی بی آر", "جی بی ار",
+        "جي بي ار", "مساكن شاطئ جميرا",
+        "джи би ар",
+    )),
+    (8, "Business Bay", (
+        "business bay",
+        "بیزینس بی", "بیزنس بی",
+        "بيزنس باي", "الخليج التجاري",
+        "бизнес бэй", "бизнес бей",
+    )),
+    (9, "Dubai Hills Estate", (
+        "dubai hills estate", "dubai hills",
+        "دبی هیلز", "دبی هیلز استیت",
+        "دبي هيلز",
+        "дубай хиллс",
+    )),
+    (10, "Arabian Ranches", (
+        "arabian ranches",
+        "عربین رنچز", "عربین رانچز",
+        "المرابع العربية",
+        "арабиан ранчес",
+    )),
+    (11, "Dubai Creek Harbour", (
+        "dubai creek harbour", "dubai creek harbor", "creek harbour", "creek harbor",
+        "کریک هاربر", "دبی کریک هاربر",
+        "خور دبي", "ميناء خور دبي",
+        "крик харбор", "дубай крик харбор",
+    )),
+    (12, "Mohammed Bin Rashid City", (
+        "mohammed bin rashid city", "mbr city", "mbr",
+        "شهر محمد بن راشد",
+        "مدينة محمد بن راشد",
+        "город мохаммеда бин рашида",
+    )),
+    (13, "Meydan", (
+        "meydan", "meydan city",
+        "میدان دبی",
+        "ميدان", "مدينة ميدان",
+        "мейдан",
+    )),
+    (14, "Dubai Silicon Oasis", (
+        "dubai silicon oasis", "silicon oasis", "dso",
+        "سیلیکون اوسیس", "دبی سیلیکون",
+        "واحة دبي للسيليكون",
+        "силикон оазис",
+    )),
+    (15, "Dubai Sports City", (
+        "dubai sports city", "sports city",
+        "اسپورتس سیتی", "اسپرت سیتی",
+        "مدينة دبي الرياضية",
+        "спортс сити",
+    )),
+    (16, "Motor City", (
+        "motor city",
+        "موتور سیتی",
+        "موتور سيتي",
+        "мотор сити",
+    )),
+    (17, "Dubailand", (
+        "dubailand", "dubai land",
+        "دبی لند",
+        "دبي لاند",
+        "дубайленд",
+    )),
+    (18, "Al Barsha", (
+        "al barsha", "barsha",
+        "البرشا", "برشا",
+        "البرشاء",
+        "аль барша", "барша",
+    )),
+    (19, "Al Furjan", (
+        "al furjan", "furjan",
+        "الفرجان", "فرجان",
+        "фурджан", "аль фурджан",
+    )),
+    (20, "Discovery Gardens", (
+        "discovery gardens",
+        "دیسکاوری گاردنز",
+        "ديسكفري جاردنز",
+        "дискавери гарденс",
+    )),
+    (21, "International City", (
+        "international city",
+        "اینترنشنال سیتی",
+        "المدينة العالمية",
+        "интернешнл сити",
+    )),
+    (22, "Deira", (
+        "deira",
+        "دیره",
+        "ديرة",
+        "дейра",
+    )),
+    (23, "Bur Dubai", (
+        "bur dubai",
+        "بر دبی",
+        "بر دبي",
+        "бур дубай",
+    )),
+    (24, "Jumeirah", (
+        "jumeirah", "jumeira",
+        "جمیرا", "جمیره",
+        "جميرا",
+        "джумейра",
+    )),
+    (25, "Umm Suqeim", (
+        "umm suqeim",
+        "ام سقیم",
+        "أم سقيم",
+        "умм сукейм",
+    )),
+    (26, "Emirates Hills", (
+        "emirates hills",
+        "امارات هیلز",
+        "تلال الإمارات",
+        "эмирейтс хиллс",
+    )),
+    (27, "The Springs", (
+        "the springs", "springs",
+        "اسپرینگز",
+        "الينابيع",
+        "спрингс",
+    )),
+    (28, "The Meadows", (
+        "the meadows", "meadows",
+        "میدوز",
+        "المروج",
+        "медоуз",
+    )),
+    (29, "Town Square", (
+        "town square", "town square dubai",
+        "تاون اسکوئر", "تاون اسکوار",
+        "تاون سكوير",
+        "таун сквер",
+    )),
+    (30, "DAMAC Hills", (
+        "damac hills", "akoya",
+        "داماک هیلز",
+        "داماك هيلز",
+        "дамак хиллс",
+    )),
+    (31, "Dubai South", (
+        "dubai south",
+        "دبی جنوب", "دبی ساوت",
+        "دبي الجنوب",
+        "дубай саут",
+    )),
+    (32, "Al Quoz", (
+        "al quoz", "quoz",
+        "القوز",
+        "аль куоз",
+    )),
+    (33, "DIFC", (
+        "difc", "dubai international financial centre", "dubai international financial center",
+        "مرکز مالی دبی",
+        "مركز دبي المالي العالمي",
+        "дифк",
+    )),
+    (34, "City Walk", (
+        "city walk",
+        "سیتی واک",
+        "سيتي ووك",
+        "сити уок",
+    )),
+    (35, "Bluewaters Island", (
+        "bluewaters island", "bluewaters", "blue waters",
+        "بلوواترز",
+        "جزيرة بلوواترز",
+        "блюуотерс",
+    )),
+    (36, "Dubai Harbour", (
+        "dubai harbour", "dubai harbor", "emaar beachfront",
+        "دبی هاربر", "اعمار بیچ فرانت",
+        "ميناء دبي",
+        "дубай харбор",
+    )),
+    (37, "Sobha Hartland", (
+        "sobha hartland",
+        "سوبها هارتلند",
+        "شوبا هارتلاند",
+        "собха хартланд",
+    )),
+    (38, "Al Jaddaf", (
+        "al jaddaf", "jaddaf",
+        "الجداف", "جداف",
+        "аль джаддаф",
+    )),
+    (39, "Mirdif", (
+        "mirdif",
+        "میردیف",
+        "مردف",
+        "мирдиф",
+    )),
+    (40, "Tilal Al Ghaf", (
+        "tilal al ghaf",
+        "تلال الغاف",
+        "тилал аль гаф",
+    )),
+    (41, "Dubai Investments Park", (
+        "dubai investments park", "dubai investment park", "dip",
+        "دبی اینوستمنت پارک",
+        "مجمع دبي للاستثمار",
+        "дубай инвестментс парк",
+    )),
+    (42, "Arjan", (
+        "arjan",
+        "ارجان",
+        "أرجان",
+        "арджан",
+    )),
+    (43, "Dubai Media City", (
+        "dubai media city", "media city",
+        "مدیا سیتی",
+        "مدينة دبي للإعلام",
+        "медиа сити",
+    )),
+    (44, "Dubai Internet City", (
+        "dubai internet city", "internet city",
+        "اینترنت سیتی",
+        "مدينة دبي للإنترنت",
+        "интернет сити",
+    )),
+    (45, "La Mer", (
+        "la mer",
+        "لامر",
+        "لا مير",
+        "ла мер",
+    )),
+    (46, "Jumeirah Golf Estates", (
+        "jumeirah golf estates", "jge",
+        "جمیرا گلف استیتس",
+        "عقارات جميرا للجولف",
+        "джумейра гольф эстейтс",
+    )),
+    (47, "The Greens", (
+        "the greens", "the views",
+        "گرینز",
+        "الجرينز",
+        "гринс",
+    )),
+    (48, "Dubai Production City", (
+        "dubai production city", "production city", "impz",
+        "پروداکشن سیتی",
+        "مدينة دبي للإنتاج",
+        "продакшн сити",
+    )),
+]
+
+# Aliases that are also everyday words - only accepted as the whole location text
+EXACT_ONLY_ALIASES = {"ميدان", "palm", "springs", "meadows"}
+
+AREA_NAMES: Dict[int, str] = {area_id: name for area_id, name, _ in DUBAI_AREAS}
+
+
+def _build_alias_map() -> Dict[str, int]:
+    aliases: Dict[str, int] = {}
+    for area_id, name, area_aliases in DUBAI_AREAS:
+        for alias in (name,) + area_aliases:
+            key = normalize_text(alias)
+            if key:
+                aliases.setdefault(key, area_id)
+    return aliases
+
+
+ALIASES: Dict[str, int] = _build_alias_map()
+_EXACT_ONLY = {normalize_text(alias) for alias in EXACT_ONLY_ALIASES}
+# Longest first, so "jumeirah village circle" wins over "jumeirah"
+_CONTAINED_ALIASES = sorted(
+    (alias for alias in ALIASES if alias not in _EXACT_ONLY),
+    key=len, reverse=True
+)
+_FUZZY_ALIASES = [alias for alias in ALIASES if len(alias) >= FUZZY_MIN_LENGTH and alias not in _EXACT_ONLY]
+
+
+@lru_cache(maxsize=4096)
+def _resolve(text: str) -> Optional[int]:
+    # 1. Exact alias
+    area_id = ALIASES.get(text)
+    if area_id is not None:
+        return area_id
+
+    # 2. Alias contained as whole words
+    padded = f" {text} "
+    for alias in _CONTAINED_ALIASES:
+        if f" {alias} " in padded:
+            return ALIASES[alias]
+
+    # 3. Fuzzy: whole text, then 3/2/1-word windows
+    words = text.split()
+    candidates = [text] + [
+        " ".join(words[i:i + size])
+        for size in (3, 2, 1)
+        for i in range(len(words) - size + 1)
+        if size < len(words)
+    ]
+    for candidate in candidates:
+        if len(candidate) < FUZZY_MIN_LENGTH:
+            continue
+        match = difflib.get_close_matches(candidate, _FUZZY_ALIASES, n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            return ALIASES[match[0]]
+    return None
+
+
+def resolve_area(location: Optional[str]) -> Optional[int]:
+    """Canonical area id for a free-text location, or None if it isn't a known Dubai area."""
+    if not location:
+        return None
+    # Punctuation ("Dubai Marina, Dubai") separates words like spaces do
+    text = normalize_text("".join(ch if ch.isalnum() else " " for ch in str(location)))
+    return _resolve(text) if text else None
+
+
+def find_area_mention(text: Optional[str]) -> Optional[Tuple[int, str]]:
+    """
+    (area id, matched alias) for an area named in a whole message - exact or whole-word
+    alias only: fuzzy matching every word of a chat message would invent locations.
+    """
+    if not text:
+        return None
+    text = normalize_text("".join(ch if ch.isalnum() else " " for ch in str(text)))
+    if not text:
+        return None
+    if text in ALIASES:
+        return ALIASES[text], text
+    padded = f" {text} "
+    for alias in _CONTAINED_ALIASES:
+        if f" {alias} " in padded:
+            return ALIASES[alias], alias
+    return None
+
+
+def resolve_areas(locations: Optional[Iterable[str]]) -> List[int]:
+    """Distinct area ids for a list of locations (unknown ones skipped), in input order."""
+    area_ids: List[int] = []
+    for location in locations or []:
+        area_id = resolve_area(location)
+        if area_id is not None and area_id not in area_ids:
+            area_ids.append(area_id)
+    return area_ids
+
+
+def area_name(area_id: Optional[int]) -> Optional[str]:
+    """Canonical English name for an area id."""
+    return AREA_NAMES.get(area_id) if area_id is not None else None
@@ -9,10 +9,11 @@ import re
 import json
 import logging
 import asyncio
+import time
+from contextvars import ContextVar
 from typing import Optional, Dict, Any, List, Tuple
 from enum import Enum
 from dataclasses import dataclass
-import google.generativeai as genai
 from sqlalchemy import or_  # For location filtering
 
 from database import (
@@ -20,7 +21,7 @@ from database import (
     TransactionType, PropertyType, PaymentMethod, Purpose,
     LeadStatus, update_lead, get_available_slots, DayOfWeek,
     PainPoint, get_tenant_context_for_ai, TenantKnowledge,
-    TenantProperty, async_session, select
+    message_turn
 )
 
 # Configure logging
@@ -28,7 +29,17 @@ logger = logging.getLogger(__name__)
 
 # Configure Gemini API with Key Rotation
 # Configure Gemini API with Key Rotation
-from utils.gemini_utils import GeminiClient
+from utils.gemini_utils import get_gemini_client, is_rate_limit_error, GeminiKeysUnavailable
+from knowledge_index import KnowledgeIndex, KnowledgeIndexSet
+from property_index import property_index
+from text_normalizer import normalize, tokenize, fold, contains_any, compile_pattern, is_question as looks_like_question
+from entity_extractor import entity_extractor, extract_rules, parse_budget_string
+from turn_planner import turn_planner, TurnPlan
+from chat_history import chat_history
+from knowledge_answers import (
+    knowledge_answerer, format_answer, find_callback_entry, knowledge_callback,
+    KNOWLEDGE_ANSWER_CANDIDATES, KNOWLEDGE_CALLBACK_PREFIX
+)
 
 # Retry configuration for API calls
 MAX_RETRIES = 3
@@ -38,6 +49,16 @@ RETRY_DELAY_BASE = 2  # seconds
 MAX_RETRIES = 3
 RETRY_DELAY_BASE = 2  # seconds
 
+# Gemini model used by Brain (one shared client per process, see get_gemini_client)
+BRAIN_MODEL_NAME = 'gemini-2.0-flash-exp'
+
+# generate_ai_response context for a question asked while we collect the lead's name
+NAME_QUESTION_CONTEXT = "User asked a question while we're collecting their name. Answer their question BRIEFLY (1-2 sentences max), then politely ask for their name again."
+# Contexts that carry nothing about the lead - FAQ-type turns answered with them are cacheable
+SHARED_REPLY_CONTEXTS = ("", NAME_QUESTION_CONTEXT)
+# Extracted fields that make a question about the lead rather than a topic ("2M AED", a phone number)
+PERSONAL_FIELDS = ("name", "phone", "email", "budget_min", "budget_max")
+
 # Professional System Instruction for Gemini
 SYSTEM_INSTRUCTION = """
 ### ROLE & PERSONA
@@ -496,28 +517,23 @@ RENT_BUDGET_RANGES = {
 }
 # ===========================
 
-def parse_budget_string(budget_str: str) -> Optional[int]:
-    """Parse budget strings like '2M', '500K', '1.5 Million' to integers."""
-    if not budget_str:
-        return None
-    
-    budget_str = budget_str.strip().upper().replace(',', '').replace(' ', '')
-    
-    # Extract number and multiplier
-    import re
-    match = re.search(r'([\d\.]+)\s*(M|K|MIL|MILLION|THOUSAND|K)?', budget_str)
-    if not match:
-        return None
-    
-    number = float(match.group(1))
-    multiplier = match.group(2) or ''
-    
-    if 'M' in multiplier or 'MIL' in multiplier:
-        return int(number * 1_000_000)
-    elif 'K' in multiplier or 'THOUSAND' in multiplier:
-        return int(number * 1_000)
-    else:
-        return int(number)
+# Negative tone -> offer human handoff (matched against normalize()d messages)
+NEGATIVE_SENTIMENT_PATTERNS = {
+    Language.FA: compile_pattern(r'\b(کلافه شدم|دیونه شدم|خیلی زیادی|اذیت شدم|خسته شدم|بدم میاد|چقدر حرف|حالم بد|بسه دیگه)\b'),
+    Language.AR: compile_pattern(r'\b(مسخوط|غاضب|زعلان|تعبت|ملل|بطيء|قاسي|سيئ)\b'),
+    Language.RU: compile_pattern(r'\b(раздосадовано|злой|устал|ужасно|недовольны|усталь)\b'),
+    Language.EN: compile_pattern(r'\b(annoyed|frustrated|angry|stupid|terrible|tired|awful|enough already|just stop)\b'),
+}
+
+# Persian vs Arabic detection (see Brain.detect_language)
+PERSIAN_MARKER_WORDS = frozenset(normalize(w) for w in [
+    'است', 'این', 'آن', 'من', 'تو', 'شما', 'چه', 'که', 'را', 'می', 'هست', 'برای', 'خیلی', 'ممنون', 'سلام'
+])
+ARABIC_MARKER_WORDS = frozenset(normalize(w) for w in [
+    'هذا', 'هذه', 'أنا', 'أنت', 'نحن', 'لا', 'في', 'هل', 'الذي', 'التي', 'على', 'إلى', 'شكرا', 'مرحبا'
+])
+PERSIAN_ONLY_LETTERS = re.compile(r'[پچژگ]')
+ARABIC_ONLY_LETTERS = re.compile(r'[ةأإ]')
 
 
 # ==================== RETRY LOGIC ====================
@@ -686,18 +702,151 @@ class Brain:
     and state machine for Turbo Qualification Flow.
     
     NEW: Uses tenant-specific data (properties, projects, knowledge) for personalized responses.
+    
+    Long-lived: get one per tenant from brain_registry instead of constructing it per
+    message. Per-message state (tenant_context, current_properties) is kept per task,
+    so concurrent messages for different leads don't see each other's data.
     """
     
     def __init__(self, tenant=None):
         self.tenant = tenant
         self.agent_name = tenant.name if tenant else "ArtinSmartRealty"
-        self.tenant_context = None  # Will be loaded on demand
-        self.chat_sessions = {}  # Store chat sessions per lead ID for conversation memory
+        self._turn_state: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+            f"brain_turn_{tenant.id if tenant else 'default'}", default=None
+        )
         
-        # Initialize Gemini Client (Handles rotation, retries, and safety)
-        self.gemini_client = GeminiClient(model_name='gemini-2.0-flash-exp')
+        # Shared Gemini Client (Handles rotation, retries, and safety)
+        self.gemini_client = get_gemini_client(BRAIN_MODEL_NAME)
         logger.info("✅ Brain initialized with robust GeminiClient")
     
+    # ---------- per-message state ----------
+    
+    def begin_turn(self, lead: Optional[Lead] = None, message: Optional[str] = None):
+        """
+        Start a new message: forget the previous message's tenant context, properties and plan.
+        lead/message (free text only) let the turn's LLM consumers share one plan_turn call.
+        """
+        self._turn_state.set({"lead": lead, "message": message})
+    
+    def _turn(self) -> Dict[str, Any]:
+        state = self._turn_state.get()
+        if state is None:
+            state = {}
+            self._turn_state.set(state)
+        return state
+    
+    @property
+    def tenant_context(self) -> Optional[Dict[str, Any]]:
+        """Tenant data for the current lead - loaded on demand (load_tenant_context)"""
+        return self._turn().get("tenant_context")
+    
+    @tenant_context.setter
+    def tenant_context(self, value: Optional[Dict[str, Any]]):
+        self._turn()["tenant_context"] = value
+    
+    @property
+    def current_properties(self) -> Optional[List[Dict[str, Any]]]:
+        """Properties picked for the current message, for property_presenter"""
+        return self._turn().get("current_properties")
+    
+    @current_properties.setter
+    def current_properties(self, value: Optional[List[Dict[str, Any]]]):
+        self._turn()["current_properties"] = value
+    
+    @property
+    def model(self):
+        """Gemini model on the healthiest pooled key, for the synchronous paths"""
+        return self.gemini_client.model
+    
+    # ---------- turn plan ----------
+    
+    @property
+    def turn_plan(self) -> Optional[TurnPlan]:
+        """This message's plan (entities, intent, sentiment, reply draft) if one was made"""
+        return self._turn().get("plan")
+    
+    def _planning(self, message: Optional[str]) -> bool:
+        """Whether LLM work on this message goes through the turn's plan"""
+        turn = self._turn()
+        return (
+            turn_planner.enabled and bool(message)
+            and turn.get("lead") is not None and turn.get("message") == message
+        )
+    
+    async def plan_turn(self, context: Optional[str] = None) -> Optional[TurnPlan]:
+        """
+        The turn's single Gemini call, made by the first consumer that needs it.
+        context: generate_ai_response context for the reply draft; by default the one
+        the current state's handler uses (_reply_context).
+        """
+        turn = self._turn()
+        if "plan" in turn:
+            return turn["plan"]
+        
+        lead, message = turn["lead"], turn["message"]
+        if context is None:
+            context = self._reply_context(turn.get("state"), message, lead)
+        shared = self._is_faq_turn(message, lead, context)
+        turn["plan"] = await turn_planner.plan(
+            self.gemini_client,
+            lambda: self._plan_reply_prompt(message, lead, context, shared),
+            message,
+            context,
+            {} if shared else self._lead_snapshot(lead),
+            lead.language or Language.EN,
+            history=None if shared else chat_history.contents(lead.id)
+        )
+        return turn["plan"]
+    
+    def _is_faq_turn(self, message: str, lead: Lead, context: str) -> bool:
+        """
+        FAQ-type turn: a question with no personal details in it (areas, property types and
+        goals are topics), answered with a context that carries nothing about the lead.
+        Its plan is the same for every lead of the tenant.
+        """
+        shared_contexts = SHARED_REPLY_CONTEXTS
+        if not lead.pain_point:
+            # Engagement context only varies with the pain point
+            shared_contexts += (self._engagement_context(lead),)
+        if context not in shared_contexts or not looks_like_question(message):
+            return False
+        fields = extract_rules(message).fields
+        return not any(fields.get(field) is not None for field in PERSONAL_FIELDS)
+    
+    async def _plan_reply_prompt(
+        self, message: str, lead: Lead, context: str, shared: bool
+    ) -> Tuple[str, Optional[Tuple[Optional[int], int]]]:
+        """Reply prompt for the turn plan, with the LLM cache scope when it is shared by all leads"""
+        if not shared:
+            return await self._build_reply_prompt(message, lead, context), None
+        prompt = await self._build_reply_prompt(message, lead, context, personalised=False)
+        return prompt, (self.tenant.id if self.tenant else None, (self.tenant_context or {}).get("version", 0))
+    
+    @staticmethod
+    def _lead_snapshot(lead: Lead) -> Dict[str, Any]:
+        """What we already know about the lead, for extraction prompts"""
+        conversation_data = lead.conversation_data or {}
+        return {
+            "name": lead.name,
+            "phone": lead.phone,
+            "email": lead.email,
+            "goal": conversation_data.get("goal"),
+            "budget": conversation_data.get("budget"),
+            "location_preference": conversation_data.get("location_preference"),
+            "property_type": conversation_data.get("property_type"),
+            "bedrooms": conversation_data.get("bedrooms")
+        }
+    
+    def _reply_context(self, state: Optional[ConversationState], message: str, lead: Lead) -> str:
+        """generate_ai_response context the state's handler uses for a free-text message"""
+        if state == ConversationState.ENGAGEMENT:
+            return self._engagement_context(lead)
+        if state == ConversationState.COLLECTING_NAME:
+            return NAME_QUESTION_CONTEXT
+        if state == ConversationState.VALUE_PROPOSITION and "?" in message:
+            return self._property_question_context(message)
+        return ""
+    
     async def extract_user_info_smart(self, message: str, current_lead_data: dict) -> dict:
         """
         🧠 INTELLIGENT EXTRACTION - Extract ALL possible info from message at once
@@ -716,6 +865,12 @@ class Brain:
             "urgency": str or None  # "urgent", "exploring", "planning"
         }
         """
+        # Turn plan: entities come from the turn's single Gemini call (turn_planner.py)
+        if self._planning(message):
+            plan = await self.plan_turn()
+            turn_planner.record_use("entities")
+            return dict(plan.entities) if plan else {}
+        
         if not self.gemini_client or not self.gemini_client.current_key:
             logger.warning("⚠️ Gemini model not available - using fallback extraction")
             return {}
@@ -788,15 +943,17 @@ Now extract from the user's message above.
         self.tenant_context = await get_tenant_context_for_ai(self.tenant.id, lead)
         return self.tenant_context
     
-    def _build_tenant_context_prompt(self) -> str:
-        """Build a prompt section with tenant's data for AI to use."""
-        if not self.tenant_context:
+    def _build_tenant_context_prompt(self, tenant_context: Optional[Dict[str, Any]] = None) -> str:
+        """Build a prompt section with tenant's data for AI to use (default: the current lead's context)."""
+        if tenant_context is None:
+            tenant_context = self.tenant_context
+        if not tenant_context:
             return ""
         
         context_parts = []
         
         # Agent/Company Info
-        tenant_info = self.tenant_context.get("tenant", {})
+        tenant_info = tenant_context.get("tenant", {})
         if tenant_info:
             context_parts.append(f"""
 AGENT INFORMATION:
@@ -806,7 +963,7 @@ AGENT INFORMATION:
 """)
         
         # Available Properties
-        properties = self.tenant_context.get("properties", [])
+        properties = tenant_context.get("properties", [])
         if properties:
             props_lines = []
             for p in properties[:5]:  # Limit to 5 for context
@@ -828,7 +985,7 @@ AVAILABLE PROPERTIES (Agent's Inventory):
 """)
         
         # Off-Plan Projects
-        projects = self.tenant_context.get("projects", [])
+        projects = tenant_context.get("projects", [])
         if projects:
             projs_lines = []
             for proj in projects[:3]:  # Limit to 3 for context
@@ -850,7 +1007,7 @@ OFF-PLAN PROJECTS (Current Launches):
 """)
         
         # Knowledge Base
-        knowledge = self.tenant_context.get("knowledge", [])
+        knowledge = tenant_context.get("knowledge", [])
         if knowledge:
             kb_text = "\n".join([
                 f"  **{k['title']}**\n  {k['content'][:300]}...\n"
@@ -863,37 +1020,36 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
         
         return "\n".join(context_parts)
     
-    def _search_relevant_knowledge(self, user_message: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    def _get_knowledge_index(self, lang: Optional[Language] = None) -> Optional[KnowledgeIndex]:
+        """
+        Get the knowledge retrieval index for a language.
+        The index set comes with the cached tenant context (built once per context version);
+        contexts built elsewhere get one built on first use.
+        """
+        if not self.tenant_context or not self.tenant_context.get("knowledge"):
+            return None
+        
+        indexes = self.tenant_context.get("knowledge_index")
+        if indexes is None:
+            indexes = KnowledgeIndexSet(self.tenant_context["knowledge"])
+            self.tenant_context["knowledge_index"] = indexes
+        return indexes.for_language(lang)
+    
+    def _search_relevant_knowledge(
+        self,
+        user_message: str,
+        max_results: int = 5,
+        lang: Optional[Language] = None
+    ) -> List[Dict[str, Any]]:
         """
         Search for relevant knowledge entries based on user message keywords.
         Returns top matching knowledge entries.
         """
-        if not self.tenant_context or not self.tenant_context.get("knowledge"):
+        index = self._get_knowledge_index(lang)
+        if index is None:
             return []
         
-        all_knowledge = self.tenant_context.get("knowledge", [])
-        message_lower = user_message.lower()
-        
-        # Score each knowledge entry based on keyword matches
-        scored_knowledge = []
-        for k in all_knowledge:
-            score = 0
-            # Check if any keyword matches
-            keywords = k.get("keywords", [])
-            for keyword in keywords:
-                if keyword.lower() in message_lower:
-                    score += 2  # Higher weight for exact keyword match
-            
-            # Check title relevance
-            if any(word in message_lower for word in k.get("title", "").lower().split()):
-                score += 1
-            
-            if score > 0:
-                scored_knowledge.append((score, k))
-        
-        # Sort by score and return top results
-        scored_knowledge.sort(reverse=True, key=lambda x: x[0])
-        return [k for _, k in scored_knowledge[:max_results]]
+        return [k for _, k in index.search(user_message, limit=max_results)]
     
     def _format_knowledge_for_prompt(self, knowledge_list: List[Dict[str, Any]]) -> str:
         """Format knowledge entries for inclusion in AI prompt."""
@@ -918,57 +1074,26 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
         Returns:
             Formatted string with relevant knowledge entries for LLM prompt
         
-        Scoring Algorithm:
-            +2 Points: If any keyword from entry.keywords appears in query
-            +1 Point: If words from entry.title appear in query
+        Scoring Algorithm (see knowledge_index.py):
+            BM25 over title/keywords/content of the entries in the user's language,
+            boosted for whole keyword matches and entry priority.
+            Only entries whose title or keywords match the query are returned.
         """
         # Load tenant context if not already loaded
         if not self.tenant_context:
             logger.warning("⚠️ Tenant context not loaded for knowledge retrieval")
             return ""
         
-        # Get all knowledge entries from context
-        all_knowledge = self.tenant_context.get("knowledge", [])
-        if not all_knowledge:
+        index = self._get_knowledge_index(lang)
+        if index is None:
             logger.info("ℹ️ No knowledge entries found in tenant context")
             return ""
         
-        query_lower = query.lower()
-        scored_entries = []
-        
-        # Score each knowledge entry
-        for entry in all_knowledge:
-            # Skip if language doesn't match
-            if entry.get("language") and entry.get("language") != lang:
-                continue
-            
-            score = 0
-            
-            # +2 points for each keyword match
-            keywords = entry.get("keywords", [])
-            if keywords:
-                for keyword in keywords:
-                    if keyword.lower() in query_lower:
-                        score += 2
-                        logger.debug(f"🔍 Keyword match '{keyword}' in query: +2 points")
-            
-            # +1 point for title word matches
-            title_words = entry.get("title", "").lower().split()
-            for word in title_words:
-                if len(word) > 3 and word in query_lower:  # Ignore short words
-                    score += 1
-                    logger.debug(f"🔍 Title word match '{word}' in query: +1 point")
-            
-            # Only include entries with score > 0
-            if score > 0:
-                scored_entries.append((score, entry.get("priority", 0), entry))
-                logger.info(f"✅ Scored '{entry.get('title')}': {score} points (priority: {entry.get('priority', 0)})")
+        scored_entries = index.search(query, limit=limit)
+        for score, entry in scored_entries:
+            logger.info(f"✅ Scored '{entry.get('title')}': {score:.2f} points (priority: {entry.get('priority', 0)})")
         
-        # Sort by score (descending), then by priority (descending)
-        scored_entries.sort(key=lambda x: (x[0], x[1]), reverse=True)
-        
-        # Get top N entries
-        top_entries = [entry for _, _, entry in scored_entries[:limit]]
+        top_entries = [entry for _, entry in scored_entries]
         
         if not top_entries:
             logger.info("ℹ️ No relevant knowledge entries found for query")
@@ -996,25 +1121,15 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
         Returns:
             Formatted knowledge entry or empty string if not found
         """
-        if not self.tenant_context:
+        index = self._get_knowledge_index(lang)
+        if index is None:
             return ""
         
-        all_knowledge = self.tenant_context.get("knowledge", [])
-        
-        # Search for entries matching the topic keyword
-        for entry in all_knowledge:
-            # Check language match
-            if entry.get("language") and entry.get("language") != lang:
-                continue
-            
-            # Check if topic_keyword is in keywords or title
-            keywords = entry.get("keywords", [])
-            title = entry.get("title", "").lower()
-            topic_lower = topic_keyword.lower()
-            
-            if any(topic_lower in kw.lower() for kw in keywords) or topic_lower in title:
-                logger.info(f"📌 Found specific knowledge for '{topic_keyword}': {entry['title']}")
-                return f"\n\n💡 **{entry['title']}**\n{entry['content']}"
+        # Search for the first entry (by priority) with topic_keyword in its keywords or title
+        entry = index.find_topic(topic_keyword)
+        if entry:
+            logger.info(f"📌 Found specific knowledge for '{topic_keyword}': {entry['title']}")
+            return f"\n\n💡 **{entry['title']}**\n{entry['content']}"
         
         logger.debug(f"ℹ️ No specific knowledge found for '{topic_keyword}'")
         return ""
@@ -1026,12 +1141,15 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
         
         # Check for Persian/Arabic characters
         if re.search(LANGUAGE_PATTERNS[Language.FA], text):
-            # Try to distinguish Persian from Arabic using common words
-            persian_words = ['است', 'این', 'آن', 'من', 'تو', 'ما', 'شما', 'چه', 'که']
-            arabic_words = ['هذا', 'هذه', 'أنا', 'أنت', 'نحن', 'ما', 'لا', 'في']
-            
-            persian_count = sum(1 for word in persian_words if word in text)
-            arabic_count = sum(1 for word in arabic_words if word in text)
+            # Distinguish Persian from Arabic by common words (on normalised tokens, so
+            # Arabic-keyboard yeh/kaf still count) and script-specific letters
+            tokens = tokenize(text)
+            persian_count = sum(1 for token in tokens if token in PERSIAN_MARKER_WORDS)
+            arabic_count = sum(1 for token in tokens if token in ARABIC_MARKER_WORDS)
+            if PERSIAN_ONLY_LETTERS.search(text):
+                persian_count += 2
+            if ARABIC_ONLY_LETTERS.search(text):
+                arabic_count += 1
             
             return Language.FA if persian_count >= arabic_count else Language.AR
         
@@ -1074,7 +1192,7 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
             Language.RU: ['отмена', 'стоп', 'главное меню', 'начать заново']
         }
         
-        if any(keyword in message.lower() for keyword in cancel_keywords.get(lang, [])):
+        if contains_any(message, cancel_keywords.get(lang, [])):
             logger.info(f"🔄 User {lead.id} requested cancellation/restart")
             # Reset to start - return to language selection
             conversation_data.clear()
@@ -1105,25 +1223,18 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
             return None  # Let normal flow continue with extracted data
         
         # 3. User is asking a question - answer it and redirect back
-        is_question = any(char in message for char in ['؟', '?']) or any(
-            word in message.lower() for word in [
-                'چطور', 'چه', 'کی', 'کجا', 'چرا', 'آیا',  # Persian
-                'how', 'what', 'when', 'where', 'why', 'do you', 'can you', 'is it',  # English
-                'هل', 'اين', 'ما', 'كيف', 'متى',  # Arabic
-                'что', 'как', 'когда', 'где', 'почему'  # Russian
-            ]
-        )
+        is_question = looks_like_question(message)
         
         if is_question:
             logger.info(f"❓ User {lead.id} asked question during {expected_state}: {message}")
             
             # Detect OFF-PLAN / PRE-PURCHASE questions
             offplan_keywords = ['پیش خرید', 'پیش‌خرید', 'اف پلن', 'آف پلن', 'off plan', 'off-plan', 'pre-sale', 'presale', 'pre purchase']
-            is_offplan_question = any(keyword in message.lower() for keyword in offplan_keywords)
+            is_offplan_question = contains_any(message, offplan_keywords)
             
             # Detect RESIDENCY / GOLDEN VISA questions
             residency_keywords = ['اقامت', 'ویزا', 'ویزای طلایی', 'گلدن ویزا', 'golden visa', 'residency', 'residence', 'visa']
-            is_residency_question = any(keyword in message.lower() for keyword in residency_keywords)
+            is_residency_question = contains_any(message, residency_keywords)
             
             # Consultation button for ALL responses
             consultation_btn = {
@@ -1249,7 +1360,7 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
         Returns dict with extracted fields if successful, None otherwise.
         """
         extracted = {}
-        message_lower = message.lower()
+        message_lower = normalize(message)
         
         # Security: Limit message length to prevent ReDoS attacks
         if len(message_lower) > 500:
@@ -1267,7 +1378,7 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
         
         for pattern in budget_patterns:
             try:
-                match = re.search(pattern, message_lower)  # Note: Python re.search() doesn't support timeout parameter
+                match = re.search(fold(pattern), message_lower)  # Note: Python re.search() doesn't support timeout parameter
             except Exception as e:
                 logger.error(f"❌ Regex error for pattern {pattern}: {e}")
                 continue
@@ -1307,7 +1418,7 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
         }
         
         for prop_type, keywords in property_keywords.items():
-            if any(kw in message_lower for kw in keywords):
+            if contains_any(message_lower, keywords):
                 extracted['property_type'] = prop_type
                 logger.info(f"🏠 Extracted property type: {prop_type}")
                 break
@@ -1479,14 +1590,14 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
                 while audio_file.state.name == "PROCESSING" and elapsed < max_wait:
                     await asyncio.sleep(1)  # Non-blocking sleep
                     elapsed += 1
-                    audio_file = await loop.run_in_executor(None, genai.get_file, audio_file.name)
+                    audio_file = await loop.run_in_executor(None, self.gemini_client.get_file, audio_file.name)
                 
                 if audio_file.state.name == "PROCESSING":
-                    await loop.run_in_executor(None, genai.delete_file, audio_file.name)
+                    await loop.run_in_executor(None, self.gemini_client.delete_file, audio_file.name)
                     return "Audio processing timeout - file too large or complex", {}
                 
                 if audio_file.state.name == "FAILED":
-                    await loop.run_in_executor(None, genai.delete_file, audio_file.name)
+                    await loop.run_in_executor(None, self.gemini_client.delete_file, audio_file.name)
                     return "Could not process audio file", {}
                 
                 # Prepare prompt for transcript extraction
@@ -1526,15 +1637,15 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
                     )
                 except asyncio.TimeoutError:
                     logger.error("⏱️ Gemini voice API timeout after 30s")
-                    await loop.run_in_executor(None, genai.delete_file, audio_file.name)
+                    await loop.run_in_executor(None, self.gemini_client.delete_file, audio_file.name)
                     return "Voice processing is taking too long. Please try typing your message instead.", {}
                 except Exception as e:
                     logger.error(f"❌ Gemini voice API failed after retries: {e}")
-                    await loop.run_in_executor(None, genai.delete_file, audio_file.name)
+                    await loop.run_in_executor(None, self.gemini_client.delete_file, audio_file.name)
                     return "Voice processing temporarily unavailable. Please try again or type your message.", {}
                 
                 # Clean up
-                await loop.run_in_executor(None, genai.delete_file, audio_file.name)
+                await loop.run_in_executor(None, self.gemini_client.delete_file, audio_file.name)
                 
                 # Parse JSON response
                 response_text = response.text.strip()
@@ -1604,7 +1715,7 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
                 
                 image_file = await loop.run_in_executor(
                     None,
-                    lambda: genai.upload_file(temp_image_path, mime_type=mime_type)
+                    lambda: self.gemini_client.upload_file(temp_image_path, mime_type=mime_type)
                 )
                 
                 # Wait for processing with timeout (non-blocking)
@@ -1613,14 +1724,14 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
                 while image_file.state.name == "PROCESSING" and elapsed < max_wait:
                     await asyncio.sleep(1)  # Non-blocking sleep
                     elapsed += 1
-                    image_file = await loop.run_in_executor(None, genai.get_file, image_file.name)
+                    image_file = await loop.run_in_executor(None, self.gemini_client.get_file, image_file.name)
                 
                 if image_file.state.name == "PROCESSING":
-                    await loop.run_in_executor(None, genai.delete_file, image_file.name)
+                    await loop.run_in_executor(None, self.gemini_client.delete_file, image_file.name)
                     return "Image processing timeout - file too large or complex", []
                 
                 if image_file.state.name == "FAILED":
-                    await loop.run_in_executor(None, genai.delete_file, image_file.name)
+                    await loop.run_in_executor(None, self.gemini_client.delete_file, image_file.name)
                     return "Could not process image file", []
                 
                 # Analyze image and extract features with retry logic
@@ -1644,18 +1755,16 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
                 Return ONLY valid JSON.
                 """
                 
-                async def call_gemini_image():
-                    return self.model.generate_content([image_file, prompt])
-                
                 try:
-                    response = await retry_with_backoff(call_gemini_image)
+                    # Routed to the key that uploaded the file; retries/rotation in the client
+                    response = await self.gemini_client.generate_content_async([image_file, prompt])
                 except Exception as e:
                     logger.error(f"❌ Gemini image API failed after retries: {e}")
-                    await loop.run_in_executor(None, genai.delete_file, image_file.name)
+                    await loop.run_in_executor(None, self.gemini_client.delete_file, image_file.name)
                     return "Image processing temporarily unavailable. Please try again.", []
                 
                 # Clean up
-                await loop.run_in_executor(None, genai.delete_file, image_file.name)
+                await loop.run_in_executor(None, self.gemini_client.delete_file, image_file.name)
                 
                 # Parse JSON response
                 response_text = response.text.strip()
@@ -1784,241 +1893,344 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
             print(f"Entity extraction error: {e}")
             return {}
     
-    def _get_chat_session(self, lead: Lead):
-        """Get or create chat session for a lead to maintain conversation history."""
-        if lead.id not in self.chat_sessions:
-            # Create new chat session with history
-            self.chat_sessions[lead.id] = self.model.start_chat(history=[])
-            logger.info(f"🆕 Created new chat session for lead {lead.id}")
-        return self.chat_sessions[lead.id]
+    async def _build_reply_prompt(self, user_message: str, lead: Lead, context: str = "", personalised: bool = True) -> str:
+        """
+        Prompt generate_ai_response answers from (also the turn plan's reply draft).
+        personalised=False leaves out everything about the lead (profile, inventory
+        filtered by their preferences) so the prompt is the same for every lead.
+        """
+        # Load tenant context if not already loaded
+        if not self.tenant_context:
+            await self.load_tenant_context(lead)
+        if not personalised:
+            lead = Lead(tenant_id=lead.tenant_id, language=lead.language, conversation_state=lead.conversation_state)
+        
+        # === STRATEGY A: Smart FAQ Handling ===
+        # Retrieve relevant knowledge based on user's message
+        knowledge_text = await self.get_relevant_knowledge(
+            query=user_message,
+            lang=lead.language or Language.EN,
+            limit=3
+        )
+        
+        # Build tenant data context
+        if personalised:
+            tenant_data_prompt = self._build_tenant_context_prompt()
+        else:
+            tenant_data_prompt = self._build_tenant_context_prompt(await get_tenant_context_for_ai(self.tenant.id, lead))
+        
+        # Build context about lead's information for AI to remember
+        lead_info_context = f"""
+        
+        ===== LEAD INFORMATION (DO NOT FORGET THIS) =====
+        Lead Name: {lead.name or 'Not provided yet'}
+        Phone Number: {lead.phone or 'Not provided yet - CRITICAL: If they gave phone/contact, acknowledge it!'}
+        Language: {lead.language if lead.language else 'EN'}
+        Current State: {lead.conversation_state.value if hasattr(lead.conversation_state, 'value') else lead.conversation_state or 'START'}
+        Purpose: {lead.purpose.value if hasattr(lead.purpose, 'value') else lead.purpose or 'Unknown'}
+        Budget: {lead.budget_min or 'Not set'} - {lead.budget_max or 'Not set'} AED
+        Location Preference: {lead.preferred_location or 'Any'}
+        Bedrooms: {lead.bedrooms_min or 'Any'} - {lead.bedrooms_max or 'Any'}
+        
+        IMPORTANT: If user shared phone number or voice message, YOU MUST acknowledge it in your response!
+        """
+        
+        system_prompt = f"""
+        You are NOT just a consultant. You are a WORLD-CLASS CLOSER for {self.agent_name} in Dubai real estate.
+        
+        YOUR NAME: Use ONLY "{self.agent_name}" - NEVER variations like "حامد رضا" if name is "حمیدرضا"
+        
+        YOUR GOAL: GET THE MEETING OR PHONE NUMBER. EVERYTHING ELSE IS SECONDARY.
+        
+        🎯 CRITICAL INSTRUCTION - MID-FLOW QUESTIONS:
+        **If the user is in the middle of a qualification flow (e.g., selecting budget, property type) 
+        but asks a question instead:**
+        1. ANSWER the question FIRST (1-2 sentences max)
+        2. Add FOMO/urgency element
+        3. IMMEDIATELY redirect back to the pending question
+        
+        Example:
+        User (while budget selection pending): "Do you offer payment plans?"
+        You: "Absolutely! We have flexible 1-5 year payment plans starting at just 1% monthly. Many investors use this to preserve cash flow. 💰
+        
+        By the way, what's your budget range so I can show you properties that qualify for these plans?"
+        
+        🧠 WOLF CLOSER RULES (FOLLOW STRICTLY):
+        1. ALWAYS respond in {lead.language.upper() if isinstance(lead.language, str) else lead.language.value.upper()} language
+        
+        2. **NEVER end with a statement.** ALWAYS end with a QUESTION or CALL TO ACTION.
+           - ❌ Bad: "The price is 2M AED."
+           - ✅ Good: "The price is 2M AED and we have an offer ending today. Should I reserve a viewing slot?"
+        
+        3. **CREATE ARTIFICIAL SCARCITY (FOMO):**
+           - Even if we have 100 units, act like we have 2-3 left
+           - Phrases to use:
+             * "Checking availability right now..."
+             * "Just one unit left with this view..."
+             * "An investor just released this unit today..."
+             * "3 other buyers looking at this - first come, first served"
+        
+        4. **THE ASSUMPTIVE CLOSE:**
+           - ❌ Don't ask: "Do you want to book a viewing?"
+           - ✅ Ask: "Is Tuesday at 4 PM better for you, or Wednesday morning?"
+           - ❌ Don't ask: "Interested in this property?"
+           - ✅ Ask: "Should I hold this unit for you while you check your schedule?"
+        
+        5. **OBJECTION HANDLING (SALES JIU-JITSU):**
+           - If "Too expensive": "Exactly! That's why the ROI is 10% and value increases daily. Do you want cheap or profitable?"
+           - If "Need to think": "Smart! While you think, Dubai prices rise 15% yearly. Let's lock this price now - you can think after securing it."
+           - If "No budget": "Perfect timing! We have payment plans from 1% monthly. Your rent money could buy this. Want numbers?"
+           - If "Not sure": "Good! That means you're careful with money. Let me show you the ROI calculator - numbers don't lie. Ready?"
+        
+        6. **THE VELVET ROPE (EXCLUSIVITY):**
+           - Make them feel they need to QUALIFY to work with {self.agent_name}
+           - "We usually work with serious investors starting at 2M AED, but for motivated buyers..."
+           - "This off-market deal isn't public yet - only for pre-qualified clients"
+           - "{self.agent_name} only takes 3 new clients per month - December is almost full"
+        
+        7. **URGENCY INJECTORS (use randomly):**
+           - "Price increase scheduled for next week"
+           - "Developer's promotion ends Friday"
+           - "Golden Visa process takes 60 days - earlier you start, earlier you get residency"
+           - "Last unit in this layout - floor plan discontinued"
+        7. **URGENCY INJECTORS (use randomly):**
+           - "Price increase scheduled for next week"
+           - "Developer's promotion ends Friday"
+           - "Golden Visa process takes 60 days - earlier you start, earlier you get residency"
+           - "Last unit in this layout - floor plan discontinued"
+        
+        CRITICAL INFORMATION TO WEAPONIZE:
+        - 🛂 Golden Visa: 2M AED investment = Your ticket to freedom (residency for family!)
+        - 💰 ROI: 7-10% annually = Beats any bank in the world
+        - 📈 Market Growth: Dubai prices +15% yearly = Your cash is losing value sitting idle
+        - 🏦 Payment Plans: As low as 1% monthly = Rent money could BUY instead
+        
+        VISA & RESIDENCY KNOWLEDGE (Use to close):
+        - 🛂 GOLDEN VISA (10 years): 2,000,000 AED minimum - Family residency included!
+        - 👨‍💼 2-YEAR INVESTOR VISA: 750,000 AED minimum - Great starter option!
+        - If user budget is <750K: Push payment plans to reach threshold OR suggest partnering with family
+        
+        === TRUSTED KNOWLEDGE BASE (Use for credibility) ===
+        {knowledge_text if knowledge_text else "No specific knowledge - use general Dubai market facts."}
+        =============================================================
+        
+        PROPERTY RECOMMENDATIONS (Close, don't just inform!):
+        8. **Use ONLY actual properties from inventory below**
+        9. **When showing properties:**
+           - Mention scarcity: "Only 2 units left" or "Just released from previous buyer"
+           - Add social proof: "3 investors viewed this today"
+           - Create urgency: "Price locks for 7 days only"
+           - Assumptive close: "Which floor do you prefer - mid or high?"
+        10. If no matching properties in budget:
+            - Pivot to payment plans: "Your 500K becomes 2M with our 60-month plan"
+            - Suggest partnership: "Many investors co-buy to reach Golden Visa threshold"
+            - Offer agent sourcing: "{self.agent_name} finds off-market deals daily - let's schedule a call"
+        
+        ==== AGENT'S INVENTORY (USE ONLY THESE!) ====
+        {tenant_data_prompt}
+        =============================================
+        
+        LEAD PROFILE (Qualification Data):
+        - Status: {lead.status.value if lead.status else 'new lead'}
+        - Budget: {f"{lead.budget_min:,.0f} - {lead.budget_max:,.0f} {lead.budget_currency or 'AED'}" if lead.budget_min and lead.budget_max else 'NOT YET ASKED - qualify first!'}
+        - Purpose: {lead.purpose.value if lead.purpose else 'NOT YET ASKED - ask now!'}
+        - Property Type: {lead.property_type.value if lead.property_type else 'NOT YET ASKED'}
+        - Location: {lead.preferred_location if lead.preferred_location else 'NOT YET ASKED'}
+        - Pain Point: {lead.pain_point if lead.pain_point else 'FIND IT NOW - crucial for closing!'}
+        
+        CRITICAL: If data missing, ASK with assumptive language:
+        - "Most investors start with 1-2M range - where do you see yourself?"
+        - "Golden Visa or passive income - which matters more to you?"
+        
+        CONVERSATION CONTEXT: {context}
+        
+        RESPONSE STYLE (Wolf Closer Voice):
+        - Confident, authoritative, slightly aggressive BUT polite
+        - Short sentences. Punchy. Impactful.
+        - Use emojis strategically to soften hard closes
+        - 2-3 sentences MAX, then QUESTION or CTA
+        - NEVER say "buttons above" or "select options" - This is CONVERSATION mode!
+        - NEVER repeat yourself - Always respond UNIQUELY with NEW angle
+        
+        CLOSING TRIGGERS (When to push for meeting):
+        - ANY buying signal: "interested", "like", "good", "thinking about it"
+        - Budget questions: "how much", "price", "cost"
+        - 3+ questions asked: Time to close
+        - Objections: Perfect time to flip and close
+        
+        When detected → Immediate assumptive close:
+        "Perfect! {self.agent_name} can show you 3 perfect matches. Tuesday 4 PM or Wednesday 10 AM - which works better?"
+        
+        IF THEY ASK A QUESTION:
+        1. Answer briefly (1-2 sentences)
+        2. Add FOMO element ("prices rising", "units selling fast")
+        3. IMMEDIATELY pivot to booking: "Should I check {self.agent_name}'s calendar?"
+        
+        Remember: You're not here to educate. You're here to CONVERT. Every response is a step closer to the meeting.
+        """.strip()
+        
+        # Build prompt with lead info context
+        return f"{system_prompt}{lead_info_context}\n\nUser says: {user_message}"
+    
+    def _count_question(self, lead: Lead, user_message: str) -> int:
+        """FIX #10d: Increment the lead's question counter; returns the count so far."""
+        conversation_data = lead.conversation_data or {}
+        question_count = conversation_data.get("question_count", 0)
+        
+        # Check if this is likely a question
+        is_question = looks_like_question(user_message)
+        if is_question:
+            question_count += 1
+            conversation_data["question_count"] = question_count
+            logger.info(f"❓ Question #{question_count} from lead {lead.id}")
+        
+        return question_count
+    
+    def _with_consultation_offer(self, response_text: str, lead: Lead, question_count: int) -> str:
+        """FIX #10d: If user has asked 3+ questions, append consultation suggestion"""
+        final_response = response_text.strip()
+        if question_count >= 3 and "📞" not in final_response:
+            lang = lead.language or Language.EN
+            consultation_offers = {
+                Language.EN: "\n\n📞 By the way, I can answer these questions better in a live consultation! Would you like to speak with {agent_name} directly?",
+                Language.FA: "\n\n📞 راستی، این سوالات رو بهتره در یک جلسه مشاوره جواب بدم! می‌خواهید با {agent_name} صحبت کنید؟",
+                Language.AR: "\n\n📞 بالمناسبة، يمكنني الإجابة على هذه الأسئلة بشكل أفضل في استشارة حية! هل تريد التحدث مع {agent_name} مباشرة؟",
+                Language.RU: "\n\n📞 Кстати, я смогу лучше ответить на эти вопросы на живой консультации! Хотите поговорить с {agent_name} напрямую?"
+            }
+            final_response += consultation_offers.get(lang, consultation_offers[Language.EN]).format(agent_name=self.agent_name)
+            logger.info(f"💡 FIX #10d: Added consultation CTA after {question_count} questions")
+        
+        return final_response
     
     async def generate_ai_response(self, user_message: str, lead: Lead, context: str = "") -> str:
+        """
+        Generate a contextual AI response.
+        FAQ-type questions with a confident knowledge base match are answered from the
+        entry (knowledge_answers.py); everything else goes to Gemini.
+        """
+        answer, faq = await self._answer_from_knowledge(user_message, lead, context)
+        if answer is not None:
+            return answer
+        
+        started = time.monotonic()
+        try:
+            return await self._generate_llm_response(user_message, lead, context)
+        finally:
+            if faq:
+                # What a knowledge answer saves, per tenant
+                knowledge_answerer.record_llm_reply(self.tenant.id if self.tenant else None, time.monotonic() - started)
+    
+    async def _answer_from_knowledge(self, user_message: str, lead: Lead, context: str) -> Tuple[Optional[str], bool]:
+        """
+        Answer straight from a confidently matched knowledge entry, without the LLM.
+        Returns (answer or None, whether this is an FAQ-type turn); the follow-up buttons
+        for the other matched entries are attached in process_message.
+        """
+        if not knowledge_answerer.enabled or not self._is_faq_turn(user_message, lead, context):
+            return None, False
+        
+        started = time.monotonic()
+        if not self.tenant_context:
+            await self.load_tenant_context(lead)
+        lang = lead.language or Language.EN
+        index = self._get_knowledge_index(lang)
+        scored_entries = index.search(user_message, limit=KNOWLEDGE_ANSWER_CANDIDATES) if index else []
+        tenant_id = self.tenant.id if self.tenant else None
+        
+        entry = knowledge_answerer.pick(user_message, scored_entries, lang)
+        if entry is None:
+            knowledge_answerer.record_miss(tenant_id, matched=bool(scored_entries))
+            return None, True
+        
+        answer = self._with_consultation_offer(format_answer(entry), lead, self._count_question(lead, user_message))
+        turn = self._turn()
+        turn["knowledge_answer"] = answer
+        turn["knowledge_buttons"] = self._knowledge_buttons(knowledge_answerer.followups(entry, scored_entries, lang), lang)
+        knowledge_answerer.record_answer(tenant_id, time.monotonic() - started)
+        logger.info(f"📚 Answered from knowledge entry '{entry['title']}' (score {scored_entries[0][0]:.2f}) - LLM skipped")
+        return answer, True
+    
+    def _knowledge_buttons(self, followups: List[Dict[str, Any]], lang: Language) -> List[Dict[str, str]]:
+        """Follow-up buttons under a knowledge answer: related entries, then a consultation"""
+        buttons = [{"text": f"❓ {entry['title']}", "callback_data": knowledge_callback(entry)} for entry in followups]
+        buttons.append({"text": "📅 " + self.get_text("btn_schedule_consultation", lang), "callback_data": "schedule_consultation"})
+        return buttons
+    
+    async def _handle_knowledge_followup(
+        self,
+        lang: Language,
+        callback_data: str,
+        lead: Lead,
+        current_state: ConversationState,
+        lead_updates: Dict
+    ) -> BrainResponse:
+        """Follow-up button under a knowledge answer: answer that entry, stay in the current state"""
+        if not self.tenant_context:
+            await self.load_tenant_context(lead)
+        entry = find_callback_entry((self.tenant_context or {}).get("knowledge") or [], callback_data)
+        if entry is None:
+            # Removed or renamed since the button was sent
+            ask_again = {
+                Language.EN: "That information has just been updated. What would you like to know? 😊",
+                Language.FA: "این اطلاعات همین الان به‌روز شده. چه چیزی می‌خواهید بدانید؟ 😊",
+                Language.AR: "تم تحديث هذه المعلومات للتو. ماذا تود أن تعرف؟ 😊",
+                Language.RU: "Эта информация только что обновилась. Что бы вы хотели узнать? 😊"
+            }
+            return BrainResponse(
+                message=ask_again.get(lang, ask_again[Language.EN]),
+                next_state=current_state,
+                lead_updates=lead_updates
+            )
+        
+        knowledge_answerer.record_followup(self.tenant.id if self.tenant else None)
+        index = self._get_knowledge_index(lang)
+        scored_entries = index.search(entry["title"], limit=KNOWLEDGE_ANSWER_CANDIDATES) if index else []
+        return BrainResponse(
+            message=format_answer(entry),
+            next_state=current_state,
+            lead_updates=lead_updates,
+            buttons=self._knowledge_buttons(knowledge_answerer.followups(entry, scored_entries, lang), lang)
+        )
+    
+    async def _generate_llm_response(self, user_message: str, lead: Lead, context: str = "") -> str:
         """
         Generate a contextual AI response using Gemini.
         Uses tenant-specific data (properties, projects, knowledge) for personalized responses.
         
         FIX #10d: Track questions and suggest consultation after 3+ questions
-        FIX #11: Use chat sessions to maintain conversation memory
+        FIX #11: Resend the lead's recent exchanges (chat_history) for conversation memory
         """
-        global GEMINI_API_KEY  # Declare at the start to allow key switching
+        # Turn plan: the reply was drafted by the turn's single Gemini call (turn_planner.py)
+        if self._planning(user_message):
+            plan = await self.plan_turn(context)
+            if plan is not None and plan.reply and plan.context == context:
+                turn_planner.record_use("reply")
+                chat_history.append(lead.id, user_message, plan.reply)
+                return self._with_consultation_offer(plan.reply, lead, self._count_question(lead, user_message))
+            if plan is not None:
+                turn_planner.record_reply_miss()
         
         if not self.model:
             return self.get_text("welcome", lead.language or Language.EN)
         
         try:
-            # Load tenant context if not already loaded
-            if not self.tenant_context:
-                await self.load_tenant_context(lead)
-            
-            # === STRATEGY A: Smart FAQ Handling ===
-            # Retrieve relevant knowledge based on user's message
-            knowledge_text = await self.get_relevant_knowledge(
-                query=user_message,
-                lang=lead.language or Language.EN,
-                limit=3
-            )
-            
-            # Build tenant data context
-            tenant_data_prompt = self._build_tenant_context_prompt()
+            question_count = self._count_question(lead, user_message)
+            full_prompt = await self._build_reply_prompt(user_message, lead, context)
             
-            # FIX #10d: Increment question counter
-            conversation_data = lead.conversation_data or {}
-            question_count = conversation_data.get("question_count", 0)
-            
-            # Check if this is likely a question
-            is_question = any(char in user_message for char in ['؟', '?', 'چطور', 'چه', 'کی', 'کجا', 'چرا', 'how', 'what', 'when', 'where', 'why', 'هل', 'اين', 'ما', 'что', 'как', 'когда', 'где', 'почему'])
-            if is_question:
-                question_count += 1
-                conversation_data["question_count"] = question_count
-                logger.info(f"❓ Question #{question_count} from lead {lead.id}")
-            
-            # Build context about lead's information for AI to remember
-            lead_info_context = f"""
-            
-            ===== LEAD INFORMATION (DO NOT FORGET THIS) =====
-            Lead Name: {lead.name or 'Not provided yet'}
-            Phone Number: {lead.phone or 'Not provided yet - CRITICAL: If they gave phone/contact, acknowledge it!'}
-            Language: {lead.language if lead.language else 'EN'}
-            Current State: {lead.conversation_state.value if hasattr(lead.conversation_state, 'value') else lead.conversation_state or 'START'}
-            Purpose: {lead.purpose.value if hasattr(lead.purpose, 'value') else lead.purpose or 'Unknown'}
-            Budget: {lead.budget_min or 'Not set'} - {lead.budget_max or 'Not set'} AED
-            Location Preference: {lead.preferred_location or 'Any'}
-            Bedrooms: {lead.bedrooms_min or 'Any'} - {lead.bedrooms_max or 'Any'}
-            
-            IMPORTANT: If user shared phone number or voice message, YOU MUST acknowledge it in your response!
-            """
-            
-            system_prompt = f"""
-            You are NOT just a consultant. You are a WORLD-CLASS CLOSER for {self.agent_name} in Dubai real estate.
-            
-            YOUR NAME: Use ONLY "{self.agent_name}" - NEVER variations like "حامد رضا" if name is "حمیدرضا"
-            
-            YOUR GOAL: GET THE MEETING OR PHONE NUMBER. EVERYTHING ELSE IS SECONDARY.
-            
-            🎯 CRITICAL INSTRUCTION - MID-FLOW QUESTIONS:
-            **If the user is in the middle of a qualification flow (e.g., selecting budget, property type) 
-            but asks a question instead:**
-            1. ANSWER the question FIRST (1-2 sentences max)
-            2. Add FOMO/urgency element
-            3. IMMEDIATELY redirect back to the pending question
-            
-            Example:
-            User (while budget selection pending): "Do you offer payment plans?"
-            You: "Absolutely! We have flexible 1-5 year payment plans starting at just 1% monthly. Many investors use this to preserve cash flow. 💰
-            
-            By the way, what's your budget range so I can show you properties that qualify for these plans?"
-            
-            🧠 WOLF CLOSER RULES (FOLLOW STRICTLY):
-            1. ALWAYS respond in {lead.language.upper() if isinstance(lead.language, str) else lead.language.value.upper()} language
-            
-            2. **NEVER end with a statement.** ALWAYS end with a QUESTION or CALL TO ACTION.
-               - ❌ Bad: "The price is 2M AED."
-               - ✅ Good: "The price is 2M AED and we have an offer ending today. Should I reserve a viewing slot?"
-            
-            3. **CREATE ARTIFICIAL SCARCITY (FOMO):**
-               - Even if we have 100 units, act like we have 2-3 left
-               - Phrases to use:
-                 * "Checking availability right now..."
-                 * "Just one unit left with this view..."
-                 * "An investor just released this unit today..."
-                 * "3 other buyers looking at this - first come, first served"
-            
-            4. **THE ASSUMPTIVE CLOSE:**
-               - ❌ Don't ask: "Do you want to book a viewing?"
-               - ✅ Ask: "Is Tuesday at 4 PM better for you, or Wednesday morning?"
-               - ❌ Don't ask: "Interested in this property?"
-               - ✅ Ask: "Should I hold this unit for you while you check your schedule?"
-            
-            5. **OBJECTION HANDLING (SALES JIU-JITSU):**
-               - If "Too expensive": "Exactly! That's why the ROI is 10% and value increases daily. Do you want cheap or profitable?"
-               - If "Need to think": "Smart! While you think, Dubai prices rise 15% yearly. Let's lock this price now - you can think after securing it."
-               - If "No budget": "Perfect timing! We have payment plans from 1% monthly. Your rent money could buy this. Want numbers?"
-               - If "Not sure": "Good! That means you're careful with money. Let me show you the ROI calculator - numbers don't lie. Ready?"
-            
-            6. **THE VELVET ROPE (EXCLUSIVITY):**
-               - Make them feel they need to QUALIFY to work with {self.agent_name}
-               - "We usually work with serious investors starting at 2M AED, but for motivated buyers..."
-               - "This off-market deal isn't public yet - only for pre-qualified clients"
-               - "{self.agent_name} only takes 3 new clients per month - December is almost full"
-            
-            7. **URGENCY INJECTORS (use randomly):**
-               - "Price increase scheduled for next week"
-               - "Developer's promotion ends Friday"
-               - "Golden Visa process takes 60 days - earlier you start, earlier you get residency"
-               - "Last unit in this layout - floor plan discontinued"
-            7. **URGENCY INJECTORS (use randomly):**
-               - "Price increase scheduled for next week"
-               - "Developer's promotion ends Friday"
-               - "Golden Visa process takes 60 days - earlier you start, earlier you get residency"
-               - "Last unit in this layout - floor plan discontinued"
-            
-            CRITICAL INFORMATION TO WEAPONIZE:
-            - 🛂 Golden Visa: 2M AED investment = Your ticket to freedom (residency for family!)
-            - 💰 ROI: 7-10% annually = Beats any bank in the world
-            - 📈 Market Growth: Dubai prices +15% yearly = Your cash is losing value sitting idle
-            - 🏦 Payment Plans: As low as 1% monthly = Rent money could BUY instead
-            
-            VISA & RESIDENCY KNOWLEDGE (Use to close):
-            - 🛂 GOLDEN VISA (10 years): 2,000,000 AED minimum - Family residency included!
-            - 👨‍💼 2-YEAR INVESTOR VISA: 750,000 AED minimum - Great starter option!
-            - If user budget is <750K: Push payment plans to reach threshold OR suggest partnering with family
-            
-            === TRUSTED KNOWLEDGE BASE (Use for credibility) ===
-            {knowledge_text if knowledge_text else "No specific knowledge - use general Dubai market facts."}
-            =============================================================
-            
-            PROPERTY RECOMMENDATIONS (Close, don't just inform!):
-            8. **Use ONLY actual properties from inventory below**
-            9. **When showing properties:**
-               - Mention scarcity: "Only 2 units left" or "Just released from previous buyer"
-               - Add social proof: "3 investors viewed this today"
-               - Create urgency: "Price locks for 7 days only"
-               - Assumptive close: "Which floor do you prefer - mid or high?"
-            10. If no matching properties in budget:
-                - Pivot to payment plans: "Your 500K becomes 2M with our 60-month plan"
-                - Suggest partnership: "Many investors co-buy to reach Golden Visa threshold"
-                - Offer agent sourcing: "{self.agent_name} finds off-market deals daily - let's schedule a call"
-            
-            ==== AGENT'S INVENTORY (USE ONLY THESE!) ====
-            {tenant_data_prompt}
-            =============================================
-            
-            LEAD PROFILE (Qualification Data):
-            - Status: {lead.status.value if lead.status else 'new lead'}
-            - Budget: {f"{lead.budget_min:,.0f} - {lead.budget_max:,.0f} {lead.budget_currency or 'AED'}" if lead.budget_min and lead.budget_max else 'NOT YET ASKED - qualify first!'}
-            - Purpose: {lead.purpose.value if lead.purpose else 'NOT YET ASKED - ask now!'}
-            - Property Type: {lead.property_type.value if lead.property_type else 'NOT YET ASKED'}
-            - Location: {lead.preferred_location if lead.preferred_location else 'NOT YET ASKED'}
-            - Pain Point: {lead.pain_point if lead.pain_point else 'FIND IT NOW - crucial for closing!'}
-            
-            CRITICAL: If data missing, ASK with assumptive language:
-            - "Most investors start with 1-2M range - where do you see yourself?"
-            - "Golden Visa or passive income - which matters more to you?"
-            
-            CONVERSATION CONTEXT: {context}
-            
-            RESPONSE STYLE (Wolf Closer Voice):
-            - Confident, authoritative, slightly aggressive BUT polite
-            - Short sentences. Punchy. Impactful.
-            - Use emojis strategically to soften hard closes
-            - 2-3 sentences MAX, then QUESTION or CTA
-            - NEVER say "buttons above" or "select options" - This is CONVERSATION mode!
-            - NEVER repeat yourself - Always respond UNIQUELY with NEW angle
-            
-            CLOSING TRIGGERS (When to push for meeting):
-            - ANY buying signal: "interested", "like", "good", "thinking about it"
-            - Budget questions: "how much", "price", "cost"
-            - 3+ questions asked: Time to close
-            - Objections: Perfect time to flip and close
-            
-            When detected → Immediate assumptive close:
-            "Perfect! {self.agent_name} can show you 3 perfect matches. Tuesday 4 PM or Wednesday 10 AM - which works better?"
-            
-            IF THEY ASK A QUESTION:
-            1. Answer briefly (1-2 sentences)
-            2. Add FOMO element ("prices rising", "units selling fast")
-            3. IMMEDIATELY pivot to booking: "Should I check {self.agent_name}'s calendar?"
-            
-            Remember: You're not here to educate. You're here to CONVERT. Every response is a step closer to the meeting.
-            """.strip()
-            
-            # FIX #11: Use chat session to maintain conversation history
-            chat = self._get_chat_session(lead)
-            
-            # Build prompt with lead info context
-            full_prompt = f"{system_prompt}{lead_info_context}\n\nUser says: {user_message}"
+            # FIX #11: Resend the lead's recent exchanges (bounded, see chat_history.py) for conversation memory
+            contents = chat_history.contents(lead.id) + [{"role": "user", "parts": [full_prompt]}]
             
             # BUG-005 FIX: Add timeout and retry logic with exponential backoff
+            # 429s are handled by the key pool (another key, or waiting for a cooldown) inside
+            # generate_content_async - running out of keys ends the turn with the quota message
             response = None
             for attempt in range(MAX_RETRIES):
                 try:
                     response = await asyncio.wait_for(
-                        asyncio.to_thread(chat.send_message, full_prompt),
+                        self.gemini_client.generate_content_async(contents),
                         timeout=30.0
                     )
                     break  # Success - exit retry loop
-                except google_exceptions.ResourceExhausted:
-                    logger.warning(f"⚠️ Gemini quota exceeded for lead {lead.id} (attempt {attempt + 1}/{MAX_RETRIES})")
-                    if attempt < MAX_RETRIES - 1:
-                        # Try with different API key
-                        if len(VALID_GEMINI_KEYS) > 1:
-                            old_key = GEMINI_API_KEY
-                            new_key = random.choice([k for k in VALID_GEMINI_KEYS if k != old_key])
-                            genai.configure(api_key=new_key)
-                            logger.info(f"🔄 Switched to different Gemini API key")
-                        wait_time = RETRY_DELAY_BASE * (2 ** attempt)
-                        logger.info(f"⏳ Waiting {wait_time}s before retry...")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        logger.error(f"❌ All retries exhausted for lead {lead.id}")
-                        lang = lead.language or Language.EN
-                        quota_messages = {
-                            Language.EN: "I'm experiencing high demand right now. Please try again in a moment.",
-                            Language.FA: "الان تقاضا خیلی زیاده. لطفاً یک لحظه دیگه امتحان کنید.",
-                            Language.AR: "أواجه طلبًا كبيرًا الآن. يرجى المحاولة مرة أخرى في لحظة.",
-                            Language.RU: "Сейчас высокая нагрузка. Попробуйте через момент."
-                        }
-                        return quota_messages.get(lang, quota_messages[Language.EN])
                 except asyncio.TimeoutError:
                     logger.error(f"⏱️ Gemini API timeout after 30s for lead {lead.id} (attempt {attempt + 1}/{MAX_RETRIES})")
                     if attempt < MAX_RETRIES - 1:
@@ -2034,12 +2246,17 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
                         }
                         return timeout_messages.get(lang, timeout_messages[Language.EN])
                 except Exception as api_error:
-                    logger.error(f"❌ Gemini API error (attempt {attempt + 1}/{MAX_RETRIES}): {type(api_error).__name__}: {str(api_error)}")
-                    if attempt < MAX_RETRIES - 1:
-                        await asyncio.sleep(RETRY_DELAY_BASE)
-                    else:
-                        # Final fallback after all retries
+                    if not isinstance(api_error, GeminiKeysUnavailable) and not is_rate_limit_error(api_error):
                         raise
+                    logger.error(f"❌ Gemini quota exhausted on every key for lead {lead.id}: {api_error}")
+                    lang = lead.language or Language.EN
+                    quota_messages = {
+                        Language.EN: "I'm experiencing high demand right now. Please try again in a moment.",
+                        Language.FA: "الان تقاضا خیلی زیاده. لطفاً یک لحظه دیگه امتحان کنید.",
+                        Language.AR: "أواجه طلبًا كبيرًا الآن. يرجى المحاولة مرة أخرى في لحظة.",
+                        Language.RU: "Сейчас высокая нагрузка. Попробуйте через момент."
+                    }
+                    return quota_messages.get(lang, quota_messages[Language.EN])
             
             if not response:
                 # Should not reach here, but safety check
@@ -2052,20 +2269,11 @@ DUBAI REAL ESTATE KNOWLEDGE BASE (Always use this for factual answers):
                 }
                 return fallback_messages.get(lang, fallback_messages[Language.EN])
             
-            # FIX #10d: If user has asked 3+ questions, append consultation suggestion
-            final_response = response.text.strip()
-            if question_count >= 3 and "📞" not in final_response:
-                lang = lead.language or Language.EN
-                consultation_offers = {
-                    Language.EN: "\n\n📞 By the way, I can answer these questions better in a live consultation! Would you like to speak with {agent_name} directly?",
-                    Language.FA: "\n\n📞 راستی، این سوالات رو بهتره در یک جلسه مشاوره جواب بدم! می‌خواهید با {agent_name} صحبت کنید؟",
-                    Language.AR: "\n\n📞 بالمناسبة، يمكنني الإجابة على هذه الأسئلة بشكل أفضل في استشارة حية! هل تريد التحدث مع {agent_name} مباشرة؟",
-                    Language.RU: "\n\n📞 Кстати, я смогу лучше ответить на эти вопросы на живой консультации! Хотите поговорить с {agent_name} напрямую?"
-                }
-                final_response += consultation_offers.get(lang, consultation_offers[Language.EN]).format(agent_name=self.agent_name)
-                logger.info(f"💡 FIX #10d: Added consultation CTA after {question_count} questions")
+            reply = response.text
+            chat_history.append(lead.id, user_message, reply)
             
-            return final_response
+            # FIX #10d: If user has asked 3+ questions, append consultation suggestion
+            return self._with_consultation_offer(reply, lead, question_count)
         except Exception as e:
             logger.error(f"❌ AI response error: {e}")
             import traceback
@@ -2381,6 +2589,12 @@ Ready to make the move? 🚀
                 "transaction_type": "buy" | "rent" | null
             }
         """
+        # Turn plan: intent comes from the turn's single Gemini call (turn_planner.py)
+        if self._planning(message):
+            plan = await self.plan_turn()
+            turn_planner.record_use("intent")
+            return plan.intent_for(expected_entities) if plan else {}
+        
         prompt = f"""
 Analyze this real estate inquiry and extract structured data.
 
@@ -2408,7 +2622,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
 """
         
         try:
-            response = await self.model.generate_content(prompt)
+            response = await self.gemini_client.generate_content_async(prompt)
             response_text = response.text.strip()
             # Remove markdown code blocks if present
             response_text = response_text.replace("```json", "").replace("```", "").strip()
@@ -2426,8 +2640,8 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         """
         🏠 گرفتن املاک واقعی از دیتابیس (نه فقط tenant_context)
         
-        این تابع مستقیم از table tenant_properties می‌خونه و 
-        املاک رو filter می‌کنه بر اساس:
+        این تابع از property_index (ستون‌های in-memory جدول tenant_properties) می‌خونه و 
+        املاک رو filter و رتبه‌بندی می‌کنه بر اساس:
         - نوع معامله (خرید/اجاره)
         - بودجه
         - نوع ملک
@@ -2441,69 +2655,48 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         Returns:
             لیستی از دیکشنری‌های property با تمام اطلاعات
         """
-        async with async_session() as db:
-            # Start with base query - tenant_id + is_available only (LESS RESTRICTIVE)
-            query = select(TenantProperty).where(
-                TenantProperty.tenant_id == lead.tenant_id,
-                TenantProperty.is_available == True
-            )
-            
-            conversation_data = lead.conversation_data or {}
-            
-            # SOFT FILTERS (optional - if missing, show all properties)
-            # These won't block results, just order them better
-            
-            # 1. Budget filter (OPTIONAL - wide range)
-            budget_min = lead.budget_min or conversation_data.get("budget_min")
-            budget_max = lead.budget_max or conversation_data.get("budget_max")
-            
-            if budget_max:
-                # Allow 50% flexibility above budget
-                flexible_max = int(budget_max * 1.5)
-                query = query.where(TenantProperty.price <= flexible_max)
-                logger.info(f"💰 Budget filter (flexible): ≤ {flexible_max:,} AED")
-            
-            # 2. Bedrooms filter (OPTIONAL)
-            bedrooms_min = lead.bedrooms_min or conversation_data.get("bedrooms_min")
-            if bedrooms_min:
-                # Allow ±1 bedroom flexibility
-                flex_min = max(0, bedrooms_min - 1)
-                flex_max = bedrooms_min + 2
-                query = query.where(
-                    TenantProperty.bedrooms >= flex_min,
-                    TenantProperty.bedrooms <= flex_max
-                )
-                logger.info(f"🛏️ Bedrooms filter (flexible): {flex_min}-{flex_max}BR")
-            
-            # 3. Location preference (OPTIONAL - fuzzy match)
-            preferred_location = conversation_data.get("preferred_location") or lead.preferred_location
-            if preferred_location:
-                # Fuzzy match - show properties in similar areas
-                query = query.where(
-                    TenantProperty.location.ilike(f"%{preferred_location}%")
-                )
-                logger.info(f"📍 Location filter: ~{preferred_location}")
-            
-            # ✅ NEW: Amenities filter (pool, gym, beach, parking)
-            required_amenities = conversation_data.get("required_amenities")
-            if required_amenities and isinstance(required_amenities, list):
-                # Match properties that have ALL required amenities
-                for amenity in required_amenities:
-                    query = query.where(
-                        TenantProperty.features.op('@>')(f'["{amenity}"]')  # PostgreSQL array contains operator
-                    )
-                logger.info(f"🏊 Amenities filter: {required_amenities}")
-            
-            # ✅ ALWAYS ORDER BY: Featured first, then price
-            query = query.order_by(
-                TenantProperty.is_featured.desc(),
-                TenantProperty.price.asc()
-            ).limit(limit).offset(offset)
-            
-            result = await db.execute(query)
-            properties = result.scalars().all()
-            
-            logger.info(f"✅ Found {len(properties)} properties for tenant {lead.tenant_id} (offset={offset})")
+        conversation_data = lead.conversation_data or {}
+        filters: Dict[str, Any] = {}
+
+        # HARD FILTERS (flexible ranges) decide which properties qualify;
+        # SOFT PREFERENCES won't block results, just order them better
+
+        # 1. Budget (hard cap with 50% flexibility, soft bonus within budget)
+        budget_min = lead.budget_min or conversation_data.get("budget_min")
+        budget_max = lead.budget_max or conversation_data.get("budget_max")
+
+        if budget_max:
+            flexible_max = int(budget_max * 1.5)
+            filters["max_price"] = flexible_max
+            filters["prefer_max_price"] = budget_max
+            logger.info(f"💰 Budget filter (flexible): ≤ {flexible_max:,} AED")
+
+        # 2. Bedrooms (hard -1/+2 range, closest first)
+        bedrooms_min = lead.bedrooms_min or conversation_data.get("bedrooms_min")
+        if bedrooms_min:
+            flex_min = max(0, bedrooms_min - 1)
+            flex_max = bedrooms_min + 2
+            filters["min_bedrooms"] = flex_min
+            filters["max_bedrooms"] = flex_max
+            filters["prefer_bedrooms"] = bedrooms_min
+            logger.info(f"🛏️ Bedrooms filter (flexible): {flex_min}-{flex_max}BR")
+
+        # 3. Location preference (soft - matching areas ranked first)
+        preferred_location = conversation_data.get("preferred_location") or lead.preferred_location
+        if preferred_location:
+            filters["prefer_location"] = preferred_location
+            logger.info(f"📍 Location preference: ~{preferred_location}")
+
+        # 4. Amenities (pool, gym, beach, parking) - soft, more matches rank higher
+        required_amenities = conversation_data.get("required_amenities")
+        if required_amenities and isinstance(required_amenities, list):
+            filters["prefer_amenities"] = required_amenities
+            logger.info(f"🏊 Amenities preference: {required_amenities}")
+
+        # Ordered by preference score, then featured first, then price
+        properties = await property_index.search(lead.tenant_id, limit=limit, offset=offset, **filters)
+
+        logger.info(f"✅ Found {len(properties)} properties for tenant {lead.tenant_id} (offset={offset})")
         
         # Convert to dict
         properties_list = []
@@ -2679,7 +2872,32 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         """
         Main entry point for processing user messages.
         Implements the Turbo Qualification State Machine.
+        
+        Runs inside a message_turn(): lead updates made while handling the
+        message are written once at the end of the (outermost) turn.
         """
+        async with message_turn():
+            self.begin_turn(lead, message if message and not callback_data else None)
+            with turn_planner.measure_turn():
+                response = await self._process_message(lead, message, callback_data)
+            return self._with_knowledge_buttons(response)
+    
+    def _with_knowledge_buttons(self, response: BrainResponse) -> BrainResponse:
+        """Add a knowledge answer's follow-up buttons when the reply carries the answer"""
+        turn = self._turn()
+        answer, buttons = turn.get("knowledge_answer"), turn.get("knowledge_buttons")
+        if not answer or not buttons or response.request_contact or answer not in (response.message or ""):
+            return response
+        existing = {button.get("callback_data") for button in response.buttons or []}
+        response.buttons = [b for b in buttons if b["callback_data"] not in existing] + list(response.buttons or [])
+        return response
+    
+    async def _process_message(
+        self, 
+        lead: Lead, 
+        message: str, 
+        callback_data: Optional[str] = None
+    ) -> BrainResponse:
         # Detect language from message (always check for language change)
         detected_lang = self.detect_language(message)
         
@@ -2702,6 +2920,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             current_state = ConversationState.START
         
         logger.info(f"🎯 FINAL current_state = {current_state}")
+        self._turn()["state"] = current_state
         
         # 🔥 VALIDATE STATE INTEGRITY (10/10 Flow Logic)
         conversation_data = lead.conversation_data or {}
@@ -2713,19 +2932,11 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         # ===== SENTIMENT DETECTION - CHECK FOR NEGATIVE TONE =====
         # If user expresses frustration/anger, immediately offer human support
         if message and not callback_data:
-            negative_sentiment_keywords = {
-                Language.FA: r'\b(کلافه شدم|دیونه شدم|خیلی زیادی|اذیت شدم|خسته شدم|بدم میاد|چقدر حرف|حالم بد|بسه دیگه)\b',
-                Language.AR: r'\b(مسخوط|غاضب|زعلان|تعبت|ملل|بطيء|قاسي|سيئ)\b',
-                Language.RU: r'\b(раздосадовано|злой|устал|ужасно|недовольны|усталь)\b',
-                Language.EN: r'\b(annoyed|frustrated|angry|stupid|terrible|tired|awful|enough already|just stop)\b'
-            }
-            
             # Check all possible languages for sentiment
-            is_negative_sentiment = False
-            for lang_key, pattern in negative_sentiment_keywords.items():
-                if re.search(pattern, message, re.IGNORECASE):
-                    is_negative_sentiment = True
-                    break
+            message_normalized = normalize(message)
+            is_negative_sentiment = any(
+                pattern.search(message_normalized) for pattern in NEGATIVE_SENTIMENT_PATTERNS.values()
+            )
             
             if is_negative_sentiment:
                 # User is frustrated - offer immediate human handoff
@@ -2757,16 +2968,13 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         # این همون "مغز" هست که همه چیز رو یکجا می‌فهمه!
         extracted_info = {}
         if message and not callback_data and len(message.strip()) > 3:
-            current_lead_data = {
-                "name": lead.name,
-                "phone": lead.phone,
-                "email": lead.email,
-                "goal": conversation_data.get("goal"),
-                "budget": conversation_data.get("budget"),
-                "location": conversation_data.get("location_preference")
-            }
+            current_lead_data = self._lead_snapshot(lead)
             
-            extracted_info = await self.extract_user_info_smart(message, current_lead_data)
+            # Rules first - Gemini only for needed fields they can't resolve (entity_extractor.py),
+            # through the turn plan so the handlers reuse that call
+            extracted_info = await entity_extractor.extract(
+                message, current_state, current_lead_data, self.extract_user_info_smart
+            )
             
             # Save extracted info to lead immediately
             lead_updates = {}
@@ -2821,9 +3029,9 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         
         requested_lang = None
         if message and not callback_data:
-            message_lower = message.lower()
+            message_lower = normalize(message)
             for lang, pattern in lang_change_patterns.items():
-                if re.search(pattern, message_lower, re.IGNORECASE):
+                if re.search(fold(pattern), message_lower, re.IGNORECASE):
                     requested_lang = lang
                     break
         
@@ -2932,6 +3140,10 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         # Update lead language if changed
         lead_updates = {"language": lang}
         
+        # Follow-up button under a knowledge base answer (any state)
+        if callback_data and callback_data.startswith(KNOWLEDGE_CALLBACK_PREFIX):
+            return await self._handle_knowledge_followup(lang, callback_data, lead, current_state, lead_updates)
+        
         # State Machine Logic
         if current_state == ConversationState.START:
             # CRITICAL FIX: If user clicked a language button (callback_data), process it immediately
@@ -2941,11 +3153,11 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             # If user types a language name instead of clicking button, handle it
             if message and not callback_data:
                 # Check if message contains language request
-                message_lower = message.lower()
+                message_lower = normalize(message)
                 detected_lang = None
                 if re.search(r'فارسی|persian|farsi', message_lower, re.IGNORECASE):
                     detected_lang = Language.FA
-                elif re.search(r'عربي|عربی|arabic', message_lower, re.IGNORECASE):
+                elif re.search(r'عربی|arabic', message_lower, re.IGNORECASE):
                     detected_lang = Language.AR
                 elif re.search(r'русский|russian', message_lower, re.IGNORECASE):
                     detected_lang = Language.RU
@@ -3029,13 +3241,13 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             lead_updates["language"] = lang
         # Handle text-based language selection (user types language name or any text)
         elif message:
-            message_lower = message.lower().strip()
+            message_lower = normalize(message)
             
             # First check for explicit language keywords
-            if 'فارسی' in message or 'persian' in message_lower or 'fa' in message_lower:
+            if 'فارسی' in message_lower or 'persian' in message_lower or 'fa' in message_lower:
                 lang = Language.FA
                 lead_updates["language"] = lang
-            elif 'عربي' in message or 'arabic' in message_lower or 'ar' in message_lower:
+            elif 'عربی' in message_lower or 'arabic' in message_lower or 'ar' in message_lower:
                 lang = Language.AR
                 lead_updates["language"] = lang
             elif 'русский' in message_lower or 'russian' in message_lower or 'ru' in message_lower:
@@ -3127,8 +3339,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         simple_name_pattern = r'^[A-Za-z\u0600-\u06FF\u0400-\u04FF\s]{2,30}$'
         
         # CRITICAL FIX: Check if this looks like a QUESTION instead of name
-        is_question = any(char in message for char in ['؟', '?']) or \
-                     any(word in message.lower() for word in ['how', 'what', 'when', 'where', 'why', 'چطور', 'چه', 'چی', 'کی', 'کجا', 'چرا', 'هل', 'ما', 'اين', 'كيف', 'لماذا', 'что', 'как', 'когда', 'где', 'почему'])
+        is_question = looks_like_question(message)
         
         # If it's a question, answer it FIRST, then ask for name again
         if is_question and len(message) > 10:
@@ -3136,7 +3347,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             
             # Generate AI answer to the question
             try:
-                ai_answer = await self.generate_ai_response(message, lead, "User asked a question while we're collecting their name. Answer their question BRIEFLY (1-2 sentences max), then politely ask for their name again.")
+                ai_answer = await self.generate_ai_response(message, lead, NAME_QUESTION_CONTEXT)
                 
                 # Append "Now, what's your name?" to the AI answer
                 ask_name_again = {
@@ -3405,28 +3616,28 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             
             # FALLBACK: If AI fails, use keyword matching (handles voice transcription errors)
             if not intent_data.get("goal"):
-                message_lower = message.lower()
+                message_lower = normalize(message)
                 goal_keywords = {
                     "investment": ["سرمایه", "investment", "invest", "استثمار", "инвестиц", "roi", "return", "بازده", "سود", "درآمد"],
                     "living": ["زندگی", "living", "live", "سكن", "жилье", "خونه", "منزل", "home", "family", "خانواده"],
                     "residency": ["اقامت", "residency", "visa", "виза", "تأشيرة", "ویزا", "اقامة", "residenc", "golden visa"]
                 }
                 for goal_key, keywords in goal_keywords.items():
-                    if any(kw in message_lower for kw in keywords):
+                    if contains_any(message_lower, keywords):
                         intent_data["goal"] = goal_key
                         logger.info(f"✅ Goal '{goal_key}' extracted via keyword fallback from: '{message}'")
                         break
             
             # FALLBACK: Extract transaction_type via keyword matching if AI didn't
             if not intent_data.get("transaction_type"):
-                message_lower = message.lower()
+                message_lower = normalize(message)
                 rent_keywords = ["rent", "rental", "lease", "اجاره", "إيجار", "аренда", "کرایه"]
                 buy_keywords = ["buy", "purchase", "خرید", "شراء", "купить", "own", "سرمایه‌گذاری"]
                 
-                if any(kw in message_lower for kw in rent_keywords):
+                if contains_any(message_lower, rent_keywords):
                     intent_data["transaction_type"] = "rent"
                     logger.info(f"✅ Transaction type 'rent' extracted via keyword from: '{message}'")
-                elif any(kw in message_lower for kw in buy_keywords):
+                elif contains_any(message_lower, buy_keywords):
                     intent_data["transaction_type"] = "buy"
                     logger.info(f"✅ Transaction type 'buy' extracted via keyword from: '{message}'")
             
@@ -3667,9 +3878,8 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
                     "residency": ["اقامت", "residency", "visa", "виза", "تأشيرة", "ویزا", "اقامة"]
                 }
                 
-                message_lower = message.lower()
                 for goal_check, keywords in goal_keywords.items():
-                    if any(kw.lower() in message_lower or kw in message for kw in keywords):
+                    if contains_any(message, keywords):
                         # User specified goal in text - treat as button click
                         logger.info(f"✅ Goal '{goal_check}' extracted from text: '{message}'")
                         return await self._handle_warmup(lang, None, f"purpose_{goal_check}", lead, lead_updates)
@@ -4373,6 +4583,15 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             next_state=ConversationState.SLOT_FILLING
         )
     
+    @staticmethod
+    def _property_question_context(message: str) -> str:
+        """generate_ai_response context for a question about the properties already shown"""
+        return f"""Answer this specific question about the property or real estate. 
+        DO NOT say 'Great! Here are properties...' - they already saw the list.
+        Answer their question directly and concisely (2-3 sentences max).
+        Question: {message}
+        """
+    
     async def _handle_value_proposition(
         self,
         lang: Language,
@@ -4409,7 +4628,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         
         # ===== CRITICAL: HANDLE TEXT MESSAGES IN VALUE_PROPOSITION =====
         if message and not callback_data:
-            message_lower = message.lower().strip()
+            message_lower = normalize(message)
             
             logger.info(f"📝 VALUE_PROPOSITION text input from lead {lead.id}: '{message}'")
             
@@ -4422,9 +4641,9 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             show_properties_keywords = ["show", "present", "پرزنت", "نشون بده", "بهم نشون بده", "ببینم", "خب منتظر", "منتظرم", "ملک", "property", "properties", "املاک", "أرني", "اعرض", "عقار", "покажи", "показать", "недвижимость", "show_properties_auto"]
             
             # Check if message is JUST affirmative/negative (not part of longer question)
-            is_pure_affirmative = any(kw == message_lower for kw in affirmative_keywords) or any(kw in message_lower for kw in affirmative_keywords[:4])  # English variants
-            is_pure_negative = any(kw == message_lower for kw in negative_keywords)
-            is_show_properties_request = any(kw in message_lower for kw in show_properties_keywords)
+            is_pure_affirmative = any(normalize(kw) == message_lower for kw in affirmative_keywords) or contains_any(message_lower, affirmative_keywords[:4])  # English variants
+            is_pure_negative = any(normalize(kw) == message_lower for kw in negative_keywords)
+            is_show_properties_request = contains_any(message_lower, show_properties_keywords)
             
             # CRITICAL: User explicitly wants to see properties - CHECK COMPLETENESS
             conversation_data = lead.conversation_data or {}
@@ -4441,92 +4660,83 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
                 logger.info(f"✅ Property request detected from lead {lead.id} - budget={has_budget}, location={has_location}, type={has_property_type}")
                 
                 # User wants to see properties with details - GET REAL PROPERTIES FROM DATABASE
-                async with async_session() as session:
-                    from sqlalchemy import select
-                    from database import TenantProperty
+                # Get properties matching lead criteria from the property index
+                filters: Dict[str, Any] = {}
+                
+                # Apply filters if available
+                conversation_data = lead.conversation_data or {}
+                if conversation_data.get("budget"):
+                    filters["max_price"] = int(conversation_data["budget"]) * 1.2  # 20% flexibility
+                
+                if conversation_data.get("property_type"):
+                    prop_type = conversation_data["property_type"]
+                    if prop_type != "any":
+                        # Normalize property type to valid enum value
+                        from database import normalize_property_type
+                        normalized_type = normalize_property_type(prop_type)
+                        if normalized_type:
+                            filters["property_types"] = [normalized_type]
+                
+                properties_db = await property_index.search(lead.tenant_id, limit=5, **filters)
+                
+                if properties_db:
+                    logger.info(f"✅ Found {len(properties_db)} properties in database for lead {lead.id}")
                     
-                    # Get properties matching lead criteria (is_active removed - column doesn't exist)
-                    query = select(TenantProperty).where(
-                        TenantProperty.tenant_id == lead.tenant_id
-                    )
+                    # Convert to dict format for property_presenter
+                    properties_list = []
+                    for prop in properties_db:
+                        properties_list.append({
+                            "id": prop.id,
+                            "name": prop.name,
+                            "price": prop.price,
+                            "location": prop.location,
+                            "bedrooms": prop.bedrooms,
+                            "bathrooms": prop.bathrooms,
+                            "area": prop.area_sqft,
+                            "property_type": prop.property_type,
+                            "image_urls": prop.image_urls or [],
+                            "brochure_pdf": prop.brochure_pdf,
+                            "primary_image": prop.primary_image,
+                            "features": prop.features or [],
+                            "description": prop.description,
+                            "golden_visa": prop.golden_visa_eligible
+                        })
                     
-                    # Apply filters if available
+                    # Track shown properties to avoid repetition
                     conversation_data = lead.conversation_data or {}
-                    if conversation_data.get("budget"):
-                        budget_max = int(conversation_data["budget"]) * 1.2  # 20% flexibility
-                        query = query.where(TenantProperty.price <= budget_max)
+                    shown_ids = set(conversation_data.get("shown_property_ids", []))
+                    shown_ids.update([p['id'] for p in properties_list[:3]])
+                    conversation_data["shown_property_ids"] = list(shown_ids)
                     
-                    if conversation_data.get("property_type"):
-                        prop_type = conversation_data["property_type"]
-                        if prop_type != "any":
-                            # Normalize property type to valid enum value
-                            from database import normalize_property_type
-                            normalized_type = normalize_property_type(prop_type)
-                            if normalized_type:
-                                query = query.where(TenantProperty.property_type == normalized_type)
+                    # SET current_properties for property_presenter
+                    self.current_properties = properties_list[:3]
                     
-                    # Execute query
-                    result = await session.execute(query.limit(5))
-                    properties_db = result.scalars().all()
+                    # Return empty message - property_presenter handles presentation + ROI PDFs
+                    return BrainResponse(
+                        message="",  # Empty - professional presenter does everything
+                        next_state=ConversationState.VALUE_PROPOSITION,
+                        lead_updates=lead_updates | {"properties_sent": True, "conversation_data": conversation_data}
+                    )
+                else:
+                    logger.warning(f"⚠️ No properties found in database for lead {lead.id} - fallback to manual contact")
                     
-                    if properties_db:
-                        logger.info(f"✅ Found {len(properties_db)} properties in database for lead {lead.id}")
-                        
-                        # Convert to dict format for property_presenter
-                        properties_list = []
-                        for prop in properties_db:
-                            properties_list.append({
-                                "id": prop.id,
-                                "name": prop.name,
-                                "price": prop.price,
-                                "location": prop.location,
-                                "bedrooms": prop.bedrooms,
-                                "bathrooms": prop.bathrooms,
-                                "area": prop.area,
-                                "property_type": prop.property_type,
-                                "image_urls": prop.image_urls or [],
-                                "brochure_pdf": prop.brochure_pdf,
-                                "primary_image": prop.primary_image,
-                                "features": prop.features or [],
-                                "description": prop.description,
-                                "golden_visa": prop.golden_visa_eligible
-                            })
-                        
-                        # Track shown properties to avoid repetition
-                        conversation_data = lead.conversation_data or {}
-                        shown_ids = set(conversation_data.get("shown_property_ids", []))
-                        shown_ids.update([p['id'] for p in properties_list[:3]])
-                        conversation_data["shown_property_ids"] = list(shown_ids)
-                        
-                        # SET current_properties for property_presenter
-                        self.current_properties = properties_list[:3]
-                        
-                        # Return empty message - property_presenter handles presentation + ROI PDFs
-                        return BrainResponse(
-                            message="",  # Empty - professional presenter does everything
-                            next_state=ConversationState.VALUE_PROPOSITION,
-                            lead_updates=lead_updates | {"properties_sent": True, "conversation_data": conversation_data}
-                        )
-                    else:
-                        logger.warning(f"⚠️ No properties found in database for lead {lead.id} - fallback to manual contact")
-                        
-                        # No properties - offer consultation
-                        no_properties_msg = {
-                            Language.EN: f"I'd love to show you properties, but I need to check our exclusive inventory for your specific criteria. Can I schedule a quick call with {self.agent_name} to discuss the best available options?",
-                            Language.FA: f"دوست دارم املاک رو نشونتون بدم، اما باید موجودی اختصاصی رو برای معیارهای خاص شما چک کنم. می‌تونم یه تماس سریع با {self.agent_name} برای بحث بهترین گزینه‌های موجود تنظیم کنم؟",
-                            Language.AR: f"أود أن أريك العقارات، لكن أحتاج للتحقق من مخزوننا الحصري لمعاييرك المحددة. هل يمكنني جدولة مكالمة سريعة مع {self.agent_name} لمناقشة أفضل الخيارات المتاحة؟",
-                            Language.RU: f"Хочу показать вам объекты, но мне нужно проверить эксклюзивный каталог под ваши критерии. Могу я организовать быстрый звонок с {self.agent_name} для обсуждения лучших вариантов?"
-                        }
-                        
-                        return BrainResponse(
-                            message=no_properties_msg.get(lang, no_properties_msg[Language.EN]),
-                            next_state=ConversationState.VALUE_PROPOSITION,
-                            lead_updates=lead_updates,
-                            buttons=[
-                                {"text": "📅 " + self.get_text("btn_schedule_consultation", lang), "callback_data": "schedule_consultation"}
-                            ]
-                        )
-            
+                    # No properties - offer consultation
+                    no_properties_msg = {
+                        Language.EN: f"I'd love to show you properties, but I need to check our exclusive inventory for your specific criteria. Can I schedule a quick call with {self.agent_name} to discuss the best available options?",
+                        Language.FA: f"دوست دارم املاک رو نشونتون بدم، اما باید موجودی اختصاصی رو برای معیارهای خاص شما چک کنم. می‌تونم یه تماس سریع با {self.agent_name} برای بحث بهترین گزینه‌های موجود تنظیم کنم؟",
+                        Language.AR: f"أود أن أريك العقارات، لكن أحتاج للتحقق من مخزوننا الحصري لمعاييرك المحددة. هل يمكنني جدولة مكالمة سريعة مع {self.agent_name} لمناقشة أفضل الخيارات المتاحة؟",
+                        Language.RU: f"Хочу показать вам объекты, но мне нужно проверить эксклюзивный каталог под ваши критерии. Могу я организовать быстрый звонок с {self.agent_name} для обсуждения лучших вариантов?"
+                    }
+                    
+                    return BrainResponse(
+                        message=no_properties_msg.get(lang, no_properties_msg[Language.EN]),
+                        next_state=ConversationState.VALUE_PROPOSITION,
+                        lead_updates=lead_updates,
+                        buttons=[
+                            {"text": "📅 " + self.get_text("btn_schedule_consultation", lang), "callback_data": "schedule_consultation"}
+                        ]
+                    )
+        
             # User wants properties but MISSING requirements - tell them what's needed (DIRECT)
             elif is_show_properties_request or is_pure_affirmative:
                 logger.info(f"📋 User wants properties - checking completeness: Location={has_location}, Budget={has_budget}, Type={has_property_type}")
@@ -4606,7 +4816,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             
             # 1. DETECT CONSULTATION REQUEST
             consultation_keywords = ["consultation", "call", "مشاوره", "تماس", "speak", "agent", "مشاور"]
-            if any(kw in message_lower for kw in consultation_keywords):
+            if contains_any(message_lower, consultation_keywords):
                 logger.info(f"🔔 Consultation request detected from lead {lead.id}")
                 lead_updates["consultation_requested"] = True
                 
@@ -4641,7 +4851,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             
             # 2. DETECT PHOTO/IMAGE/PDF REQUEST OR PROPERTY SHOWCASE REQUEST
             photo_keywords = ["photo", "picture", "image", "عکس", "تصویر", "صورة", "фото", "pdf", "پی دی اف", "بی دی اف", "پی دی ای", "برشور", "brochure", "catalog", "کاتالوگ", "ملک", "property", "عقار", "نشون", "show", "بهم"]
-            if any(kw in message_lower for kw in photo_keywords):
+            if contains_any(message_lower, photo_keywords):
                 logger.info(f"📸 Photo/PDF/Property request detected from lead {lead.id}")
                 
                 # Track shown properties for rotation
@@ -4714,12 +4924,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             if "?" in message:
                 logger.info(f"❓ Question detected from lead {lead.id}")
                 # Answer the specific question via AI - DO NOT resend property list
-                ai_context = f"""Answer this specific question about the property or real estate. 
-                DO NOT say 'Great! Here are properties...' - they already saw the list.
-                Answer their question directly and concisely (2-3 sentences max).
-                Question: {message}
-                """
-                ai_response = await self.generate_ai_response(message, lead, context=ai_context)
+                ai_response = await self.generate_ai_response(message, lead, context=self._property_question_context(message))
                 
                 return BrainResponse(
                     message=ai_response,
@@ -4981,7 +5186,7 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
                 )
             
             # Check if this looks like a question (not a phone number)
-            is_question = any(char in message for char in ['؟', '?', 'چطور', 'چه', 'کی', 'کجا', 'چرا', 'how', 'what', 'when', 'where', 'why'])
+            is_question = looks_like_question(message)
             is_phone_attempt = re.match(r'^[\d\+\-\(\)\s]+$', message)
             
             if is_question and not is_phone_attempt:
@@ -5371,24 +5576,9 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             buttons=[]  # No buttons - free conversation
         )
     
-    async def _handle_engagement(self, lang: Language, message: str, lead: Lead, lead_updates: Dict) -> BrainResponse:
-        """
-        ENGAGEMENT state - Free conversation to nurture, answer questions, and build trust.
-        AI responds naturally and decides when lead is ready to schedule consultation.
-        
-        FIXED: Add consultation booking nudge after 2+ questions.
-        """
-        # Load tenant context if not loaded
-        if not self.tenant_context:
-            await self.load_tenant_context(lead)
-        
-        # Track question count for consultation nudge
-        conversation_data = lead.conversation_data or {}
-        question_count = conversation_data.get("question_count", 0) + 1
-        lead_updates["conversation_data"] = {**conversation_data, "question_count": question_count}
-        
-        # Enhanced AI prompt to handle engagement intelligently
-        engagement_context = f"""
+    def _engagement_context(self, lead: Lead) -> str:
+        """Enhanced AI prompt to handle engagement intelligently"""
+        return f"""
         ENGAGEMENT MODE - Lead is asking questions and exploring options.
         
         CRITICAL RULE: You are "{self.agent_name}" - Do NOT introduce yourself again! They already know who you are.
@@ -5427,9 +5617,25 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
         
         Previous conversation: {lead.pain_point or 'N/A'}
         """
+    
+    async def _handle_engagement(self, lang: Language, message: str, lead: Lead, lead_updates: Dict) -> BrainResponse:
+        """
+        ENGAGEMENT state - Free conversation to nurture, answer questions, and build trust.
+        AI responds naturally and decides when lead is ready to schedule consultation.
+        
+        FIXED: Add consultation booking nudge after 2+ questions.
+        """
+        # Load tenant context if not loaded
+        if not self.tenant_context:
+            await self.load_tenant_context(lead)
+        
+        # Track question count for consultation nudge
+        conversation_data = lead.conversation_data or {}
+        question_count = conversation_data.get("question_count", 0) + 1
+        lead_updates["conversation_data"] = {**conversation_data, "question_count": question_count}
         
         # Generate AI response
-        ai_response = await self.generate_ai_response(message, lead, context=engagement_context)
+        ai_response = await self.generate_ai_response(message, lead, context=self._engagement_context(lead))
         
         # Enhanced scheduling detection - check BEFORE AI response
         schedule_triggers_explicit = [
@@ -5450,10 +5656,10 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             "تماس بگیر", "تماس بگیرید"
         ]
         
-        user_message_lower = message.lower() if message else ""
+        user_message_lower = normalize(message) if message else ""
         
         # Check for explicit scheduling request
-        explicit_schedule_request = any(trigger in user_message_lower for trigger in schedule_triggers_explicit)
+        explicit_schedule_request = contains_any(user_message_lower, schedule_triggers_explicit)
         
         if explicit_schedule_request:
             # User explicitly wants to schedule - show calendar directly
@@ -5466,8 +5672,8 @@ RESPOND IN JSON ONLY (no markdown, no explanation):
             "می‌تونم وقت بذارم", "can arrange", "available slots"
         ]
         
-        ai_response_lower = ai_response.lower()
-        soft_schedule_suggestion = any(trigger in ai_response_lower for trigger in schedule_triggers_soft)
+        ai_response_lower = normalize(ai_response)
+        soft_schedule_suggestion = contains_any(ai_response_lower, schedule_triggers_soft)
         
         # If AI suggested scheduling OR user hinted at it, show scheduling button
         if soft_schedule_suggestion:
@@ -5622,7 +5828,8 @@ async def process_telegram_message(
     """
     Convenience function to process a Telegram message through the Brain.
     """
-    brain = Brain(tenant)
+    from brain_registry import brain_registry
+    brain = brain_registry.get(tenant)
     return await brain.process_message(lead, message_text, callback_data)
 
 
@@ -5636,80 +5843,83 @@ async def process_voice_message(
     Process a voice message and return transcript + response.
     Shows acknowledgment of what was heard, then processes it.
     """
-    brain = Brain(tenant)
-    lang = lead.language or Language.EN
-    
-    # Process voice to get transcript and entities
-    transcript, entities = await brain.process_voice(audio_data, file_extension)
-    
-    # If no transcript, return error
-    if not transcript or "Error" in transcript or "unavailable" in transcript:
-        error_msg = brain.get_text("voice_error", lang)
-        return transcript, BrainResponse(message=error_msg)
-    
-    # Update lead with transcript
-    lead_updates = {"voice_transcript": transcript}
-    
-    # Update lead with extracted entities if any
-    if entities:
-        if "budget_min" in entities:
-            lead_updates["budget_min"] = entities["budget_min"]
-        if "budget_max" in entities:
-            lead_updates["budget_max"] = entities["budget_max"]
-        if "property_type" in entities:
-            pt = entities["property_type"].lower()
-            property_type_map = {
-                "apartment": PropertyType.APARTMENT,
-                "villa": PropertyType.VILLA,
-                "penthouse": PropertyType.PENTHOUSE,
-                "townhouse": PropertyType.TOWNHOUSE,
-                "commercial": PropertyType.COMMERCIAL,
-                "land": PropertyType.LAND,
-                "residential": PropertyType.APARTMENT,
-            }
-            lead_updates["property_type"] = property_type_map.get(pt, PropertyType.APARTMENT)
-        if "transaction_type" in entities:
-            tt = entities["transaction_type"].lower()
-            lead_updates["transaction_type"] = TransactionType.BUY if tt == "buy" else TransactionType.RENT
-        if "purpose" in entities:
-            p = entities["purpose"].lower()
-            if p == "investment":
-                lead_updates["purpose"] = Purpose.INVESTMENT
-            elif p == "living":
-                lead_updates["purpose"] = Purpose.LIVING
-            else:
-                lead_updates["purpose"] = Purpose.RESIDENCY
-        if "preferences" in entities:
-            lead_updates["taste_tags"] = entities["preferences"]
-        if "location" in entities:
-            lead_updates["preferred_location"] = entities["location"]
-        if "bedrooms" in entities:
-            lead_updates["bedrooms_min"] = entities.get("bedrooms_min", entities.get("bedrooms"))
-            lead_updates["bedrooms_max"] = entities.get("bedrooms_max", entities.get("bedrooms"))
-        if "phone_number" in entities:
-            lead_updates["phone"] = entities["phone_number"]
-        
-        # Store all extracted entities as JSON
-        lead_updates["voice_entities"] = entities
-    
-    # Update lead in database
-    if lead_updates:
-        await update_lead(lead.id, **lead_updates)
-    
-    # Process the transcript as a regular text message
-    response = await brain.process_message(lead, transcript)
-    
-    # Prepend acknowledgment of what was heard
-    try:
-        transcript_preview = str(transcript)[:100] if transcript else "..."
-        ack_msg = brain.get_text("voice_acknowledged", lang).format(transcript=transcript_preview)
-        response.message = f"{ack_msg}\n\n{response.message}"
-    except (KeyError, AttributeError) as e:
-        # If template formatting fails, still prepend transcript
-        logger.warning(f"Voice acknowledgment formatting failed: {e}, using simple format")
-        response.message = f"🎤 {transcript}\n\n{response.message}"
-    
-    return transcript, response
+    from brain_registry import brain_registry
+    async with message_turn():
+        brain = brain_registry.get(tenant)
+        brain.begin_turn()
+        lang = lead.language or Language.EN
+        
+        # Process voice to get transcript and entities
+        transcript, entities = await brain.process_voice(audio_data, file_extension)
+        
+        # If no transcript, return error
+        if not transcript or "Error" in transcript or "unavailable" in transcript:
+            error_msg = brain.get_text("voice_error", lang)
+            return transcript, BrainResponse(message=error_msg)
+        
+        # Update lead with transcript
+        lead_updates = {"voice_transcript": transcript}
+        
+        # Update lead with extracted entities if any
+        if entities:
+            if "budget_min" in entities:
+                lead_updates["budget_min"] = entities["budget_min"]
+            if "budget_max" in entities:
+                lead_updates["budget_max"] = entities["budget_max"]
+            if "property_type" in entities:
+                pt = entities["property_type"].lower()
+                property_type_map = {
+                    "apartment": PropertyType.APARTMENT,
+                    "villa": PropertyType.VILLA,
+                    "penthouse": PropertyType.PENTHOUSE,
+                    "townhouse": PropertyType.TOWNHOUSE,
+                    "commercial": PropertyType.COMMERCIAL,
+                    "land": PropertyType.LAND,
+                    "residential": PropertyType.APARTMENT,
+                }
+                lead_updates["property_type"] = property_type_map.get(pt, PropertyType.APARTMENT)
+            if "transaction_type" in entities:
+                tt = entities["transaction_type"].lower()
+                lead_updates["transaction_type"] = TransactionType.BUY if tt == "buy" else TransactionType.RENT
+            if "purpose" in entities:
+                p = entities["purpose"].lower()
+                if p == "investment":
+                    lead_updates["purpose"] = Purpose.INVESTMENT
+                elif p == "living":
+                    lead_updates["purpose"] = Purpose.LIVING
+                else:
+                    lead_updates["purpose"] = Purpose.RESIDENCY
+            if "preferences" in entities:
+                lead_updates["taste_tags"] = entities["preferences"]
+            if "location" in entities:
+                lead_updates["preferred_location"] = entities["location"]
+            if "bedrooms" in entities:
+                lead_updates["bedrooms_min"] = entities.get("bedrooms_min", entities.get("bedrooms"))
+                lead_updates["bedrooms_max"] = entities.get("bedrooms_max", entities.get("bedrooms"))
+            if "phone_number" in entities:
+                lead_updates["phone"] = entities["phone_number"]
+        
+            # Store all extracted entities as JSON
+            lead_updates["voice_entities"] = entities
+        
+        # Update lead in database
+        if lead_updates:
+            await update_lead(lead.id, **lead_updates)
+        
+        # Process the transcript as a regular text message
+        response = await brain.process_message(lead, transcript)
+        
+        # Prepend acknowledgment of what was heard
+        try:
+            transcript_preview = str(transcript)[:100] if transcript else "..."
+            ack_msg = brain.get_text("voice_acknowledged", lang).format(transcript=transcript_preview)
+            response.message = f"{ack_msg}\n\n{response.message}"
+        except (KeyError, AttributeError) as e:
+            # If template formatting fails, still prepend transcript
+            logger.warning(f"Voice acknowledgment formatting failed: {e}, using simple format")
+            response.message = f"🎤 {transcript}\n\n{response.message}"
+        
+        return transcript, response
 
 
 async def process_image_message(
@@ -5722,65 +5932,68 @@ async def process_image_message(
     Process an image and find similar properties.
     Shows image analysis results and matching properties.
     """
-    brain = Brain(tenant)
-    lang = lead.language or Language.EN
-    
-    # Load tenant context (properties, projects) for matching
-    await brain.load_tenant_context(lead)
-    
-    # Process image to get description and matches
-    description, matching_properties = await brain.process_image(image_data, file_extension)
-    
-    # If error, return error message
-    if "Error" in description or "unavailable" in description:
-        error_msg = brain.get_text("image_error", lang)
-        return description, BrainResponse(message=error_msg)
-    
-    # If no matches found
-    if not matching_properties:
-        no_results_msg = brain.get_text("image_no_results", lang)
-        return description, BrainResponse(message=no_results_msg)
-    
-    # Format matching properties
-    property_details_parts = []
-    for i, prop in enumerate(matching_properties[:3], 1):
-        price_str = f"AED {prop['price']:,.0f}" if prop.get('price') else "Price on request"
-        
-        # Safely handle features (could be list or string)
-        features = prop.get('features', [])
-        if isinstance(features, list):
-            features_str = ", ".join(str(f) for f in features[:3])
-        elif isinstance(features, str):
-            features_str = features[:100]  # Truncate if too long
-        else:
-            features_str = ""
+    from brain_registry import brain_registry
+    async with message_turn():
+        brain = brain_registry.get(tenant)
+        brain.begin_turn()
+        lang = lead.language or Language.EN
+        
+        # Load tenant context (properties, projects) for matching
+        await brain.load_tenant_context(lead)
+        
+        # Process image to get description and matches
+        description, matching_properties = await brain.process_image(image_data, file_extension)
+        
+        # If error, return error message
+        if "Error" in description or "unavailable" in description:
+            error_msg = brain.get_text("image_error", lang)
+            return description, BrainResponse(message=error_msg)
+        
+        # If no matches found
+        if not matching_properties:
+            no_results_msg = brain.get_text("image_no_results", lang)
+            return description, BrainResponse(message=no_results_msg)
+        
+        # Format matching properties
+        property_details_parts = []
+        for i, prop in enumerate(matching_properties[:3], 1):
+            price_str = f"AED {prop['price']:,.0f}" if prop.get('price') else "Price on request"
+        
+            # Safely handle features (could be list or string)
+            features = prop.get('features', [])
+            if isinstance(features, list):
+                features_str = ", ".join(str(f) for f in features[:3])
+            elif isinstance(features, str):
+                features_str = features[:100]  # Truncate if too long
+            else:
+                features_str = ""
         
-        golden_str = " 🛂 Golden Visa" if prop.get('golden_visa') else ""
-        roi_str = f" | ROI: {prop['roi']}%" if prop.get('roi') else ""
+            golden_str = " 🛂 Golden Visa" if prop.get('golden_visa') else ""
+            roi_str = f" | ROI: {prop['roi']}%" if prop.get('roi') else ""
+        
+            property_details_parts.append(
+                f"{i}. **{prop.get('name', 'Property')}**\n"
+                f"   📍 {prop.get('location', 'Dubai')}\n"
+                f"   🏠 {prop.get('bedrooms', 'N/A')}BR {prop.get('type', 'Property')}\n"
+                f"   💰 {price_str}{golden_str}{roi_str}\n"
+                f"   ✨ {features_str}\n"
+            )
         
-        property_details_parts.append(
-            f"{i}. **{prop.get('name', 'Property')}**\n"
-            f"   📍 {prop.get('location', 'Dubai')}\n"
-            f"   🏠 {prop.get('bedrooms', 'N/A')}BR {prop.get('type', 'Property')}\n"
-            f"   💰 {price_str}{golden_str}{roi_str}\n"
-            f"   ✨ {features_str}\n"
+        property_details = "\n".join(property_details_parts)
+        
+        # Build response message
+        results_msg = brain.get_text("image_results", lang).format(
+            count=len(matching_properties),
+            property_details=property_details
         )
-    
-    property_details = "\n".join(property_details_parts)
-    
-    # Build response message
-    results_msg = brain.get_text("image_results", lang).format(
-        count=len(matching_properties),
-        property_details=property_details
-    )
-    
-    # Update lead with image search data
-    lead_updates = {
-        "image_description": description,
-        "image_search_results": len(matching_properties)
-    }
-    
-    await update_lead(lead.id, **lead_updates)
-    
-    return description, BrainResponse(message=results_msg)
+        
+        # Update lead with image search data
+        lead_updates = {
+            "image_description": description,
+            "image_search_results": len(matching_properties)
+        }
+        
+        await update_lead(lead.id, **lead_updates)
+        
+        return description, BrainResponse(message=results_msg)
 
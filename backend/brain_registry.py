@@ -0,0 +1,86 @@
+"""
+Brain Registry
+One long-lived Brain per tenant, shared by every message handler in the worker
+
+Constructing a Brain per message re-read the API keys, called genai.configure and built a
+GenerativeModel every time (before the shared Gemini client pool,
+utils.gemini_utils.get_gemini_client). Conversation memory is kept per lead in
+chat_history.py, not on the Brain. Brains are cheap now, but the
+per-message handlers (process_telegram_message/voice/image, WhatsApp deep links) still
+reuse one per tenant. Per-message state lives in the task (Brain.begin_turn), so a
+shared Brain is safe under concurrent messages.
+
+Entries are dropped when the tenant cache invalidates the tenant (update/delete - local
+or broadcast from another worker) and least-recently-used tenants are evicted beyond
+BRAIN_REGISTRY_MAX_TENANTS.
+"""
+
+import os
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+from brain import Brain
+from database import Tenant
+from tenant_cache import tenant_cache
+
+logger = logging.getLogger(__name__)
+
+# Registry Configuration
+BRAIN_REGISTRY_MAX_TENANTS = int(os.getenv("BRAIN_REGISTRY_MAX_TENANTS", "1000"))
+
+DEFAULT_KEY = None  # Brain without a tenant (ArtinSmartRealty defaults)
+
+
+class BrainRegistry:
+    """Per-worker Brain instances keyed by tenant id (LRU-bounded)."""
+
+    def __init__(self, max_tenants: int = BRAIN_REGISTRY_MAX_TENANTS):
+        self.max_tenants = max_tenants
+        self._brains: "OrderedDict[Optional[int], Brain]" = OrderedDict()
+        self.hits = 0
+        self.created = 0
+        self.evictions = 0
+        tenant_cache.on_invalidate(self.invalidate)
+
+    def get(self, tenant: Optional[Tenant]) -> Brain:
+        """The tenant's Brain, created on first use."""
+        key = tenant.id if tenant is not None else DEFAULT_KEY
+        brain = self._brains.get(key)
+        if brain is not None:
+            self.hits += 1
+            self._brains.move_to_end(key)
+            if tenant is not None and brain.tenant is not tenant:
+                # Callers pass the freshest Tenant (tenant cache / DB) - keep settings current
+                brain.tenant = tenant
+                brain.agent_name = tenant.name
+            return brain
+
+        brain = Brain(tenant)
+        self.created += 1
+        self._brains[key] = brain
+        if len(self._brains) > self.max_tenants:
+            self._brains.popitem(last=False)
+            self.evictions += 1
+        return brain
+
+    def invalidate(self, tenant_id: Optional[int] = None):
+        """Drop one tenant's Brain (or all of them)."""
+        if tenant_id is None:
+            self._brains.clear()
+        else:
+            self._brains.pop(tenant_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.created
+        return {
+            "tenants": len(self._brains),
+            "hits": self.hits,
+            "created": self.created,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Global instance
+brain_registry = BrainRegistry()
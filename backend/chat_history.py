@@ -0,0 +1,92 @@
+"""
+Chat History Store
+Bounded per-lead conversation memory for Brain.generate_ai_response
+
+Brains are shared per tenant (brain_registry), so conversation memory can't live on the
+Brain as one ever-growing Gemini ChatSession per lead. Each lead keeps its last
+CHAT_HISTORY_MAX_TURNS exchanges (the lead's message and our reply - not the full prompt
+with tenant context), leads idle for CHAT_HISTORY_TTL_SECONDS are forgotten, and
+least-recently-used leads are evicted beyond CHAT_HISTORY_MAX_LEADS.
+
+History is handed out as a snapshot and appended after the reply, so concurrent messages
+from the same lead never share a mutable session object.
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any, List, Deque, Tuple
+
+logger = logging.getLogger(__name__)
+
+# History Configuration
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "6"))  # exchanges resent with each prompt
+CHAT_HISTORY_MAX_LEADS = int(os.getenv("CHAT_HISTORY_MAX_LEADS", "5000"))
+CHAT_HISTORY_TTL_SECONDS = int(os.getenv("CHAT_HISTORY_TTL_SECONDS", "3600"))
+
+
+class ChatHistoryStore:
+    """Per-worker lead id -> recent exchanges (LRU + idle TTL + turn cap)."""
+
+    def __init__(
+        self,
+        max_turns: int = CHAT_HISTORY_MAX_TURNS,
+        max_leads: int = CHAT_HISTORY_MAX_LEADS,
+        ttl_seconds: int = CHAT_HISTORY_TTL_SECONDS
+    ):
+        self.max_turns = max_turns
+        self.max_leads = max_leads
+        self.ttl_seconds = ttl_seconds
+        # lead_id -> (exchanges, last_used); each exchange is (user message, model reply)
+        self._leads: "OrderedDict[int, Tuple[Deque[Tuple[str, str]], float]]" = OrderedDict()
+        self.expirations = 0
+        self.evictions = 0
+
+    def contents(self, lead_id: int) -> List[Dict[str, Any]]:
+        """The lead's recent exchanges as Gemini contents (oldest first), a snapshot"""
+        entry = self._leads.get(lead_id)
+        if entry is None:
+            return []
+        exchanges, last_used = entry
+        if time.monotonic() - last_used > self.ttl_seconds:
+            del self._leads[lead_id]
+            self.expirations += 1
+            return []
+        contents: List[Dict[str, Any]] = []
+        for user_message, reply in exchanges:
+            contents.append({"role": "user", "parts": [user_message]})
+            contents.append({"role": "model", "parts": [reply]})
+        return contents
+
+    def append(self, lead_id: int, user_message: str, reply: str):
+        """Remember one exchange, dropping the oldest beyond max_turns"""
+        if self.max_turns <= 0:
+            return
+        entry = self._leads.get(lead_id)
+        exchanges = entry[0] if entry is not None else deque(maxlen=self.max_turns)
+        exchanges.append((user_message, reply))
+        self._leads[lead_id] = (exchanges, time.monotonic())
+        self._leads.move_to_end(lead_id)
+        while len(self._leads) > self.max_leads:
+            self._leads.popitem(last=False)
+            self.evictions += 1
+
+    def forget(self, lead_id: Optional[int] = None):
+        """Drop one lead's history (or everyone's)"""
+        if lead_id is None:
+            self._leads.clear()
+        else:
+            self._leads.pop(lead_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "leads": len(self._leads),
+            "max_turns": self.max_turns,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+# Global instance
+chat_history = ChatHistoryStore()
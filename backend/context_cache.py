@@ -0,0 +1,359 @@
+"""
+Tenant AI Context Cache
+Versioned per-tenant snapshot of the data Brain feeds to the AI (tenant info, inventory, projects, knowledge)
+
+A Brain is created per message, and every one of them used to re-run the tenant/properties/
+projects/knowledge queries. The snapshot is loaded once per tenant per *context version*:
+the property/project/knowledge write paths call `bump_context_version(tenant_id)`, which
+increments a counter in Redis (shared by all workers) and drops the local snapshot.
+Lead-specific filtering (budget, type, location, bedrooms, golden visa, language) is then
+applied in memory on the snapshot.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+
+from sqlalchemy import select
+
+from database import (
+    async_session, Tenant, TenantProperty, TenantProject, TenantKnowledge,
+    PropertyType, Purpose, Lead
+)
+from redis_manager import redis_manager
+from knowledge_index import KnowledgeIndexSet
+from area_gazetteer import resolve_area
+
+logger = logging.getLogger(__name__)
+
+# Cache Configuration
+# Upper bound on snapshot age - covers writes that bypass bump_context_version (SQL console, scripts)
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "600"))
+VERSION_KEY = "tenant_context:version:{tenant_id}"
+
+# Same limits the per-lead SQL queries used
+PROPERTY_LIMIT = 10
+PROJECT_LIMIT = 5
+
+
+class TenantContextSnapshot:
+    """Everything the AI context needs for one tenant, at one context version."""
+
+    __slots__ = (
+        "tenant_id", "version", "loaded_at", "tenant", "properties", "projects", "knowledge", "knowledge_indexes"
+    )
+
+    def __init__(
+        self,
+        tenant_id: int,
+        version: int,
+        tenant: Dict[str, Any],
+        properties: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        projects: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        knowledge: List[Dict[str, Any]]
+    ):
+        self.tenant_id = tenant_id
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.tenant = tenant
+        # (filter fields, AI-facing dict) pairs, in the SQL ordering (featured first, newest first)
+        self.properties = properties
+        self.projects = projects
+        # Ordered by priority desc
+        self.knowledge = knowledge
+        # Retrieval indexes, built lazily per language and reused until the next version
+        self.knowledge_indexes = KnowledgeIndexSet(knowledge)
+
+
+def _property_entry(p: TenantProperty) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    filters = {
+        "property_type": p.property_type,
+        "price": p.price,
+        "location": (p.location or "").lower(),
+        "area_id": p.area_id if p.area_id is not None else resolve_area(p.location),
+        "bedrooms": p.bedrooms,
+        "golden_visa": bool(p.golden_visa_eligible),
+    }
+    data = {
+        "name": p.name,
+        "type": p.property_type.value if p.property_type else None,
+        "location": p.location,
+        "price": p.price,
+        "bedrooms": p.bedrooms,
+        "features": p.features,
+        "roi": p.expected_roi,
+        "rental_yield": p.rental_yield,
+        "golden_visa": p.golden_visa_eligible,
+        "description": p.description,
+    }
+    return filters, data
+
+
+def _project_entry(proj: TenantProject) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    filters = {
+        "price": proj.starting_price,
+        "location": (proj.location or "").lower(),
+        "area_id": proj.area_id if proj.area_id is not None else resolve_area(proj.location),
+        "golden_visa": bool(proj.golden_visa_eligible),
+    }
+    data = {
+        "name": proj.name,
+        "developer": proj.developer,
+        "location": proj.location,
+        "starting_price": proj.starting_price,
+        "payment_plan": proj.payment_plan,
+        "handover": proj.handover_date.strftime("%Y-%m") if proj.handover_date else None,
+        "roi": proj.projected_roi,
+        "rental_yield": proj.projected_rental_yield,
+        "golden_visa": proj.golden_visa_eligible,
+        "amenities": proj.amenities,
+        "selling_points": proj.selling_points,
+    }
+    return filters, data
+
+
+def _knowledge_entry(k: TenantKnowledge) -> Dict[str, Any]:
+    return {
+        "category": k.category,
+        "title": k.title,
+        "content": k.content,
+        "keywords": k.keywords,
+        "language": k.language,
+        "priority": k.priority,
+    }
+
+
+def _matches(
+    filters: Dict[str, Any],
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    location: Optional[str] = None,
+    area_id: Optional[int] = None,
+    golden_visa_only: bool = False,
+    property_type: Optional[PropertyType] = None,
+    bedrooms: Optional[int] = None
+) -> bool:
+    """In-memory equivalent of the WHERE clauses in get_tenant_properties/get_tenant_projects."""
+    price = filters["price"]
+    if min_price and (price is None or price < min_price):
+        return False
+    if max_price and (price is None or price > max_price):
+        return False
+    if area_id is not None and filters["area_id"] != area_id:
+        return False
+    if location and location.lower() not in filters["location"]:
+        return False
+    if golden_visa_only and not filters["golden_visa"]:
+        return False
+    if property_type and filters.get("property_type") != property_type:
+        return False
+    if bedrooms and filters.get("bedrooms") != bedrooms:
+        return False
+    return True
+
+
+class TenantContextCache:
+    """Per-worker cache of TenantContextSnapshot, validated against a shared version counter."""
+
+    def __init__(self, ttl_seconds: int = CONTEXT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshots: Dict[int, TenantContextSnapshot] = {}
+        self._local_versions: Dict[int, int] = {}  # used when Redis is unavailable
+        self._loading: Dict[int, asyncio.Future] = {}  # one cold load per tenant at a time
+        self.hits = 0
+        self.misses = 0
+        self.bumps = 0
+
+    # ---------- versions ----------
+
+    async def get_version(self, tenant_id: int) -> int:
+        """Current context version for a tenant (shared across workers via Redis)."""
+        client = redis_manager.redis_client
+        if client:
+            try:
+                value = await client.get(VERSION_KEY.format(tenant_id=tenant_id))
+                return int(value) if value else 0
+            except Exception as e:
+                logger.warning(f"⚠️ Context version lookup failed, using local version: {e}")
+        return self._local_versions.get(tenant_id, 0)
+
+    async def bump_version(self, tenant_id: int) -> int:
+        """Mark a tenant's inventory/knowledge as changed. Call after the write is committed."""
+        self._snapshots.pop(tenant_id, None)
+        self._local_versions[tenant_id] = self._local_versions.get(tenant_id, 0) + 1
+        self.bumps += 1
+
+        client = redis_manager.redis_client
+        if client:
+            try:
+                return int(await client.incr(VERSION_KEY.format(tenant_id=tenant_id)))
+            except Exception as e:
+                # Other workers still converge within CONTEXT_CACHE_TTL_SECONDS
+                logger.warning(f"⚠️ Failed to bump shared context version for tenant {tenant_id}: {e}")
+        return self._local_versions[tenant_id]
+
+    # ---------- snapshots ----------
+
+    async def get_snapshot(self, tenant_id: int) -> Optional[TenantContextSnapshot]:
+        """Get the tenant's snapshot, loading it if missing, expired or outdated."""
+        version = await self.get_version(tenant_id)
+        snapshot = self._snapshots.get(tenant_id)
+        if (
+            snapshot is not None
+            and snapshot.version == version
+            and time.monotonic() - snapshot.loaded_at < self.ttl_seconds
+        ):
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+
+        # Concurrent cold misses for the same tenant share one load
+        pending = self._loading.get(tenant_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[tenant_id] = future
+        try:
+            snapshot = await self._load(tenant_id, version)
+            if snapshot is not None:
+                self._snapshots[tenant_id] = snapshot
+            future.set_result(snapshot)
+            return snapshot
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved so a load nobody else waited on doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(tenant_id, None)
+
+    async def _load(self, tenant_id: int, version: int) -> Optional[TenantContextSnapshot]:
+        """Run the four tenant queries concurrently, each on its own pooled connection."""
+
+        async def fetch(query):
+            async with async_session() as session:
+                result = await session.execute(query)
+                return result.scalars().all()
+
+        tenants, properties, projects, knowledge = await asyncio.gather(
+            fetch(select(Tenant).where(Tenant.id == tenant_id)),
+            fetch(
+                select(TenantProperty)
+                .where(TenantProperty.tenant_id == tenant_id, TenantProperty.is_available == True)
+                .order_by(TenantProperty.is_featured.desc(), TenantProperty.created_at.desc())
+            ),
+            fetch(
+                select(TenantProject)
+                .where(TenantProject.tenant_id == tenant_id, TenantProject.is_active == True)
+                .order_by(TenantProject.is_featured.desc(), TenantProject.created_at.desc())
+            ),
+            fetch(
+                select(TenantKnowledge)
+                .where(TenantKnowledge.tenant_id == tenant_id, TenantKnowledge.is_active == True)
+                .order_by(TenantKnowledge.priority.desc())
+            ),
+        )
+
+        if not tenants:
+            return None
+        tenant = tenants[0]
+
+        logger.info(
+            f"📦 Loaded AI context for tenant {tenant_id} (v{version}): "
+            f"{len(properties)} properties, {len(projects)} projects, {len(knowledge)} knowledge entries"
+        )
+        return TenantContextSnapshot(
+            tenant_id=tenant_id,
+            version=version,
+            tenant={
+                "name": tenant.name,
+                "company": tenant.company_name,
+                "phone": tenant.phone,
+                "email": tenant.email,
+            },
+            properties=[_property_entry(p) for p in properties],
+            projects=[_project_entry(proj) for proj in projects],
+            knowledge=[_knowledge_entry(k) for k in knowledge],
+        )
+
+    async def get_context(self, tenant_id: int, lead: Optional[Lead] = None) -> Dict[str, Any]:
+        """Build the AI context dict for a tenant, filtered for the lead's preferences."""
+        snapshot = await self.get_snapshot(tenant_id)
+        if snapshot is None:
+            return {}
+
+        # Build filters based on lead preferences
+        property_filters: Dict[str, Any] = {}
+        if lead:
+            if lead.budget_min:
+                property_filters["min_price"] = lead.budget_min
+            if lead.budget_max:
+                property_filters["max_price"] = lead.budget_max
+            if lead.property_type:
+                property_type = lead.property_type
+                if isinstance(property_type, str):
+                    property_type = PropertyType[property_type.upper()]
+                property_filters["property_type"] = property_type
+            if lead.preferred_location:
+                # Canonical area when the gazetteer knows it, partial text match otherwise
+                area_id = lead.preferred_area_id or resolve_area(lead.preferred_location)
+                if area_id is not None:
+                    property_filters["area_id"] = area_id
+                else:
+                    property_filters["location"] = lead.preferred_location
+            if lead.bedrooms_min:
+                property_filters["bedrooms"] = lead.bedrooms_min
+            if lead.purpose and lead.purpose == Purpose.RESIDENCY:
+                property_filters["golden_visa_only"] = True
+
+        project_filters = {k: v for k, v in property_filters.items()
+                           if k in ["min_price", "max_price", "location", "area_id", "golden_visa_only"]}
+
+        properties = []
+        for filters, data in snapshot.properties:
+            if _matches(filters, **property_filters):
+                properties.append(data)
+                if len(properties) >= PROPERTY_LIMIT:
+                    break
+
+        projects = []
+        for filters, data in snapshot.projects:
+            if _matches(filters, **project_filters):
+                projects.append(data)
+                if len(projects) >= PROJECT_LIMIT:
+                    break
+
+        language = lead.language if lead else None
+        knowledge = [k for k in snapshot.knowledge if not language or k["language"] == language]
+
+        return {
+            "version": snapshot.version,
+            "tenant": dict(snapshot.tenant),
+            "properties": properties,
+            "projects": projects,
+            "knowledge": knowledge,
+            "knowledge_index": snapshot.knowledge_indexes,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "cached_tenants": len(self._snapshots),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "version_bumps": self.bumps,
+        }
+
+
+# Global instance
+tenant_context_cache = TenantContextCache()
+
+
+async def bump_context_version(tenant_id: int) -> int:
+    """Invalidate a tenant's cached AI context after a property/project/knowledge change."""
+    return await tenant_context_cache.bump_version(tenant_id)
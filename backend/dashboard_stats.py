@@ -0,0 +1,110 @@
+"""
+Dashboard Stats
+Lead counts for the tenant dashboard, read from the lead rollups
+
+get_dashboard_stats used to load every Lead row of the tenant and loop over the list once
+per LeadStatus and once per Purpose. The counts now come from lead_daily_rollups
+(lead_rollups.py), summed by status and purpose - a few dozen rows per day of history
+instead of one per lead - and every figure on the dashboard is derived from that small
+result. Results are cached per tenant for DASHBOARD_STATS_TTL_SECONDS
+(0 disables the cache) - dashboards poll, and a few seconds of staleness is fine.
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Any, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import LeadStatus, Purpose
+from lead_rollups import lead_rollups, LEAD_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Cache Configuration
+DASHBOARD_STATS_TTL_SECONDS = int(os.getenv("DASHBOARD_STATS_TTL_SECONDS", "30"))
+
+ACTIVE_DEAL_STATUSES = (LeadStatus.NEGOTIATING, LeadStatus.VIEWING_SCHEDULED)
+
+
+def _enum(enum_cls, value):
+    """Rollup dimensions are stored as enum values ("" = not set)."""
+    if value is None or isinstance(value, enum_cls):
+        return value
+    try:
+        return enum_cls(str(value).lower())
+    except ValueError:
+        return None
+
+
+async def compute_dashboard_stats(session: AsyncSession, tenant_id: int) -> Dict[str, Any]:
+    """DashboardStats fields for a tenant from the rollup, summed by status and purpose."""
+    rows = await lead_rollups.totals(session, tenant_id, LEAD_TABLE, group_by=("status", "purpose"))
+
+    by_status: Dict[LeadStatus, int] = {}
+    by_purpose: Dict[Purpose, int] = {}
+    total_leads = 0
+    for row in rows:
+        count = row["lead_count"]
+        total_leads += count
+        status = _enum(LeadStatus, row["status"])
+        purpose = _enum(Purpose, row["purpose"])
+        if status is not None:
+            by_status[status] = by_status.get(status, 0) + count
+        if purpose is not None:
+            by_purpose[purpose] = by_purpose.get(purpose, 0) + count
+
+    closed_won = by_status.get(LeadStatus.CLOSED_WON, 0)
+    conversion_rate = (closed_won / total_leads * 100) if total_leads > 0 else 0
+
+    return {
+        "total_leads": total_leads,
+        "active_deals": sum(by_status.get(s, 0) for s in ACTIVE_DEAL_STATUSES),
+        "qualified_leads": by_status.get(LeadStatus.QUALIFIED, 0),
+        "scheduled_viewings": by_status.get(LeadStatus.VIEWING_SCHEDULED, 0),
+        "conversion_rate": round(conversion_rate, 1),
+        # Breakdown in enum order, non-zero entries only
+        "leads_by_status": {s.value: by_status[s] for s in LeadStatus if by_status.get(s)},
+        "leads_by_purpose": {p.value: by_purpose[p] for p in Purpose if by_purpose.get(p)},
+    }
+
+
+class DashboardStatsCache:
+    """Per-worker TTL cache of dashboard stats, keyed by tenant id."""
+
+    def __init__(self, ttl_seconds: int = DASHBOARD_STATS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._stats: Dict[int, Tuple[Dict[str, Any], float]] = {}  # tenant_id -> (stats, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, session: AsyncSession, tenant_id: int) -> Dict[str, Any]:
+        """Cached stats for a tenant, recomputed once the TTL has passed."""
+        if self.ttl_seconds > 0:
+            cached = self._stats.get(tenant_id)
+            if cached is not None and cached[1] > time.monotonic():
+                self.hits += 1
+                return cached[0]
+
+        self.misses += 1
+        stats = await compute_dashboard_stats(session, tenant_id)
+        if self.ttl_seconds > 0:
+            self._stats[tenant_id] = (stats, time.monotonic() + self.ttl_seconds)
+        return stats
+
+    def invalidate(self, tenant_id: int):
+        self._stats.pop(tenant_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "cached_tenants": len(self._stats),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global instance
+dashboard_stats_cache = DashboardStatsCache()
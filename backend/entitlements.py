@@ -0,0 +1,254 @@
+"""
+Tenant Entitlements
+Resolved per-tenant feature flags + plan limits, cached in process and in Redis
+
+Feature checks sit on hot request paths, and each one used to run a TenantFeature query
+(feature_flags.has_feature) or re-derive plan data from a Tenant row (subscription_guard).
+An Entitlements object resolves all of it once per tenant:
+
+- admin feature flags (TenantFeature rows) as a bitset over FeatureFlag
+- the plan's features (subscription_guard.FEATURE_ACCESS) and limits (PLAN_LIMITS)
+- subscription status and end dates, so "is it active" stays correct as time passes
+
+Lookups go worker memory -> Redis (shared by all workers, ENTITLEMENT_CACHE_TTL_SECONDS)
+-> database. Write paths call `await entitlement_cache.invalidate(tenant_id)` after the
+commit: it deletes the Redis copy and invalidates the tenant cache, whose broadcast makes
+every worker drop its in-memory copy.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+from sqlalchemy import select
+
+from database import async_session, Tenant, TenantFeature, FeatureFlag, SubscriptionPlan, SubscriptionStatus
+from redis_manager import redis_manager
+from tenant_cache import tenant_cache
+from subscription_guard import FEATURE_ACCESS, PLAN_LIMITS, RESOURCE_LIMITS, plan_name, subscription_active
+
+logger = logging.getLogger(__name__)
+
+# Cache Configuration
+ENTITLEMENT_CACHE_TTL_SECONDS = int(os.getenv("ENTITLEMENT_CACHE_TTL_SECONDS", "300"))
+REDIS_KEY = "entitlements:{tenant_id}"
+
+# Bit position of every feature flag
+FLAG_BITS: Dict[FeatureFlag, int] = {flag: 1 << index for index, flag in enumerate(FeatureFlag)}
+
+
+class Entitlements:
+    """Everything a tenant may use, resolved once. All checks are in-memory lookups."""
+
+    __slots__ = ("tenant_id", "plan", "status", "trial_ends_at", "subscription_ends_at", "flags", "plan_features", "limits")
+
+    def __init__(
+        self,
+        tenant_id: int,
+        plan: Optional[SubscriptionPlan],
+        status: Optional[SubscriptionStatus],
+        trial_ends_at: Optional[datetime],
+        subscription_ends_at: Optional[datetime],
+        enabled_flags: Iterable[FeatureFlag] = ()
+    ):
+        self.tenant_id = tenant_id
+        self.plan = plan
+        self.status = status
+        self.trial_ends_at = trial_ends_at
+        self.subscription_ends_at = subscription_ends_at
+        self.flags = 0
+        for flag in enabled_flags:
+            self.flags |= FLAG_BITS[flag]
+        self.plan_features = frozenset(
+            feature for feature, plans in FEATURE_ACCESS.items() if plan in plans
+        )
+        self.limits = PLAN_LIMITS[plan_name(plan)]
+
+    # ---------- checks ----------
+
+    def has_flag(self, feature: FeatureFlag) -> bool:
+        """Admin feature flag (TenantFeature) enabled for this tenant"""
+        return bool(self.flags & FLAG_BITS[feature])
+
+    def enabled_flags(self) -> List[FeatureFlag]:
+        return [flag for flag, bit in FLAG_BITS.items() if self.flags & bit]
+
+    def subscription_active(self, now: Optional[datetime] = None) -> bool:
+        return subscription_active(self.status, self.trial_ends_at, self.subscription_ends_at, now)
+
+    def allows(self, feature: str) -> bool:
+        """Plan feature access - same rules as subscription_guard.check_feature_access"""
+        if not self.subscription_active():
+            return False
+        if feature not in FEATURE_ACCESS:
+            return True  # Unknown features are allowed by default
+        return feature in self.plan_features
+
+    def within_limit(self, resource_type: str, current_count: int) -> bool:
+        """Same rules as subscription_guard.check_usage_limit"""
+        limit_key = RESOURCE_LIMITS.get(resource_type)
+        if limit_key is None:
+            return True
+        return current_count < self.limits[limit_key]
+
+    # ---------- (de)serialisation for Redis ----------
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "tenant_id": self.tenant_id,
+            "plan": self.plan.value if self.plan else None,
+            "status": self.status.value if self.status else None,
+            "trial_ends_at": self.trial_ends_at.isoformat() if self.trial_ends_at else None,
+            "subscription_ends_at": self.subscription_ends_at.isoformat() if self.subscription_ends_at else None,
+            # Flag values, not bits - stays valid if FeatureFlag members are reordered
+            "flags": [flag.value for flag in self.enabled_flags()],
+        })
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Entitlements":
+        data = json.loads(raw)
+
+        def when(value: Optional[str]) -> Optional[datetime]:
+            return datetime.fromisoformat(value) if value else None
+
+        return cls(
+            tenant_id=data["tenant_id"],
+            plan=SubscriptionPlan(data["plan"]) if data["plan"] else None,
+            status=SubscriptionStatus(data["status"]) if data["status"] else None,
+            trial_ends_at=when(data["trial_ends_at"]),
+            subscription_ends_at=when(data["subscription_ends_at"]),
+            enabled_flags=[FeatureFlag(value) for value in data["flags"] if value in FeatureFlag._value2member_map_],
+        )
+
+
+class EntitlementCache:
+    """Per-worker Entitlements cache backed by a shared Redis copy."""
+
+    def __init__(self, ttl_seconds: int = ENTITLEMENT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Tuple[Entitlements, float]] = {}  # tenant_id -> (entitlements, expires_at)
+        self._generation = 0  # bumped on every invalidation; loads started before one aren't stored
+        self._loading: Dict[int, asyncio.Future] = {}  # one cold load per tenant at a time
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Tenant cache invalidations (local or broadcast from another worker) drop our copy too
+        tenant_cache.on_invalidate(self.invalidate_local)
+
+    async def get(self, tenant_id: int) -> Optional[Entitlements]:
+        """Entitlements for a tenant, or None if the tenant doesn't exist."""
+        entry = self._entries.get(tenant_id)
+        if entry is not None and time.monotonic() < entry[1]:
+            self.hits += 1
+            return entry[0]
+
+        # Concurrent misses for the same tenant share one load
+        pending = self._loading.get(tenant_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[tenant_id] = future
+        generation = self._generation
+        try:
+            entitlements = await self._load(tenant_id, generation)
+            if entitlements is not None and self._generation == generation:
+                self._entries[tenant_id] = (entitlements, time.monotonic() + self.ttl_seconds)
+            future.set_result(entitlements)
+            return entitlements
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved so a load nobody else waited on doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(tenant_id, None)
+
+    async def _load(self, tenant_id: int, generation: int) -> Optional[Entitlements]:
+        client = redis_manager.redis_client
+        key = REDIS_KEY.format(tenant_id=tenant_id)
+        if client:
+            try:
+                raw = await client.get(key)
+                if raw:
+                    self.redis_hits += 1
+                    return Entitlements.from_json(raw)
+            except Exception as e:
+                logger.warning(f"⚠️ Entitlement cache Redis read failed for tenant {tenant_id}: {e}")
+
+        self.misses += 1
+        entitlements = await load_entitlements(tenant_id)
+        # Not if an invalidation arrived meanwhile - the rows read may predate it
+        if entitlements is not None and client and self._generation == generation:
+            try:
+                await client.setex(key, self.ttl_seconds, entitlements.to_json())
+            except Exception as e:
+                logger.warning(f"⚠️ Entitlement cache Redis write failed for tenant {tenant_id}: {e}")
+        return entitlements
+
+    def invalidate_local(self, tenant_id: Optional[int] = None):
+        """Drop one tenant (or everything) from this worker's cache."""
+        if tenant_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(tenant_id, None)
+        self._generation += 1
+        self.invalidations += 1
+
+    async def invalidate(self, tenant_id: int):
+        """
+        Call after committing a plan/status/feature-flag change. Deletes the shared Redis
+        copy, then invalidates the tenant cache (whose subscription fields changed too),
+        which drops the entitlements on this and - via its broadcast - every other worker.
+        """
+        client = redis_manager.redis_client
+        if client:
+            try:
+                await client.delete(REDIS_KEY.format(tenant_id=tenant_id))
+            except Exception as e:
+                # Other workers still converge within ENTITLEMENT_CACHE_TTL_SECONDS
+                logger.warning(f"⚠️ Failed to delete shared entitlements for tenant {tenant_id}: {e}")
+        await tenant_cache.invalidate(tenant_id)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "cached_tenants": len(self._entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+async def load_entitlements(tenant_id: int) -> Optional[Entitlements]:
+    """Resolve a tenant's entitlements from the database."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(
+                Tenant.subscription_plan,
+                Tenant.subscription_status,
+                Tenant.trial_ends_at,
+                Tenant.subscription_ends_at,
+            ).where(Tenant.id == tenant_id)
+        )
+        tenant = result.one_or_none()
+        if tenant is None:
+            return None
+        flags = await session.scalars(
+            select(TenantFeature.feature).where(
+                TenantFeature.tenant_id == tenant_id,
+                TenantFeature.is_enabled == True
+            )
+        )
+        return Entitlements(tenant_id, *tenant, enabled_flags=flags.all())
+
+
+# Global instance
+entitlement_cache = EntitlementCache()
@@ -0,0 +1,439 @@
+"""
+Entity Extractor
+Rule-first extraction of lead details from free-text messages, Gemini only as a fallback
+
+Brain ran every free-text message through extract_user_info_smart - a full Gemini round
+trip - even for "2 bedroom", "09177105840" or "budget 2M AED". A compiled rule engine
+(patterns over text_normalizer.normalize()d text, so Persian/Arabic digits and letter
+variants match) now resolves first:
+
+- phones (local Iranian / UAE formats converted to international), emails
+- budgets with their currency, converted to USD like the LLM prompt asks
+- bedrooms, property types, goals, urgency and known Dubai areas (area_gazetteer)
+
+The LLM is only called when a field the current conversation state still needs is
+unresolved AND the message has words the rules did not account for. Per-turn outcomes
+are counted in entity_extractor.stats().
+"""
+
+import re
+import logging
+from typing import Optional, Dict, Any, List, Tuple, Set, Callable, Awaitable, Iterable
+
+from database import ConversationState
+from area_gazetteer import find_area_mention, area_name
+from text_normalizer import normalize, fold, compile_pattern, is_question
+
+logger = logging.getLogger(__name__)
+
+# ==================== BUDGET PARSING ====================
+
+# Amount with optional multiplier, matched against normalize()d text (ASCII digits, folded letters)
+BUDGET_PATTERN = compile_pattern(
+    r'(\d+(?:\.\d+)?)\s*(billion|bn|میلیارد|ملیار|million|mil|m|میلیون|ملیون|миллион|млн|thousand|k|هزار|الف|тыс)?'
+)
+BUDGET_MULTIPLIERS = {
+    1_000_000_000: ('billion', 'bn', 'میلیارد', 'ملیار'),
+    1_000_000: ('million', 'mil', 'm', 'میلیون', 'ملیون', 'миллион', 'млн'),
+    1_000: ('thousand', 'k', 'هزار', 'الف', 'тыс'),
+}
+_MULTIPLIER_FACTORS = {normalize(word): factor for factor, words in BUDGET_MULTIPLIERS.items() for word in words}
+
+
+def parse_budget_string(budget_str: str) -> Optional[int]:
+    """Parse budget strings like '2M', '500K', '1.5 Million', '۲ میلیون' to integers."""
+    if not budget_str:
+        return None
+
+    budget_str = normalize(budget_str).replace(',', '').replace(' ', '')
+
+    # Extract number and multiplier
+    match = BUDGET_PATTERN.search(budget_str)
+    if not match:
+        return None
+
+    number = float(match.group(1))
+    multiplier = match.group(2) or ''
+
+    for factor, words in BUDGET_MULTIPLIERS.items():
+        if multiplier in words:
+            return int(number * factor)
+    return int(number)
+
+
+# Currency words -> units per USD (same rates the extraction prompt gives the LLM)
+CURRENCIES = {
+    "AED": (3.67, ("aed", "dhs", "dirham", "dirhams", "درهم", "дирхам", "дирхамов")),
+    "USD": (1.0, ("usd", "$", "dollar", "dollars", "دلار", "دولار", "доллар", "долларов")),
+    "IRT": (600_000.0, ("toman", "tomans", "تومان", "تومن")),
+}
+DEFAULT_CURRENCY = "AED"  # bare amounts in a budget context are Dubai prices
+_CURRENCY_BY_WORD = {normalize(word): code for code, (_, words) in CURRENCIES.items() for word in words}
+
+# Amounts that are only budgets when the message talks about a budget
+# (not "price" - "price in 2024?" / "price per sqft 1500?" ask about the market, not the lead's budget)
+BUDGET_WORDS = ("budget", "بودجه", "ميزانية", "бюджет")
+# Bare numbers in this range are years ("budget for 2026"), never amounts
+YEAR_RANGE = (1900, 2100)
+MAX_WORDS = ("up to", "upto", "under", "below", "max", "maximum", "less than", "تا", "حداکثر", "زیر",
+             "کمتر از", "حتى", "أقل من", "до", "максимум", "не более")
+MIN_WORDS = ("from", "min", "minimum", "at least", "over", "above", "more than", "از", "حداقل", "بالای",
+             "بیشتر از", "أكثر من", "от", "минимум", "не менее")
+RANGE_CONNECTORS = ("-", "to", "and", "تا", "و", "الى", "إلى", "до", "и")
+RANGE_WORDS = ("between", "بین", "بين", "между")
+
+
+def _alternation(words: Iterable[str]) -> str:
+    # Longest first so "million" wins over "m"
+    return "|".join(sorted((re.escape(fold(w)) for w in words), key=len, reverse=True))
+
+
+_MULT = _alternation(_MULTIPLIER_FACTORS)
+_CUR = _alternation(_CURRENCY_BY_WORD)
+_AMOUNT = rf'(?:(?P<{{p}}cur1>{_CUR})\s*)?(?P<{{p}}num>\d+(?:[.,]\d+)*)(?:\s*(?P<{{p}}mult>{_MULT})(?![^\W\d]))?(?:\s*(?P<{{p}}cur2>{_CUR})(?!\w))?'
+AMOUNT_PATTERN = compile_pattern(rf'(?<![\w.]){_AMOUNT.format(p="")}')
+RANGE_PATTERN = compile_pattern(
+    rf'(?<![\w.]){_AMOUNT.format(p="a")}\s*(?:{_alternation(RANGE_CONNECTORS)})\s*{_AMOUNT.format(p="b")}'
+)
+MIN_PATTERN = compile_pattern(rf'(?:{_alternation(MIN_WORDS)})\s*$')
+BUDGET_WORD_PATTERN = compile_pattern(rf'(?:{_alternation(BUDGET_WORDS)})')
+
+# ==================== OTHER FIELDS ====================
+
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+# 9-15 digits with optional separators and +/00 prefix
+PHONE_PATTERN = re.compile(r'(?<![\w.])(?:\+|00)?\d(?:[\s\-().]?\d){8,14}(?![\w.])')
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "یک": 1, "دو": 2, "سه": 3, "چهار": 4, "پنج": 5, "شش": 6,
+    "одна": 1, "одно": 1, "две": 2, "двух": 2, "три": 3, "трех": 3, "четыре": 4, "пять": 5,
+}
+_NUMBER_WORDS = {normalize(word): value for word, value in NUMBER_WORDS.items()}
+BEDROOM_PATTERN = compile_pattern(
+    rf'(?<!\w)(\d+|{_alternation(NUMBER_WORDS)})\s*-?\s*'
+    r'(?:bedrooms?|beds?|br|bhk|bd|اتاق خوابه|اتاق خواب|خوابه|خواب|غرف|غرفة|غرفه|غرف نوم|'
+    r'спальн\w*|комнатн\w*|комнат\w*|комн)(?!\w)'
+)
+
+# Field value -> keywords (whole words / phrases on normalize()d text)
+PROPERTY_TYPE_KEYWORDS = {
+    "studio": ("studio", "استودیو", "ستوديو", "студия", "студию"),
+    "penthouse": ("penthouse", "پنت هاوس", "پنتهاوس", "بنتهاوس", "пентхаус"),
+    "townhouse": ("townhouse", "تاون هاوس", "تاونهاوس", "таунхаус"),
+    "villa": ("villa", "villas", "ویلا", "ویلایی", "فيلا", "вилла", "виллу"),
+    "office": ("office", "دفتر", "اداری", "مكتب", "офис"),
+    "apartment": ("apartment", "apartments", "flat", "apt", "آپارتمان", "شقة", "شقه", "квартира", "квартиру",
+                  "апартаменты"),
+}
+GOAL_KEYWORDS = {
+    "golden_visa": ("golden visa", "ویزای طلایی", "گلدن ویزا", "الإقامة الذهبية", "التأشيرة الذهبية", "золотая виза", "золотую визу"),
+    "investment": ("invest", "investment", "investing", "سرمایه گذاری", "سرمایه‌گذاری", "استثمار", "инвестиция", "инвестиции", "инвестировать"),
+    "residency": ("residency", "residence visa", "اقامت", "إقامة", "вид на жительство", "резидентство"),
+    "rent": ("rent", "rental", "lease", "اجاره", "رهن", "إيجار", "ايجار", "аренда", "арендовать", "снять"),
+    "buy": ("buy", "purchase", "buying", "خرید", "بخرم", "بخریم", "شراء", "أشتري", "купить", "покупка"),
+}
+URGENCY_KEYWORDS = {
+    "urgent": ("urgent", "asap", "urgently", "immediately", "فوری", "فورا", "عاجل", "срочно"),
+    "just_looking": ("just looking", "exploring", "browsing", "فقط نگاه", "فقط دارم نگاه", "مجرد استفسار", "просто смотрю"),
+}
+
+
+def _keyword_patterns(table: Dict[str, Tuple[str, ...]]) -> List[Tuple[str, Any]]:
+    # Letters only at the edges: Persian suffixes ("ویلایی") are listed explicitly instead
+    return [(value, compile_pattern(rf'(?<!\w)(?:{_alternation(words)})(?!\w)')) for value, words in table.items()]
+
+
+PROPERTY_TYPE_PATTERNS = _keyword_patterns(PROPERTY_TYPE_KEYWORDS)
+GOAL_PATTERNS = _keyword_patterns(GOAL_KEYWORDS)
+URGENCY_PATTERNS = _keyword_patterns(URGENCY_KEYWORDS)
+
+# Words that carry no lead data - a message made only of these plus rule matches is fully parsed
+FILLER_WORDS = {token for phrase in (
+    # EN
+    "hi", "hello", "hey", "i", "im", "i'm", "am", "a", "an", "the", "want", "wanna", "would", "like", "to",
+    "looking", "look", "for", "need", "in", "at", "with", "and", "or", "please", "pls", "my", "me", "is",
+    "it", "of", "around", "about", "approx", "approximately", "ok", "okay", "yes", "thanks", "thank", "you",
+    "we", "our", "some", "something", "property", "home", "house", "dubai", "bedroom", "near", "area",
+    "maybe", "also", "number", "phone", "email", "mail", "here", "this", "that", "its", "are", "be", "can",
+    # FA
+    "سلام", "من", "ما", "میخوام", "میخواهم", "میخواستم", "می", "خوام", "خواهم", "یه", "یک", "دنبال",
+    "در", "با", "و", "لطفا", "هستم", "هستیم", "هست", "است", "برای", "حدود", "تقریبا", "شماره", "ایمیل",
+    "ملک", "خونه", "خانه", "دبی", "منطقه", "اطراف", "نزدیک", "باشه", "بله", "ممنون", "مرسی", "را", "رو",
+    "که", "به", "این", "اینه", "داریم", "دارم", "ام", "م", "عالی", "خوبه",
+    # AR
+    "مرحبا", "السلام", "عليكم", "أنا", "انا", "أريد", "اريد", "ابحث", "أبحث", "عن", "في", "مع", "او",
+    "أو", "من", "لو", "سمحت", "رقم", "هاتف", "بريد", "عقار", "دبي", "منطقة", "نعم", "شكرا", "حوالي",
+    # RU
+    "привет", "здравствуйте", "я", "мы", "хочу", "хотим", "ищу", "ищем", "в", "с", "и", "или",
+    "пожалуйста", "мне", "нам", "номер", "телефон", "почта", "недвижимость", "дубай", "дубае", "район",
+    "около", "примерно", "да", "спасибо", "это",
+) + BUDGET_WORDS + MAX_WORDS + MIN_WORDS + RANGE_CONNECTORS + RANGE_WORDS for token in normalize(phrase).split()}
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# Fields each conversation state may still need from a free-text message
+STATE_FIELDS: Dict[ConversationState, Tuple[str, ...]] = {
+    ConversationState.START: ("name", "phone", "email", "goal", "budget", "property_type", "location_preference"),
+    ConversationState.LANGUAGE_SELECT: ("name", "phone", "email", "goal", "budget", "property_type", "location_preference"),
+    ConversationState.COLLECTING_NAME: (),  # the state handler takes the reply itself as the name
+    ConversationState.WARMUP: ("goal", "budget", "property_type", "location_preference", "bedrooms"),
+    ConversationState.CAPTURE_CONTACT: ("phone", "email"),
+    ConversationState.SLOT_FILLING: ("goal", "budget", "property_type", "location_preference", "bedrooms"),
+    ConversationState.VALUE_PROPOSITION: ("budget", "property_type", "location_preference", "bedrooms"),
+    ConversationState.HARD_GATE: ("phone", "email"),
+    ConversationState.ENGAGEMENT: ("budget", "property_type", "location_preference", "bedrooms"),
+    ConversationState.HANDOFF_SCHEDULE: ("phone",),
+    ConversationState.HANDOFF_URGENT: ("phone",),
+    ConversationState.COMPLETED: (),
+}
+# Extracted field(s) that resolve each needed field
+FIELD_KEYS = {"budget": ("budget_min", "budget_max")}
+# Fields the rules find whenever they are present - never worth an LLM call
+RULE_ONLY_FIELDS = {"email"}
+
+
+# ==================== RULE ENGINE ====================
+
+def _number(raw: str) -> Optional[float]:
+    # "2,000,000" / "1.5" / "1,5" (decimal comma when the tail isn't 3 digits)
+    if "," in raw and "." not in raw and not re.fullmatch(r'\d{1,3}(?:,\d{3})+', raw):
+        raw = raw.replace(",", ".")
+    try:
+        return float(raw.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _amount(match, prefix: str = "") -> Tuple[Optional[float], Optional[str], bool]:
+    """(value with multiplier, currency code or None, had multiplier)"""
+    value = _number(match.group(f"{prefix}num"))
+    mult = match.group(f"{prefix}mult")
+    if value is not None and mult:
+        value *= _MULTIPLIER_FACTORS.get(mult.lower(), 1)
+    currency = match.group(f"{prefix}cur1") or match.group(f"{prefix}cur2")
+    return value, _CURRENCY_BY_WORD.get(currency.lower()) if currency else None, bool(mult)
+
+
+def _to_usd(value: float, currency: Optional[str]) -> int:
+    rate = CURRENCIES[currency or DEFAULT_CURRENCY][0]
+    return int(round(value / rate))
+
+
+def _international_phone(raw: str) -> Optional[str]:
+    digits = re.sub(r'\D', '', raw)
+    if raw.startswith("+"):
+        return f"+{digits}"
+    if raw.startswith("00"):
+        return f"+{digits[2:]}"
+    if len(digits) == 11 and digits.startswith("09"):  # Iran mobile
+        return f"+98{digits[1:]}"
+    if len(digits) == 10 and digits.startswith("05"):  # UAE mobile
+        return f"+971{digits[1:]}"
+    if len(digits) == 9 and digits.startswith("5"):
+        return f"+971{digits}"
+    if len(digits) >= 11 and digits.startswith(("971", "98")):
+        return f"+{digits}"
+    return None
+
+
+class RuleExtraction:
+    """What the rule engine found in one message, plus the words it could not account for."""
+
+    __slots__ = ("fields", "residual")
+
+    def __init__(self, fields: Dict[str, Any], residual: Tuple[str, ...]):
+        self.fields = fields
+        self.residual = residual
+
+    def has(self, field: str) -> bool:
+        return any(self.fields.get(key) is not None for key in FIELD_KEYS.get(field, (field,)))
+
+
+def extract_rules(message: str) -> RuleExtraction:
+    """Deterministic extraction - no I/O, microseconds per message."""
+    text = normalize(message)
+    fields: Dict[str, Any] = {}
+    spans: List[Tuple[int, int]] = []
+
+    def free(start: int, end: int) -> bool:
+        return all(end <= s or start >= e for s, e in spans)
+
+    def take(match, group: int = 0):
+        spans.append(match.span(group))
+
+    # Email (before phones/budgets - addresses contain digits and dots)
+    for match in EMAIL_PATTERN.finditer(text):
+        fields.setdefault("email", match.group())
+        take(match)
+
+    # Bedrooms / studio (before budgets - "2 bedroom" is not an amount)
+    for match in BEDROOM_PATTERN.finditer(text):
+        if not free(*match.span()):
+            continue
+        word = match.group(1)
+        count = int(word) if word.isdigit() else _NUMBER_WORDS.get(word)
+        if count is not None and 0 < count <= 20:
+            fields.setdefault("bedrooms", count)
+            take(match)
+
+    def ranges(require_marker: bool):
+        for match in RANGE_PATTERN.finditer(text):
+            low, low_cur, low_mult = _amount(match, "a")
+            high, high_cur, high_mult = _amount(match, "b")
+            if low is None or high is None or not free(*match.span()):
+                continue
+            if require_marker and not (low_cur or high_cur or low_mult or high_mult):
+                continue
+            if high_mult and not low_mult:
+                # "1-2M": the multiplier applies to both ends
+                low *= _MULTIPLIER_FACTORS.get(match.group("bmult").lower(), 1)
+            currency = low_cur or high_cur
+            fields.setdefault("budget_min", _to_usd(min(low, high), currency))
+            fields.setdefault("budget_max", _to_usd(max(low, high), currency))
+            take(match)
+
+    def single_amounts(require_marker: bool):
+        for match in AMOUNT_PATTERN.finditer(text):
+            if not free(*match.span()):
+                continue
+            value, currency, has_mult = _amount(match)
+            if value is None:
+                continue
+            if require_marker and not (currency or has_mult):
+                continue
+            if not require_marker and (value < 1000 or (YEAR_RANGE[0] <= value <= YEAR_RANGE[1] and value.is_integer())):
+                continue
+            before = text[:match.start()]
+            usd = _to_usd(value, currency)
+            if MIN_PATTERN.search(before):
+                fields.setdefault("budget_min", usd)
+            else:
+                fields.setdefault("budget_max", usd)
+            take(match)
+
+    # Budgets with a currency / multiplier: ranges first ("1-2M AED"), then single amounts
+    ranges(require_marker=True)
+    single_amounts(require_marker=True)
+
+    # Phones (after explicit amounts - "1500000000 تومان" is a budget, not a number to call)
+    for match in PHONE_PATTERN.finditer(text):
+        if not free(*match.span()):
+            continue
+        phone = _international_phone(match.group())
+        if phone:
+            fields.setdefault("phone", phone)
+            take(match)
+
+    # Bare amounts count as a budget only when the message talks about one
+    if BUDGET_WORD_PATTERN.search(text):
+        ranges(require_marker=False)
+        single_amounts(require_marker=False)
+
+    # Keyword fields
+    for field, patterns in (("property_type", PROPERTY_TYPE_PATTERNS), ("goal", GOAL_PATTERNS), ("urgency", URGENCY_PATTERNS)):
+        for value, pattern in patterns:
+            match = pattern.search(text)
+            if match:
+                fields.setdefault(field, value)
+                take(match)
+    if fields.get("property_type") == "studio":
+        fields.setdefault("bedrooms", 0)
+
+    # Location: known areas only
+    mention = find_area_mention(text)
+    area_words: Set[str] = set()
+    if mention:
+        fields["location_preference"] = area_name(mention[0])
+        area_words = set(mention[1].split())
+
+    # Words nothing above accounted for
+    chars = list(text)
+    for start, end in spans:
+        chars[start:end] = " " * (end - start)
+    residual = tuple(
+        token for token in _TOKEN.findall("".join(chars))
+        if token not in FILLER_WORDS and token not in area_words and not token.isdigit()
+        and (len(token) > 1 or not token.isascii())
+    )
+    return RuleExtraction(fields, residual)
+
+
+# ==================== LAYERED EXTRACTOR ====================
+
+LLMExtractor = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class EntityExtractor:
+    """Rules first, the LLM only for needed fields the rules could not resolve."""
+
+    def __init__(self):
+        self.turns = 0
+        self.llm_calls = 0
+        self.llm_avoided = 0
+        self.avoided_reasons: Dict[str, int] = {"resolved": 0, "not_needed": 0, "fully_parsed": 0, "question": 0}
+        self.rule_fields: Dict[str, int] = {}
+
+    @staticmethod
+    def needed_fields(state: Optional[ConversationState], known: Dict[str, Any]) -> Tuple[str, ...]:
+        """Fields the state still collects that the lead doesn't have yet"""
+        fields = STATE_FIELDS.get(state, STATE_FIELDS[ConversationState.START])
+        return tuple(field for field in fields if not known.get(field) and field not in RULE_ONLY_FIELDS)
+
+    async def extract(
+        self,
+        message: str,
+        state: Optional[ConversationState],
+        current_lead_data: Dict[str, Any],
+        llm_extractor: LLMExtractor
+    ) -> Dict[str, Any]:
+        """
+        Extract lead details from a free-text message.
+        Rule results win; LLM results only fill fields the rules left empty.
+        Questions never yield a budget: amounts in them are what the lead asks about.
+        """
+        self.turns += 1
+        rules = extract_rules(message)
+        for field in rules.fields:
+            self.rule_fields[field] = self.rule_fields.get(field, 0) + 1
+        question = is_question(message)
+        fields = {
+            key: value for key, value in rules.fields.items()
+            if not (question and key in FIELD_KEYS["budget"])
+        }
+
+        missing = [field for field in self.needed_fields(state, current_lead_data) if not rules.has(field)]
+        if not missing:
+            reason = "resolved" if rules.fields else "not_needed"
+        elif not rules.residual:
+            reason = "fully_parsed"
+        elif question:
+            reason = "question"  # answered by the FAQ/knowledge path; rules already took any details
+        else:
+            reason = None
+
+        if reason:
+            self.llm_avoided += 1
+            self.avoided_reasons[reason] += 1
+            logger.info(f"🧩 Rule extraction {fields} - LLM skipped ({reason})")
+            return fields
+
+        self.llm_calls += 1
+        logger.info(f"🧩 Rule extraction {rules.fields} - LLM for {missing} (unparsed: {' '.join(rules.residual[:5])})")
+        llm_fields = await llm_extractor(message, current_lead_data) or {}
+        merged = {key: value for key, value in llm_fields.items() if value is not None}
+        merged.update(fields)
+        return merged
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "llm_calls": self.llm_calls,
+            "llm_avoided": self.llm_avoided,
+            "llm_avoided_rate": round(self.llm_avoided / self.turns, 3) if self.turns else 0.0,
+            "avoided_reasons": dict(self.avoided_reasons),
+            "rule_fields": dict(self.rule_fields),
+        }
+
+
+# Global instance
+entity_extractor = EntityExtractor()
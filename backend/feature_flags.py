@@ -1,10 +1,13 @@
 """
 Feature Flags System
 Centralized feature access control for multi-tenant platform
+
+Flags are read from the tenant's cached Entitlements (entitlements.py), so a check is a
+bit test in memory; the admin toggle endpoints invalidate the cache.
 """
 
-from sqlalchemy import select
-from database import async_session, TenantFeature, FeatureFlag
+from database import FeatureFlag
+from entitlements import entitlement_cache
 from typing import Optional
 
 
@@ -19,16 +22,8 @@ async def has_feature(tenant_id: int, feature: FeatureFlag) -> bool:
     Returns:
         True if feature is enabled, False otherwise
     """
-    async with async_session() as session:
-        result = await session.execute(
-            select(TenantFeature).where(
-                TenantFeature.tenant_id == tenant_id,
-                TenantFeature.feature == feature,
-                TenantFeature.is_enabled == True
-            )
-        )
-        tenant_feature = result.scalar_one_or_none()
-        return tenant_feature is not None
+    entitlements = await entitlement_cache.get(tenant_id)
+    return entitlements is not None and entitlements.has_flag(feature)
 
 
 async def require_feature(tenant_id: int, feature: FeatureFlag, error_message: Optional[str] = None):
@@ -60,15 +55,8 @@ async def get_enabled_features(tenant_id: int) -> list[FeatureFlag]:
     Returns:
         List of enabled FeatureFlag enums
     """
-    async with async_session() as session:
-        result = await session.execute(
-            select(TenantFeature).where(
-                TenantFeature.tenant_id == tenant_id,
-                TenantFeature.is_enabled == True
-            )
-        )
-        features = result.scalars().all()
-        return [f.feature for f in features]
+    entitlements = await entitlement_cache.get(tenant_id)
+    return entitlements.enabled_flags() if entitlements else []
 
 
 # Usage Examples:
@@ -15,13 +15,44 @@ from datetime import datetime, timedelta
 
 from database import (
     Lead, TenantProperty, Tenant, async_session, select,
-    Language, LeadStatus, PropertyType
+    Language, PropertyType
 )
 from property_presenter import send_property_with_roi
 from brain import generate_urgency_message
+from lead_preference_index import qualified_lead_index
 
 logger = logging.getLogger(__name__)
 
+# Leads fetched per IN (...) query when loading matches
+LEAD_FETCH_BATCH = 1000
+
+# 10% flexibility above the lead's budget_max
+BUDGET_TOLERANCE = 1.1
+
+
+async def _match_lead_ids(tenant_id: int, new_property: TenantProperty) -> List[int]:
+    """Qualified leads whose saved budget, property type and bedrooms fit the property."""
+    if new_property.price is None:
+        return []
+    return await qualified_lead_index.match(
+        tenant_id,
+        price=new_property.price,
+        budget_tolerance=BUDGET_TOLERANCE,
+        property_type=new_property.property_type,  # or no preference saved
+        bedrooms=new_property.bedrooms
+    )
+
+
+async def _load_leads(session, lead_ids: List[int]) -> List[Lead]:
+    """Fetch matched leads in batches (no cap on the number of matches)."""
+    leads = []
+    for i in range(0, len(lead_ids), LEAD_FETCH_BATCH):
+        result = await session.execute(
+            select(Lead).where(Lead.id.in_(lead_ids[i:i + LEAD_FETCH_BATCH]))
+        )
+        leads.extend(result.scalars().all())
+    return leads
+
 
 async def notify_qualified_leads_of_new_property(
     tenant_id: int,
@@ -74,41 +105,11 @@ async def notify_qualified_leads_of_new_property(
             stats["errors"].append(f"Tenant {tenant_id} not found")
             return stats
         
-        # 3. پیدا کردن لیدهای کولیفای شده که با این ملک match میکنن
-        # فیلتر: qualified/hot leads که preferences ذخیره شده دارن
-        matching_leads_query = select(Lead).where(
-            Lead.tenant_id == tenant_id,
-            Lead.status == LeadStatus.QUALIFIED,
-            Lead.budget_min.isnot(None),  # حتماً بودجه ذخیره شده باشه
-            Lead.budget_max.isnot(None)
-        )
-        
-        # فیلتر بودجه: lead.budget_min <= property.price <= lead.budget_max * 1.1 (10% flexibility)
-        matching_leads_query = matching_leads_query.where(
-            Lead.budget_min <= new_property.price,
-            Lead.budget_max * 1.1 >= new_property.price  # 10% tolerance
-        )
-        
-        # فیلتر نوع ملک (اگر ذخیره شده باشه)
-        if new_property.property_type:
-            matching_leads_query = matching_leads_query.where(
-                (Lead.property_type == new_property.property_type) |
-                (Lead.property_type.is_(None))  # OR no preference saved
-            )
-        
-        # فیلتر تعداد اتاق (اگر ذخیره شده باشه)
-        if new_property.bedrooms:
-            matching_leads_query = matching_leads_query.where(
-                (Lead.bedrooms_min.is_(None)) |  # No bedroom preference
-                (Lead.bedrooms_min <= new_property.bedrooms)
-            ).where(
-                (Lead.bedrooms_max.is_(None)) |  # No bedroom max
-                (Lead.bedrooms_max >= new_property.bedrooms)
-            )
-        
-        # اجرای query
-        result = await session.execute(matching_leads_query)
-        matching_leads = result.scalars().all()
+        # 3. پیدا کردن لیدهای کولیفای شده که با این ملک match میکنن (یک probe روی lead preference index)
+        # qualified leads با بودجه ذخیره شده:
+        # lead.budget_min <= property.price <= lead.budget_max * 1.1، نوع ملک و تعداد اتاق (اگر ذخیره شده باشه)
+        lead_ids = await _match_lead_ids(tenant_id, new_property)
+        matching_leads = await _load_leads(session, lead_ids)
         
         logger.info(f"🎯 Found {len(matching_leads)} matching qualified leads")
         
@@ -219,22 +220,4 @@ async def get_matching_leads_count(tenant_id: int, property_id: int) -> int:
         if not new_property:
             return 0
         
-        matching_leads_query = select(Lead).where(
-            Lead.tenant_id == tenant_id,
-            Lead.status == LeadStatus.QUALIFIED,
-            Lead.budget_min.isnot(None),
-            Lead.budget_max.isnot(None),
-            Lead.budget_min <= new_property.price,
-            Lead.budget_max * 1.1 >= new_property.price
-        )
-        
-        if new_property.property_type:
-            matching_leads_query = matching_leads_query.where(
-                (Lead.property_type == new_property.property_type) |
-                (Lead.property_type.is_(None))
-            )
-        
-        result = await session.execute(matching_leads_query)
-        matching_leads = result.scalars().all()
-        
-        return len(matching_leads)
+        return len(await _match_lead_ids(tenant_id, new_property))
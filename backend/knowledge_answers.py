@@ -0,0 +1,212 @@
+"""
+Knowledge Answers
+FAQ questions answered straight from the tenant's knowledge base, without Gemini
+
+When the knowledge retrieval (knowledge_index.py) found the entry that answers a question,
+Brain still sent the whole tenant prompt plus that entry to Gemini to paraphrase it -
+seconds of latency for an answer the tenant already wrote. A match is confident when:
+
+- the question names it: one of its keywords or its title appears in the question as a
+  phrase (BM25 scores alone depend on the size of the knowledge base)
+- it beats the runner-up by KNOWLEDGE_ANSWER_MIN_MARGIN (ratio of the scores)
+- at least KNOWLEDGE_ANSWER_MIN_COVERAGE of the question's words occur in the entry
+  (a question that asks more than the entry says goes to the LLM)
+- the entry is written in the lead's language (entries without one go to the LLM, which
+  answers in the lead's language)
+
+Confident matches are answered with the entry itself plus follow-up buttons for the
+other entries the question matched (KNOWLEDGE_CALLBACK_PREFIX callbacks). Anything else
+is ambiguous and generated by the LLM as before. Per-tenant hit rates and the latency
+saved (against the mean LLM reply time for the tenant's ambiguous questions) are in stats().
+"""
+
+import os
+import hashlib
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+
+from database import Language
+from knowledge_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Knowledge Answer Configuration
+KNOWLEDGE_ANSWERS_ENABLED = os.getenv("KNOWLEDGE_ANSWERS_ENABLED", "true").lower() in ("1", "true", "yes")
+KNOWLEDGE_ANSWER_MIN_MARGIN = float(os.getenv("KNOWLEDGE_ANSWER_MIN_MARGIN", "1.5"))
+KNOWLEDGE_ANSWER_MIN_COVERAGE = float(os.getenv("KNOWLEDGE_ANSWER_MIN_COVERAGE", "0.6"))
+KNOWLEDGE_ANSWER_MAX_FOLLOWUPS = int(os.getenv("KNOWLEDGE_ANSWER_MAX_FOLLOWUPS", "2"))
+
+# Entries searched per question: the answer plus its follow-up candidates
+KNOWLEDGE_ANSWER_CANDIDATES = KNOWLEDGE_ANSWER_MAX_FOLLOWUPS + 1
+KNOWLEDGE_CALLBACK_PREFIX = "kb_"
+# Weight of the newest sample in the per-tenant LLM reply time average
+LATENCY_EWMA_ALPHA = 0.2
+
+ANSWER_TEMPLATE = "💡 **{title}**\n\n{content}"
+
+
+def knowledge_callback(entry: Dict[str, Any]) -> str:
+    """Callback data for a follow-up button (stable across context versions, within Telegram's 64 bytes)"""
+    language = entry.get("language")
+    raw = f"{getattr(language, 'value', language)}|{entry.get('title') or ''}"
+    return KNOWLEDGE_CALLBACK_PREFIX + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def find_callback_entry(entries: List[Dict[str, Any]], callback_data: str) -> Optional[Dict[str, Any]]:
+    """Entry a follow-up button points to, or None if it was removed or renamed since"""
+    return next((entry for entry in entries if knowledge_callback(entry) == callback_data), None)
+
+
+def format_answer(entry: Dict[str, Any]) -> str:
+    return ANSWER_TEMPLATE.format(title=entry["title"], content=(entry.get("content") or "").strip())
+
+
+def _phrase_in(phrase: str, padded_question: str) -> bool:
+    tokens = tokenize(phrase, cache=False)
+    return bool(tokens) and f" {' '.join(tokens)} " in padded_question
+
+
+def names_entry(question: str, entry: Dict[str, Any]) -> bool:
+    """Whether the question contains the entry's title or one of its keywords (normalised)"""
+    padded_question = f" {' '.join(tokenize(question))} "
+    return any(_phrase_in(phrase, padded_question) for phrase in [entry.get("title") or ""] + list(entry.get("keywords") or []))
+
+
+def coverage(question: str, entry: Dict[str, Any]) -> float:
+    """Share of the question's words that occur in the entry's title, keywords or content"""
+    question_tokens = set(tokenize(question))
+    if not question_tokens:
+        return 0.0
+    entry_text = " ".join([entry.get("title") or "", entry.get("content") or ""] + list(entry.get("keywords") or []))
+    return len(question_tokens & set(tokenize(entry_text, cache=False))) / len(question_tokens)
+
+
+class TenantKnowledgeStats:
+    """Knowledge answer outcomes of one tenant."""
+
+    __slots__ = ("questions", "answered", "ambiguous", "no_match", "followups", "llm_reply_seconds", "saved_seconds")
+
+    def __init__(self):
+        self.questions = 0
+        self.answered = 0
+        self.ambiguous = 0  # matched, but not confidently enough
+        self.no_match = 0
+        self.followups = 0  # follow-up buttons clicked
+        self.llm_reply_seconds: Optional[float] = None  # EWMA of LLM replies to FAQ questions
+        self.saved_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "questions": self.questions,
+            "answered": self.answered,
+            "ambiguous": self.ambiguous,
+            "no_match": self.no_match,
+            "followups": self.followups,
+            "hit_rate": round(self.answered / self.questions, 3) if self.questions else 0.0,
+            "llm_reply_seconds": round(self.llm_reply_seconds, 3) if self.llm_reply_seconds is not None else None,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+class KnowledgeAnswerer:
+    """Confidence test for knowledge matches; per-tenant hit rate and latency saved."""
+
+    def __init__(
+        self,
+        min_margin: float = KNOWLEDGE_ANSWER_MIN_MARGIN,
+        min_coverage: float = KNOWLEDGE_ANSWER_MIN_COVERAGE,
+        max_followups: int = KNOWLEDGE_ANSWER_MAX_FOLLOWUPS,
+        enabled: bool = KNOWLEDGE_ANSWERS_ENABLED
+    ):
+        self.min_margin = min_margin
+        self.min_coverage = min_coverage
+        self.max_followups = max_followups
+        self.enabled = enabled
+        self._tenants: Dict[Optional[int], TenantKnowledgeStats] = {}
+
+    def _tenant(self, tenant_id: Optional[int]) -> TenantKnowledgeStats:
+        stats = self._tenants.get(tenant_id)
+        if stats is None:
+            stats = self._tenants[tenant_id] = TenantKnowledgeStats()
+        return stats
+
+    def pick(
+        self,
+        question: str,
+        scored_entries: List[Tuple[float, Dict[str, Any]]],
+        lang: Language
+    ) -> Optional[Dict[str, Any]]:
+        """The entry that answers the question on its own, or None when retrieval is ambiguous"""
+        if not scored_entries:
+            return None
+        top_score, entry = scored_entries[0]
+        if entry.get("language") != lang:
+            return None
+        if len(scored_entries) > 1 and top_score < self.min_margin * scored_entries[1][0]:
+            return None
+        if coverage(question, entry) < self.min_coverage or not names_entry(question, entry):
+            return None
+        return entry
+
+    def followups(
+        self,
+        answer: Dict[str, Any],
+        scored_entries: List[Tuple[float, Dict[str, Any]]],
+        lang: Language
+    ) -> List[Dict[str, Any]]:
+        """Other matched entries in the lead's language, best first"""
+        return [
+            entry for _, entry in scored_entries
+            if entry is not answer and entry.get("language") == lang
+        ][:self.max_followups]
+
+    # ---------- metrics ----------
+
+    def record_answer(self, tenant_id: Optional[int], seconds: float):
+        """A question answered from the knowledge base in `seconds`"""
+        stats = self._tenant(tenant_id)
+        stats.questions += 1
+        stats.answered += 1
+        if stats.llm_reply_seconds is not None:
+            stats.saved_seconds += max(0.0, stats.llm_reply_seconds - seconds)
+
+    def record_miss(self, tenant_id: Optional[int], matched: bool):
+        """A question left to the LLM (matched: retrieval found entries, none confidently)"""
+        stats = self._tenant(tenant_id)
+        stats.questions += 1
+        if matched:
+            stats.ambiguous += 1
+        else:
+            stats.no_match += 1
+
+    def record_llm_reply(self, tenant_id: Optional[int], seconds: float):
+        """Time the LLM took to answer a question the knowledge base couldn't"""
+        stats = self._tenant(tenant_id)
+        if stats.llm_reply_seconds is None:
+            stats.llm_reply_seconds = seconds
+        else:
+            stats.llm_reply_seconds += LATENCY_EWMA_ALPHA * (seconds - stats.llm_reply_seconds)
+
+    def record_followup(self, tenant_id: Optional[int]):
+        self._tenant(tenant_id).followups += 1
+
+    def tenant_stats(self, tenant_id: Optional[int]) -> Dict[str, Any]:
+        return self._tenant(tenant_id).to_dict()
+
+    def stats(self) -> Dict[str, Any]:
+        questions = sum(s.questions for s in self._tenants.values())
+        answered = sum(s.answered for s in self._tenants.values())
+        return {
+            "enabled": self.enabled,
+            "min_margin": self.min_margin,
+            "min_coverage": self.min_coverage,
+            "questions": questions,
+            "answered": answered,
+            "hit_rate": round(answered / questions, 3) if questions else 0.0,
+            "saved_seconds": round(sum(s.saved_seconds for s in self._tenants.values()), 3),
+            "tenants": {str(tenant_id): s.to_dict() for tenant_id, s in self._tenants.items()},
+        }
+
+
+# Global instance
+knowledge_answerer = KnowledgeAnswerer()
@@ -0,0 +1,206 @@
+"""
+Knowledge Retrieval Index
+Inverted index over a tenant's knowledge base entries with BM25 ranking
+
+Built once per tenant context version (see context_cache.TenantContextSnapshot) and
+per language, so each AI turn only touches the postings of the words in the message
+instead of scanning every entry.
+
+Ranking:
+    BM25 over title/keywords/content (keywords and title weighted higher)
+    + KEYWORD_PHRASE_BOOST for each entry keyword that appears in the query
+    + PRIORITY_BOOST * entry priority (tie-breaker between similar matches)
+
+An entry is only returned if the query hits its title or keywords - content words
+alone only affect the ordering, like the original keyword/title scorer.
+"""
+
+import math
+import heapq
+from collections import defaultdict
+from typing import Optional, Dict, Any, List, Tuple
+
+from database import Language
+from text_normalizer import normalize, normalize_text, tokenize as cached_tokens, tokenize_text
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field weights (term frequency multipliers)
+KEYWORD_WEIGHT = 3.0
+TITLE_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+
+KEYWORD_PHRASE_BOOST = 2.0
+PRIORITY_BOOST = 0.01
+
+# Function words that would otherwise match every entry (normalised below like the text)
+STOPWORDS = {
+    # EN
+    "the", "and", "for", "are", "you", "your", "can", "how", "what", "is", "in", "of", "to",
+    "a", "an", "do", "does", "i", "my", "me", "it", "on", "at", "with", "this", "that", "be",
+    # FA
+    "و", "در", "به", "از", "که", "را", "با", "این", "آن", "است", "برای", "یک", "هم", "تا", "من", "چه",
+    # AR
+    "في", "من", "على", "إلى", "عن", "هل", "ما", "هذا", "هذه", "أن", "مع",
+    # RU
+    "и", "в", "на", "с", "по", "что", "как", "это", "для", "не", "я",
+}
+STOPWORDS = {normalize(word) for word in STOPWORDS}
+
+
+def tokenize(text: str, cache: bool = True) -> List[str]:
+    """
+    Normalised word tokens with stopwords removed and simple English plural folding.
+    Queries use the memoised tokenizer; index builds pass cache=False so entry
+    content doesn't evict the cached user messages.
+    """
+    tokens = []
+    for token in (cached_tokens(text) if cache else tokenize_text(text)):
+        if token in STOPWORDS:
+            continue
+        # Fold plain ASCII plurals ("visas" -> "visa") so singular and plural share postings
+        if len(token) > 4 and token.isascii() and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _contains_sequence(haystack: List[str], needle: List[str]) -> bool:
+    n = len(needle)
+    if n == 0 or n > len(haystack):
+        return False
+    first = needle[0]
+    for i in range(len(haystack) - n + 1):
+        if haystack[i] == first and haystack[i:i + n] == needle:
+            return True
+    return False
+
+
+class KnowledgeIndex:
+    """Inverted index over one list of knowledge entries (already filtered to a language)."""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.entries = entries
+        # term -> [(entry position, weighted tf, matched in title/keywords)]
+        self._postings: Dict[str, List[Tuple[int, float, bool]]] = defaultdict(list)
+        self._lengths: List[float] = []
+        self._keyword_tokens: List[List[List[str]]] = []
+        self._search_text: List[str] = []  # normalised title + keywords, for exact topic checks
+
+        for pos, entry in enumerate(entries):
+            keywords = [kw for kw in (entry.get("keywords") or []) if kw]
+            keyword_tokens = [tokenize(kw, cache=False) for kw in keywords]
+            title_tokens = tokenize(entry.get("title") or "", cache=False)
+            content_tokens = tokenize(entry.get("content") or "", cache=False)
+
+            weights: Dict[str, float] = defaultdict(float)
+            strong = set()
+            for tokens in keyword_tokens:
+                for token in tokens:
+                    weights[token] += KEYWORD_WEIGHT
+                    strong.add(token)
+            for token in title_tokens:
+                weights[token] += TITLE_WEIGHT
+                strong.add(token)
+            for token in content_tokens:
+                weights[token] += CONTENT_WEIGHT
+
+            for term, tf in weights.items():
+                self._postings[term].append((pos, tf, term in strong))
+
+            self._lengths.append(sum(weights.values()))
+            self._keyword_tokens.append(keyword_tokens)
+            self._search_text.append(
+                "\n".join([normalize_text(entry.get("title") or "")] + [normalize_text(kw) for kw in keywords])
+            )
+
+        avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        avg_length = avg_length or 1.0
+        # Per-entry BM25 length normalisation, precomputed so lookups are one multiply-add per posting
+        self._norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) for length in self._lengths]
+        doc_count = len(entries)
+        self._idf = {
+            term: math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, query: str, limit: int = 3) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return up to `limit` (score, entry) pairs, best first."""
+        query_tokens = tokenize(query)
+        if not query_tokens or not self.entries:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        matched: set = set()
+        for term in set(query_tokens):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term] * (BM25_K1 + 1)
+            norms = self._norms
+            for pos, tf, strong in postings:
+                scores[pos] += idf * tf / (tf + norms[pos])
+                if strong:
+                    matched.add(pos)
+
+        results = []
+        for pos in matched:
+            score = scores[pos]
+            for tokens in self._keyword_tokens[pos]:
+                if _contains_sequence(query_tokens, tokens):
+                    score += KEYWORD_PHRASE_BOOST
+            priority = self.entries[pos].get("priority") or 0
+            results.append((score + PRIORITY_BOOST * priority, priority, pos))
+
+        top = heapq.nlargest(limit, results, key=lambda r: (r[0], r[1], -r[2]))
+        return [(score, self.entries[pos]) for score, _, pos in top]
+
+    def find_topic(self, topic: str) -> Optional[Dict[str, Any]]:
+        """
+        First entry (in priority order) whose title or any keyword contains `topic`.
+        Same result as the linear scan in Brain.get_specific_knowledge, via the postings.
+        """
+        topic_lower = normalize(topic)
+        topic_tokens = tokenize(topic)
+        if not topic_tokens:
+            return None
+
+        candidates = None
+        for term in set(topic_tokens):
+            positions = {pos for pos, _, strong in self._postings.get(term, ()) if strong}
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                return None
+
+        for pos in sorted(candidates):
+            if topic_lower in self._search_text[pos]:
+                return self.entries[pos]
+        return None
+
+
+class KnowledgeIndexSet:
+    """Lazily built per-language KnowledgeIndex instances over one tenant's knowledge base."""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.entries = entries
+        self._indexes: Dict[Optional[Language], KnowledgeIndex] = {}
+
+    def for_language(self, language: Optional[Language] = None) -> KnowledgeIndex:
+        """
+        Index for one language. Entries without a language are shared by all languages;
+        language=None indexes everything.
+        """
+        index = self._indexes.get(language)
+        if index is None:
+            if language is None:
+                entries = self.entries
+            else:
+                entries = [e for e in self.entries if not e.get("language") or e.get("language") == language]
+            index = KnowledgeIndex(entries)
+            self._indexes[language] = index
+        return index
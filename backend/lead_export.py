@@ -0,0 +1,230 @@
+"""
+Lead Export
+Streaming lead exports (xlsx / csv / ndjson) in constant memory
+
+The old exports loaded every Lead ORM object, built the whole workbook in memory and
+only then sent it. Here rows are read through a server-side cursor (yield_per) in
+batches of LEAD_EXPORT_BATCH_SIZE, selecting only the exported columns, and each batch
+is written out before the next one is fetched:
+
+- csv / ndjson: every batch is encoded and sent straight away (chunked transfer)
+- xlsx: an openpyxl write-only workbook spools rows to disk; the finished file (a zip,
+  which can only be assembled at the end) is streamed from the temp file in chunks
+
+Column sets are plain lists of ExportColumn, so the dashboard and analytics exports share
+the same engine with different columns and filters.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Sequence
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from database import async_session, Lead, Purpose
+
+logger = logging.getLogger(__name__)
+
+# Export Configuration
+LEAD_EXPORT_BATCH_SIZE = int(os.getenv("LEAD_EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = ("xlsx", "csv", "ndjson")
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _value(value: Any) -> Any:
+    """Enums as their values, missing values as empty cells."""
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _timestamp(value: Optional[datetime]) -> str:
+    return value.strftime("%Y-%m-%d %H:%M") if value else ""
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    """One exported column: header, Lead attribute it reads and how to render it."""
+    header: str
+    field: str
+    width: int = 15
+    render: Callable[[Any], Any] = _value
+
+
+# Tenant dashboard export (/api/tenants/{tenant_id}/leads/export)
+LEAD_EXPORT_COLUMNS: List[ExportColumn] = [
+    ExportColumn("ID", "id", 8),
+    ExportColumn("Name", "name", 20),
+    ExportColumn("Phone", "phone", 15),
+    ExportColumn("Telegram Username", "telegram_username", 20),
+    ExportColumn("Language", "language", 10),
+    ExportColumn("Status", "status"),
+    ExportColumn("Transaction Type", "transaction_type"),
+    ExportColumn("Property Type", "property_type"),
+    ExportColumn("Budget Min", "budget_min", 12),
+    ExportColumn("Budget Max", "budget_max", 12),
+    ExportColumn("Payment Method", "payment_method"),
+    ExportColumn("Purpose", "purpose"),
+    ExportColumn("Residency Need", "purpose", 15, lambda p: "Yes" if p == Purpose.RESIDENCY else "No"),
+    ExportColumn("Bedrooms Min", "bedrooms_min", 12),
+    ExportColumn("Bedrooms Max", "bedrooms_max", 12),
+    ExportColumn("Location", "preferred_location", 20),
+    ExportColumn("Taste Tags", "taste_tags", 30, lambda tags: ", ".join(tags) if tags else ""),
+    ExportColumn("Notes", "notes", 30),
+    ExportColumn("Voice Transcript", "voice_transcript", 40),
+    ExportColumn("Source", "source", 12),
+    ExportColumn("Created At", "created_at", 18, _timestamp),
+    ExportColumn("Last Interaction", "last_interaction", 18, _timestamp),
+]
+
+# Agency reporting export (/analytics/export)
+ANALYTICS_EXPORT_COLUMNS: List[ExportColumn] = [
+    ExportColumn("ID", "id", 8),
+    ExportColumn("Name", "name", 20, lambda v: v or "N/A"),
+    ExportColumn("Phone", "phone", 15, lambda v: v or "N/A"),
+    ExportColumn("Email", "email", 25, lambda v: v or "N/A"),
+    ExportColumn("Language", "language", 10, lambda v: _value(v) or "N/A"),
+    ExportColumn("Status", "status", 15, lambda v: _value(v) or "new"),
+    ExportColumn("Property Type", "property_type", 15, lambda v: _value(v) or "N/A"),
+    ExportColumn("Transaction Type", "transaction_type", 15, lambda v: _value(v) or "N/A"),
+    ExportColumn("Budget Min", "budget_min", 12, lambda v: v or 0),
+    ExportColumn("Budget Max", "budget_max", 12, lambda v: v or 0),
+    ExportColumn("Purpose", "purpose", 15, lambda v: _value(v) or "N/A"),
+    ExportColumn("Conversation State", "conversation_state", 20, lambda v: _value(v) or "start"),
+    ExportColumn("Created At", "created_at", 18, _timestamp),
+    ExportColumn("Last Interaction", "last_interaction", 18, lambda v: _timestamp(v) or "N/A"),
+]
+
+
+async def iter_lead_batches(
+    tenant_id: int,
+    columns: Sequence[ExportColumn],
+    filters: Iterable = (),
+    batch_size: int = LEAD_EXPORT_BATCH_SIZE,
+) -> AsyncIterator[List[List[Any]]]:
+    """Rendered rows (newest first) in batches, fetched through a server-side cursor."""
+    fields = list(dict.fromkeys(column.field for column in columns))
+    query = (
+        select(*[getattr(Lead, name) for name in fields])
+        .where(Lead.tenant_id == tenant_id, *filters)
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    positions = [fields.index(column.field) for column in columns]
+
+    async with async_session() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield [
+                [column.render(row[pos]) for column, pos in zip(columns, positions)]
+                for row in partition
+            ]
+
+
+async def stream_csv(batches: AsyncIterator[List[List[Any]]], columns: Sequence[ExportColumn]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens UTF-8 (Persian/Arabic names) correctly
+    buffer.write("\ufeff")
+    writer.writerow([column.header for column in columns])
+    async for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def stream_ndjson(batches: AsyncIterator[List[List[Any]]], columns: Sequence[ExportColumn]) -> AsyncIterator[bytes]:
+    headers = [column.header for column in columns]
+    async for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def _header_cells(ws, columns: Sequence[ExportColumn]) -> List[WriteOnlyCell]:
+    side = Side(style='thin', color='D4AF37')
+    cells = []
+    for column in columns:
+        cell = WriteOnlyCell(ws, value=column.header)
+        cell.fill = PatternFill(start_color="0f1729", end_color="0f1729", fill_type="solid")
+        cell.font = Font(color="FFFFFF", bold=True, size=11)
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = Border(left=side, right=side, top=side, bottom=side)
+        cells.append(cell)
+    return cells
+
+
+def _append_rows(ws, rows: List[List[Any]]):
+    for row in rows:
+        ws.append(row)
+
+
+async def stream_xlsx(
+    batches: AsyncIterator[List[List[Any]]],
+    columns: Sequence[ExportColumn],
+    sheet_title: str = "Leads",
+) -> AsyncIterator[bytes]:
+    """Write-only workbook spooled to a temp file, then streamed in chunks."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title)
+    for index, column in enumerate(columns, 1):
+        ws.column_dimensions[get_column_letter(index)].width = column.width
+    ws.append(_header_cells(ws, columns))
+
+    with tempfile.TemporaryFile() as output:
+        async for rows in batches:
+            # openpyxl work is CPU-bound - keep it off the event loop
+            await asyncio.to_thread(_append_rows, ws, rows)
+        await asyncio.to_thread(wb.save, output)
+
+        output.seek(0)
+        while True:
+            chunk = await asyncio.to_thread(output.read, EXPORT_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+_WRITERS = {"xlsx": stream_xlsx, "csv": stream_csv, "ndjson": stream_ndjson}
+
+
+def lead_export_response(
+    tenant_id: int,
+    export_format: str,
+    columns: Sequence[ExportColumn],
+    filters: Iterable = (),
+    filename: str = "leads",
+) -> StreamingResponse:
+    """StreamingResponse for a lead export; export_format must be one of EXPORT_FORMATS."""
+    batches = iter_lead_batches(tenant_id, columns, list(filters))
+    logger.info(f"📤 Lead export started: tenant {tenant_id}, format {export_format}")
+    return StreamingResponse(
+        _WRITERS[export_format](batches, columns),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"},
+    )
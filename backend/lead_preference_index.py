@@ -0,0 +1,353 @@
+"""
+Lead Preference Index
+Reverse index from a new listing to the leads whose saved preferences it matches
+
+When a property is uploaded, the follow-up paths (followup_matcher for Lead,
+unified_database.find_matching_leads_for_property for UnifiedLead) need every lead
+whose budget range, property type, bedrooms and locations fit it. Instead of a range
+query plus a capped Python location loop, each tenant's lead preferences are kept as:
+
+    budget_min (sorted)     - interval probe: searchsorted(price) gives every lead with
+    budget_max                budget_min <= price, then one vectorised budget_max check
+    property/transaction    - bitmaps per value, plus a "no preference" bitmap
+    bedrooms_min/max        - int columns (-1 = no preference)
+    preferred locations     - bitmaps per gazetteer area id, plus "no preference"
+
+so matching all leads against a listing is one probe, with no result cap.
+
+The index is loaded per tenant on first use. update_lead / the message-turn flush and
+UnifiedLead.update_score_and_grade patch changed leads in; arrays are rebuilt lazily on
+the next probe, so the per-message preference updates stay O(1). Changes made by other
+workers or outside those paths show up after LEAD_PREFERENCE_INDEX_TTL_SECONDS.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+import numpy as np
+from sqlalchemy import select, or_
+
+from database import async_session, Lead, LeadStatus
+from text_normalizer import normalize_text
+from area_gazetteer import resolve_area
+
+logger = logging.getLogger(__name__)
+
+# Index Configuration
+LEAD_PREFERENCE_INDEX_TTL_SECONDS = int(os.getenv("LEAD_PREFERENCE_INDEX_TTL_SECONDS", "300"))
+
+# Lead fields that affect matching - updates touching none of them skip the index
+LEAD_PREFERENCE_FIELDS = frozenset({
+    "status", "budget_min", "budget_max", "property_type", "bedrooms_min", "bedrooms_max",
+})
+UNIFIED_LEAD_PREFERENCE_FIELDS = frozenset({
+    "status", "budget_min", "budget_max", "property_type", "transaction_type",
+    "preferred_locations", "telegram_user_id", "whatsapp_number",
+})
+
+# (budget_min, budget_max, property_type, transaction_type, bedrooms_min, bedrooms_max, locations)
+PreferenceRow = Tuple[
+    Optional[float], Optional[float], Optional[str], Optional[str],
+    Optional[int], Optional[int], Optional[frozenset]
+]
+
+
+def _value(value) -> Optional[str]:
+    """Enum or string -> lowercase value string (Lead and UnifiedLead use different enums)."""
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        value = value.value
+    return str(value).lower()
+
+
+def _float(value) -> float:
+    return float(value) if value is not None else np.nan
+
+
+def _location_key(location: str):
+    """Gazetteer area id, or the normalised text for places outside the gazetteer."""
+    return resolve_area(location) or normalize_text(location)
+
+
+def _locations(values: Optional[Iterable]) -> Optional[frozenset]:
+    if not values:
+        return None
+    locations = frozenset(_location_key(str(v)) for v in values if v)
+    return locations or None
+
+
+class TenantLeadPreferences:
+    """One tenant's indexed lead preferences. Arrays are rebuilt lazily after changes."""
+
+    def __init__(self, tenant_id: int, rows: Dict[int, PreferenceRow]):
+        self.tenant_id = tenant_id
+        self.loaded_at = time.monotonic()
+        self.rows = rows
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def upsert(self, lead_id: int, row: PreferenceRow):
+        self.rows[lead_id] = row
+        self._dirty = True
+
+    def remove(self, lead_id: int):
+        if self.rows.pop(lead_id, None) is not None:
+            self._dirty = True
+
+    def _build(self):
+        items = list(self.rows.items())
+        n = len(items)
+        budget_min = np.array([_float(row[0]) for _, row in items], dtype=np.float64)
+        # Interval structure: rows sorted by budget_min (NaN last) so "budget_min <= price" is a prefix
+        order = np.argsort(budget_min, kind="stable")
+        items = [items[i] for i in order]
+
+        self.ids = np.array([lead_id for lead_id, _ in items], dtype=np.int64)
+        self.budget_min = budget_min[order]
+        self.budget_max = np.array([_float(row[1]) for _, row in items], dtype=np.float64)
+        self.bedrooms_min = np.array([row[4] if row[4] is not None else -1 for _, row in items], dtype=np.int32)
+        self.bedrooms_max = np.array([row[5] if row[5] is not None else -1 for _, row in items], dtype=np.int32)
+
+        # Bitmaps: value -> rows with that preference (None key = no preference)
+        self.property_types: Dict[Optional[str], np.ndarray] = {}
+        self.transaction_types: Dict[Optional[str], np.ndarray] = {}
+        self.locations: Dict[Any, np.ndarray] = {}
+        self.no_location = np.zeros(n, dtype=bool)
+        for pos, (_, row) in enumerate(items):
+            self.property_types.setdefault(row[2], np.zeros(n, dtype=bool))[pos] = True
+            self.transaction_types.setdefault(row[3], np.zeros(n, dtype=bool))[pos] = True
+            if row[6]:
+                for location in row[6]:
+                    self.locations.setdefault(location, np.zeros(n, dtype=bool))[pos] = True
+            else:
+                self.no_location[pos] = True
+        self._dirty = False
+
+    def _bitmap(self, bitmaps: Dict, key, size: int) -> np.ndarray:
+        bitmap = bitmaps.get(key)
+        return bitmap[:size] if bitmap is not None else np.zeros(size, dtype=bool)
+
+    def match(
+        self,
+        price: Optional[float] = None,
+        budget_tolerance: float = 1.0,
+        property_type=None,
+        any_property_type: bool = True,
+        transaction_type=None,
+        bedrooms: Optional[int] = None,
+        location: Optional[str] = None
+    ) -> List[int]:
+        """
+        Ids of leads matching a listing. Only the filters that are passed apply:
+        - price: budget_min <= price <= budget_max * budget_tolerance (leads without a budget never match)
+        - property_type: same type, or no saved type when any_property_type
+        - transaction_type: same transaction type
+        - bedrooms: within the lead's bedrooms_min/max where set
+        - location: same area as one of the lead's preferred locations, or no location preference
+        """
+        if self._dirty:
+            self._build()
+
+        size = len(self.ids)
+        if price is not None:
+            size = int(np.searchsorted(self.budget_min, price, side="right"))
+        if size == 0:
+            return []
+
+        mask = np.ones(size, dtype=bool)
+        if price is not None:
+            mask &= self.budget_max[:size] * budget_tolerance >= price
+        if property_type is not None:
+            types = self._bitmap(self.property_types, _value(property_type), size)
+            if any_property_type:
+                types = types | self._bitmap(self.property_types, None, size)
+            mask &= types
+        if transaction_type is not None:
+            mask &= self._bitmap(self.transaction_types, _value(transaction_type), size)
+        if bedrooms:
+            low = self.bedrooms_min[:size]
+            high = self.bedrooms_max[:size]
+            mask &= ((low < 0) | (low <= bedrooms)) & ((high < 0) | (high >= bedrooms))
+        if location:
+            mask &= self._bitmap(self.locations, _location_key(location), size) | self.no_location[:size]
+
+        return self.ids[:size][mask].tolist()
+
+
+class LeadPreferenceIndex(ABC):
+    """Per-worker registry of TenantLeadPreferences for one lead model."""
+
+    fields: frozenset = frozenset()
+
+    def __init__(self, ttl_seconds: int = LEAD_PREFERENCE_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._tenants: Dict[int, TenantLeadPreferences] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self.loads = 0
+        self.updates = 0
+        self.probes = 0
+        self.probe_time_total = 0.0
+
+    # ---------- per-model hooks ----------
+
+    @abstractmethod
+    async def _load_rows(self, tenant_id: int) -> Dict[int, PreferenceRow]:
+        """Preference rows of every indexable lead of the tenant, by lead id."""
+        pass
+
+    @abstractmethod
+    def _row(self, lead) -> Optional[PreferenceRow]:
+        """Preference row for a lead, or None if the lead shouldn't be indexed."""
+        pass
+
+    # ---------- index ----------
+
+    async def get(self, tenant_id: int) -> TenantLeadPreferences:
+        index = self._tenants.get(tenant_id)
+        if index is not None and time.monotonic() - index.loaded_at < self.ttl_seconds:
+            return index
+
+        lock = self._locks.setdefault(tenant_id, asyncio.Lock())
+        async with lock:
+            # Another task may have loaded it while we waited
+            index = self._tenants.get(tenant_id)
+            if index is not None and time.monotonic() - index.loaded_at < self.ttl_seconds:
+                return index
+            rows = await self._load_rows(tenant_id)
+            index = TenantLeadPreferences(tenant_id, rows)
+            self._tenants[tenant_id] = index
+            self.loads += 1
+            logger.info(f"🗂️ {type(self).__name__} loaded for tenant {tenant_id}: {len(rows)} leads")
+            return index
+
+    async def match(self, tenant_id: int, **listing) -> List[int]:
+        """Ids of the tenant's leads matching a listing. See TenantLeadPreferences.match."""
+        index = await self.get(tenant_id)
+        start = time.perf_counter()
+        lead_ids = index.match(**listing)
+        self.probe_time_total += time.perf_counter() - start
+        self.probes += 1
+        return lead_ids
+
+    def lead_changed(self, lead, changed_fields: Optional[Iterable[str]] = None):
+        """
+        Patch one lead into its tenant's index (if loaded).
+        Pass changed_fields to skip updates that don't touch preferences.
+        """
+        if changed_fields is not None and self.fields.isdisjoint(changed_fields):
+            return
+        tenant_id = getattr(lead, "tenant_id", None)
+        index = self._tenants.get(tenant_id)
+        if index is None:
+            return
+        if getattr(lead, "id", None) is None:
+            # Not flushed yet - reload on next probe
+            self._tenants.pop(tenant_id, None)
+            return
+
+        row = self._row(lead)
+        if row is None:
+            index.remove(lead.id)
+        else:
+            index.upsert(lead.id, row)
+        self.updates += 1
+
+    def invalidate(self, tenant_id: int):
+        self._tenants.pop(tenant_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indexed_tenants": len(self._tenants),
+            "indexed_leads": sum(len(i) for i in self._tenants.values()),
+            "loads": self.loads,
+            "updates": self.updates,
+            "probes": self.probes,
+            "avg_probe_us": round(self.probe_time_total / self.probes * 1_000_000, 1) if self.probes else 0.0,
+        }
+
+
+class QualifiedLeadIndex(LeadPreferenceIndex):
+    """Qualified `Lead`s with a saved budget range (followup_matcher)."""
+
+    fields = LEAD_PREFERENCE_FIELDS
+
+    async def _load_rows(self, tenant_id: int) -> Dict[int, PreferenceRow]:
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    Lead.id, Lead.budget_min, Lead.budget_max, Lead.property_type,
+                    Lead.bedrooms_min, Lead.bedrooms_max
+                ).where(
+                    Lead.tenant_id == tenant_id,
+                    Lead.status == LeadStatus.QUALIFIED,
+                    Lead.budget_min.isnot(None),
+                    Lead.budget_max.isnot(None)
+                )
+            )
+            return {
+                lead_id: (budget_min, budget_max, _value(property_type), None, bedrooms_min, bedrooms_max, None)
+                for lead_id, budget_min, budget_max, property_type, bedrooms_min, bedrooms_max in result.all()
+            }
+
+    def _row(self, lead) -> Optional[PreferenceRow]:
+        if _value(lead.status) != LeadStatus.QUALIFIED.value:
+            return None
+        if lead.budget_min is None or lead.budget_max is None:
+            return None
+        return (
+            lead.budget_min, lead.budget_max, _value(lead.property_type), None,
+            lead.bedrooms_min, lead.bedrooms_max, None
+        )
+
+
+class UnifiedLeadIndex(LeadPreferenceIndex):
+    """Open, contactable `UnifiedLead`s (unified_database.find_matching_leads_for_property)."""
+
+    fields = UNIFIED_LEAD_PREFERENCE_FIELDS
+    closed_statuses = ("won", "lost")
+
+    async def _load_rows(self, tenant_id: int) -> Dict[int, PreferenceRow]:
+        from unified_database import UnifiedLead, LeadStatus as UnifiedLeadStatus
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    UnifiedLead.id, UnifiedLead.budget_min, UnifiedLead.budget_max,
+                    UnifiedLead.property_type, UnifiedLead.transaction_type, UnifiedLead.preferred_locations
+                ).where(
+                    UnifiedLead.tenant_id == tenant_id,
+                    UnifiedLead.status.not_in([UnifiedLeadStatus.WON, UnifiedLeadStatus.LOST]),
+                    # Skip leads we can't contact
+                    or_(UnifiedLead.telegram_user_id.isnot(None), UnifiedLead.whatsapp_number.isnot(None))
+                )
+            )
+            return {
+                lead_id: (
+                    budget_min, budget_max, _value(property_type), _value(transaction_type),
+                    None, None, _locations(locations)
+                )
+                for lead_id, budget_min, budget_max, property_type, transaction_type, locations in result.all()
+            }
+
+    def _row(self, lead) -> Optional[PreferenceRow]:
+        if _value(lead.status) in self.closed_statuses:
+            return None
+        if not lead.telegram_user_id and not lead.whatsapp_number:
+            return None
+        return (
+            lead.budget_min, lead.budget_max, _value(lead.property_type), _value(lead.transaction_type),
+            None, None, _locations(lead.preferred_locations)
+        )
+
+
+# Global instances
+qualified_lead_index = QualifiedLeadIndex()
+unified_lead_index = UnifiedLeadIndex()
@@ -0,0 +1,373 @@
+"""
+Lead Rollups
+Incrementally maintained lead counts per (tenant, day, status, purpose, source, channel)
+
+Analytics used to recount raw lead rows on every request, so dashboard latency grew with
+lead volume. lead_daily_rollups holds the same counts pre-aggregated, and readers sum a
+handful of rollup rows instead.
+
+A lead is counted in the bucket of its creation day with its *current* dimensions: when
+its status (or purpose, phone, ...) changes, its old bucket is decremented and the new
+one incremented, in the same transaction as the lead write. Write paths:
+
+- ORM flushes (API endpoints, unified leads, follow-up engine): after_flush listener below
+- database.get_or_create_lead / update_lead / MessageTurn.flush (bulk statements that
+  bypass the ORM): call record_insert / record_change explicitly
+
+rebuild() recomputes the rollups from the lead tables (backfill, or repair after manual
+SQL edits). Run it via: python backend/migrate_lead_rollups.py [tenant_id]
+"""
+
+import logging
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, delete, func, case, event, inspect, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import engine, Lead, LeadDailyRollup
+from unified_database import UnifiedLead
+
+logger = logging.getLogger(__name__)
+
+LEAD_TABLE = "leads"
+UNIFIED_LEAD_TABLE = "unified_leads"
+
+DIMENSIONS = ("tenant_id", "day", "lead_table", "status", "purpose", "source", "channel")
+MEASURES = ("lead_count", "with_phone", "qualified")
+
+# Rows per upsert statement (rebuilds write many buckets; keeps bind params under driver limits)
+ROLLUP_INSERT_BATCH = 1000
+
+# Lead columns that decide a lead's bucket or measures - other updates skip the rollup
+LEAD_ROLLUP_FIELDS = frozenset({
+    "tenant_id", "created_at", "status", "purpose", "source",
+    "telegram_chat_id", "whatsapp_phone", "phone", "budget_min", "property_type",
+})
+UNIFIED_ROLLUP_FIELDS = frozenset({
+    "tenant_id", "created_at", "status", "purpose", "source",
+    "telegram_user_id", "whatsapp_number", "linkedin_url", "email", "phone", "budget_min", "property_type",
+})
+
+# (dimension values, measure values) of one lead
+Entry = Tuple[Tuple[Any, ...], Tuple[int, int, int]]
+
+
+def _dimension(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return str(value.value)
+    return str(value)
+
+
+def _enum_dimension(value: Any) -> str:
+    """Status/purpose may arrive as enum members or as stored strings."""
+    return _dimension(value).lower()
+
+
+def _day(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        return date.fromisoformat(value[:10])
+    return None
+
+
+def _lead_entry(get: Callable[[str], Any]) -> Optional[Entry]:
+    day = _day(get("created_at"))
+    if get("tenant_id") is None or day is None:
+        return None
+    if get("telegram_chat_id") is not None:
+        channel = "telegram"
+    elif get("whatsapp_phone") is not None:
+        channel = "whatsapp"
+    else:
+        channel = ""
+    key = (
+        get("tenant_id"), day, LEAD_TABLE,
+        _enum_dimension(get("status")), _enum_dimension(get("purpose")),
+        _dimension(get("source")), channel,
+    )
+    qualified = get("budget_min") is not None and get("property_type") is not None
+    return key, (1, int(get("phone") is not None), int(qualified))
+
+
+def _unified_entry(get: Callable[[str], Any]) -> Optional[Entry]:
+    day = _day(get("created_at"))
+    if get("tenant_id") is None or day is None:
+        return None
+    channel = ""
+    for column, name in _UNIFIED_CHANNELS:
+        if get(column) is not None:
+            channel = name
+            break
+    key = (
+        get("tenant_id"), day, UNIFIED_LEAD_TABLE,
+        _enum_dimension(get("status")), _enum_dimension(get("purpose")),
+        _dimension(get("source")), channel,
+    )
+    qualified = get("budget_min") is not None and get("property_type") is not None
+    return key, (1, int(get("phone") is not None), int(qualified))
+
+
+# Primary contact channel of a unified lead, in order of preference
+_UNIFIED_CHANNELS = (
+    ("telegram_user_id", "telegram"),
+    ("whatsapp_number", "whatsapp"),
+    ("linkedin_url", "linkedin"),
+    ("phone", "phone"),
+    ("email", "email"),
+)
+
+_ENTRY_FUNCTIONS = {Lead: (_lead_entry, LEAD_ROLLUP_FIELDS), UnifiedLead: (_unified_entry, UNIFIED_ROLLUP_FIELDS)}
+
+
+def lead_entry(lead) -> Optional[Entry]:
+    """Rollup bucket and measures of a Lead / UnifiedLead object (or row mapping)."""
+    if isinstance(lead, UnifiedLead):
+        return _unified_entry(lambda name: getattr(lead, name, None))
+    if isinstance(lead, dict):
+        return _lead_entry(lead.get)
+    return _lead_entry(lambda name: getattr(lead, name, None))
+
+
+class RollupDelta:
+    """Bucket increments collected from lead writes, applied as one upsert."""
+
+    def __init__(self):
+        self.buckets: Dict[Tuple[Any, ...], List[int]] = {}
+
+    def add(self, entry: Optional[Entry], sign: int = 1):
+        if entry is None:
+            return
+        key, measures = entry
+        bucket = self.buckets.setdefault(key, [0] * len(MEASURES))
+        for i, value in enumerate(measures):
+            bucket[i] += sign * value
+
+    def change(self, before: Optional[Entry], after: Optional[Entry]):
+        if before != after:
+            self.add(before, -1)
+            self.add(after, 1)
+
+    def statements(self, dialect_name: str) -> Iterable:
+        """INSERT ... ON CONFLICT DO UPDATE adding the increments, in key order and batches."""
+        rows = [
+            {**dict(zip(DIMENSIONS, key)), **dict(zip(MEASURES, self.buckets[key]))}
+            for key in sorted(self.buckets)  # Same lock order for concurrent writers
+            if any(self.buckets[key])
+        ]
+        insert = sqlite_insert if dialect_name == "sqlite" else pg_insert
+        table = LeadDailyRollup.__table__
+        for start in range(0, len(rows), ROLLUP_INSERT_BATCH):
+            stmt = insert(table).values(rows[start:start + ROLLUP_INSERT_BATCH])
+            yield stmt.on_conflict_do_update(
+                index_elements=list(DIMENSIONS),
+                set_={m: table.c[m] + stmt.excluded[m] for m in MEASURES},
+            )
+
+
+class LeadRollups:
+    """Maintains and reads lead_daily_rollups."""
+
+    def __init__(self):
+        self.deltas_applied = 0
+        self.rebuilds = 0
+        self.last_rebuild_at: Optional[datetime] = None
+
+    # ----- Incremental maintenance -----
+
+    async def apply(self, session, delta: RollupDelta):
+        """Apply a delta inside the caller's (async) transaction."""
+        for stmt in delta.statements(session.get_bind().dialect.name):
+            await session.execute(stmt)
+            self.deltas_applied += 1
+
+    async def record_insert(self, session, lead):
+        delta = RollupDelta()
+        delta.add(lead_entry(lead))
+        await self.apply(session, delta)
+
+    async def record_change(self, session, before: Optional[Entry], lead):
+        delta = RollupDelta()
+        delta.change(before, lead_entry(lead))
+        await self.apply(session, delta)
+
+    async def load_entry(self, session, lead_id: int) -> Optional[Entry]:
+        """Current bucket of a bot lead, read (and row-locked) before a bulk UPDATE."""
+        columns = [getattr(Lead, name) for name in LEAD_ROLLUP_FIELDS]
+        result = await session.execute(
+            select(*columns).where(Lead.id == lead_id).with_for_update()
+        )
+        row = result.mappings().one_or_none()
+        return _lead_entry(row.get) if row is not None else None
+
+    def _after_flush(self, session: Session, flush_context):
+        """Move ORM-written leads between buckets, in the flush's transaction."""
+        delta = RollupDelta()
+        for obj in session.new:
+            functions = _ENTRY_FUNCTIONS.get(type(obj))
+            if functions:
+                delta.add(functions[0](lambda name: getattr(obj, name, None)))
+        for obj in session.dirty:
+            functions = _ENTRY_FUNCTIONS.get(type(obj))
+            if not functions:
+                continue
+            entry_fn, fields = functions
+            state = inspect(obj)
+            changed = [name for name in fields if state.attrs[name].history.has_changes()]
+            if changed:
+                delta.change(entry_fn(_previous_values(state)), entry_fn(lambda name: getattr(obj, name, None)))
+        for obj in session.deleted:
+            functions = _ENTRY_FUNCTIONS.get(type(obj))
+            if functions:
+                delta.add(functions[0](_previous_values(inspect(obj))), -1)
+
+        if delta.buckets:
+            connection = session.connection()
+            for stmt in delta.statements(connection.dialect.name):
+                connection.execute(stmt)
+                self.deltas_applied += 1
+
+    # ----- Rebuild -----
+
+    async def rebuild(self, tenant_id: Optional[int] = None) -> int:
+        """Recompute the rollups from the lead tables (all tenants or one). Returns rows written."""
+        rows: List[Dict[str, Any]] = []
+        async with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Concurrent lead writes wait for the rebuild instead of racing it
+                await conn.execute(text("LOCK TABLE lead_daily_rollups IN EXCLUSIVE MODE"))
+
+            stmt = delete(LeadDailyRollup)
+            if tenant_id is not None:
+                stmt = stmt.where(LeadDailyRollup.tenant_id == tenant_id)
+            await conn.execute(stmt)
+
+            for query, lead_table in ((_lead_rebuild_query(), LEAD_TABLE), (_unified_rebuild_query(), UNIFIED_LEAD_TABLE)):
+                if tenant_id is not None:
+                    query = query.where(query.selected_columns.tenant_id == tenant_id)
+                result = await conn.execute(query)
+                for row in result.mappings():
+                    rows.append({
+                        "tenant_id": row["tenant_id"],
+                        "day": _day(row["day"]),
+                        "lead_table": lead_table,
+                        "status": _enum_dimension(row["status"]),
+                        "purpose": _enum_dimension(row["purpose"]),
+                        "source": _dimension(row["source"]),
+                        "channel": row["channel"],
+                        "lead_count": row["lead_count"],
+                        "with_phone": row["with_phone"] or 0,
+                        "qualified": row["qualified"] or 0,
+                    })
+
+            # Status strings of different enum spellings can land in one bucket - merge before insert
+            delta = RollupDelta()
+            for row in rows:
+                delta.add((tuple(row[d] for d in DIMENSIONS), tuple(row[m] for m in MEASURES)))
+            for stmt in delta.statements(conn.dialect.name):
+                await conn.execute(stmt)
+
+        self.rebuilds += 1
+        self.last_rebuild_at = datetime.utcnow()
+        logger.info(f"📊 Lead rollups rebuilt ({'tenant ' + str(tenant_id) if tenant_id else 'all tenants'}): {len(delta.buckets)} rows")
+        return len(delta.buckets)
+
+    # ----- Reads -----
+
+    async def totals(
+        self,
+        session,
+        tenant_id: int,
+        lead_table: str = LEAD_TABLE,
+        group_by: Sequence[str] = (),
+        since: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Summed measures for a tenant, grouped by the given dimensions."""
+        group_columns = [getattr(LeadDailyRollup, name) for name in group_by]
+        query = (
+            select(*group_columns, *[func.sum(getattr(LeadDailyRollup, m)).label(m) for m in MEASURES])
+            .where(LeadDailyRollup.tenant_id == tenant_id, LeadDailyRollup.lead_table == lead_table)
+        )
+        if since is not None:
+            query = query.where(LeadDailyRollup.day >= since)
+        if group_columns:
+            query = query.group_by(*group_columns)
+        result = await session.execute(query)
+        return [
+            {**{name: row[name] for name in group_by}, **{m: int(row[m] or 0) for m in MEASURES}}
+            for row in result.mappings()
+            if row["lead_count"]
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "deltas_applied": self.deltas_applied,
+            "rebuilds": self.rebuilds,
+            "last_rebuild_at": self.last_rebuild_at.isoformat() if self.last_rebuild_at else None,
+        }
+
+
+def _previous_values(state) -> Callable[[str], Any]:
+    """Attribute getter returning the values an object had before this flush."""
+    def get(name: str) -> Any:
+        history = state.attrs[name].history
+        if history.deleted:
+            return history.deleted[0]
+        if history.unchanged:
+            return history.unchanged[0]
+        return state.attrs[name].value
+    return get
+
+
+def _phone_and_qualified(model) -> Iterable:
+    return (
+        func.sum(case((model.phone.isnot(None), 1), else_=0)).label("with_phone"),
+        func.sum(case((model.budget_min.isnot(None) & model.property_type.isnot(None), 1), else_=0)).label("qualified"),
+    )
+
+
+def _lead_rebuild_query():
+    day = func.date(Lead.created_at)
+    channel = case(
+        (Lead.telegram_chat_id.isnot(None), "telegram"),
+        (Lead.whatsapp_phone.isnot(None), "whatsapp"),
+        else_="",
+    )
+    return (
+        select(
+            Lead.tenant_id, day.label("day"), Lead.status, Lead.purpose, Lead.source,
+            channel.label("channel"), func.count().label("lead_count"), *_phone_and_qualified(Lead),
+        )
+        .where(Lead.created_at.isnot(None))
+        .group_by(Lead.tenant_id, day, Lead.status, Lead.purpose, Lead.source, channel)
+    )
+
+
+def _unified_rebuild_query():
+    day = func.date(UnifiedLead.created_at)
+    channel = case(
+        *[(getattr(UnifiedLead, column).isnot(None), name) for column, name in _UNIFIED_CHANNELS],
+        else_="",
+    )
+    return (
+        select(
+            UnifiedLead.tenant_id, day.label("day"), UnifiedLead.status, UnifiedLead.purpose, UnifiedLead.source,
+            channel.label("channel"), func.count().label("lead_count"), *_phone_and_qualified(UnifiedLead),
+        )
+        .where(UnifiedLead.created_at.isnot(None))
+        .group_by(UnifiedLead.tenant_id, day, UnifiedLead.status, UnifiedLead.purpose, UnifiedLead.source, channel)
+    )
+
+
+# Global instance
+lead_rollups = LeadRollups()
+
+event.listen(Session, "after_flush", lead_rollups._after_flush)
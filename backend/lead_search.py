@@ -0,0 +1,162 @@
+"""
+Lead Search
+Ranked lead lookup by name, username, notes, voice transcript or phone fragment
+
+Queries are answered from the Postgres search columns created by LEAD_SEARCH_DDL
+(database.py), all tenant-scoped GIN / btree indexes:
+
+- digits only ("+971 50 12", "۰۵۰ ۱۲") -> phone prefix on phone_digits; a local number
+  ("050 12") is also tried with LEAD_SEARCH_COUNTRY_CODE instead of the trunk 0
+- anything else -> every word as a prefix in the 'simple' tsvector of search_text
+  ("ali ahm" finds "Ali Ahmadi") OR the whole query as a substring (pg_trgm), so
+  mid-word fragments and Persian/Arabic spelling variants still hit
+
+Hits are ranked by ts_rank_cd + trigram word similarity, then lead_score. On other
+databases (SQLite in development) a plain LIKE scan over the same columns is used.
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func, or_, false, literal, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Lead, LEAD_SEARCH_COLUMNS
+from text_normalizer import normalize_text, normalize_digits, tokenize_text
+
+logger = logging.getLogger(__name__)
+
+# Shortest query searched; substring (trigram) matching needs 3 characters to use its index
+MIN_QUERY_LENGTH = 2
+MIN_FRAGMENT_LENGTH = 3
+MIN_PHONE_DIGITS = 3
+
+# Country code assumed for phone fragments typed in local format (leading 0)
+LEAD_SEARCH_COUNTRY_CODE = os.getenv("LEAD_SEARCH_COUNTRY_CODE", "971")
+
+# Columns returned with each hit
+LEAD_SEARCH_FIELDS = (
+    "id", "name", "phone", "whatsapp_phone", "telegram_username", "language",
+    "status", "lead_score", "temperature", "source", "last_interaction", "created_at",
+)
+
+_PHONE_QUERY = re.compile(r"^\+?[\d\s\-().]+$")
+_SIMPLE = literal_column("'simple'::regconfig")
+_SEARCH_TEXT = literal_column("leads.search_text")
+_PHONE_DIGITS = literal_column("leads.phone_digits")
+
+
+@dataclass
+class SearchQuery:
+    """A user query parsed into what the SQL needs."""
+    text: str                       # normalize()d query
+    phone_prefix: Optional[str]     # bare digits when the query is a phone fragment
+    phone_local: Optional[str]      # the same in international form, for "05..." fragments
+    tsquery: Optional[str]          # 'ali:* & ahm:*'
+
+    @classmethod
+    def parse(cls, raw: str) -> "SearchQuery":
+        raw = normalize_digits(raw or "").strip()
+        if _PHONE_QUERY.match(raw):
+            digits = re.sub(r"\D", "", raw)
+            if digits.startswith("00"):
+                digits = digits[2:]
+            if len(digits) >= MIN_PHONE_DIGITS:
+                local = None
+                if digits.startswith("0") and LEAD_SEARCH_COUNTRY_CODE:
+                    local = LEAD_SEARCH_COUNTRY_CODE + digits[1:]
+                return cls(text=digits, phone_prefix=digits, phone_local=local, tsquery=None)
+        # Postgres' parser also splits words on "_" ("user_42" -> user, 42)
+        words = [part for token in tokenize_text(raw) for part in token.split("_") if part]
+        return cls(
+            text=normalize_text(raw),
+            phone_prefix=None,
+            phone_local=None,
+            tsquery=" & ".join(f"{word}:*" for word in words) or None,
+        )
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _postgres_query(query: SearchQuery):
+    """Conditions and rank for the indexed Postgres search."""
+    if query.phone_prefix:
+        prefixes = [p for p in (query.phone_prefix, query.phone_local) if p]
+        condition = or_(*[_PHONE_DIGITS.like(_like_escape(p) + "%", escape="\\") for p in prefixes])
+        return condition, literal(1.0), "phone"
+
+    conditions = []
+    rank = literal(0.0)
+    if query.tsquery:
+        tsquery = func.to_tsquery(_SIMPLE, query.tsquery)
+        vector = func.to_tsvector(_SIMPLE, _SEARCH_TEXT)
+        conditions.append(vector.op("@@")(tsquery))
+        rank = rank + func.ts_rank_cd(vector, tsquery)
+    if len(query.text) >= MIN_FRAGMENT_LENGTH:
+        conditions.append(_SEARCH_TEXT.like(f"%{_like_escape(query.text)}%", escape="\\"))
+        rank = rank + func.word_similarity(query.text, _SEARCH_TEXT)
+    return or_(false(), *conditions), rank, "text"
+
+
+def _fallback_query(query: SearchQuery):
+    """Unindexed LIKE scan for databases without the search columns."""
+    if query.phone_prefix:
+        patterns = [f"%{_like_escape(p)}%" for p in (query.phone_prefix, query.phone_local) if p]
+        condition = or_(*[
+            column.like(pattern, escape="\\")
+            for pattern in patterns
+            for column in (Lead.phone, Lead.whatsapp_phone)
+        ])
+        return condition, literal(1.0), "phone"
+    pattern = f"%{_like_escape(query.text)}%"
+    condition = or_(*[
+        func.lower(getattr(Lead, column)).like(pattern, escape="\\")
+        for column in LEAD_SEARCH_COLUMNS
+    ])
+    return condition, literal(1.0), "text"
+
+
+async def search_leads(
+    session: AsyncSession,
+    tenant_id: int,
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """
+    Ranked search of one tenant's leads.
+    Returns {"hits": [...], "matched_on": "phone"|"text", "next_offset": int|None}.
+    """
+    query = SearchQuery.parse(q)
+    if len(query.text) < MIN_QUERY_LENGTH:
+        return {"hits": [], "matched_on": None, "next_offset": None}
+
+    if session.bind.dialect.name == "postgresql":
+        condition, rank, matched_on = _postgres_query(query)
+    else:
+        condition, rank, matched_on = _fallback_query(query)
+
+    rank = rank.label("rank")
+    stmt = (
+        select(*[getattr(Lead, field) for field in LEAD_SEARCH_FIELDS], rank)
+        .where(Lead.tenant_id == tenant_id, condition)
+        .order_by(rank.desc(), Lead.lead_score.desc(), Lead.id.desc())
+        .offset(offset)
+        .limit(limit + 1)  # one extra row tells whether there is a next page
+    )
+    rows = (await session.execute(stmt)).mappings().all()
+
+    hits: List[Dict[str, Any]] = [dict(row) for row in rows[:limit]]
+    for hit in hits:
+        hit["rank"] = round(float(hit["rank"] or 0), 4)
+    logger.debug(f"🔎 Lead search tenant {tenant_id}: {len(hits)} hits on {matched_on}")
+    return {
+        "hits": hits,
+        "matched_on": matched_on,
+        "next_offset": offset + limit if len(rows) > limit else None,
+    }
@@ -0,0 +1,162 @@
+"""
+LLM Response Cache
+Gemini answers to repeated FAQ-type prompts, shared by all workers through Redis
+
+"What is golden visa", "service charges in Marina" and the like were answered with a
+fresh Gemini call each time, although the answer only depends on the tenant's data and
+the question. Cache keys hash:
+
+- the tenant id and its context version (context_cache - bumped on property/project/
+  knowledge writes, so answers never outlive the data they were generated from)
+- the language
+- the normalised user message (text_normalizer.tokenize - case, punctuation, Persian/
+  Arabic letter and digit variants don't matter)
+- the prompt template (the rendered prompt without the user message: prompt changes,
+  agent name and retrieved knowledge all produce new keys)
+
+Lookups go worker memory (LRU, LLM_CACHE_MAX_ENTRIES) -> Redis (LLM_CACHE_TTL_SECONDS).
+Answers longer than LLM_CACHE_MAX_RESPONSE_CHARS are not stored.
+
+Callers opt in per call (GeminiClient.generate_content_async(cache_key=...)). Personalised
+prompts - anything with the lead's name, budget or filtered inventory - pass no key.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from redis_manager import redis_manager
+from text_normalizer import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Cache Configuration
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "21600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))  # per worker
+LLM_CACHE_MAX_RESPONSE_CHARS = int(os.getenv("LLM_CACHE_MAX_RESPONSE_CHARS", "8000"))
+REDIS_KEY = "llm_cache:{key}"
+
+
+def llm_cache_key(tenant_id: Optional[int], context_version: int, language: Any, message: str, template: str) -> str:
+    """Cache key for one prompt; template is the prompt without the user message."""
+    raw = json.dumps([
+        tenant_id,
+        context_version,
+        str(getattr(language, "value", language)),
+        " ".join(tokenize(message)),
+        hashlib.sha256(template.encode("utf-8")).hexdigest(),
+    ], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """Stands in for a Gemini response served from the cache (only the text is kept)."""
+
+    cached = True
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class LLMResponseCache:
+    """Per-worker LRU of LLM answers in front of a shared Redis copy."""
+
+    def __init__(
+        self,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_response_chars: int = LLM_CACHE_MAX_RESPONSE_CHARS,
+        enabled: bool = LLM_CACHE_ENABLED
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_response_chars = max_response_chars
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (text, expires_at)
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.oversize = 0
+        self.evictions = 0
+
+    def _remember(self, key: str, text: str, expires_at: float):
+        self._entries[key] = (text, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        """Cached answer for a key, or None."""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() < entry[1]:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            del self._entries[key]
+
+        client = redis_manager.redis_client
+        if client:
+            try:
+                redis_key = REDIS_KEY.format(key=key)
+                text = await client.get(redis_key)
+                if text is not None:
+                    ttl = await client.ttl(redis_key)
+                    self.redis_hits += 1
+                    self._remember(key, text, time.monotonic() + (ttl if ttl and ttl > 0 else self.ttl_seconds))
+                    return text
+            except Exception as e:
+                logger.warning(f"⚠️ LLM cache Redis read failed: {e}")
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, text: str):
+        """Store an answer (skipped when empty or longer than max_response_chars)."""
+        if not self.enabled or not text:
+            return
+        if len(text) > self.max_response_chars:
+            self.oversize += 1
+            return
+
+        self.stores += 1
+        self._remember(key, text, time.monotonic() + self.ttl_seconds)
+        client = redis_manager.redis_client
+        if client:
+            try:
+                await client.setex(REDIS_KEY.format(key=key), self.ttl_seconds, text)
+            except Exception as e:
+                # This worker still serves it from memory
+                logger.warning(f"⚠️ LLM cache Redis write failed: {e}")
+
+    def clear(self):
+        """Drop this worker's entries (Redis entries expire on their own)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.redis_hits) / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "oversize": self.oversize,
+            "evictions": self.evictions,
+        }
+
+
+# Global instance
+llm_response_cache = LLMResponseCache()
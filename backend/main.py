@@ -4,7 +4,6 @@ FastAPI Application with Scheduling, Excel Export, and Background Tasks
 """
 
 import os
-import io
 import asyncio
 import secrets
 import hashlib
@@ -18,19 +17,16 @@ logger = logging.getLogger(__name__)
 
 from fastapi import FastAPI, HTTPException, Depends, Query, BackgroundTasks, Response, Header, UploadFile, File, Form, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field, EmailStr, field_validator, field_serializer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_, or_, delete
+from sqlalchemy.orm import load_only
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-import openpyxl
 from enum import Enum
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
 import jwt
 
 from database import (
@@ -50,6 +46,14 @@ from rate_limiter import rate_limit, rate_limiter, cleanup_rate_limiter
 from security_headers import add_security_headers
 from password_validator import validate_password_strength
 from input_sanitizer import sanitize_text, sanitize_email, sanitize_phone
+from tenant_cache import tenant_cache
+from entitlements import entitlement_cache
+from context_cache import bump_context_version
+from property_index import property_changed
+from dashboard_stats import dashboard_stats_cache
+from lead_export import lead_export_response, LEAD_EXPORT_COLUMNS, EXPORT_FORMATS
+from keyset_pagination import NEXT_CURSOR_HEADER, keyset_order, keyset_after, next_cursor
+from lead_search import search_leads
 
 # Import API routers
 from api import broadcast, catalogs, lotteries, admin, smart_upload
@@ -327,6 +331,34 @@ class LeadResponse(BaseModel):
         return str(value).lower() if value else None
 
 
+class LeadSearchHit(BaseModel):
+    id: int
+    name: Optional[str]
+    phone: Optional[str]
+    whatsapp_phone: Optional[str]
+    telegram_username: Optional[str]
+    language: Optional[str]
+    status: Optional[LeadStatus]
+    lead_score: Optional[int]
+    temperature: Optional[str]
+    source: Optional[str]
+    last_interaction: Optional[datetime]
+    created_at: Optional[datetime]
+    rank: float
+
+
+class LeadSearchResponse(BaseModel):
+    query: str
+    matched_on: Optional[str]  # "phone" or "text"
+    hits: List[LeadSearchHit]
+    next_offset: Optional[int]
+
+
+# Lead list: columns loaded for LeadResponse and the keyset (sort key + id tie-breaker)
+LEAD_LIST_COLUMNS = [getattr(Lead, field) for field in LeadResponse.model_fields]
+LEAD_LIST_KEYSET = [Lead.lead_score, Lead.created_at, Lead.id]
+
+
 class LeadUpdate(BaseModel):
     """Validated lead update model - only allow specific fields to be updated."""
     name: Optional[str] = Field(None, max_length=255)
@@ -635,6 +667,9 @@ async def lifespan(app: FastAPI):
     asyncio.create_task(cleanup_rate_limiter())
     print("✅ Rate limiter cleanup task started")
     
+    # Listen for tenant cache invalidations from other workers
+    await tenant_cache.start_listener()
+    
     yield
     
     # Shutdown
@@ -647,6 +682,8 @@ async def lifespan(app: FastAPI):
     from followup_engine import stop_followup_engine
     await stop_followup_engine()
     
+    await tenant_cache.stop_listener()
+    
     print("✅ Shutdown complete")
 
 
@@ -702,6 +739,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, admin.TOTAL_COUNT_HEADER, admin.NEXT_OFFSET_HEADER],
 )
 
 # Add security headers middleware
@@ -1165,6 +1203,7 @@ async def create_tenant(
     db.add(tenant)
     await db.commit()
     await db.refresh(tenant)
+    await tenant_cache.invalidate(tenant.id)
     
     return {"id": tenant.id, "message": "Tenant created successfully"}
 
@@ -1203,6 +1242,7 @@ async def update_tenant(
     
     tenant.updated_at = datetime.utcnow()
     await db.commit()
+    await entitlement_cache.invalidate(tenant_id)  # also invalidates the tenant cache
     
     return {"message": "Tenant updated successfully"}
 
@@ -1224,6 +1264,7 @@ async def delete_tenant(
     
     await db.delete(tenant)
     await db.commit()
+    await tenant_cache.invalidate(tenant_id)
     
     return {"message": "Tenant deleted successfully"}
 
@@ -1300,6 +1341,7 @@ async def create_tenant(tenant_data: TenantCreate, db: AsyncSession = Depends(ge
     db.add(tenant)
     await db.commit()
     await db.refresh(tenant)
+    await tenant_cache.invalidate(tenant.id)
     
     # Start bot if token provided
     if tenant.telegram_bot_token:
@@ -1357,6 +1399,7 @@ async def update_tenant(
     tenant.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(tenant)
+    await tenant_cache.invalidate(tenant_id)
     
     # Restart bot if token changed
     new_bot_token = tenant.telegram_bot_token
@@ -1399,102 +1442,89 @@ async def list_tenants(
 @app.get("/api/tenants/{tenant_id}/leads/export")
 async def export_leads_excel(
     tenant_id: int,
+    export_format: str = Query("xlsx", alias="format"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ):
-    """Export all leads to Excel (.xlsx) file. MUST be before /leads/{lead_id} route."""
+    """
+    Export all leads as xlsx (default), csv or ndjson. MUST be before /leads/{lead_id} route.
+    Streamed in batches - memory stays flat regardless of lead count.
+    """
     # Verify access
     await verify_tenant_access(credentials, tenant_id, db)
     
-    # Get all leads for tenant
-    result = await db.execute(
-        select(Lead).where(Lead.tenant_id == tenant_id).order_by(Lead.created_at.desc())
-    )
-    leads = result.scalars().all()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
     
-    # Create workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Leads"
-    
-    # Define headers
-    headers = [
-        "ID", "Name", "Phone", "Telegram Username", "Language", "Status",
-        "Transaction Type", "Property Type", "Budget Min", "Budget Max",
-        "Payment Method", "Purpose", "Bedrooms Min", "Bedrooms Max",
-        "Location", "Notes", "Source", "Created At"
-    ]
-    ws.append(headers)
-    
-    # Add data rows
-    for lead in leads:
-        ws.append([
-            lead.id,
-            lead.name or "",
-            lead.phone or "",
-            lead.telegram_username or "",
-            lead.language.value if lead.language else "",
-            lead.status.value if lead.status else "",
-            lead.transaction_type.value if lead.transaction_type else "",
-            lead.property_type.value if lead.property_type else "",
-            lead.budget_min or "",
-            lead.budget_max or "",
-            lead.payment_method.value if lead.payment_method else "",
-            lead.purpose.value if lead.purpose else "",
-            lead.bedrooms_min or "",
-            lead.bedrooms_max or "",
-            lead.preferred_location or "",
-            lead.notes or "",
-            lead.source or "",
-            lead.created_at.strftime("%Y-%m-%d %H:%M") if lead.created_at else ""
-        ])
-    
-    # Save to BytesIO
-    from io import BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Return as downloadable file
-    from fastapi.responses import StreamingResponse
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=leads_{tenant_id}.xlsx"}
-    )
+    filename = f"leads_export_{tenant_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    return lead_export_response(tenant_id, export_format, LEAD_EXPORT_COLUMNS, filename=filename)
 
 
 @app.get("/api/tenants/{tenant_id}/leads", response_model=List[LeadResponse])
 async def list_leads(
     tenant_id: int,
+    response: Response,
     status: Optional[LeadStatus] = None,
     purpose: Optional[Purpose] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ):
-    """List leads for a tenant with optional filtering. Requires authentication."""
+    """
+    List leads for a tenant with optional filtering. Requires authentication.
+    
+    Keyset paginated: pass the X-Next-Cursor header of a page as ?cursor= to get the
+    next one (no header = last page). skip is only honoured without a cursor.
+    """
     # Verify access
     await verify_tenant_access(credentials, tenant_id, db)
     
-    query = select(Lead).where(Lead.tenant_id == tenant_id)
+    # Only the columns LeadResponse needs - conversation_data, filled_slots etc. stay unloaded
+    query = select(Lead).options(load_only(*LEAD_LIST_COLUMNS)).where(Lead.tenant_id == tenant_id)
     
     if status:
         query = query.where(Lead.status == status)
     if purpose:
         query = query.where(Lead.purpose == purpose)
     
-    # Order by lead_score DESC (NULL values last), then by created_at DESC
-    # Use nullslast() to ensure NULLs appear at the end
-    from sqlalchemy import nullslast
-    query = query.order_by(
-        nullslast(Lead.lead_score.desc()), 
-        Lead.created_at.desc()
-    ).offset(skip).limit(limit)
+    # Order by lead_score DESC, then newest first (index ix_leads_tenant_score_created)
+    if cursor:
+        try:
+            query = query.where(keyset_after(LEAD_LIST_KEYSET, cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif skip:
+        query = query.offset(skip)
+    query = query.order_by(*keyset_order(LEAD_LIST_KEYSET)).limit(limit)
     
     result = await db.execute(query)
-    return result.scalars().all()
+    leads = result.scalars().all()
+    
+    next_page = next_cursor(leads, LEAD_LIST_KEYSET, limit)
+    if next_page:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
+    return leads
+
+
+@app.get("/api/tenants/{tenant_id}/leads/search", response_model=LeadSearchResponse)
+async def search_tenant_leads(
+    tenant_id: int,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Search leads by name, username, notes, voice transcript or phone fragment.
+    Ranked best match first; page with next_offset. Requires authentication.
+    """
+    await verify_tenant_access(credentials, tenant_id, db)
+    
+    result = await search_leads(db, tenant_id, q, limit=limit, offset=offset)
+    return LeadSearchResponse(query=q, **result)
 
 
 @app.get("/api/tenants/{tenant_id}/leads/{lead_id}", response_model=LeadResponse)
@@ -1868,99 +1898,6 @@ async def list_appointments(
     return result.scalars().all()
 
 
-# ==================== EXCEL EXPORT ====================
-
-@app.get("/api/tenants/{tenant_id}/leads/export")
-async def export_leads_excel(
-    tenant_id: int,
-    db: AsyncSession = Depends(get_db)
-):
-    """Export all leads to Excel (.xlsx) file."""
-    # Get all leads for tenant
-    result = await db.execute(
-        select(Lead).where(Lead.tenant_id == tenant_id).order_by(Lead.created_at.desc())
-    )
-    leads = result.scalars().all()
-    
-    # Create workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Leads"
-    
-    # Define headers
-    headers = [
-        "ID", "Name", "Phone", "Telegram Username", "Language", "Status",
-        "Transaction Type", "Property Type", "Budget Min", "Budget Max",
-        "Payment Method", "Purpose", "Residency Need", "Taste Tags",
-        "Voice Transcript", "Source", "Created At", "Last Interaction"
-    ]
-    
-    # Style definitions
-    header_fill = PatternFill(start_color="0f1729", end_color="0f1729", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True, size=11)
-    gold_border = Border(
-        left=Side(style='thin', color='D4AF37'),
-        right=Side(style='thin', color='D4AF37'),
-        top=Side(style='thin', color='D4AF37'),
-        bottom=Side(style='thin', color='D4AF37')
-    )
-    
-    # Write headers
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-        cell.border = gold_border
-    
-    # Write data
-    for row, lead in enumerate(leads, 2):
-        data = [
-            lead.id,
-            lead.name or "",
-            lead.phone or "",
-            lead.telegram_username or "",
-            lead.language.value if lead.language else "",
-            lead.status.value if lead.status else "",
-            lead.transaction_type.value if lead.transaction_type else "",
-            lead.property_type.value if lead.property_type else "",
-            lead.budget_min or "",
-            lead.budget_max or "",
-            lead.payment_method.value if lead.payment_method else "",
-            lead.purpose.value if lead.purpose else "",
-            "Yes" if lead.purpose == Purpose.RESIDENCY else "No",
-            ", ".join(lead.taste_tags) if lead.taste_tags else "",
-            lead.voice_transcript or "",
-            lead.source or "",
-            lead.created_at.strftime("%Y-%m-%d %H:%M") if lead.created_at else "",
-            lead.last_interaction.strftime("%Y-%m-%d %H:%M") if lead.last_interaction else ""
-        ]
-        
-        for col, value in enumerate(data, 1):
-            cell = ws.cell(row=row, column=col, value=value)
-            cell.border = gold_border
-            cell.alignment = Alignment(wrap_text=True)
-    
-    # Adjust column widths
-    column_widths = [8, 20, 15, 20, 10, 15, 15, 15, 12, 12, 15, 15, 15, 30, 40, 12, 18, 18]
-    for col, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
-    
-    # Save to bytes
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Return as download
-    filename = f"leads_export_{tenant_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
-
-
 # ==================== DASHBOARD STATS ====================
 
 @app.get("/api/tenants/{tenant_id}/dashboard/stats", response_model=DashboardStats)
@@ -1973,44 +1910,9 @@ async def get_dashboard_stats(
     # Verify access (authentication check)
     await verify_tenant_access(credentials, tenant_id, db)
     
-    # Get all leads
-    result = await db.execute(
-        select(Lead).where(Lead.tenant_id == tenant_id)
-    )
-    leads = result.scalars().all()
-    
-    # Calculate stats
-    total_leads = len(leads)
-    active_deals = sum(1 for l in leads if l.status in [LeadStatus.NEGOTIATING, LeadStatus.VIEWING_SCHEDULED])
-    qualified_leads = sum(1 for l in leads if l.status == LeadStatus.QUALIFIED)
-    scheduled_viewings = sum(1 for l in leads if l.status == LeadStatus.VIEWING_SCHEDULED)
-    closed_won = sum(1 for l in leads if l.status == LeadStatus.CLOSED_WON)
-    
-    conversion_rate = (closed_won / total_leads * 100) if total_leads > 0 else 0
-    
-    # Status breakdown
-    leads_by_status = {}
-    for status in LeadStatus:
-        count = sum(1 for l in leads if l.status == status)
-        if count > 0:
-            leads_by_status[status.value] = count
-    
-    # Purpose breakdown
-    leads_by_purpose = {}
-    for purpose in Purpose:
-        count = sum(1 for l in leads if l.purpose == purpose)
-        if count > 0:
-            leads_by_purpose[purpose.value] = count
-    
-    return DashboardStats(
-        total_leads=total_leads,
-        active_deals=active_deals,
-        qualified_leads=qualified_leads,
-        scheduled_viewings=scheduled_viewings,
-        conversion_rate=round(conversion_rate, 1),
-        leads_by_status=leads_by_status,
-        leads_by_purpose=leads_by_purpose
-    )
+    # One grouped COUNT query (cached briefly per tenant)
+    stats = await dashboard_stats_cache.get(db, tenant_id)
+    return DashboardStats(**stats)
 
 
 # ==================== ROI PDF ENDPOINT ====================
@@ -2153,72 +2055,68 @@ async def waha_webhook(
             
             # Parse webhook using Waha provider
             from whatsapp_providers import WahaWhatsAppProvider
-            from database import Tenant
             from vertical_router import VerticalMode
             
-            # Get tenant from router header or fallback to default
-            async with AsyncSessionLocal() as db:
-                if x_tenant_id:
-                    logger.info(f"🔀 Routed message for Tenant {x_tenant_id}")
-                    result = await db.execute(select(Tenant).where(Tenant.id == x_tenant_id))
-                else:
-                    logger.warning("⚠️ No X-Tenant-ID header - using default tenant")
-                    result = await db.execute(select(Tenant).where(Tenant.id == 1))
-                
-                tenant = result.scalar_one_or_none()
-                
-                if not tenant:
-                    logger.error(f"❌ Tenant {x_tenant_id} not found")
-                    return
-                
-                provider = WahaWhatsAppProvider(tenant)
-                message_data = provider.parse_webhook(payload)
-                
-                if not message_data:
-                    logger.info("Waha webhook ignored (not a user message)")
-                    return
-                
-                # If router provided vertical mode, set it in Redis session for this user
-                if x_vertical_mode:
-                    from redis_manager import RedisManager
-                    redis_mgr = RedisManager()
-                    await redis_mgr.connect()
-                    if redis_mgr.redis_client:
-                        user_phone = message_data["from_phone"]
-                        mode_key = f"user:{user_phone}:mode"
-                        await redis_mgr.redis_client.set(mode_key, x_vertical_mode, ex=86400)  # 24h TTL
-                        logger.info(f"✅ Vertical mode '{x_vertical_mode}' set for {user_phone} from router")
-                
-                # Route to WhatsApp bot manager
-                # Convert to Meta-like format for compatibility
-                meta_format = {
-                    "entry": [{
-                        "changes": [{
-                            "value": {
-                                "messages": [{
-                                    "from": message_data["from_phone"],
-                    "type": message_data["message_type"],
-                                    "text": {"body": message_data.get("text", "")}
-                                }],
-                                "contacts": [{
-                                    "profile": {"name": message_data.get("profile_name", "User")}
-                                }],
-                                "metadata": {
-                                    "phone_number_id": tenant.whatsapp_phone_number_id or "default",
-                                    "display_phone_number": tenant.whatsapp_phone_number or "unknown"
-                                }
+            # Get tenant from router header or fallback to default (cached - no DB hit in the common case)
+            if x_tenant_id:
+                logger.info(f"🔀 Routed message for Tenant {x_tenant_id}")
+                tenant = await tenant_cache.get_by_id(x_tenant_id)
+            else:
+                logger.warning("⚠️ No X-Tenant-ID header - using default tenant")
+                tenant = await tenant_cache.get_by_id(1)
+            
+            if not tenant:
+                logger.error(f"❌ Tenant {x_tenant_id} not found")
+                return
+            
+            provider = WahaWhatsAppProvider(tenant)
+            message_data = provider.parse_webhook(payload)
+            
+            if not message_data:
+                logger.info("Waha webhook ignored (not a user message)")
+                return
+            
+            # If router provided vertical mode, set it in Redis session for this user
+            if x_vertical_mode:
+                from redis_manager import RedisManager
+                redis_mgr = RedisManager()
+                await redis_mgr.connect()
+                if redis_mgr.redis_client:
+                    user_phone = message_data["from_phone"]
+                    mode_key = f"user:{user_phone}:mode"
+                    await redis_mgr.redis_client.set(mode_key, x_vertical_mode, ex=86400)  # 24h TTL
+                    logger.info(f"✅ Vertical mode '{x_vertical_mode}' set for {user_phone} from router")
+            
+            # Route to WhatsApp bot manager
+            # Convert to Meta-like format for compatibility
+            meta_format = {
+                "entry": [{
+                    "changes": [{
+                        "value": {
+                            "messages": [{
+                                "from": message_data["from_phone"],
+                "type": message_data["message_type"],
+                                "text": {"body": message_data.get("text", "")}
+                            }],
+                            "contacts": [{
+                                "profile": {"name": message_data.get("profile_name", "User")}
+                            }],
+                            "metadata": {
+                                "phone_number_id": tenant.whatsapp_phone_number_id or "default",
+                                "display_phone_number": getattr(tenant, "whatsapp_phone_number", None) or "unknown"
                             }
-                        }]
-                    }],
-                    # Pass router context for the handler
-                    "_router_context": {
-                        "tenant_id": tenant.id,
-                        "vertical_mode": x_vertical_mode
-                    }
+                        }
+                    }]
+                }],
+                # Pass router context for the handler
+                "_router_context": {
+                    "tenant_id": tenant.id,
+                    "vertical_mode": x_vertical_mode
                 }
-                
-                await whatsapp_bot_manager.handle_webhook(meta_format)
-                
+            }
+            
+            await whatsapp_bot_manager.handle_webhook(meta_format)
+            
         except Exception as e:
             logger.error(f"❌ Error processing Waha webhook: {e}", exc_info=True)
     
@@ -2296,6 +2194,7 @@ async def create_property(
         db.add(property_obj)
         await db.commit()
         await db.refresh(property_obj)
+        await property_changed(tenant_id, property_obj.id)
         
         logger.info(f"✅ Property created successfully for tenant {tenant_id}: {property_obj.id}")
         return property_obj
@@ -2340,6 +2239,7 @@ async def update_property(
     property_obj.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(property_obj)
+    await property_changed(tenant_id, property_id)
     
     return property_obj
 
@@ -2373,6 +2273,7 @@ async def delete_property(
     
     await db.delete(property_obj)
     await db.commit()
+    await property_changed(tenant_id, property_id)
     
     return {"status": "deleted", "id": property_id}
 
@@ -2508,6 +2409,7 @@ async def upload_property_images(
     property_obj.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(property_obj)
+    await property_changed(tenant_id, property_id)
     
     # پاسخ با جزئیات کامل
     response = {
@@ -2732,6 +2634,7 @@ async def delete_property_image(
     
     property_obj.updated_at = datetime.utcnow()
     await db.commit()
+    await property_changed(tenant_id, property_id)
     
     return {"status": "deleted", "filename": filename, "remaining": len(remaining_images)}
 
@@ -2778,6 +2681,7 @@ async def create_project(
     db.add(project)
     await db.commit()
     await db.refresh(project)
+    await bump_context_version(tenant_id)
     
     return project
 
@@ -2807,6 +2711,7 @@ async def update_project(
     project.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(project)
+    await bump_context_version(tenant_id)
     
     return project
 
@@ -2829,8 +2734,9 @@ async def delete_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    db.delete(project)
+    await db.delete(project)
     await db.commit()
+    await bump_context_version(tenant_id)
     
     return {"status": "deleted", "id": project_id}
 
@@ -2883,6 +2789,7 @@ async def create_knowledge(
     db.add(knowledge)
     await db.commit()
     await db.refresh(knowledge)
+    await bump_context_version(tenant_id)
     
     return knowledge
 
@@ -2912,6 +2819,7 @@ async def update_knowledge(
     knowledge.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(knowledge)
+    await bump_context_version(tenant_id)
     
     return knowledge
 
@@ -2934,8 +2842,9 @@ async def delete_knowledge(
     if not knowledge:
         raise HTTPException(status_code=404, detail="Knowledge entry not found")
     
-    db.delete(knowledge)
+    await db.delete(knowledge)
     await db.commit()
+    await bump_context_version(tenant_id)
     
     return {"status": "deleted", "id": knowledge_id}
 
@@ -0,0 +1,132 @@
+"""
+Database Migration: Canonical area IDs (area_gazetteer)
+Adds area id columns + indexes and backfills them from the existing free-text locations
+Run: python backend/migrate_area_ids.py
+
+Safe to re-run: columns/indexes use IF NOT EXISTS and the backfill only touches rows
+whose area id is still NULL.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, bindparam, JSON
+from database import engine
+from area_gazetteer import resolve_area, resolve_areas
+
+# Rows per UPDATE batch for the JSON location lists
+BATCH_SIZE = 1000
+
+
+async def add_columns():
+    """Add the area id columns and their indexes."""
+    print("🔄 Adding area id columns...")
+
+    migrations = [
+        "ALTER TABLE tenant_properties ADD COLUMN IF NOT EXISTS area_id INTEGER;",
+        "ALTER TABLE tenant_projects ADD COLUMN IF NOT EXISTS area_id INTEGER;",
+        "ALTER TABLE leads ADD COLUMN IF NOT EXISTS preferred_area_id INTEGER;",
+        "ALTER TABLE unified_leads ADD COLUMN IF NOT EXISTS preferred_area_ids JSON;",
+        """
+        CREATE INDEX IF NOT EXISTS idx_tenant_properties_tenant_area
+        ON tenant_properties(tenant_id, area_id);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_tenant_projects_tenant_area
+        ON tenant_projects(tenant_id, area_id);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_leads_preferred_area_id
+        ON leads(preferred_area_id);
+        """,
+    ]
+
+    async with engine.begin() as conn:
+        for sql in migrations:
+            print(f"  Executing: {sql.strip()[:70]}...")
+            await conn.execute(text(sql))
+
+
+async def backfill_column(table: str, source: str, target: str):
+    """Resolve each distinct location string once and update all rows that share it."""
+    async with engine.begin() as conn:
+        result = await conn.execute(text(
+            f"SELECT DISTINCT {source} FROM {table} WHERE {target} IS NULL AND {source} IS NOT NULL"
+        ))
+        locations = [row[0] for row in result.fetchall()]
+
+        resolved = 0
+        unknown = []
+        for location in locations:
+            area_id = resolve_area(location)
+            if area_id is None:
+                unknown.append(location)
+                continue
+            await conn.execute(
+                text(f"UPDATE {table} SET {target} = :area_id WHERE {source} = :location AND {target} IS NULL"),
+                {"area_id": area_id, "location": location}
+            )
+            resolved += 1
+
+    print(f"✅ {table}.{target}: {resolved}/{len(locations)} distinct locations resolved")
+    if unknown:
+        print(f"   ⚠️ Not in gazetteer (kept as free text): {unknown[:20]}{' ...' if len(unknown) > 20 else ''}")
+
+
+async def backfill_unified_leads():
+    """Resolve unified_leads.preferred_locations (JSON lists) into preferred_area_ids."""
+    updated = 0
+    last_id = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                text(
+                    "SELECT id, preferred_locations FROM unified_leads "
+                    "WHERE id > :last_id AND preferred_area_ids IS NULL AND preferred_locations IS NOT NULL "
+                    "ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE}
+            )
+            rows = result.fetchall()
+            if not rows:
+                break
+
+            for lead_id, locations in rows:
+                if isinstance(locations, str):
+                    locations = json.loads(locations)
+                area_ids = resolve_areas(locations)
+                if area_ids:
+                    await conn.execute(
+                        text("UPDATE unified_leads SET preferred_area_ids = :area_ids WHERE id = :id")
+                        .bindparams(bindparam("area_ids", type_=JSON)),
+                        {"area_ids": area_ids, "id": lead_id}
+                    )
+                    updated += 1
+            last_id = rows[-1][0]
+
+    print(f"✅ unified_leads.preferred_area_ids: {updated} leads backfilled")
+
+
+async def migrate():
+    print("🔄 Starting migration: canonical area ids...")
+    await add_columns()
+
+    print("\n🔄 Backfilling area ids from existing locations...")
+    await backfill_column("tenant_properties", "location", "area_id")
+    await backfill_column("tenant_projects", "location", "area_id")
+    await backfill_column("leads", "preferred_location", "preferred_area_id")
+    await backfill_unified_leads()
+
+    print("\n✅ Migration completed successfully!")
+    print("\n🎯 Next steps:")
+    print("  1. Restart backend: docker-compose restart backend")
+    print("  2. New and edited properties/leads get their area id on write")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
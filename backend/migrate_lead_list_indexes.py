@@ -0,0 +1,61 @@
+"""
+Database Migration: Lead list keyset pagination indexes (keyset_pagination.py)
+Composite indexes matching the lead list orderings, so every page - including deep
+ones - is a single index range scan
+Run: python backend/migrate_lead_list_indexes.py
+
+Keyset comparisons skip rows whose sort columns are NULL, so legacy NULL lead_score /
+created_at values are backfilled first (lead_score -> 0, created_at -> updated_at or now).
+Safe to re-run.
+"""
+
+import asyncio
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import engine
+
+
+async def migrate():
+    """Backfill NULL sort keys and create the lead list indexes."""
+
+    print("🔄 Starting migration: Lead list keyset indexes...")
+
+    async with engine.begin() as conn:
+        print("🔄 Backfilling NULL sort keys...")
+        backfills = [
+            "UPDATE leads SET lead_score = 0 WHERE lead_score IS NULL;",
+            "UPDATE leads SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;",
+            "UPDATE unified_leads SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;",
+        ]
+        for sql in backfills:
+            result = await conn.execute(text(sql))
+            print(f"  ✅ {result.rowcount} rows: {sql.split(' SET ')[0]}")
+
+        print("🔄 Creating indexes...")
+        indexes = [
+            """
+            CREATE INDEX IF NOT EXISTS ix_leads_tenant_score_created
+            ON leads (tenant_id, lead_score, created_at, id);
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_unified_leads_tenant_created
+            ON unified_leads (tenant_id, created_at, id);
+            """,
+        ]
+        for sql in indexes:
+            await conn.execute(text(sql))
+        print("✅ Indexes created")
+
+    print("\n✅ Migration completed successfully!")
+    print("\n🎯 Next steps:")
+    print("  1. Restart backend: docker-compose restart backend")
+    print("  2. Lead lists return the next page cursor in the X-Next-Cursor header")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
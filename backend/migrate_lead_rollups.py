@@ -0,0 +1,39 @@
+"""
+Database Migration / Rebuild Job: lead_daily_rollups (lead_rollups.py)
+Creates the rollup table and (re)computes it from the leads and unified_leads tables
+Run: python backend/migrate_lead_rollups.py            # all tenants
+     python backend/migrate_lead_rollups.py <tenant_id> # one tenant
+
+Safe to re-run: the table is created only if missing and every run replaces the rollup
+rows it covers, so it also repairs drift after manual SQL edits to lead rows.
+"""
+
+import asyncio
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine, Base, LeadDailyRollup
+from lead_rollups import lead_rollups
+
+
+async def migrate(tenant_id=None):
+    print("🔄 Creating lead_daily_rollups table...")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[LeadDailyRollup.__table__])
+
+    scope = f"tenant {tenant_id}" if tenant_id else "all tenants"
+    print(f"🔄 Rebuilding lead rollups for {scope}...")
+    rows = await lead_rollups.rebuild(tenant_id)
+    print(f"✅ {rows} rollup rows written")
+
+    print("\n✅ Migration completed successfully!")
+    print("\n🎯 Next steps:")
+    print("  1. Restart backend: docker-compose restart backend")
+    print("  2. New leads and status changes update the rollups on write")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate(int(sys.argv[1]) if len(sys.argv) > 1 else None))
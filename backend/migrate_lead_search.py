@@ -0,0 +1,43 @@
+"""
+Database Migration: Lead search columns and indexes (lead_search.py)
+Adds the generated search_text / phone_digits columns to leads plus their
+tenant-scoped GIN (tsvector + pg_trgm) and prefix indexes
+Run: python backend/migrate_lead_search.py
+
+Needs the pg_trgm and btree_gin extensions (shipped with Postgres contrib, created here).
+Adding a stored generated column rewrites the leads table once - run it off-peak.
+Safe to re-run.
+"""
+
+import asyncio
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine, LEAD_SEARCH_DDL
+
+
+async def migrate():
+    """Create the lead search columns and indexes."""
+
+    print("🔄 Starting migration: Lead search columns and indexes...")
+
+    if engine.dialect.name != "postgresql":
+        print(f"⚠️  {engine.dialect.name} database - lead search uses an unindexed LIKE scan. Skipping.")
+        return
+
+    async with engine.begin() as conn:
+        for ddl in LEAD_SEARCH_DDL:
+            await conn.execute(ddl)
+            print(f"  ✅ {' '.join(ddl.statement.split()[:6])}")
+
+    print("\n✅ Migration completed successfully!")
+    print("\n🎯 Next steps:")
+    print("  1. Restart backend: docker-compose restart backend")
+    print("  2. Search leads: GET /api/tenants/{tenant_id}/leads/search?q=...")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
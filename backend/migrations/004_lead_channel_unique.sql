@@ -0,0 +1,184 @@
+-- Migration: One lead per Telegram chat / WhatsApp phone per tenant
+-- Description: get_or_create_lead now resolves leads with
+--              INSERT ... ON CONFLICT (tenant_id, telegram_chat_id | whatsapp_phone) ... RETURNING
+--              which needs these unique constraints. Existing duplicates (created by
+--              concurrent first messages) are merged into the most recently updated
+--              lead first: its empty fields are filled from the others before they go.
+
+BEGIN;
+
+-- Telegram leads: map each duplicate to the lead that stays - the most recently updated one
+-- (the row the bot was actually writing to)
+CREATE TEMP TABLE lead_duplicates AS
+SELECT id, keep_id FROM (
+    SELECT id, FIRST_VALUE(id) OVER (
+        PARTITION BY tenant_id, telegram_chat_id ORDER BY updated_at DESC NULLS LAST, id DESC
+    ) AS keep_id
+    FROM leads
+    WHERE telegram_chat_id IS NOT NULL
+) ranked
+WHERE id <> keep_id;
+
+-- Fill the kept lead's empty fields from its duplicates (most recent value first),
+-- keep a status past 'new' and the highest score, add up messages and keep the first created_at
+WITH merged AS (
+    SELECT
+        d.keep_id,
+        (ARRAY_AGG(l.name ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.name IS NOT NULL))[1] AS name,
+        (ARRAY_AGG(l.phone ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.phone IS NOT NULL))[1] AS phone,
+        (ARRAY_AGG(l.email ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.email IS NOT NULL))[1] AS email,
+        (ARRAY_AGG(l.telegram_username ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.telegram_username IS NOT NULL))[1] AS telegram_username,
+        (ARRAY_AGG(l.transaction_type ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.transaction_type IS NOT NULL))[1] AS transaction_type,
+        (ARRAY_AGG(l.property_type ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.property_type IS NOT NULL))[1] AS property_type,
+        (ARRAY_AGG(l.budget_min ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.budget_min IS NOT NULL))[1] AS budget_min,
+        (ARRAY_AGG(l.budget_max ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.budget_max IS NOT NULL))[1] AS budget_max,
+        (ARRAY_AGG(l.purpose ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.purpose IS NOT NULL))[1] AS purpose,
+        (ARRAY_AGG(l.preferred_location ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.preferred_location IS NOT NULL))[1] AS preferred_location,
+        (ARRAY_AGG(l.voice_transcript ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.voice_transcript IS NOT NULL))[1] AS voice_transcript,
+        (ARRAY_AGG(l.status ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE lower(l.status::text) <> 'new'))[1] AS status,
+        (ARRAY_AGG(l.conversation_data ORDER BY l.updated_at DESC NULLS LAST, l.id DESC)
+            FILTER (WHERE l.conversation_data IS NOT NULL AND l.conversation_data::text NOT IN ('{}', 'null')))[1] AS conversation_data,
+        MAX(l.lead_score) AS lead_score,
+        (ARRAY_AGG(l.temperature ORDER BY l.lead_score DESC NULLS LAST, l.updated_at DESC NULLS LAST, l.id DESC))[1] AS temperature,
+        SUM(COALESCE(l.messages_count, 0)) AS messages_count,
+        MIN(l.created_at) AS created_at
+    FROM lead_duplicates d
+    JOIN leads l ON l.id = d.id
+    GROUP BY d.keep_id
+)
+UPDATE leads k SET
+    name = COALESCE(k.name, m.name),
+    phone = COALESCE(k.phone, m.phone),
+    email = COALESCE(k.email, m.email),
+    telegram_username = COALESCE(k.telegram_username, m.telegram_username),
+    transaction_type = COALESCE(k.transaction_type, m.transaction_type),
+    property_type = COALESCE(k.property_type, m.property_type),
+    budget_min = COALESCE(k.budget_min, m.budget_min),
+    budget_max = COALESCE(k.budget_max, m.budget_max),
+    purpose = COALESCE(k.purpose, m.purpose),
+    preferred_location = COALESCE(k.preferred_location, m.preferred_location),
+    voice_transcript = COALESCE(k.voice_transcript, m.voice_transcript),
+    status = CASE WHEN k.status IS NULL OR lower(k.status::text) = 'new' THEN COALESCE(m.status, k.status) ELSE k.status END,
+    conversation_data = CASE
+        WHEN k.conversation_data IS NULL OR k.conversation_data::text IN ('{}', 'null') THEN COALESCE(m.conversation_data, k.conversation_data)
+        ELSE k.conversation_data
+    END,
+    lead_score = GREATEST(COALESCE(k.lead_score, 0), COALESCE(m.lead_score, 0)),
+    temperature = CASE WHEN COALESCE(m.lead_score, 0) > COALESCE(k.lead_score, 0) THEN m.temperature ELSE k.temperature END,
+    messages_count = COALESCE(k.messages_count, 0) + m.messages_count,
+    created_at = LEAST(k.created_at, m.created_at)
+FROM merged m
+WHERE k.id = m.keep_id;
+
+-- Re-point appointments / booked slots, then drop the duplicates
+UPDATE appointments a SET lead_id = d.keep_id
+FROM lead_duplicates d
+WHERE a.lead_id = d.id;
+
+UPDATE agent_availability s SET booked_by_lead_id = d.keep_id
+FROM lead_duplicates d
+WHERE s.booked_by_lead_id = d.id;
+
+DELETE FROM leads l
+USING lead_duplicates d
+WHERE l.id = d.id;
+
+DROP TABLE lead_duplicates;
+
+-- Same for WhatsApp leads: map each duplicate to the lead that stays - the most recently updated one
+-- (the row the bot was actually writing to)
+CREATE TEMP TABLE lead_duplicates AS
+SELECT id, keep_id FROM (
+    SELECT id, FIRST_VALUE(id) OVER (
+        PARTITION BY tenant_id, whatsapp_phone ORDER BY updated_at DESC NULLS LAST, id DESC
+    ) AS keep_id
+    FROM leads
+    WHERE whatsapp_phone IS NOT NULL
+) ranked
+WHERE id <> keep_id;
+
+-- Fill the kept lead's empty fields from its duplicates (most recent value first),
+-- keep a status past 'new' and the highest score, add up messages and keep the first created_at
+WITH merged AS (
+    SELECT
+        d.keep_id,
+        (ARRAY_AGG(l.name ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.name IS NOT NULL))[1] AS name,
+        (ARRAY_AGG(l.phone ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.phone IS NOT NULL))[1] AS phone,
+        (ARRAY_AGG(l.email ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.email IS NOT NULL))[1] AS email,
+        (ARRAY_AGG(l.telegram_username ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.telegram_username IS NOT NULL))[1] AS telegram_username,
+        (ARRAY_AGG(l.transaction_type ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.transaction_type IS NOT NULL))[1] AS transaction_type,
+        (ARRAY_AGG(l.property_type ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.property_type IS NOT NULL))[1] AS property_type,
+        (ARRAY_AGG(l.budget_min ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.budget_min IS NOT NULL))[1] AS budget_min,
+        (ARRAY_AGG(l.budget_max ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.budget_max IS NOT NULL))[1] AS budget_max,
+        (ARRAY_AGG(l.purpose ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.purpose IS NOT NULL))[1] AS purpose,
+        (ARRAY_AGG(l.preferred_location ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.preferred_location IS NOT NULL))[1] AS preferred_location,
+        (ARRAY_AGG(l.voice_transcript ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE l.voice_transcript IS NOT NULL))[1] AS voice_transcript,
+        (ARRAY_AGG(l.status ORDER BY l.updated_at DESC NULLS LAST, l.id DESC) FILTER (WHERE lower(l.status::text) <> 'new'))[1] AS status,
+        (ARRAY_AGG(l.conversation_data ORDER BY l.updated_at DESC NULLS LAST, l.id DESC)
+            FILTER (WHERE l.conversation_data IS NOT NULL AND l.conversation_data::text NOT IN ('{}', 'null')))[1] AS conversation_data,
+        MAX(l.lead_score) AS lead_score,
+        (ARRAY_AGG(l.temperature ORDER BY l.lead_score DESC NULLS LAST, l.updated_at DESC NULLS LAST, l.id DESC))[1] AS temperature,
+        SUM(COALESCE(l.messages_count, 0)) AS messages_count,
+        MIN(l.created_at) AS created_at
+    FROM lead_duplicates d
+    JOIN leads l ON l.id = d.id
+    GROUP BY d.keep_id
+)
+UPDATE leads k SET
+    name = COALESCE(k.name, m.name),
+    phone = COALESCE(k.phone, m.phone),
+    email = COALESCE(k.email, m.email),
+    telegram_username = COALESCE(k.telegram_username, m.telegram_username),
+    transaction_type = COALESCE(k.transaction_type, m.transaction_type),
+    property_type = COALESCE(k.property_type, m.property_type),
+    budget_min = COALESCE(k.budget_min, m.budget_min),
+    budget_max = COALESCE(k.budget_max, m.budget_max),
+    purpose = COALESCE(k.purpose, m.purpose),
+    preferred_location = COALESCE(k.preferred_location, m.preferred_location),
+    voice_transcript = COALESCE(k.voice_transcript, m.voice_transcript),
+    status = CASE WHEN k.status IS NULL OR lower(k.status::text) = 'new' THEN COALESCE(m.status, k.status) ELSE k.status END,
+    conversation_data = CASE
+        WHEN k.conversation_data IS NULL OR k.conversation_data::text IN ('{}', 'null') THEN COALESCE(m.conversation_data, k.conversation_data)
+        ELSE k.conversation_data
+    END,
+    lead_score = GREATEST(COALESCE(k.lead_score, 0), COALESCE(m.lead_score, 0)),
+    temperature = CASE WHEN COALESCE(m.lead_score, 0) > COALESCE(k.lead_score, 0) THEN m.temperature ELSE k.temperature END,
+    messages_count = COALESCE(k.messages_count, 0) + m.messages_count,
+    created_at = LEAST(k.created_at, m.created_at)
+FROM merged m
+WHERE k.id = m.keep_id;
+
+-- Re-point appointments / booked slots, then drop the duplicates
+UPDATE appointments a SET lead_id = d.keep_id
+FROM lead_duplicates d
+WHERE a.lead_id = d.id;
+
+UPDATE agent_availability s SET booked_by_lead_id = d.keep_id
+FROM lead_duplicates d
+WHERE s.booked_by_lead_id = d.id;
+
+DELETE FROM leads l
+USING lead_duplicates d
+WHERE l.id = d.id;
+
+DROP TABLE lead_duplicates;
+
+-- Add unique constraints (NULLs stay allowed, so WhatsApp leads without a chat id are fine)
+DO $$ BEGIN
+    ALTER TABLE leads ADD CONSTRAINT uix_lead_tenant_telegram_chat UNIQUE (tenant_id, telegram_chat_id);
+EXCEPTION
+    WHEN duplicate_object OR duplicate_table THEN null;
+END $$;
+
+DO $$ BEGIN
+    ALTER TABLE leads ADD CONSTRAINT uix_lead_tenant_whatsapp_phone UNIQUE (tenant_id, whatsapp_phone);
+EXCEPTION
+    WHEN duplicate_object OR duplicate_table THEN null;
+END $$;
+
+COMMIT;
+
+-- Verify
+SELECT conname FROM pg_constraint
+WHERE conrelid = 'leads'::regclass
+AND conname IN ('uix_lead_tenant_telegram_chat', 'uix_lead_tenant_whatsapp_phone');
@@ -23,6 +23,7 @@ from dotenv import load_dotenv
 
 # Import shared Gemini utilities
 from utils.gemini_utils import GeminiClient, get_gemini_api_keys
+from text_normalizer import normalize_text
 
 # Load environment variables
 load_dotenv()
@@ -44,14 +45,6 @@ except ImportError:
     HAS_OCR = False
     print("⚠️ Pillow/pytesseract not installed. Run: pip install Pillow pytesseract")
 
-# AI Vision (Gemini Vision for complex extraction)
-try:
-    import google.generativeai as genai
-    HAS_GEMINI = True
-except ImportError:
-    HAS_GEMINI = False
-    print("⚠️ google-generativeai not installed. Run: pip install google-generativeai")
-
 logger = logging.getLogger(__name__)
 
 
@@ -67,13 +60,10 @@ class PropertyExtractor:
     def __init__(self, gemini_api_key: Optional[str] = None):
         # We ignore the passed key if it's the placeholder or invalid
         # The GeminiClient handles key loading from env automatically
-        self.gemini_client = None
-        
-        if HAS_GEMINI:
-            self.gemini_client = GeminiClient()
-            logger.info("✅ PropertyExtractor initialized with robust GeminiClient")
-        else:
-            logger.warning("⚠️ No google-generativeai installed - AI extraction disabled")
+        # AI Vision (Gemini Vision for complex extraction) - utils.gemini_utils needs the SDK,
+        # so it is always installed here
+        self.gemini_client = GeminiClient()
+        logger.info("✅ PropertyExtractor initialized with robust GeminiClient")
     
     async def _extract_pdf_with_gemini(self, pdf_path: str) -> Dict:
         """
@@ -156,8 +146,7 @@ class PropertyExtractor:
             # Clean up uploaded file
             if pdf_file:
                 try:
-                    # We might need to use genai directly for deletion or add delete to wrapper
-                    genai.delete_file(pdf_file.name)
+                    self.gemini_client.delete_file(pdf_file.name)
                 except:
                     pass
 
@@ -245,7 +234,7 @@ class PropertyExtractor:
         pdf_file = None
         try:
             # Upload PDF to Gemini
-            pdf_file = genai.upload_file(pdf_path, mime_type="application/pdf")
+            pdf_file = self.gemini_client.upload_file(pdf_path, mime_type="application/pdf")
             logger.info(f"📤 Uploaded PDF to Gemini: {pdf_file.name}")
             
             prompt = """
@@ -313,7 +302,7 @@ class PropertyExtractor:
             # Clean up uploaded file
             if pdf_file:
                 try:
-                    genai.delete_file(pdf_file.name)
+                    self.gemini_client.delete_file(pdf_file.name)
                 except:
                     pass
     
@@ -450,7 +439,8 @@ class PropertyExtractor:
             'amenities': []
         }
         
-        text_lower = text.lower()
+        # Normalised form: Persian/Arabic digits and separators become ASCII so the patterns match
+        text_lower = normalize_text(text)
         
         # Extract PRICE (AED)
         price_patterns = [
@@ -0,0 +1,425 @@
+"""
+Property Recommendation Index
+Per-tenant, in-memory columnar index of available properties for recommendation queries
+
+Recommendation paths (Brain, RealtySalesBot, RealtyTelegramBot, get_tenant_properties)
+used to run an `ilike '%location%'` / JSON `@>` query per request. Each tenant's available
+properties are now loaded once into NumPy columns:
+
+    price, bedrooms, property type, transaction type, golden visa, featured,
+    created_at, area id (area_gazetteer), amenity bitsets (uint64 words)
+
+Queries are vectorised masks (hard filters) plus a soft relevance score, so a lookup
+is a few array operations. The DB is only read on a cold load, and on writes
+(`property_changed`) only the changed row is re-read and patched in.
+
+Staleness across workers follows the tenant context version (context_cache): a write
+bumps the version, other workers see the new version and reload.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Iterable, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from database import async_session, TenantProperty, PropertyType, TransactionType
+from context_cache import tenant_context_cache, bump_context_version
+from text_normalizer import normalize, normalize_text
+from area_gazetteer import resolve_area
+
+logger = logging.getLogger(__name__)
+
+# Index Configuration
+# Upper bound on index age - covers writes that bypass property_changed (SQL console, scripts)
+PROPERTY_INDEX_TTL_SECONDS = int(os.getenv("PROPERTY_INDEX_TTL_SECONDS", "600"))
+
+# Soft-score weights (relevance ordering; hard filters decide membership)
+LOCATION_WEIGHT = 3.0
+BEDROOMS_WEIGHT = 2.0  # exact match; minus 1 per bedroom off, floored at 0
+AMENITY_WEIGHT = 1.0  # per requested amenity present
+BUDGET_WEIGHT = 1.0  # within the preferred budget (vs. only within the hard cap)
+
+# Orderings
+RELEVANCE = "relevance"  # score desc, featured first, cheapest first
+NEWEST = "newest"  # featured first, newest first (the AI context ordering)
+
+_PROPERTY_TYPES = list(PropertyType)
+_TRANSACTION_TYPES = list(TransactionType)
+_TYPE_CODES = {t: i for i, t in enumerate(_PROPERTY_TYPES)}
+_TRANSACTION_CODES = {t: i for i, t in enumerate(_TRANSACTION_TYPES)}
+
+
+def _code(value, codes: Dict[Any, int], enum_cls) -> int:
+    if value is None:
+        return -1
+    if isinstance(value, str) and not isinstance(value, enum_cls):
+        try:
+            value = enum_cls(value.lower())
+        except ValueError:
+            return -1
+    return codes.get(value, -1)
+
+
+# Scalar columns: name -> dtype (the amenity bitsets are a 2-D column of their own)
+_COLUMNS = (
+    ("ids", np.int64),
+    ("price", np.float64),
+    ("bedrooms", np.int16),
+    ("property_type", np.int8),
+    ("transaction_type", np.int8),
+    ("golden_visa", bool),
+    ("featured", bool),
+    ("created", np.float64),
+    ("area_id", np.int32),
+    ("location_id", np.int32),
+)
+_INITIAL_CAPACITY = 64
+
+
+class TenantPropertyIndex:
+    """
+    Columnar arrays over one tenant's available properties.
+    Columns live in over-allocated buffers (doubled when full); writes patch one row -
+    appended, overwritten in place, or swap-removed with the last row - via an id -> row map.
+    """
+
+    def __init__(self, tenant_id: int, version: int, properties: Iterable[TenantProperty]):
+        self.tenant_id = tenant_id
+        self.version = version
+        self.loaded_at = time.monotonic()
+        properties = sorted(properties, key=lambda p: p.id)
+
+        self._props: List[TenantProperty] = []
+        self._rows: Dict[int, int] = {}  # property id -> row
+        # Location vocabulary (for places outside the gazetteer): normalised location string -> id
+        self.locations: List[str] = []
+        self._location_ids: Dict[str, int] = {}
+        # Amenity vocabulary: normalised feature -> bit; bitsets are (n, words) uint64
+        self.amenities: List[str] = []
+        self._amenity_ids: Dict[str, int] = {}
+
+        capacity = max(_INITIAL_CAPACITY, len(properties))
+        self._buffers: Dict[str, np.ndarray] = {name: np.empty(capacity, dtype=dtype) for name, dtype in _COLUMNS}
+        self._amenity_buffer = np.zeros((capacity, 1), dtype=np.uint64)
+        for prop in properties:
+            self._append(prop)
+        self._publish()
+
+    def __len__(self) -> int:
+        return len(self._props)
+
+    # ---------- build / incremental updates ----------
+
+    def _row_values(self, p: TenantProperty) -> Dict[str, Any]:
+        location = normalize_text(p.location or "")
+        if location not in self._location_ids:
+            self._location_ids[location] = len(self.locations)
+            self.locations.append(location)
+        return {
+            "ids": p.id,
+            "price": p.price if p.price is not None else np.nan,
+            "bedrooms": p.bedrooms if p.bedrooms is not None else -1,
+            "property_type": _code(p.property_type, _TYPE_CODES, PropertyType),
+            "transaction_type": _code(p.transaction_type, _TRANSACTION_CODES, TransactionType),
+            "golden_visa": bool(p.golden_visa_eligible),
+            "featured": bool(p.is_featured),
+            "created": p.created_at.timestamp() if p.created_at else 0.0,
+            # Canonical area id (-1 = outside the gazetteer); rows written before the
+            # area_id backfill are resolved here
+            "area_id": (p.area_id if p.area_id is not None else resolve_area(p.location)) or -1,
+            "location_id": self._location_ids[location],
+        }
+
+    def _amenity_row(self, p: TenantProperty) -> np.ndarray:
+        bits = []
+        for feature in (p.features or []):
+            if not isinstance(feature, str):
+                continue
+            key = normalize_text(feature)
+            if not key:
+                continue
+            if key not in self._amenity_ids:
+                self._amenity_ids[key] = len(self.amenities)
+                self.amenities.append(key)
+            bits.append(self._amenity_ids[key])
+
+        words = max(1, (len(self.amenities) + 63) // 64)
+        if words > self._amenity_buffer.shape[1]:
+            # Vocabulary outgrew the bitset width - widen every row (rare: once per 64 new amenities)
+            wider = np.zeros((self._amenity_buffer.shape[0], words), dtype=np.uint64)
+            wider[:, :self._amenity_buffer.shape[1]] = self._amenity_buffer
+            self._amenity_buffer = wider
+
+        row = np.zeros(self._amenity_buffer.shape[1], dtype=np.uint64)
+        for bit in bits:
+            row[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return row
+
+    def _write_row(self, row: int, p: TenantProperty):
+        for name, value in self._row_values(p).items():
+            self._buffers[name][row] = value
+        self._amenity_buffer[row] = self._amenity_row(p)
+        self._props[row] = p
+
+    def _append(self, p: TenantProperty):
+        row = len(self._props)
+        capacity = self._amenity_buffer.shape[0]
+        if row == capacity:
+            for name, buffer in self._buffers.items():
+                grown = np.empty(capacity * 2, dtype=buffer.dtype)
+                grown[:row] = buffer[:row]
+                self._buffers[name] = grown
+            grown = np.zeros((capacity * 2, self._amenity_buffer.shape[1]), dtype=np.uint64)
+            grown[:row] = self._amenity_buffer[:row]
+            self._amenity_buffer = grown
+        self._props.append(p)
+        self._rows[p.id] = row
+        self._write_row(row, p)
+
+    def _publish(self):
+        """Expose the live rows of every buffer as the query columns (views, no copies)."""
+        n = len(self._props)
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:n])
+        self.amenity_bits = self._amenity_buffer[:n]
+
+    def upsert(self, prop: TenantProperty):
+        """Insert or replace one property (must be available)."""
+        row = self._rows.get(prop.id)
+        if row is None:
+            self._append(prop)
+        else:
+            self._write_row(row, prop)
+        self._publish()
+
+    def remove(self, property_id: int):
+        """Drop one property (deleted or no longer available): the last row moves into its slot."""
+        row = self._rows.pop(property_id, None)
+        if row is None:
+            return
+        last = len(self._props) - 1
+        if row != last:
+            for buffer in self._buffers.values():
+                buffer[row] = buffer[last]
+            self._amenity_buffer[row] = self._amenity_buffer[last]
+            moved = self._props[last]
+            self._props[row] = moved
+            self._rows[moved.id] = row
+        self._props.pop()
+        self._publish()
+
+    # ---------- queries ----------
+
+    def _location_mask(self, location: str) -> np.ndarray:
+        area_id = resolve_area(location)
+        if area_id is not None:
+            return self.area_id == area_id
+        # Not a known area - substring match on the tenant's location strings
+        needle = normalize(location)
+        ids = [i for i, name in enumerate(self.locations) if needle in name]
+        if not ids:
+            return np.zeros(len(self._props), dtype=bool)
+        return np.isin(self.location_id, ids)
+
+    def _amenity_mask(self, amenity: str) -> np.ndarray:
+        needle = normalize(amenity)
+        mask = np.zeros(self.amenity_bits.shape[1], dtype=np.uint64)
+        for bit, name in enumerate(self.amenities):
+            if needle and needle in name:
+                mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return (self.amenity_bits & mask).any(axis=1)
+
+    def search(
+        self,
+        transaction_type: Optional[TransactionType] = None,
+        property_types: Optional[Sequence[PropertyType]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        bedrooms: Optional[int] = None,
+        min_bedrooms: Optional[int] = None,
+        max_bedrooms: Optional[int] = None,
+        golden_visa_only: bool = False,
+        location: Optional[str] = None,
+        prefer_location: Optional[str] = None,
+        prefer_bedrooms: Optional[int] = None,
+        prefer_amenities: Optional[Sequence[str]] = None,
+        prefer_max_price: Optional[float] = None,
+        order: str = RELEVANCE,
+        limit: int = 5,
+        offset: int = 0
+    ) -> List[TenantProperty]:
+        """
+        Hard filters (transaction/property type, price bounds, bedrooms, golden visa, location)
+        decide which properties qualify; prefer_* arguments only raise their ranking.
+        Falsy numeric filters are ignored, like the SQL queries this replaces.
+        """
+        n = len(self._props)
+        if n == 0:
+            return []
+
+        mask = np.ones(n, dtype=bool)
+        if transaction_type is not None:
+            mask &= self.transaction_type == _code(transaction_type, _TRANSACTION_CODES, TransactionType)
+        if property_types:
+            codes = [_code(t, _TYPE_CODES, PropertyType) for t in property_types]
+            mask &= np.isin(self.property_type, codes)
+        # NaN prices fail every comparison, i.e. NULL prices never pass a price filter
+        if min_price:
+            mask &= self.price >= min_price
+        if max_price:
+            mask &= self.price <= max_price
+        if bedrooms:
+            mask &= self.bedrooms == bedrooms
+        if min_bedrooms is not None:
+            mask &= (self.bedrooms >= min_bedrooms)
+        if max_bedrooms is not None:
+            mask &= (self.bedrooms >= 0) & (self.bedrooms <= max_bedrooms)
+        if golden_visa_only:
+            mask &= self.golden_visa
+        if location:
+            mask &= self._location_mask(location)
+
+        rows = np.flatnonzero(mask)
+        if rows.size == 0:
+            return []
+
+        if order == NEWEST:
+            ranked = rows[np.lexsort((self.ids[rows], -self.created[rows], ~self.featured[rows]))]
+        else:
+            score = np.zeros(rows.size, dtype=np.float64)
+            if prefer_location:
+                score += LOCATION_WEIGHT * self._location_mask(prefer_location)[rows]
+            if prefer_bedrooms:
+                beds = self.bedrooms[rows]
+                fit = np.clip(BEDROOMS_WEIGHT - np.abs(beds - prefer_bedrooms), 0, None)
+                score += np.where(beds >= 0, fit, 0)
+            for amenity in (prefer_amenities or []):
+                score += AMENITY_WEIGHT * self._amenity_mask(amenity)[rows]
+            if prefer_max_price:
+                score += BUDGET_WEIGHT * (self.price[rows] <= prefer_max_price)
+            # lexsort: last key is primary -> score desc, featured first, price asc (NULL last), id asc
+            # (rows aren't in id order once writes swap-remove them)
+            ranked = rows[np.lexsort((self.ids[rows], self.price[rows], ~self.featured[rows], -score))]
+
+        return [self._props[i] for i in ranked[offset:offset + limit]]
+
+
+class PropertyIndex:
+    """Per-worker registry of TenantPropertyIndex, validated against the tenant context version."""
+
+    def __init__(self, ttl_seconds: int = PROPERTY_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._indexes: Dict[int, TenantPropertyIndex] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.cold_loads = 0
+        self.incremental_updates = 0
+        self.queries = 0
+        self.query_time_total = 0.0
+
+    async def get(self, tenant_id: int) -> TenantPropertyIndex:
+        """Get the tenant's index, loading it if missing, expired or outdated."""
+        version = await tenant_context_cache.get_version(tenant_id)
+        index = self._indexes.get(tenant_id)
+        if (
+            index is not None
+            and index.version == version
+            and time.monotonic() - index.loaded_at < self.ttl_seconds
+        ):
+            self.hits += 1
+            return index
+
+        # Concurrent cold loads for the same tenant share one query
+        pending = self._loading.get(tenant_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[tenant_id] = future
+        try:
+            index = await self._load(tenant_id, version)
+            self._indexes[tenant_id] = index
+            future.set_result(index)
+            return index
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved in case nobody else was waiting on this load
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(tenant_id, None)
+
+    async def _load(self, tenant_id: int, version: int) -> TenantPropertyIndex:
+        async with async_session() as session:
+            result = await session.execute(
+                select(TenantProperty).where(
+                    TenantProperty.tenant_id == tenant_id,
+                    TenantProperty.is_available == True
+                )
+            )
+            properties = result.scalars().all()
+
+        self.cold_loads += 1
+        index = TenantPropertyIndex(tenant_id, version, properties)
+        logger.info(
+            f"📇 Property index loaded for tenant {tenant_id} (v{version}): "
+            f"{len(index)} properties, {len(index.locations)} locations, {len(index.amenities)} amenities"
+        )
+        return index
+
+    async def search(self, tenant_id: int, **filters) -> List[TenantProperty]:
+        """Ranked properties for a tenant. See TenantPropertyIndex.search for filters."""
+        index = await self.get(tenant_id)
+        start = time.perf_counter()
+        results = index.search(**filters)
+        self.query_time_total += time.perf_counter() - start
+        self.queries += 1
+        return results
+
+    async def property_changed(self, tenant_id: int, property_id: int):
+        """
+        Call after a property write is committed.
+        Bumps the tenant context version and patches this worker's index with the one changed row.
+        """
+        new_version = await bump_context_version(tenant_id)
+        index = self._indexes.get(tenant_id)
+        if index is None:
+            return
+        if index.version != new_version - 1:
+            # Something else changed in between - reload from scratch on next use
+            self._indexes.pop(tenant_id, None)
+            return
+
+        async with async_session() as session:
+            prop = await session.get(TenantProperty, property_id)
+
+        if prop is None or prop.tenant_id != tenant_id or not prop.is_available:
+            index.remove(property_id)
+        else:
+            index.upsert(prop)
+        index.version = new_version
+        self.incremental_updates += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indexed_tenants": len(self._indexes),
+            "indexed_properties": sum(len(i) for i in self._indexes.values()),
+            "hits": self.hits,
+            "cold_loads": self.cold_loads,
+            "incremental_updates": self.incremental_updates,
+            "queries": self.queries,
+            "avg_query_us": round(self.query_time_total / self.queries * 1_000_000, 1) if self.queries else 0.0,
+        }
+
+
+# Global instance
+property_index = PropertyIndex()
+
+
+async def property_changed(tenant_id: int, property_id: int):
+    """Refresh the property index (and AI context) after a property create/update/delete."""
+    await property_index.property_changed(tenant_id, property_id)
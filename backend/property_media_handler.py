@@ -10,6 +10,7 @@ from sqlalchemy.future import select
 from sqlalchemy import and_, or_
 
 from database import TenantProperty, PropertyType, TransactionType
+from area_gazetteer import resolve_area
 
 logger = logging.getLogger(__name__)
 
@@ -59,9 +60,13 @@ async def get_property_media(
         if property_type:
             query = query.where(TenantProperty.property_type == property_type)
         
-        # Filter by location (case-insensitive partial match)
+        # Filter by location (canonical area id; partial text match for places outside the gazetteer)
         if location:
-            query = query.where(TenantProperty.location.ilike(f"%{location}%"))
+            area_id = resolve_area(location)
+            if area_id is not None:
+                query = query.where(TenantProperty.area_id == area_id)
+            else:
+                query = query.where(TenantProperty.location.ilike(f"%{location}%"))
         
         # Filter by price
         if max_price:
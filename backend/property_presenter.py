@@ -95,8 +95,8 @@ async def send_property_with_roi(
         await asyncio.sleep(1)
         
         # 📋 Step 2: ارسال پرزنتیشن کامل ملک
-        from brain import Brain
-        brain = Brain(tenant)
+        from brain_registry import brain_registry
+        brain = brain_registry.get(tenant)
         presentation_text = brain.format_property_presentation(property_data, lang, index)
         
         # دکمه‌های اقدام
@@ -11,6 +11,8 @@ from typing import Optional, Dict, Any, List, Tuple
 from dataclasses import dataclass
 import logging
 
+from text_normalizer import contains_any
+
 logger = logging.getLogger(__name__)
 
 
@@ -272,13 +274,11 @@ class FlowController:
     @staticmethod
     def get_flow_from_intent(intent: str) -> RealtyFlow:
         """Map intent selection to flow"""
-        intent_lower = intent.lower()
-        
-        if "rent" in intent_lower or "اجاره" in intent_lower or "إيجار" in intent_lower or "аренд" in intent_lower:
+        if contains_any(intent, ["rent", "اجاره", "إيجار", "аренд"]):
             return RealtyFlow.RENT
-        elif "invest" in intent_lower or "سرمایه" in intent_lower or "استثمار" in intent_lower or "инвест" in intent_lower:
+        elif contains_any(intent, ["invest", "سرمایه", "استثمار", "инвест"]):
             return RealtyFlow.INVESTMENT
-        elif "resid" in intent_lower or "اقامت" in intent_lower or "إقامة" in intent_lower or "резидент" in intent_lower or "visa" in intent_lower or "ویزا" in intent_lower:
+        elif contains_any(intent, ["resid", "اقامت", "إقامة", "резидент", "visa", "ویزا"]):
             return RealtyFlow.RESIDENCY
         
         return RealtyFlow.NONE
@@ -293,8 +293,7 @@ class FlowController:
             "меню", "назад", "начало",
             "MAIN_MENU", "0"
         ]
-        message_lower = message.lower().strip()
-        return any(trigger in message_lower for trigger in back_triggers)
+        return contains_any(message, back_triggers)
 
 
 # ==================== PROPERTY QUERY HELPERS ====================
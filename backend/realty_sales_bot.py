@@ -34,6 +34,7 @@ from database import (
     TenantProperty, async_session, Tenant, Lead,
     PropertyType as DBPropertyType, TransactionType
 )
+from property_index import property_index
 from sqlalchemy import select, and_, or_
 
 
@@ -968,112 +969,81 @@ class RealtySalesBot:
     # ==================== PROPERTY QUERIES ====================
     
     async def _query_rent_properties(self, session: RealtySession) -> List[Dict[str, Any]]:
-        """Query database for rental properties"""
+        """Query the property index for rental properties"""
+        property_types = None
+        if session.property_type == PropertyCategory.RESIDENTIAL:
+            property_types = [
+                DBPropertyType.APARTMENT, DBPropertyType.VILLA,
+                DBPropertyType.STUDIO, DBPropertyType.PENTHOUSE, DBPropertyType.TOWNHOUSE
+            ]
+        elif session.property_type == PropertyCategory.COMMERCIAL:
+            property_types = [DBPropertyType.COMMERCIAL]
+
         try:
-            async with async_session() as db_session:
-                query = select(TenantProperty).where(
-                    TenantProperty.tenant_id == self.tenant_id,
-                    TenantProperty.is_active == True
-                )
-                
-                # Add filters based on session data
-                if session.property_type == PropertyCategory.RESIDENTIAL:
-                    query = query.where(TenantProperty.property_type.in_([
-                        DBPropertyType.APARTMENT, DBPropertyType.VILLA, 
-                        DBPropertyType.STUDIO, DBPropertyType.PENTHOUSE, DBPropertyType.TOWNHOUSE
-                    ]))
-                elif session.property_type == PropertyCategory.COMMERCIAL:
-                    query = query.where(TenantProperty.property_type == DBPropertyType.COMMERCIAL)
-                
-                # Filter for rental properties
-                query = query.where(TenantProperty.transaction_type == TransactionType.RENT)
-                
-                if session.budget_max:
-                    # Filter by price (annual rent value)
-                    query = query.where(TenantProperty.price <= session.budget_max * 12)  # Annual
-                
-                if session.location_preference:
-                    query = query.where(
-                        TenantProperty.location.ilike(f"%{session.location_preference}%")
-                    )
-                
-                query = query.limit(5)
-                result = await db_session.execute(query)
-                properties = result.scalars().all()
-                
-                return [self._property_to_dict(p) for p in properties]
-                
+            properties = await property_index.search(
+                self.tenant_id,
+                transaction_type=TransactionType.RENT,
+                property_types=property_types,
+                # Filter by price (annual rent value)
+                max_price=session.budget_max * 12 if session.budget_max else None,
+                prefer_location=session.location_preference,
+                limit=5
+            )
+            return [self._property_to_dict(p) for p in properties]
+
         except Exception as e:
             logger.error(f"Error querying rent properties: {e}")
             return []
     
     async def _query_invest_properties(self, session: RealtySession) -> List[Dict[str, Any]]:
-        """Query database for investment properties"""
+        """Query the property index for investment properties"""
+        property_types = None
+        if session.investment_type == PropertyCategory.RESIDENTIAL:
+            property_types = [DBPropertyType.APARTMENT, DBPropertyType.VILLA, DBPropertyType.PENTHOUSE]
+        elif session.investment_type == PropertyCategory.COMMERCIAL:
+            property_types = [DBPropertyType.COMMERCIAL]
+        elif session.investment_type == PropertyCategory.LAND:
+            property_types = [DBPropertyType.LAND]
+
         try:
-            async with async_session() as db_session:
-                query = select(TenantProperty).where(
-                    TenantProperty.tenant_id == self.tenant_id,
-                    TenantProperty.is_active == True
-                )
-                
-                if session.investment_type == PropertyCategory.RESIDENTIAL:
-                    query = query.where(TenantProperty.property_type.in_([
-                        DBPropertyType.APARTMENT, DBPropertyType.VILLA, DBPropertyType.PENTHOUSE
-                    ]))
-                elif session.investment_type == PropertyCategory.COMMERCIAL:
-                    query = query.where(TenantProperty.property_type == DBPropertyType.COMMERCIAL)
-                elif session.investment_type == PropertyCategory.LAND:
-                    query = query.where(TenantProperty.property_type == DBPropertyType.LAND)
-                
-                # Filter for purchase (investment) properties
-                query = query.where(TenantProperty.transaction_type == TransactionType.BUY)
-                
-                if session.budget_min:
-                    query = query.where(TenantProperty.price >= session.budget_min)
-                if session.budget_max:
-                    query = query.where(TenantProperty.price <= session.budget_max)
-                
-                query = query.limit(5)
-                result = await db_session.execute(query)
-                properties = result.scalars().all()
-                
-                return [self._property_to_dict(p) for p in properties]
-                
+            # Purchase (investment) properties
+            properties = await property_index.search(
+                self.tenant_id,
+                transaction_type=TransactionType.BUY,
+                property_types=property_types,
+                min_price=session.budget_min,
+                max_price=session.budget_max,
+                limit=5
+            )
+            return [self._property_to_dict(p) for p in properties]
+
         except Exception as e:
             logger.error(f"Error querying invest properties: {e}")
             return []
     
     async def _query_resid_properties(self, session: RealtySession) -> List[Dict[str, Any]]:
-        """Query database for residency-eligible properties"""
+        """Query the property index for residency-eligible properties"""
         min_price = RESIDENCY_MINIMUMS.get(VisaType(session.visa_type), 750000)
-        
+
+        property_types = None
+        if session.property_type == PropertyCategory.RESIDENTIAL:
+            property_types = [DBPropertyType.APARTMENT, DBPropertyType.VILLA, DBPropertyType.PENTHOUSE]
+        elif session.property_type == PropertyCategory.COMMERCIAL:
+            property_types = [DBPropertyType.COMMERCIAL]
+        elif session.property_type == PropertyCategory.LAND:
+            property_types = [DBPropertyType.LAND]
+
         try:
-            async with async_session() as db_session:
-                query = select(TenantProperty).where(
-                    TenantProperty.tenant_id == self.tenant_id,
-                    TenantProperty.is_active == True,
-                    TenantProperty.price >= min_price
-                )
-                
-                if session.property_type == PropertyCategory.RESIDENTIAL:
-                    query = query.where(TenantProperty.property_type.in_([
-                        DBPropertyType.APARTMENT, DBPropertyType.VILLA, DBPropertyType.PENTHOUSE
-                    ]))
-                elif session.property_type == PropertyCategory.COMMERCIAL:
-                    query = query.where(TenantProperty.property_type == DBPropertyType.COMMERCIAL)
-                elif session.property_type == PropertyCategory.LAND:
-                    query = query.where(TenantProperty.property_type == DBPropertyType.LAND)
-                
+            properties = await property_index.search(
+                self.tenant_id,
+                property_types=property_types,
+                min_price=min_price,
                 # Filter for Golden Visa when applicable
-                if session.visa_type == VisaType.GOLDEN_VISA:
-                    query = query.where(TenantProperty.golden_visa_eligible == True)
-                
-                query = query.limit(5)
-                result = await db_session.execute(query)
-                properties = result.scalars().all()
-                
-                return [self._property_to_dict(p) for p in properties]
-                
+                golden_visa_only=session.visa_type == VisaType.GOLDEN_VISA,
+                limit=5
+            )
+            return [self._property_to_dict(p) for p in properties]
+
         except Exception as e:
             logger.error(f"Error querying resid properties: {e}")
             return []
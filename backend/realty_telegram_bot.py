@@ -33,10 +33,10 @@ from translations_realty import (
     RealtyLanguage, get_translation, get_button_text
 )
 from database import (
-    TenantProperty, async_session, Tenant, Lead,
+    TenantProperty, Tenant, Lead,
     PropertyType as DBPropertyType, TransactionType
 )
-from sqlalchemy import select
+from property_index import property_index
 
 logger = logging.getLogger(__name__)
 
@@ -616,43 +616,35 @@ class RealtyTelegramBot:
 
     async def _query_properties(self, session: RealtySession, dict_transaction_type: TransactionType, is_residency: bool = False):
         try:
-            async with async_session() as db_session:
-                query = select(TenantProperty).where(
-                    TenantProperty.tenant_id == self.tenant_id,
-                    TenantProperty.is_active == True
-                )
-                
-                # Filters
-                if session.property_type:
-                    # Map to DB Enums
-                    pt_map = {
-                        PropertyCategory.RESIDENTIAL: [DBPropertyType.APARTMENT, DBPropertyType.VILLA, DBPropertyType.PENTHOUSE],
-                        PropertyCategory.COMMERCIAL: [DBPropertyType.COMMERCIAL],
-                        PropertyCategory.LAND: [DBPropertyType.LAND]
-                    }
-                    if session.property_type in pt_map:
-                         query = query.where(TenantProperty.property_type.in_(pt_map[session.property_type]))
-
-                if dict_transaction_type == TransactionType.RENT:
-                     query = query.where(TenantProperty.transaction_type == TransactionType.RENT)
-                     if session.budget_max:
-                         query = query.where(TenantProperty.price <= session.budget_max * 12)
-                
-                elif dict_transaction_type == TransactionType.BUY:
-                     query = query.where(TenantProperty.transaction_type == TransactionType.BUY)
-                     if session.budget_min: query = query.where(TenantProperty.price >= session.budget_min)
-                     if session.budget_max: query = query.where(TenantProperty.price <= session.budget_max)
-
-                # Residency specific
-                if is_residency:
-                     min_price = RESIDENCY_MINIMUMS.get(VisaType(session.visa_type), 750000)
-                     query = query.where(TenantProperty.price >= min_price)
-                     if session.visa_type == VisaType.GOLDEN_VISA:
-                         query = query.where(TenantProperty.golden_visa_eligible == True)
-
-                query = query.limit(5)
-                result = await db_session.execute(query)
-                return result.scalars().all()
+            filters: Dict[str, Any] = {"transaction_type": dict_transaction_type}
+
+            # Filters
+            if session.property_type:
+                # Map to DB Enums
+                pt_map = {
+                    PropertyCategory.RESIDENTIAL: [DBPropertyType.APARTMENT, DBPropertyType.VILLA, DBPropertyType.PENTHOUSE],
+                    PropertyCategory.COMMERCIAL: [DBPropertyType.COMMERCIAL],
+                    PropertyCategory.LAND: [DBPropertyType.LAND]
+                }
+                if session.property_type in pt_map:
+                    filters["property_types"] = pt_map[session.property_type]
+
+            if dict_transaction_type == TransactionType.RENT:
+                if session.budget_max:
+                    filters["max_price"] = session.budget_max * 12
+
+            elif dict_transaction_type == TransactionType.BUY:
+                filters["min_price"] = session.budget_min
+                filters["max_price"] = session.budget_max
+
+            # Residency specific
+            if is_residency:
+                min_price = RESIDENCY_MINIMUMS.get(VisaType(session.visa_type), 750000)
+                filters["min_price"] = max(min_price, filters.get("min_price") or 0)
+                if session.visa_type == VisaType.GOLDEN_VISA:
+                    filters["golden_visa_only"] = True
+
+            return await property_index.search(self.tenant_id, limit=5, **filters)
         except Exception as e:
             logger.error(f"DB Query Error: {e}")
             return []
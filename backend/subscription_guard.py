@@ -25,28 +25,81 @@ FEATURE_ACCESS = {
 }
 
 
-def check_subscription_active(tenant: Tenant) -> bool:
-    """Check if tenant's subscription is active"""
+# Usage limits per plan (free also covers trials)
+PLAN_LIMITS = {
+    "free": {
+        "max_leads": 100,
+        "max_messages_per_month": 1000,
+        "max_bot_instances": 1,
+        "max_followup_campaigns": 3,
+        "linkedin_scraper": False,
+        "advanced_analytics": False
+    },
+    "basic": {
+        "max_leads": 1000,
+        "max_messages_per_month": 10000,
+        "max_bot_instances": 2,
+        "max_followup_campaigns": 10,
+        "linkedin_scraper": False,
+        "advanced_analytics": False
+    },
+    "pro": {
+        "max_leads": 10000,
+        "max_messages_per_month": 100000,
+        "max_bot_instances": 10,
+        "max_followup_campaigns": 100,
+        "linkedin_scraper": True,
+        "advanced_analytics": True
+    },
+}
+
+# check_usage_limit resource type -> PLAN_LIMITS key
+RESOURCE_LIMITS = {
+    "leads": "max_leads",
+    "messages": "max_messages_per_month",
+    "bots": "max_bot_instances",
+    "campaigns": "max_followup_campaigns",
+}
+
+
+def subscription_active(
+    status: Optional[SubscriptionStatus],
+    trial_ends_at: Optional[datetime],
+    subscription_ends_at: Optional[datetime],
+    now: Optional[datetime] = None
+) -> bool:
+    """Whether a subscription in this state is usable right now"""
+    now = now or datetime.utcnow()
+    
     # Trial period
-    if tenant.subscription_status == SubscriptionStatus.TRIAL:  # type: ignore
-        if tenant.trial_ends_at:  # type: ignore
-            return datetime.utcnow() < tenant.trial_ends_at  # type: ignore
+    if status == SubscriptionStatus.TRIAL:
+        if trial_ends_at:
+            return now < trial_ends_at
         return True
     
     # Active subscription
-    if tenant.subscription_status == SubscriptionStatus.ACTIVE:  # type: ignore
-        if tenant.subscription_ends_at:  # type: ignore
-            return datetime.utcnow() < tenant.subscription_ends_at  # type: ignore
+    if status == SubscriptionStatus.ACTIVE:
+        if subscription_ends_at:
+            return now < subscription_ends_at
         return True
     
     # Cancelled but still in valid period
-    if tenant.subscription_status == SubscriptionStatus.CANCELLED:  # type: ignore
-        if tenant.subscription_ends_at:  # type: ignore
-            return datetime.utcnow() < tenant.subscription_ends_at  # type: ignore
+    if status == SubscriptionStatus.CANCELLED:
+        if subscription_ends_at:
+            return now < subscription_ends_at
     
     return False
 
 
+def check_subscription_active(tenant: Tenant) -> bool:
+    """Check if tenant's subscription is active"""
+    return subscription_active(
+        tenant.subscription_status,  # type: ignore
+        tenant.trial_ends_at,  # type: ignore
+        tenant.subscription_ends_at  # type: ignore
+    )
+
+
 def check_feature_access(tenant: Tenant, feature: str) -> bool:
     """
     Check if tenant has access to a specific feature.
@@ -118,37 +171,15 @@ def require_feature(feature: str):
     return decorator
 
 
+def plan_name(plan: Optional[SubscriptionPlan]) -> str:
+    """PLAN_LIMITS key for a plan (no plan = free)"""
+    value = plan.value if plan else "free"
+    return value if value in PLAN_LIMITS else "free"
+
+
 def get_plan_limits(tenant: Tenant) -> dict:
     """Get usage limits for tenant's plan"""
-    plan = tenant.subscription_plan.value if tenant.subscription_plan else "free"  # type: ignore
-    
-    if plan == "basic":
-        return {
-            "max_leads": 1000,
-            "max_messages_per_month": 10000,
-            "max_bot_instances": 2,
-            "max_followup_campaigns": 10,
-            "linkedin_scraper": False,
-            "advanced_analytics": False
-        }
-    elif plan == "pro":
-        return {
-            "max_leads": 10000,
-            "max_messages_per_month": 100000,
-            "max_bot_instances": 10,
-            "max_followup_campaigns": 100,
-            "linkedin_scraper": True,
-            "advanced_analytics": True
-        }
-    else:  # free/trial
-        return {
-            "max_leads": 100,
-            "max_messages_per_month": 1000,
-            "max_bot_instances": 1,
-            "max_followup_campaigns": 3,
-            "linkedin_scraper": False,
-            "advanced_analytics": False
-        }
+    return dict(PLAN_LIMITS[plan_name(tenant.subscription_plan)])  # type: ignore
 
 
 async def check_usage_limit(tenant: Tenant, resource_type: str, current_count: int) -> bool:
@@ -156,15 +187,7 @@ async def check_usage_limit(tenant: Tenant, resource_type: str, current_count: i
     Check if tenant has reached usage limit for a resource.
     Returns True if within limit, False if exceeded.
     """
-    limits = get_plan_limits(tenant)
-    
-    if resource_type == "leads":
-        return current_count < limits["max_leads"]
-    elif resource_type == "messages":
-        return current_count < limits["max_messages_per_month"]
-    elif resource_type == "bots":
-        return current_count < limits["max_bot_instances"]
-    elif resource_type == "campaigns":
-        return current_count < limits["max_followup_campaigns"]
-    
-    return True  # Unknown resource types are allowed
+    limit_key = RESOURCE_LIMITS.get(resource_type)
+    if limit_key is None:
+        return True  # Unknown resource types are allowed
+    return current_count < PLAN_LIMITS[plan_name(tenant.subscription_plan)][limit_key]  # type: ignore
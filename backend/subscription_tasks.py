@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from sqlalchemy import select, and_
 
 from database import async_session, Tenant, SubscriptionStatus
+from entitlements import entitlement_cache
 from email_service import (
     send_trial_ending_email,
     send_trial_expired_email
@@ -93,6 +94,8 @@ async def expire_trials():
         
         if expired_trials:
             await session.commit()
+            for tenant in expired_trials:
+                await entitlement_cache.invalidate(tenant.id)
             print(f"[TRIAL EXPIRY] Expired {len(expired_trials)} trials")
 
 
@@ -125,6 +128,8 @@ async def check_subscription_expiry():
         
         if expired_subscriptions:
             await session.commit()
+            for tenant in expired_subscriptions:
+                await entitlement_cache.invalidate(tenant.id)
             print(f"[SUBSCRIPTION EXPIRY] Expired {len(expired_subscriptions)} subscriptions")
 
 
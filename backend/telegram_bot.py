@@ -28,20 +28,23 @@ from telegram.ext import (
     filters
 )
 from sqlalchemy.future import select
+from sqlalchemy import func, or_
 
 from database import (
-    Tenant, Lead, AgentAvailability, get_tenant_by_bot_token, get_or_create_lead,
+    Tenant, Lead, AgentAvailability, get_or_create_lead,
     update_lead, ConversationState, book_slot, create_appointment,
     AppointmentType, async_session, Language, get_available_slots, DayOfWeek,
-    LeadStatus
+    LeadStatus, Purpose, in_message_turn
 )
-from brain import Brain, BrainResponse, process_telegram_message, process_voice_message
+from brain import BrainResponse, process_telegram_message, process_voice_message
+from brain_registry import brain_registry
 from redis_manager import redis_manager, init_redis, close_redis
 from context_recovery import save_context_to_redis, handle_user_message_with_recovery
 from inline_keyboards import edit_message_with_checkmark
 from lead_scoring import increment_engagement, update_lead_score
 from property_presenter import present_all_properties
 from realty_telegram_bot import RealtyTelegramBot
+from tenant_cache import tenant_cache
 
 # Configure logging
 logging.basicConfig(
@@ -50,6 +53,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Morning Coffee delivery: reports are spread over a window after 08:00 with bounded
+# concurrency, so all tenants don't hit Postgres and Telegram in the same second
+MORNING_REPORT_WINDOW_SECONDS = int(os.getenv("MORNING_REPORT_WINDOW_SECONDS", "1800"))
+MORNING_REPORT_CONCURRENCY = int(os.getenv("MORNING_REPORT_CONCURRENCY", "5"))
+
 # Enable DEBUG logging for telegram library to see all updates
 logging.getLogger('telegram').setLevel(logging.DEBUG)
 logging.getLogger('telegram.ext').setLevel(logging.DEBUG)
@@ -63,7 +71,7 @@ class TelegramBotHandler:
     
     def __init__(self, tenant: Tenant):
         self.tenant = tenant
-        self.brain = Brain(tenant)
+        self.brain = brain_registry.get(tenant)
         self.realty_bot = RealtyTelegramBot(tenant)
         self.application: Optional[Application] = None
     
@@ -356,6 +364,7 @@ class TelegramBotHandler:
                 logger.warning(f"⚠️ Admin ID not set for tenant {self.tenant.id}. Use /set_admin to configure.")
         # ===================================================
     
+    @in_message_turn
     async def handle_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command - Delegate to Realty Bot"""
         # We still create the lead in DB for tracking
@@ -418,6 +427,7 @@ class TelegramBotHandler:
             
         await self.realty_bot.handle_update(update, context)
     
+    @in_message_turn
     async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages - Delegate to Realty Bot"""
         # We still create the lead in DB for tracking
@@ -425,18 +435,12 @@ class TelegramBotHandler:
         
         await self.realty_bot.handle_update(update, context)
     
+    @in_message_turn
     async def handle_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle voice messages with slot filling protection."""
+        # Loaded fresh from the DB in this message turn - no separate refresh query needed
         lead = await self._get_or_create_lead(update)
         
-        # CRITICAL FIX #8: Refresh lead object - use fresh instance directly
-        async with async_session() as session:
-            result = await session.execute(select(Lead).where(Lead.id == lead.id))
-            fresh_lead = result.scalars().first()
-            if fresh_lead:
-                logger.info(f"🔄 Refreshed lead {lead.id}, state={fresh_lead.conversation_state}")
-                lead = fresh_lead  # Replace object reference
-        
         # ✅ REMOVED ZOMBIE STATE PROTECTION - Voice should ALWAYS be processed!
         # Voice transcript will be analyzed by brain's AI intent extraction
         
@@ -482,14 +486,11 @@ class TelegramBotHandler:
                 logger.info(f"✅ Brain processed voice transcript - extracted intents")
             
             # Update lead score (voice = high engagement)
-            async with async_session() as session:
-                result = await session.execute(select(Lead).where(Lead.id == lead.id))
-                db_lead = result.scalars().first()
-                if db_lead:
-                    db_lead.messages_count += 1  # Count voice as message
-                    update_lead_score(db_lead)  # Recalculate with voice bonus
-                    await session.commit()
-                    logger.info(f"📊 Updated lead score after voice: {db_lead.lead_score} ({db_lead.temperature})")
+            # Staged on the turn's lead, after Brain's changes, so the end-of-turn UPDATE keeps it
+            lead = await update_lead(lead.id, messages_count=(lead.messages_count or 0) + 1)  # Count voice as message
+            score, temperature = update_lead_score(lead)  # Recalculate with voice bonus
+            await update_lead(lead.id, lead_score=score, temperature=temperature)
+            logger.info(f"📊 Updated lead score after voice: {score} ({temperature})")
         
         # Save context to Redis after voice processing
         await save_context_to_redis(lead)
@@ -500,6 +501,7 @@ class TelegramBotHandler:
         
         await self._send_response(update, context, response, lead)
     
+    @in_message_turn
     async def handle_photo(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle photo messages - find similar properties OR handle unexpected photo during slot filling."""
         lead = await self._get_or_create_lead(update)
@@ -547,9 +549,7 @@ class TelegramBotHandler:
         
         # Send processing message
         lang = lead.language or Language.EN
-        from brain import Brain
-        brain = Brain(self.tenant)
-        processing_msg = brain.get_text("image_processing", lang)
+        processing_msg = self.brain.get_text("image_processing", lang)
         await update.message.reply_text(processing_msg)
         
         # Process through Brain
@@ -563,18 +563,12 @@ class TelegramBotHandler:
         
         await self._send_response(update, context, response, lead)
     
+    @in_message_turn
     async def handle_contact(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle shared contact (phone number)."""
+        # Loaded fresh from the DB in this message turn - no separate refresh query needed
         lead = await self._get_or_create_lead(update)
         
-        # CRITICAL FIX #8: Refresh lead object - use fresh instance directly
-        async with async_session() as session:
-            result = await session.execute(select(Lead).where(Lead.id == lead.id))
-            fresh_lead = result.scalars().first()
-            if fresh_lead:
-                logger.info(f"🔄 Refreshed lead {lead.id}, state={fresh_lead.conversation_state}")
-                lead = fresh_lead  # Replace object reference
-        
         contact = update.message.contact
         
         # Update lead with phone number
@@ -822,7 +816,7 @@ class TelegramBotHandler:
 
 # ==================== MORNING COFFEE REPORT ====================
 
-async def generate_daily_report(tenant_id: int) -> Dict[str, str]:
+async def generate_daily_report(tenant_id: int, language: Optional[Language] = None) -> Dict[str, str]:
     """
     Generate daily "Wolf Closer Morning Report" - NOT just stats, but ACTION LIST!
     
@@ -833,84 +827,84 @@ async def generate_daily_report(tenant_id: int) -> Dict[str, str]:
     - Direct call-to-action for agent
     
     This is a WEAPON, not a report.
+    
+    Counts come from a single COUNT query and only the top rows are fetched. Pass
+    `language` to render just that report (the scheduler sends one per tenant);
+    without it all four languages are returned.
     """
     try:
         async with async_session() as session:
             now = datetime.utcnow()
             yesterday = now - timedelta(days=1)
             
-            # Metric A: Count active conversations (updated in last 24h)
-            chat_result = await session.execute(
-                select(Lead).where(
+            # Metric A + C: active conversations (updated in last 24h) and new leads with phone
+            counts_result = await session.execute(
+                select(
+                    func.count().filter(Lead.updated_at >= yesterday),
+                    func.count().filter(Lead.phone.isnot(None), Lead.created_at >= yesterday)
+                ).where(
                     Lead.tenant_id == tenant_id,
-                    Lead.updated_at >= yesterday
+                    or_(Lead.updated_at >= yesterday, Lead.created_at >= yesterday)
                 )
             )
-            active_conversations = len(chat_result.scalars().all())
+            active_conversations, total_new_leads_count = counts_result.one()
             
             # Metric B: NEW STRATEGY - Get HOT LEADS (qualified + phone + not booked yet)
             hot_leads_result = await session.execute(
                 select(Lead).where(
                     Lead.tenant_id == tenant_id,
                     Lead.phone.isnot(None),  # Has phone
-                    Lead.status != ConversationState.VIEWING_SCHEDULED,  # Not booked yet = opportunity!
+                    Lead.status != LeadStatus.VIEWING_SCHEDULED,  # Not booked yet = opportunity!
                     Lead.budget_max.isnot(None),  # Budget qualified
                     Lead.updated_at >= yesterday  # Active in last 24h
                 ).order_by(Lead.budget_max.desc()).limit(10)  # Top 10 by budget
             )
             hot_leads_list = hot_leads_result.scalars().all()
             
-            # Metric C: Count total new leads with phone (for stats)
-            total_leads_result = await session.execute(
-                select(Lead).where(
-                    Lead.tenant_id == tenant_id,
-                    Lead.phone.isnot(None),
-                    Lead.created_at >= yesterday
-                )
-            )
-            total_new_leads_count = len(total_leads_result.scalars().all())
-            
             # Metric D: Find DIAMOND lead (highest budget or Golden Visa seeker)
             diamond_result = await session.execute(
                 select(Lead).where(
                     Lead.tenant_id == tenant_id,
                     Lead.created_at >= yesterday,
                     ((Lead.purpose == Purpose.RESIDENCY) | (Lead.budget_max >= 2000000))  # Golden Visa or 2M+
-                ).order_by(Lead.budget_max.desc())
+                ).order_by(Lead.budget_max.desc()).limit(1)
             )
-            diamond_leads = diamond_result.scalars().all()
-            
-            # Generate highlight message
-            highlight_msg_en = highlight_msg_fa = highlight_msg_ar = highlight_msg_ru = ""
-            if diamond_leads:
-                lead = diamond_leads[0]
-                budget_str = f"{lead.budget_max:,.0f} AED" if lead.budget_max else "High"
-                if lead.purpose == Purpose.RESIDENCY:
-                    highlight_msg_en = f"🛂 Golden Visa seeker (Budget: {budget_str})!"
-                    highlight_msg_fa = f"🛂 خریدار گلدن ویزا (بودجه: {budget_str})!"
-                    highlight_msg_ar = f"🛂 باحث عن التأشيرة الذهبية (الميزانية: {budget_str})!"
-                    highlight_msg_ru = f"🛂 Ищет Golden Visa (Бюджет: {budget_str})!"
-                else:
-                    highlight_msg_en = f"💎 High-value investor ({budget_str})!"
-                    highlight_msg_fa = f"💎 سرمایه‌گذار VIP ({budget_str})!"
-                    highlight_msg_ar = f"💎 مستثمر كبير ({budget_str})!"
-                    highlight_msg_ru = f"💎 Крупный инвестор ({budget_str})!"
+            diamond_lead = diamond_result.scalars().first()
+        
+        # Generate highlight message
+        if diamond_lead:
+            budget_str = f"{diamond_lead.budget_max:,.0f} AED" if diamond_lead.budget_max else "High"
+            if diamond_lead.purpose == Purpose.RESIDENCY:
+                highlights = {
+                    Language.EN: f"🛂 Golden Visa seeker (Budget: {budget_str})!",
+                    Language.FA: f"🛂 خریدار گلدن ویزا (بودجه: {budget_str})!",
+                    Language.AR: f"🛂 باحث عن التأشيرة الذهبية (الميزانية: {budget_str})!",
+                    Language.RU: f"🛂 Ищет Golden Visa (Бюджет: {budget_str})!",
+                }
             else:
-                highlight_msg_en = "✨ Quality leads incoming - keep the pipeline hot!"
-                highlight_msg_fa = "✨ لید‌های با کیفیت در راهند - خط رو گرم نگه دار!"
-                highlight_msg_ar = "✨ عملاء جيدون قادمون - حافظ على الخط ساخنًا!"
-                highlight_msg_ru = "✨ Качественные лиды на подходе - держи воронку горячей!"
-            
-            # Generate multilingual weaponized reports
-            reports = {
-                Language.EN.value: generate_wolf_report_en(active_conversations, total_new_leads_count, hot_leads_list, highlight_msg_en),
-                Language.FA.value: generate_wolf_report_fa(active_conversations, total_new_leads_count, hot_leads_list, highlight_msg_fa),
-                Language.AR.value: generate_wolf_report_ar(active_conversations, total_new_leads_count, hot_leads_list, highlight_msg_ar),
-                Language.RU.value: generate_wolf_report_ru(active_conversations, total_new_leads_count, hot_leads_list, highlight_msg_ru),
+                highlights = {
+                    Language.EN: f"💎 High-value investor ({budget_str})!",
+                    Language.FA: f"💎 سرمایه‌گذار VIP ({budget_str})!",
+                    Language.AR: f"💎 مستثمر كبير ({budget_str})!",
+                    Language.RU: f"💎 Крупный инвестор ({budget_str})!",
+                }
+        else:
+            highlights = {
+                Language.EN: "✨ Quality leads incoming - keep the pipeline hot!",
+                Language.FA: "✨ لید‌های با کیفیت در راهند - خط رو گرم نگه دار!",
+                Language.AR: "✨ عملاء جيدون قادمون - حافظ على الخط ساخنًا!",
+                Language.RU: "✨ Качественные лиды на подходе - держи воронку горячей!",
             }
-            
-            logger.info(f"[Wolf Report] Generated for tenant {tenant_id}: {active_conversations} chats, {len(hot_leads_list)} hot leads")
-            return reports
+        
+        # Generate multilingual weaponized reports (only the requested one when given)
+        languages = [language if language in WOLF_REPORT_GENERATORS else Language.EN] if language else list(WOLF_REPORT_GENERATORS)
+        reports = {
+            lang.value: WOLF_REPORT_GENERATORS[lang](active_conversations, total_new_leads_count, hot_leads_list, highlights[lang])
+            for lang in languages
+        }
+        
+        logger.info(f"[Wolf Report] Generated for tenant {tenant_id}: {active_conversations} chats, {len(hot_leads_list)} hot leads")
+        return reports
     
     except Exception as e:
         logger.error(f"[Wolf Report] Error generating report for tenant {tenant_id}: {e}")
@@ -1033,6 +1027,14 @@ def generate_wolf_report_ru(chat_count: int, total_leads: int, hot_leads: list,
 """
 
 
+WOLF_REPORT_GENERATORS = {
+    Language.EN: generate_wolf_report_en,
+    Language.FA: generate_wolf_report_fa,
+    Language.AR: generate_wolf_report_ar,
+    Language.RU: generate_wolf_report_ru,
+}
+
+
 # ==================== BOT MANAGER ====================
 
 class BotManager:
@@ -1080,6 +1082,9 @@ class BotManager:
         """
         Send Morning Coffee Reports to all tenants who have admin_chat_id set.
         This is called daily at 08:00 AM by the scheduler.
+        
+        Tenants get evenly spaced start times across MORNING_REPORT_WINDOW_SECONDS and at
+        most MORNING_REPORT_CONCURRENCY reports are generated/sent at once.
         """
         try:
             logger.info("[Morning Coffee] Starting morning report generation for all tenants...")
@@ -1087,7 +1092,7 @@ class BotManager:
             # Query all tenants with admin_chat_id set
             async with async_session() as session:
                 result = await session.execute(
-                    select(Tenant).where(Tenant.admin_chat_id.isnot(None))
+                    select(Tenant).where(Tenant.admin_chat_id.isnot(None)).order_by(Tenant.id)
                 )
                 tenants_with_admin = result.scalars().all()
             
@@ -1097,45 +1102,50 @@ class BotManager:
             
             logger.info(f"[Morning Coffee] Found {len(tenants_with_admin)} tenants to send reports to")
             
-            # Send report to each tenant
-            for tenant in tenants_with_admin:
-                try:
-                    # Generate report for this tenant
-                    reports = await generate_daily_report(tenant.id)
-                    
-                    if not reports:
-                        logger.warning(f"[Morning Coffee] No report generated for tenant {tenant.id}")
-                        continue
-                    
-                    # Get tenant's language preference (default to English)
-                    tenant_lang = (tenant.language or Language.EN).value if hasattr(tenant, 'language') else "en"
-                    report_text = reports.get(tenant_lang, reports.get("en", ""))
-                    
-                    if not report_text:
-                        logger.warning(f"[Morning Coffee] No report text available for tenant {tenant.id}")
-                        continue
-                    
-                    # Send report via Telegram
-                    if tenant.id in self.bots and self.bots[tenant.id].application:
-                        try:
-                            await self.bots[tenant.id].application.bot.send_message(
-                                chat_id=int(tenant.admin_chat_id),
-                                text=report_text,
-                                parse_mode="HTML"
-                            )
-                            logger.info(f"✅ [Morning Coffee] Report sent to tenant {tenant.id} ({tenant.name})")
-                        
-                        except Exception as e:
-                            logger.error(f"❌ [Morning Coffee] Failed to send report to tenant {tenant.id}: {e}")
-                    else:
-                        logger.warning(f"[Morning Coffee] Bot not running for tenant {tenant.id}")
-                
-                except Exception as e:
-                    logger.error(f"❌ [Morning Coffee] Error processing tenant {tenant.id}: {e}")
+            semaphore = asyncio.Semaphore(max(MORNING_REPORT_CONCURRENCY, 1))
+            spacing = MORNING_REPORT_WINDOW_SECONDS / len(tenants_with_admin)
+            await asyncio.gather(*[
+                self._send_morning_coffee_report(tenant, delay=i * spacing, semaphore=semaphore)
+                for i, tenant in enumerate(tenants_with_admin)
+            ])
+            logger.info(f"✅ [Morning Coffee] Finished reports for {len(tenants_with_admin)} tenants")
         
         except Exception as e:
             logger.error(f"❌ [Morning Coffee] Fatal error in send_morning_coffee_reports: {e}")
     
+    async def _send_morning_coffee_report(self, tenant: Tenant, delay: float, semaphore: asyncio.Semaphore):
+        """Generate and send one tenant's report in its language, after its slot delay."""
+        await asyncio.sleep(delay)
+        async with semaphore:
+            try:
+                if tenant.id not in self.bots or not self.bots[tenant.id].application:
+                    logger.warning(f"[Morning Coffee] Bot not running for tenant {tenant.id}")
+                    return
+                
+                # Only the tenant's language (default to English) is rendered
+                tenant_lang = tenant.default_language or Language.EN
+                reports = await generate_daily_report(tenant.id, language=tenant_lang)
+                report_text = reports.get(tenant_lang.value) or reports.get(Language.EN.value, "")
+                
+                if not report_text:
+                    logger.warning(f"[Morning Coffee] No report generated for tenant {tenant.id}")
+                    return
+                
+                # Send report via Telegram
+                try:
+                    await self.bots[tenant.id].application.bot.send_message(
+                        chat_id=int(tenant.admin_chat_id),
+                        text=report_text,
+                        parse_mode="HTML"
+                    )
+                    logger.info(f"✅ [Morning Coffee] Report sent to tenant {tenant.id} ({tenant.name})")
+                
+                except Exception as e:
+                    logger.error(f"❌ [Morning Coffee] Failed to send report to tenant {tenant.id}: {e}")
+            
+            except Exception as e:
+                logger.error(f"❌ [Morning Coffee] Error processing tenant {tenant.id}: {e}")
+    
     async def start_bot_for_tenant(self, tenant: Tenant):
         """Start a bot for a specific tenant."""
         if tenant.id in self.bots:
@@ -1209,8 +1219,8 @@ async def handle_telegram_webhook(token: str, update_data: dict):
     Handle incoming Telegram webhook update.
     This is called from the FastAPI endpoint.
     """
-    # Get tenant by token
-    tenant = await get_tenant_by_bot_token(token)
+    # Get tenant by token (cached - no DB hit in the common case)
+    tenant = await tenant_cache.get_by_bot_token(token)
     if not tenant:
         logger.error(f"Unknown bot token: {token[:10]}...")
         return
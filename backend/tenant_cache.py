@@ -0,0 +1,232 @@
+"""
+Tenant Resolution Cache
+In-process cache for webhook routing (bot token / WhatsApp phone_number_id / tenant id → Tenant)
+
+Every inbound Telegram/WhatsApp/Waha message needs its tenant. Tenants change rarely,
+so they are cached per worker with a TTL and invalidated explicitly by the tenant
+create/update/delete endpoints. Invalidations are broadcast over Redis pub/sub so
+all workers drop their copy.
+"""
+
+import os
+import uuid
+import time
+import json
+import asyncio
+import logging
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable, List
+
+import redis.asyncio as redis
+
+from database import Tenant, get_tenant_by_id, get_tenant_by_bot_token, get_tenant_by_whatsapp_phone_id
+from redis_manager import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD
+
+logger = logging.getLogger(__name__)
+
+# Cache Configuration
+TENANT_CACHE_TTL_SECONDS = int(os.getenv("TENANT_CACHE_TTL_SECONDS", "300"))
+INVALIDATION_CHANNEL = "tenant_cache:invalidate"
+
+# Alias kinds (secondary keys that point to a tenant id)
+BOT_TOKEN = "bot_token"
+WHATSAPP_PHONE_ID = "whatsapp_phone_id"
+
+InvalidationCallback = Callable[[Optional[int]], Any]
+
+
+class TenantCache:
+    """Per-worker tenant cache keyed by tenant id, with bot token / phone_number_id aliases."""
+
+    def __init__(self, ttl_seconds: int = TENANT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._tenants: Dict[int, Tuple[Tenant, float]] = {}  # tenant_id -> (tenant, expires_at)
+        self._aliases: Dict[Tuple[str, str], int] = {}  # (kind, value) -> tenant_id
+        self._callbacks: List[InvalidationCallback] = []
+        self._redis: Optional[redis.Redis] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._origin = uuid.uuid4().hex  # lets the listener skip this worker's own broadcasts
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ---------- lookups ----------
+
+    async def get_by_id(self, tenant_id: int) -> Optional[Tenant]:
+        """Get tenant by id (cached)."""
+        tenant = self._get_fresh(tenant_id)
+        if tenant is not None:
+            self.hits += 1
+            return tenant
+
+        self.misses += 1
+        tenant = await get_tenant_by_id(tenant_id)
+        if tenant:
+            self._store(tenant)
+        return tenant
+
+    async def get_by_bot_token(self, token: str) -> Optional[Tenant]:
+        """Get tenant by Telegram bot token (cached)."""
+        return await self._get_by_alias(BOT_TOKEN, token, get_tenant_by_bot_token)
+
+    async def get_by_whatsapp_phone_id(self, phone_number_id: str) -> Optional[Tenant]:
+        """Get tenant by WhatsApp phone_number_id (cached)."""
+        return await self._get_by_alias(WHATSAPP_PHONE_ID, phone_number_id, get_tenant_by_whatsapp_phone_id)
+
+    async def _get_by_alias(
+        self,
+        kind: str,
+        value: str,
+        loader: Callable[[str], Awaitable[Optional[Tenant]]]
+    ) -> Optional[Tenant]:
+        tenant_id = self._aliases.get((kind, value))
+        if tenant_id is not None:
+            tenant = self._get_fresh(tenant_id)
+            # Alias may be stale if the token/phone id was changed on the tenant
+            if tenant is not None and self._alias_value(tenant, kind) == value:
+                self.hits += 1
+                return tenant
+            self._aliases.pop((kind, value), None)
+
+        self.misses += 1
+        tenant = await loader(value)
+        if tenant:
+            self._store(tenant)
+        return tenant
+
+    def _get_fresh(self, tenant_id: int) -> Optional[Tenant]:
+        entry = self._tenants.get(tenant_id)
+        if entry is None:
+            return None
+        tenant, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._drop(tenant_id)
+            return None
+        return tenant
+
+    @staticmethod
+    def _alias_value(tenant: Tenant, kind: str) -> Optional[str]:
+        if kind == BOT_TOKEN:
+            return tenant.telegram_bot_token
+        if kind == WHATSAPP_PHONE_ID:
+            return tenant.whatsapp_phone_number_id
+        return None
+
+    def _store(self, tenant: Tenant):
+        self._tenants[tenant.id] = (tenant, time.monotonic() + self.ttl_seconds)
+        for kind in (BOT_TOKEN, WHATSAPP_PHONE_ID):
+            value = self._alias_value(tenant, kind)
+            if value:
+                self._aliases[(kind, value)] = tenant.id
+
+    def _drop(self, tenant_id: int):
+        self._tenants.pop(tenant_id, None)
+        for key in [k for k, v in self._aliases.items() if v == tenant_id]:
+            del self._aliases[key]
+
+    # ---------- invalidation ----------
+
+    def on_invalidate(self, callback: InvalidationCallback):
+        """
+        Register a callback run on every invalidation (local or from another worker).
+        Receives the tenant id, or None when the whole cache was cleared.
+        """
+        self._callbacks.append(callback)
+
+    def invalidate_local(self, tenant_id: Optional[int] = None):
+        """Drop one tenant (or everything) from this worker's cache."""
+        if tenant_id is None:
+            self._tenants.clear()
+            self._aliases.clear()
+        else:
+            self._drop(tenant_id)
+        self.invalidations += 1
+
+        for callback in self._callbacks:
+            try:
+                callback(tenant_id)
+            except Exception as e:
+                logger.error(f"❌ Tenant cache invalidation callback failed: {e}")
+
+    async def invalidate(self, tenant_id: Optional[int] = None):
+        """Invalidate a tenant on this worker and broadcast to all other workers."""
+        self.invalidate_local(tenant_id)
+
+        if not self._redis:
+            return
+        try:
+            await self._redis.publish(INVALIDATION_CHANNEL, json.dumps({"tenant_id": tenant_id, "origin": self._origin}))
+        except Exception as e:
+            # Other workers still converge within TENANT_CACHE_TTL_SECONDS
+            logger.warning(f"⚠️ Failed to broadcast tenant cache invalidation: {e}")
+
+    async def start_listener(self):
+        """Connect to Redis and listen for invalidations from other workers."""
+        if self._listener_task:
+            return
+        try:
+            self._redis = redis.Redis(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                password=REDIS_PASSWORD,
+                decode_responses=True,
+                socket_connect_timeout=5
+            )
+            await self._redis.ping()
+        except Exception as e:
+            logger.warning(f"⚠️ Tenant cache running without cross-worker invalidation (Redis unavailable: {e})")
+            self._redis = None
+            return
+
+        self._listener_task = asyncio.create_task(self._listen())
+        logger.info("✅ Tenant cache invalidation listener started")
+
+    async def stop_listener(self):
+        """Stop the invalidation listener and close Redis."""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+    async def _listen(self):
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                except (ValueError, TypeError):
+                    logger.warning(f"⚠️ Ignoring malformed tenant cache message: {message.get('data')}")
+                    continue
+                if data.get("origin") == self._origin:
+                    continue
+                self.invalidate_local(data.get("tenant_id"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Tenant cache listener stopped: {e}")
+        finally:
+            await pubsub.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "cached_tenants": len(self._tenants),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "cross_worker": self._listener_task is not None,
+        }
+
+
+# Global instance
+tenant_cache = TenantCache()
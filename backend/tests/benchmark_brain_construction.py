@@ -0,0 +1,96 @@
+"""
+🧠 Brain Construction Benchmark
+Per-message cost of getting a Brain, before and after the Brain registry:
+
+- legacy: Brain(tenant) building its own GeminiClient (re-read the keys, called
+  genai.configure, instantiated the GenerativeModel) - what every message paid
+- Brain(tenant) on the shared client pool (get_gemini_client)
+- brain_registry.get(tenant) - what the message handlers do now
+
+Also checks that one shared Brain keeps per-message state (tenant_context,
+current_properties) apart for concurrent messages.
+
+No database or network needed - a dummy API key is configured (building a model
+makes no API call) and tenants are in-memory Tenant objects.
+
+Run: python backend/tests/benchmark_brain_construction.py
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+# Dummy key so GeminiClient does its full setup; never used for a request
+os.environ.setdefault("GEMINI_API_KEY", "AIza" + "0" * 35)
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import Tenant
+import unified_database  # noqa: F401 - registers the models Tenant relationships point to
+from brain import Brain, BRAIN_MODEL_NAME
+from brain_registry import brain_registry
+import google.generativeai as genai
+from utils.gemini_utils import GEMINI_SAFETY_SETTINGS, get_gemini_api_keys, get_random_api_key
+
+ROUNDS = 2_000
+TENANT_COUNT = 20
+
+
+def legacy_brain(tenant: Tenant) -> Brain:
+    """What each message paid before: a Brain whose own GeminiClient re-read the keys,
+    called genai.configure and built a GenerativeModel."""
+    brain = Brain(tenant)
+    get_gemini_api_keys()
+    genai.configure(api_key=get_random_api_key())
+    genai.GenerativeModel(model_name=BRAIN_MODEL_NAME, safety_settings=GEMINI_SAFETY_SETTINGS)
+    return brain
+
+
+def timed(label: str, build, tenants) -> float:
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        build(tenants[i % len(tenants)])
+    per_call_us = (time.perf_counter() - start) / ROUNDS * 1_000_000
+    print(f"{label:<34}{per_call_us:>12.1f}")
+    return per_call_us
+
+
+async def check_turn_isolation(tenant: Tenant):
+    """Two concurrent messages on one shared Brain must not see each other's state."""
+    brain = brain_registry.get(tenant)
+
+    async def message(lead_id: int):
+        brain.begin_turn()
+        brain.tenant_context = {"lead": lead_id}
+        brain.current_properties = [{"id": lead_id}]
+        await asyncio.sleep(0.01)  # let the other message run in between
+        return brain.tenant_context["lead"], brain.current_properties[0]["id"]
+
+    results = await asyncio.gather(*(asyncio.create_task(message(lead_id)) for lead_id in range(10)))
+    assert results == [(lead_id, lead_id) for lead_id in range(10)], results
+
+
+def run_benchmark():
+    # Constructors log at INFO on every call
+    logging.disable(logging.INFO)
+    tenants = [Tenant(id=i, name=f"Agency {i}") for i in range(1, TENANT_COUNT + 1)]
+
+    print(f"🧠 Getting a Brain per message ({ROUNDS:,} messages over {TENANT_COUNT} tenants)")
+    print(f"{'':<34}{'µs/message':>12}")
+    legacy_us = timed("legacy (own GeminiClient)", legacy_brain, tenants)
+    shared_us = timed("Brain() on shared client pool", Brain, tenants)
+    registry_us = timed("brain_registry.get()", brain_registry.get, tenants)
+    print(f"Speedup vs legacy: {legacy_us / shared_us:.0f}x (shared pool), {legacy_us / registry_us:.0f}x (registry)")
+
+    assert brain_registry.get(tenants[0]) is brain_registry.get(tenants[0])
+    assert brain_registry.get(tenants[0]).gemini_client is brain_registry.get(tenants[1]).gemini_client
+    asyncio.run(check_turn_isolation(tenants[0]))
+    print(f"✅ One Brain per tenant, one Gemini client per model, per-message state isolated ({brain_registry.stats()})")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,146 @@
+"""
+📊 Dashboard Stats Benchmark
+Compares dashboard_stats.py (sums of lead_daily_rollups rows) with the previous
+implementation (load every Lead row, then count in Python) for a tenant with 100k leads,
+and times the full rollup rebuild used for backfills.
+
+Uses DATABASE_URL when it is set (point it at a scratch Postgres database - rows are
+inserted into the leads table), otherwise a throwaway SQLite file.
+
+Run: python backend/tests/benchmark_dashboard_stats.py [lead_count]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.gettempdir(), "benchmark_dashboard_stats.db")
+    if os.path.exists(_db_file):
+        os.remove(_db_file)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+    os.environ.setdefault("DB_POOL_SIZE", "0")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, insert
+
+from database import engine, async_session, Base, Tenant, Lead, LeadStatus, Purpose
+import unified_database  # noqa: F401 - registers the models Tenant relationships point to
+from dashboard_stats import compute_dashboard_stats
+from lead_rollups import lead_rollups
+
+LEAD_COUNT = 100_000
+INSERT_BATCH = 5_000
+ROUNDS = 5
+
+
+async def legacy_dashboard_stats(session, tenant_id: int) -> dict:
+    """The pre-aggregate implementation, kept here as the reference."""
+    result = await session.execute(select(Lead).where(Lead.tenant_id == tenant_id))
+    leads = result.scalars().all()
+
+    total_leads = len(leads)
+    active_deals = sum(1 for l in leads if l.status in [LeadStatus.NEGOTIATING, LeadStatus.VIEWING_SCHEDULED])
+    qualified_leads = sum(1 for l in leads if l.status == LeadStatus.QUALIFIED)
+    scheduled_viewings = sum(1 for l in leads if l.status == LeadStatus.VIEWING_SCHEDULED)
+    closed_won = sum(1 for l in leads if l.status == LeadStatus.CLOSED_WON)
+    conversion_rate = (closed_won / total_leads * 100) if total_leads > 0 else 0
+
+    leads_by_status = {}
+    for status in LeadStatus:
+        count = sum(1 for l in leads if l.status == status)
+        if count > 0:
+            leads_by_status[status.value] = count
+
+    leads_by_purpose = {}
+    for purpose in Purpose:
+        count = sum(1 for l in leads if l.purpose == purpose)
+        if count > 0:
+            leads_by_purpose[purpose.value] = count
+
+    return {
+        "total_leads": total_leads,
+        "active_deals": active_deals,
+        "qualified_leads": qualified_leads,
+        "scheduled_viewings": scheduled_viewings,
+        "conversion_rate": round(conversion_rate, 1),
+        "leads_by_status": leads_by_status,
+        "leads_by_purpose": leads_by_purpose,
+    }
+
+
+async def seed(lead_count: int) -> int:
+    """Create a tenant with lead_count leads spread over every status/purpose."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        tenant = Tenant(name="Benchmark Realty", email=f"bench-{time.time_ns()}@example.com")
+        session.add(tenant)
+        await session.commit()
+        tenant_id = tenant.id
+
+    rng = random.Random(42)
+    statuses = list(LeadStatus)
+    purposes = list(Purpose) + [None]
+    for start in range(0, lead_count, INSERT_BATCH):
+        rows = [
+            {
+                "tenant_id": tenant_id,
+                "name": f"Lead {i}",
+                "status": rng.choice(statuses),
+                "purpose": rng.choice(purposes),
+            }
+            for i in range(start, min(start + INSERT_BATCH, lead_count))
+        ]
+        async with async_session() as session:
+            await session.execute(insert(Lead), rows)
+            await session.commit()
+    return tenant_id
+
+
+async def timed(fn, tenant_id: int):
+    timings = []
+    result = None
+    for _ in range(ROUNDS):
+        async with async_session() as session:
+            start = time.perf_counter()
+            result = await fn(session, tenant_id)
+            timings.append((time.perf_counter() - start) * 1000)
+    return result, min(timings), sum(timings) / len(timings)
+
+
+async def run_benchmark(lead_count: int = LEAD_COUNT):
+    print(f"Seeding {lead_count:,} leads ({engine.url.get_backend_name()})...")
+    tenant_id = await seed(lead_count)
+
+    try:
+        # Bulk-inserted rows bypass the incremental hooks - backfill like a deployment would
+        start = time.perf_counter()
+        rollup_rows = await lead_rollups.rebuild(tenant_id)
+        rebuild_ms = (time.perf_counter() - start) * 1000
+
+        legacy, legacy_best, legacy_avg = await timed(legacy_dashboard_stats, tenant_id)
+        rollup, rollup_best, rollup_avg = await timed(compute_dashboard_stats, tenant_id)
+    finally:
+        await engine.dispose()
+
+    print(f"\nRollup rebuild: {rebuild_ms:.1f} ms ({rollup_rows} rollup rows)")
+    print(f"\n{'implementation':<22}{'best ms':>12}{'avg ms':>12}")
+    print(f"{'load + Python count':<22}{legacy_best:>12.1f}{legacy_avg:>12.1f}")
+    print(f"{'rollup read':<22}{rollup_best:>12.1f}{rollup_avg:>12.1f}")
+    print(f"\nSpeedup (best): {legacy_best / rollup_best:.1f}x")
+
+    assert rollup == legacy, f"Results differ:\n{rollup}\n{legacy}"
+    print("✅ Rollup matches the row-by-row result")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else LEAD_COUNT
+    asyncio.run(run_benchmark(count))
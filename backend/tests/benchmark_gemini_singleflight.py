@@ -0,0 +1,131 @@
+"""
+🛬 Gemini Request Coalescing Benchmark
+Upstream Gemini calls for bursts of concurrent requests, with and without request
+coalescing in GeminiClient.generate_content_async.
+
+100 callers send the same prompt at once (a follow-up batch, the LinkedIn message
+endpoint under load, many users asking the same FAQ). Gemini is a local stub that
+answers after STUB_LATENCY_SECONDS, so without coalescing every caller pays for its own
+call. Also checks that:
+
+- different prompts are not coalesced
+- an upstream error reaches every waiting caller, and the next request calls again
+- a caller that gives up (cancelled) doesn't cancel the call for the others
+- prompts with an LLM cache key are coalesced on the key
+
+No database or Redis needed.
+
+Run: python backend/tests/benchmark_gemini_singleflight.py
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.gemini_utils import GeminiClient, GeminiKeyPool, gemini_call_log
+
+STUB_LATENCY_SECONDS = 0.2
+CONCURRENCY = 100
+
+PROMPT = "Write a short follow-up for a lead interested in Dubai Marina apartments."
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiClient(GeminiClient):
+    """GeminiClient whose upstream calls never leave the process"""
+
+    def __init__(self, coalesce: bool = True, fail: bool = False):
+        super().__init__(model_name="stub", key_pool=GeminiKeyPool([]), coalesce=coalesce)
+        self.requests = 0
+        self.fail = fail
+
+    async def _generate_with_retries(self, contents, max_retries, **kwargs):
+        self.requests += 1
+        await asyncio.sleep(STUB_LATENCY_SECONDS)
+        if self.fail:
+            raise RuntimeError("stub upstream error")
+        return StubResponse(f"answer #{self.requests} to {contents}")
+
+
+async def burst(client: GeminiClient, prompts, **kwargs):
+    """(results, seconds) for all prompts sent at once"""
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(client.generate_content_async(prompt, **kwargs) for prompt in prompts), return_exceptions=True
+    )
+    return results, time.perf_counter() - started
+
+
+def run_benchmark():
+    logging.disable(logging.WARNING)
+
+    async def main():
+        print(f"🛬 {CONCURRENCY} concurrent requests, stub Gemini at {STUB_LATENCY_SECONDS}s")
+        print(f"{'case':<40}{'upstream calls':>16}{'seconds':>10}")
+
+        # Identical prompts, coalescing off and on
+        for label, coalesce in (("identical, no coalescing", False), ("identical, coalesced", True)):
+            client = StubGeminiClient(coalesce=coalesce)
+            results, seconds = await burst(client, [PROMPT] * CONCURRENCY)
+            print(f"{label:<40}{client.requests:>16}{seconds:>10.2f}")
+            assert all(isinstance(r, StubResponse) for r in results)
+            if coalesce:
+                assert client.requests == 1, client.requests
+                assert len({r.text for r in results}) == 1
+                assert client.stats() == {"upstream_calls": 1, "coalesced": CONCURRENCY - 1, "in_flight": 0}
+            else:
+                assert client.requests == CONCURRENCY, client.requests
+
+        # Different prompts: one call each
+        client = StubGeminiClient()
+        results, seconds = await burst(client, [f"{PROMPT} #{i}" for i in range(CONCURRENCY)])
+        print(f"{'distinct prompts, coalesced':<40}{client.requests:>16}{seconds:>10.2f}")
+        assert client.requests == CONCURRENCY, client.requests
+
+        # An upstream error reaches every waiting caller; nothing is remembered afterwards
+        client = StubGeminiClient(fail=True)
+        results, seconds = await burst(client, [PROMPT] * CONCURRENCY)
+        print(f"{'identical, upstream error':<40}{client.requests:>16}{seconds:>10.2f}")
+        assert client.requests == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        client.fail = False
+        response = await client.generate_content_async(PROMPT)
+        assert client.requests == 2 and isinstance(response, StubResponse)
+
+        # The caller that started the call gives up: the others still get the answer
+        client = StubGeminiClient()
+        with gemini_call_log() as calls:
+            first = asyncio.ensure_future(client.generate_content_async(PROMPT))
+            await asyncio.sleep(0)
+            others = [asyncio.ensure_future(client.generate_content_async(PROMPT)) for _ in range(CONCURRENCY - 1)]
+            await asyncio.sleep(0)
+            first.cancel()
+            results = await asyncio.gather(*others)
+        assert first.cancelled() and client.requests == 1
+        assert all(isinstance(r, StubResponse) for r in results)
+        assert len(calls) == 1, calls  # the one upstream call, logged once
+        print(f"{'identical, first caller cancelled':<40}{client.requests:>16}{'':>10}")
+
+        # Same LLM cache key, differently worded prompts: one call
+        client = StubGeminiClient()
+        prompts = [f"What is golden visa{'?' * (i % 3)}" for i in range(CONCURRENCY)]
+        results, seconds = await burst(client, prompts, cache_key=f"singleflight-{time.time_ns()}")
+        print(f"{'same cache key, coalesced':<40}{client.requests:>16}{seconds:>10.2f}")
+        assert client.requests == 1, client.requests
+
+        print(f"\n✅ {CONCURRENCY} identical concurrent requests -> 1 upstream Gemini call")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,185 @@
+"""
+📚 Knowledge Answer Benchmark
+Reply time for FAQ questions answered straight from the tenant's knowledge base
+(knowledge_answers.py) versus questions that still need Gemini.
+
+New leads of one tenant ask questions through Brain.process_message: some name exactly
+one knowledge entry (answered from the entry, with follow-up buttons), others match
+several entries or ask more than an entry says (ambiguous - Gemini answers). Gemini is a
+local stub that answers after STUB_LATENCY_SECONDS. A follow-up button is clicked at the
+end; it is answered from the knowledge base too.
+
+Uses DATABASE_URL when it is set (point it at a scratch Postgres database - a tenant,
+leads and knowledge entries are inserted), otherwise a throwaway SQLite file.
+
+Run: python backend/tests/benchmark_knowledge_answers.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.gettempdir(), "benchmark_knowledge_answers.db")
+    if os.path.exists(_db_file):
+        os.remove(_db_file)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+    os.environ.setdefault("DB_POOL_SIZE", "0")
+
+# Dummy key so the shared GeminiClient Brain builds is set up; the benchmark swaps in a stub
+os.environ.setdefault("GEMINI_API_KEY", "AIza" + "0" * 35)
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import (
+    engine, async_session, Base, Tenant, Lead, TenantKnowledge, ConversationState, Language
+)
+import unified_database  # noqa: F401 - registers the models Tenant relationships point to
+from brain import Brain
+from knowledge_answers import knowledge_answerer, KNOWLEDGE_CALLBACK_PREFIX
+from llm_cache import llm_response_cache
+from utils.gemini_utils import GeminiClient, GeminiKeyPool
+
+STUB_LATENCY_SECONDS = 0.5
+
+KNOWLEDGE = [
+    ("Golden Visa", "Property investments of 2M AED or more qualify for the 10-year Golden Visa.", ["golden visa", "residency"]),
+    ("Service Charges", "Service charges range from 10 to 25 AED per sq ft per year depending on the community.", ["service charges", "maintenance fee"]),
+    ("Off-plan payment plans", "Off-plan projects usually need 10-20% down payment, the rest during construction.", ["off-plan", "payment plan", "installments"]),
+    ("Mortgage for non-residents", "Non-residents can get up to 50% LTV mortgage from UAE banks.", ["mortgage", "loan", "bank"]),
+    ("Residency visa for tenants", "Renting does not give residency; buying property of 750k AED gives a 2-year visa.", ["residency", "visa"]),
+]
+
+# Each names one entry
+CONFIDENT = [
+    "What is golden visa?",
+    "How much are service charges?",
+    "Do you offer a payment plan for off-plan?",
+    "Can I get a mortgage as a non resident?",
+]
+# Several entries match, or the question asks more than the entry says
+AMBIGUOUS = [
+    "Tell me about residency?",
+    "How do I get residency with golden visa?",
+    "How long does golden visa processing take for my family of five?",
+]
+
+PLAN_ANSWER = json.dumps({
+    "entities": {},
+    "intent": {},
+    "sentiment": "neutral",
+    "is_question": True,
+    "reply": "Good question - let me explain how that works in Dubai.",
+})
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiClient(GeminiClient):
+    """GeminiClient whose requests never leave the process (call logging still applies)"""
+
+    def __init__(self):
+        super().__init__(model_name="stub", key_pool=GeminiKeyPool([]))
+        self.requests = 0
+
+    @property
+    def current_key(self):
+        return "stub"
+
+    async def _generate_with_retries(self, contents, max_retries, **kwargs):
+        self.requests += 1
+        await asyncio.sleep(STUB_LATENCY_SECONDS)
+        return StubResponse(PLAN_ANSWER)
+
+
+async def seed() -> Tenant:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as session:
+        tenant = Tenant(name="Knowledge Realty", email=f"knowledge-{time.time_ns()}@example.com")
+        session.add(tenant)
+        await session.commit()
+        await session.refresh(tenant)
+        for title, content, keywords in KNOWLEDGE:
+            session.add(TenantKnowledge(
+                tenant_id=tenant.id,
+                category="faq",
+                title=title,
+                content=content,
+                keywords=keywords,
+                language=Language.EN,
+            ))
+        await session.commit()
+        return tenant
+
+
+async def new_lead(tenant: Tenant) -> Lead:
+    async with async_session() as session:
+        lead = Lead(
+            tenant_id=tenant.id,
+            language=Language.EN,
+            conversation_state=ConversationState.COLLECTING_NAME,  # questions get an AI answer here
+            conversation_data={},
+        )
+        session.add(lead)
+        await session.commit()
+        await session.refresh(lead)
+        return lead
+
+
+def run_benchmark():
+    # Brain logs every step at INFO
+    logging.disable(logging.WARNING)
+
+    async def main():
+        # Every question is new; keep the LLM cache out of the comparison
+        llm_response_cache.enabled = False
+        tenant = await seed()
+        brain = Brain(tenant)
+        client = StubGeminiClient()
+        brain.gemini_client = client
+
+        print(f"📚 {len(KNOWLEDGE)} knowledge entries, stub Gemini at {STUB_LATENCY_SECONDS}s")
+        print(f"{'question':<68}{'ms':>8}  answered by")
+        followup = None
+        # Ambiguous first, so the tenant's LLM reply time is known when the knowledge answers come
+        for question in AMBIGUOUS + CONFIDENT:
+            lead = await new_lead(tenant)
+            requests = client.requests
+            started = time.perf_counter()
+            response = await brain.process_message(lead, question)
+            elapsed = (time.perf_counter() - started) * 1000
+            source = "gemini" if client.requests > requests else "knowledge"
+            print(f"{question:<68}{elapsed:>8.1f}  {source}")
+            assert source == ("knowledge" if question in CONFIDENT else "gemini"), question
+            if source == "knowledge":
+                kb_buttons = [b for b in response.buttons or [] if b["callback_data"].startswith(KNOWLEDGE_CALLBACK_PREFIX)]
+                followup = followup or (lead, kb_buttons[0] if kb_buttons else None)
+        assert client.requests == len(AMBIGUOUS), client.requests
+
+        # Follow-up button under a knowledge answer
+        lead, button = followup
+        if button:
+            requests = client.requests
+            response = await brain.process_message(lead, "", callback_data=button["callback_data"])
+            assert client.requests == requests
+            print(f"\n👉 follow-up {button['text']!r}: {response.message.splitlines()[0]}")
+
+        await engine.dispose()
+        stats = knowledge_answerer.tenant_stats(tenant.id)
+        print(f"\n✅ {client.requests} Gemini requests for {len(AMBIGUOUS) + len(CONFIDENT)} questions ({stats})")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run_benchmark()
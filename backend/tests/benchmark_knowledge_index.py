@@ -0,0 +1,140 @@
+"""
+📊 Knowledge Retrieval Benchmark
+Compares the inverted-index BM25 retriever (knowledge_index.py) with the previous
+linear keyword/title scorer on the seed_dubai_knowledge corpus.
+
+The corpus is also replicated to show how both scale with larger knowledge bases.
+No database needed - entries are built straight from KNOWLEDGE_DATA.
+
+Run: python backend/tests/benchmark_knowledge_index.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import Language
+from knowledge_index import KnowledgeIndexSet
+from seed_dubai_knowledge import KNOWLEDGE_DATA
+
+QUERIES = {
+    Language.EN: [
+        "Is my money safe if I buy off-plan?",
+        "How do I get a golden visa with property?",
+        "What is the ROI and rental yield in Dubai Marina?",
+        "Can foreigners get freehold ownership and a title deed?",
+        "what are the service charges and DLD fees",
+        "hello",
+    ],
+    Language.FA: [
+        "آیا پول من امن است؟",
+        "چطور ویزای طلایی بگیرم",
+        "بازده اجاره در دبی چقدر است",
+        "مالکیت کامل برای خارجی ها",
+    ],
+    Language.AR: [
+        "هل أموالي في أمان؟",
+        "كيف أحصل على التأشيرة الذهبية",
+    ],
+    Language.RU: [
+        "Безопасны ли мои деньги?",
+        "золотая виза за недвижимость",
+    ],
+}
+
+ROUNDS = 200
+
+
+def build_corpus(copies: int = 1):
+    """Flatten KNOWLEDGE_DATA into the entry dicts the tenant context holds."""
+    entries = []
+    for copy in range(copies):
+        for item in KNOWLEDGE_DATA:
+            for language, content in item["content"].items():
+                title = content["title"] if copy == 0 else f"{content['title']} #{copy}"
+                entries.append({
+                    "category": item["category"],
+                    "title": title,
+                    "content": content["content"],
+                    "keywords": content.get("keywords", []),
+                    "language": language,
+                    "priority": item.get("priority", 0),
+                })
+    entries.sort(key=lambda e: e["priority"], reverse=True)
+    return entries
+
+
+def legacy_search(all_knowledge, query, lang, limit=3):
+    """The linear scorer Brain.get_relevant_knowledge used before the index (logging removed)."""
+    query_lower = query.lower()
+    scored_entries = []
+    for entry in all_knowledge:
+        if entry.get("language") and entry.get("language") != lang:
+            continue
+        score = 0
+        for keyword in entry.get("keywords", []):
+            if keyword.lower() in query_lower:
+                score += 2
+        for word in entry.get("title", "").lower().split():
+            if len(word) > 3 and word in query_lower:
+                score += 1
+        if score > 0:
+            scored_entries.append((score, entry.get("priority", 0), entry))
+    scored_entries.sort(key=lambda x: (x[0], x[1]), reverse=True)
+    return [entry for _, _, entry in scored_entries[:limit]]
+
+
+def index_search(indexes, query, lang, limit=3):
+    return [entry for _, entry in indexes.for_language(lang).search(query, limit=limit)]
+
+
+def time_per_lookup(search, corpus, rounds=ROUNDS):
+    lookups = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for lang, queries in QUERIES.items():
+            for query in queries:
+                search(corpus, query, lang)
+                lookups += 1
+    return (time.perf_counter() - start) / lookups * 1_000_000  # µs
+
+
+def run_benchmark():
+    print("📊 Knowledge retrieval: linear scorer vs inverted index (BM25)\n")
+
+    corpus = build_corpus()
+    indexes = KnowledgeIndexSet(corpus)
+    print(f"{'Query':<55} {'legacy top-1':<45} index top-1")
+    for lang, queries in QUERIES.items():
+        for query in queries:
+            legacy = legacy_search(corpus, query, lang)
+            indexed = index_search(indexes, query, lang)
+            print(
+                f"{query[:53]:<55} "
+                f"{(legacy[0]['title'][:43] if legacy else '-'):<45} "
+                f"{indexed[0]['title'][:43] if indexed else '-'}"
+            )
+
+    print(f"\n{'Entries':>8} {'build (ms)':>11} {'legacy (µs/query)':>18} {'index (µs/query)':>17} {'speedup':>8}")
+    for copies in (1, 10, 50):
+        corpus = build_corpus(copies)
+
+        start = time.perf_counter()
+        indexes = KnowledgeIndexSet(corpus)
+        for lang in QUERIES:
+            indexes.for_language(lang)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        legacy_us = time_per_lookup(legacy_search, corpus)
+        index_us = time_per_lookup(index_search, indexes)
+        print(
+            f"{len(corpus):>8} {build_ms:>11.1f} {legacy_us:>18.1f} {index_us:>17.1f} "
+            f"{legacy_us / index_us:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark()
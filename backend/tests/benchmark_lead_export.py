@@ -0,0 +1,142 @@
+"""
+📤 Lead Export Benchmark
+Peak Python memory of the streaming lead export (lead_export.py) against the previous
+export (all Lead ORM objects + in-memory workbook) at growing lead counts.
+
+The streaming numbers should stay flat as the lead count grows; the old export grows
+linearly. The xlsx output is re-opened to check every lead made it into the file.
+
+Uses DATABASE_URL when it is set (point it at a scratch Postgres database - rows are
+inserted into the leads table), otherwise a throwaway SQLite file.
+
+Run: python backend/tests/benchmark_lead_export.py
+"""
+
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.gettempdir(), "benchmark_lead_export.db")
+    if os.path.exists(_db_file):
+        os.remove(_db_file)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+    os.environ.setdefault("DB_POOL_SIZE", "0")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import openpyxl
+from sqlalchemy import select, insert
+
+from database import engine, async_session, Base, Tenant, Lead, LeadStatus, Purpose
+import unified_database  # noqa: F401 - registers the models Tenant relationships point to
+from lead_export import LEAD_EXPORT_COLUMNS, iter_lead_batches, stream_csv, stream_xlsx
+
+LEAD_COUNTS = (10_000, 50_000)
+INSERT_BATCH = 5_000
+
+
+async def legacy_export(tenant_id: int) -> int:
+    """The pre-streaming export: every ORM object and the whole workbook in memory."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(Lead).where(Lead.tenant_id == tenant_id).order_by(Lead.created_at.desc())
+        )
+        leads = result.scalars().all()
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append([column.header for column in LEAD_EXPORT_COLUMNS])
+    for lead in leads:
+        ws.append([column.render(getattr(lead, column.field)) for column in LEAD_EXPORT_COLUMNS])
+    output = io.BytesIO()
+    wb.save(output)
+    return len(output.getvalue())
+
+
+async def streaming_export(writer, tenant_id: int) -> int:
+    """Drain the streaming export like a client would, keeping only the byte count."""
+    size = 0
+    async for chunk in writer(iter_lead_batches(tenant_id, LEAD_EXPORT_COLUMNS), LEAD_EXPORT_COLUMNS):
+        size += len(chunk)
+    return size
+
+
+async def seed(lead_count: int) -> int:
+    async with async_session() as session:
+        tenant = Tenant(name=f"Export {lead_count}", email=f"export-{time.time_ns()}@example.com")
+        session.add(tenant)
+        await session.commit()
+        tenant_id = tenant.id
+
+    rng = random.Random(lead_count)
+    for start in range(0, lead_count, INSERT_BATCH):
+        rows = [
+            {
+                "tenant_id": tenant_id,
+                "name": f"Lead {i}",
+                "phone": f"+9715{i:08d}",
+                "status": rng.choice(list(LeadStatus)),
+                "purpose": rng.choice(list(Purpose)),
+                "budget_max": rng.randrange(500_000, 5_000_000, 50_000),
+                "preferred_location": rng.choice(["Dubai Marina", "Downtown Dubai", "JVC"]),
+                "notes": "Interested in sea view, wants to visit next week",
+            }
+            for i in range(start, min(start + INSERT_BATCH, lead_count))
+        ]
+        async with async_session() as session:
+            await session.execute(insert(Lead), rows)
+            await session.commit()
+    return tenant_id
+
+
+async def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = await fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak / 1024 / 1024, elapsed
+
+
+async def check_xlsx(tenant_id: int, lead_count: int):
+    with tempfile.TemporaryFile() as output:
+        async for chunk in stream_xlsx(iter_lead_batches(tenant_id, LEAD_EXPORT_COLUMNS), LEAD_EXPORT_COLUMNS):
+            output.write(chunk)
+        output.seek(0)
+        ws = openpyxl.load_workbook(output, read_only=True).active
+        rows = sum(1 for _ in ws.iter_rows(values_only=True)) - 1
+    assert rows == lead_count, f"xlsx has {rows} rows, expected {lead_count}"
+
+
+async def run_benchmark():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(f"{'leads':>8} {'export':<16}{'peak MB':>10}{'seconds':>10}{'size MB':>10}")
+    try:
+        for lead_count in LEAD_COUNTS:
+            tenant_id = await seed(lead_count)
+            for label, fn, args in (
+                ("legacy xlsx", legacy_export, (tenant_id,)),
+                ("streaming xlsx", streaming_export, (stream_xlsx, tenant_id)),
+                ("streaming csv", streaming_export, (stream_csv, tenant_id)),
+            ):
+                size, peak_mb, seconds = await measure(fn, *args)
+                print(f"{lead_count:>8,} {label:<16}{peak_mb:>10.1f}{seconds:>10.2f}{size / 1024 / 1024:>10.1f}")
+            await check_xlsx(tenant_id, lead_count)
+    finally:
+        await engine.dispose()
+    print("✅ Streaming xlsx contains every lead")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
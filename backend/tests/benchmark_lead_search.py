@@ -0,0 +1,160 @@
+"""
+🔎 Lead Search Benchmark
+Latency of the lead search (lead_search.py) against the only lookup that existed before
+it - loading the tenant's leads and filtering them in Python - for a tenant with 100k+
+leads next to a second, noisy tenant.
+
+On Postgres the search runs on the GIN / prefix indexes from LEAD_SEARCH_DDL and should
+stay in the low milliseconds at any tenant size; the SQLite fallback is an unindexed
+scan and is only here so the benchmark also runs without a database server. First-page
+hits are checked against the Python filter.
+
+Uses DATABASE_URL when it is set (point it at a scratch Postgres database - rows are
+inserted into the leads table), otherwise a throwaway SQLite file.
+
+Run: python backend/tests/benchmark_lead_search.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.gettempdir(), "benchmark_lead_search.db")
+    if os.path.exists(_db_file):
+        os.remove(_db_file)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+    os.environ.setdefault("DB_POOL_SIZE", "0")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, insert
+
+from database import engine, async_session, Base, Tenant, Lead, LEAD_SEARCH_DDL
+import unified_database  # noqa: F401 - registers the models Tenant relationships point to
+from lead_search import search_leads
+from text_normalizer import normalize_text
+
+LEAD_COUNT = 100_000
+NOISE_LEAD_COUNT = 20_000
+INSERT_BATCH = 5_000
+PAGE_SIZE = 20
+ROUNDS = 5
+
+FIRST_NAMES = ["Ali", "Sara", "Mohammad", "Olga", "Ahmed", "Fatima", "John", "Maryam", "Reza", "Elena"]
+LAST_NAMES = ["Ahmadi", "Karimi", "Petrova", "Hassan", "Smith", "Rezaei", "Ivanov", "Haddad", "Moradi", "Khan"]
+PERSIAN_NAMES = ["علی احمدی", "مریم کریمی", "رضا مرادی", "سارا رضایی"]
+NOTES = [
+    "Interested in sea view, wants to visit next week",
+    "Golden visa investor, cash buyer",
+    "Looking for a villa near the golf course",
+    "Prefers off-plan with payment plan",
+    "به دنبال آپارتمان در دبی مارینا",
+]
+
+# (label, query, python predicate on (search text, phone digits)) - predicates mirror the search
+QUERIES = [
+    ("name fragment", "petro", lambda text, digits: "petro" in text),
+    ("username", "user_0042", lambda text, digits: "user_0042" in text),
+    ("notes word", "golf", lambda text, digits: "golf" in text),
+    ("phone prefix", "+971 500 012", lambda text, digits: digits.startswith("971500012")),
+]
+# Spelling-variant query (Arabic yeh/kaf for a Persian name) - folded on Postgres only
+PERSIAN_QUERY = ("persian variant", "كريمي", lambda text, digits: "کریمی" in text)
+
+
+def _search_text(lead) -> str:
+    return normalize_text(" ".join(v or "" for v in (lead.name, lead.telegram_username, lead.notes, lead.voice_transcript)))
+
+
+def _digits(lead) -> str:
+    return "".join(ch for ch in (lead.phone or "") if ch.isdigit())
+
+
+async def legacy_search(tenant_id: int, predicate) -> list:
+    """What finding a lead took before: every lead of the tenant, filtered in Python."""
+    async with async_session() as session:
+        result = await session.execute(select(Lead).where(Lead.tenant_id == tenant_id))
+        leads = result.scalars().all()
+    return [lead.id for lead in leads if predicate(_search_text(lead), _digits(lead))]
+
+
+async def seed(name: str, lead_count: int, seed_value: int) -> int:
+    async with async_session() as session:
+        tenant = Tenant(name=name, email=f"search-{time.time_ns()}@example.com")
+        session.add(tenant)
+        await session.commit()
+        tenant_id = tenant.id
+
+    rng = random.Random(seed_value)
+    for start in range(0, lead_count, INSERT_BATCH):
+        rows = []
+        for i in range(start, min(start + INSERT_BATCH, lead_count)):
+            if i % 10 == 0:
+                lead_name = rng.choice(PERSIAN_NAMES)
+            else:
+                lead_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            rows.append({
+                "tenant_id": tenant_id,
+                "name": lead_name,
+                "phone": f"+9715{i:08d}",
+                "telegram_username": f"user_{i:05d}",
+                "notes": rng.choice(NOTES),
+                "lead_score": rng.randrange(0, 100),
+            })
+        async with async_session() as session:
+            await session.execute(insert(Lead), rows)
+            await session.commit()
+    return tenant_id
+
+
+async def timed(fn, *args):
+    start = time.perf_counter()
+    result = await fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def search_page(tenant_id: int, query: str):
+    async with async_session() as session:
+        return await search_leads(session, tenant_id, query, limit=PAGE_SIZE)
+
+
+async def run_benchmark():
+    is_postgres = engine.dialect.name == "postgresql"
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if is_postgres:
+            # Existing scratch databases: create_all skips the leads table and its DDL hooks
+            for ddl in LEAD_SEARCH_DDL:
+                await conn.execute(ddl)
+
+    queries = QUERIES + ([PERSIAN_QUERY] if is_postgres else [])
+    try:
+        await seed("Noise agency", NOISE_LEAD_COUNT, 1)
+        tenant_id = await seed("Big agency", LEAD_COUNT, 2)
+        print(f"🔎 {LEAD_COUNT:,} leads ({engine.dialect.name}, {'indexed' if is_postgres else 'LIKE scan fallback'})")
+        print(f"{'query':<18}{'hits':>8}{'search ms':>12}{'legacy ms':>12}")
+
+        for label, query, predicate in queries:
+            timings = []
+            for _ in range(ROUNDS):
+                page, ms = await timed(search_page, tenant_id, query)
+                timings.append(ms)
+            expected, legacy_ms = await timed(legacy_search, tenant_id, predicate)
+
+            hit_ids = [hit["id"] for hit in page["hits"]]
+            assert len(hit_ids) == min(PAGE_SIZE, len(expected)), f"{label}: {len(hit_ids)} hits, expected {min(PAGE_SIZE, len(expected))}"
+            assert set(hit_ids) <= set(expected), f"{label}: unexpected hits {set(hit_ids) - set(expected)}"
+            print(f"{label:<18}{len(expected):>8,}{sorted(timings)[ROUNDS // 2]:>12.1f}{legacy_ms:>12.1f}")
+    finally:
+        await engine.dispose()
+    print("✅ Search hits match the full-scan filter")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,173 @@
+"""
+💾 LLM Response Cache Benchmark
+Reply time for repeated FAQ-type questions with and without the LLM response cache
+(llm_cache.py).
+
+Different leads of one tenant ask the same questions, worded slightly differently
+("What is golden visa?" / "what is Golden Visa??"), through Brain.process_message.
+Gemini is a local stub that answers after STUB_LATENCY_SECONDS, so a cache miss costs
+about that and a hit should take milliseconds. Also checks that a knowledge change
+(context version bump) and a personalised turn (the message carries the lead's budget)
+don't get a cached answer.
+
+Uses DATABASE_URL when it is set (point it at a scratch Postgres database - a tenant,
+leads and a knowledge entry are inserted), otherwise a throwaway SQLite file. Redis is
+not needed; without it the cache works from worker memory.
+
+Run: python backend/tests/benchmark_llm_cache.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.gettempdir(), "benchmark_llm_cache.db")
+    if os.path.exists(_db_file):
+        os.remove(_db_file)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+    os.environ.setdefault("DB_POOL_SIZE", "0")
+
+# Dummy key so the shared GeminiClient Brain builds is set up; the benchmark swaps in a stub
+os.environ.setdefault("GEMINI_API_KEY", "AIza" + "0" * 35)
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import (
+    engine, async_session, Base, Tenant, Lead, TenantKnowledge, ConversationState, Language
+)
+import unified_database  # noqa: F401 - registers the models Tenant relationships point to
+from brain import Brain
+from context_cache import bump_context_version
+from llm_cache import llm_response_cache
+from knowledge_answers import knowledge_answerer
+from utils.gemini_utils import GeminiClient, GeminiKeyPool
+
+STUB_LATENCY_SECONDS = 0.5
+LEADS_PER_QUESTION = 5
+
+# Same question, different wording per lead
+QUESTIONS = [
+    ["What is golden visa?", "what is golden visa", "What is Golden Visa??"],
+    ["How much are service charges in Dubai Marina?", "how much are service charges in dubai marina"],
+]
+PERSONALISED = "Is 2M AED enough for golden visa?"
+
+PLAN_ANSWER = json.dumps({
+    "entities": {},
+    "intent": {},
+    "sentiment": "neutral",
+    "is_question": True,
+    "reply": "Golden Visa is a 10-year residency for property investors from 2M AED. What budget do you have in mind?",
+})
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiClient(GeminiClient):
+    """GeminiClient whose requests never leave the process (caching and call logging still apply)"""
+
+    def __init__(self):
+        super().__init__(model_name="stub", key_pool=GeminiKeyPool([]))
+        self.requests = 0
+
+    @property
+    def current_key(self):
+        return "stub"
+
+    async def _generate_with_retries(self, contents, max_retries, **kwargs):
+        self.requests += 1
+        await asyncio.sleep(STUB_LATENCY_SECONDS)
+        return StubResponse(PLAN_ANSWER)
+
+
+async def seed() -> Tenant:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as session:
+        tenant = Tenant(name="Cache Realty", email=f"cache-{time.time_ns()}@example.com")
+        session.add(tenant)
+        await session.commit()
+        await session.refresh(tenant)
+        session.add(TenantKnowledge(
+            tenant_id=tenant.id,
+            category="faq",
+            title="Golden Visa",
+            content="Property investments of 2M AED or more qualify for the 10-year Golden Visa.",
+            keywords=["golden visa", "residency"],
+            language=Language.EN,
+            priority=1,
+        ))
+        await session.commit()
+        return tenant
+
+
+async def new_lead(tenant: Tenant) -> Lead:
+    async with async_session() as session:
+        lead = Lead(
+            tenant_id=tenant.id,
+            language=Language.EN,
+            conversation_state=ConversationState.COLLECTING_NAME,  # questions get an AI answer here
+            conversation_data={},
+        )
+        session.add(lead)
+        await session.commit()
+        await session.refresh(lead)
+        return lead
+
+
+async def ask(brain: Brain, tenant: Tenant, message: str) -> float:
+    """Milliseconds to answer a question from a new lead (the cached answer is lead-independent)"""
+    lead = await new_lead(tenant)
+    started = time.perf_counter()
+    await brain.process_message(lead, message)
+    return (time.perf_counter() - started) * 1000
+
+
+def run_benchmark():
+    # Brain logs every step at INFO
+    logging.disable(logging.WARNING)
+
+    async def main():
+        # The seeded knowledge entry would answer "What is golden visa?" without the LLM
+        knowledge_answerer.enabled = False
+        tenant = await seed()
+        brain = Brain(tenant)
+        client = StubGeminiClient()
+        brain.gemini_client = client
+
+        print(f"💾 {len(QUESTIONS)} FAQ questions x {LEADS_PER_QUESTION} leads, stub Gemini at {STUB_LATENCY_SECONDS}s")
+        print(f"{'question':<52}{'first ms':>10}{'repeat ms (mean)':>18}")
+        for variants in QUESTIONS:
+            first = await ask(brain, tenant, variants[0])
+            repeats = [await ask(brain, tenant, variants[i % len(variants)]) for i in range(1, LEADS_PER_QUESTION)]
+            print(f"{variants[0]:<52}{first:>10.1f}{sum(repeats) / len(repeats):>18.1f}")
+        assert client.requests == len(QUESTIONS), client.requests
+
+        # Knowledge change: the next answer is generated again
+        await bump_context_version(tenant.id)
+        await ask(brain, tenant, QUESTIONS[0][0])
+        assert client.requests == len(QUESTIONS) + 1, client.requests
+
+        # The lead's own budget in the message: personalised, never cached
+        for _ in range(2):
+            await ask(brain, tenant, PERSONALISED)
+        assert client.requests == len(QUESTIONS) + 3, client.requests
+
+        await engine.dispose()
+        print(f"✅ {client.requests} Gemini requests for {len(QUESTIONS) * LEADS_PER_QUESTION + 3} turns ({llm_response_cache.stats()})")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run_benchmark()
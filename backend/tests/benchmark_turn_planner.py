@@ -0,0 +1,214 @@
+"""
+🗺️ Turn Planner Benchmark
+Gemini calls and LLM time per conversational turn, with one call per step (extraction,
+intent, reply - TURN_PLANNER_ENABLED=false) and with the turn planner's single
+structured call.
+
+The same free-text messages go through Brain.process_message for leads in the states
+that use the LLM. Gemini is a local stub that answers each prompt kind after a fixed
+delay, so the numbers are call counts x STUB_LATENCY_SECONDS; the per-turn histograms
+are the ones /api/health/metrics reports (turn_planner.stats()).
+
+Uses DATABASE_URL when it is set (point it at a scratch Postgres database - a tenant
+and leads are inserted), otherwise a throwaway SQLite file.
+
+Run: python backend/tests/benchmark_turn_planner.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.gettempdir(), "benchmark_turn_planner.db")
+    if os.path.exists(_db_file):
+        os.remove(_db_file)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+    os.environ.setdefault("DB_POOL_SIZE", "0")
+
+# Dummy key so the shared GeminiClient Brain builds is set up; the benchmark swaps in a stub
+os.environ.setdefault("GEMINI_API_KEY", "AIza" + "0" * 35)
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import engine, async_session, Base, Tenant, Lead, ConversationState, Language
+import unified_database  # noqa: F401 - registers the models Tenant relationships point to
+import brain as brain_module
+from brain import Brain
+from turn_planner import TurnPlanner
+from utils.gemini_utils import GeminiClient, GeminiKeyPool
+
+STUB_LATENCY_SECONDS = 0.3
+
+# Two personalised turns of one lead - the second plan must see the first exchange
+MEMORY_STATE = ConversationState.ENGAGEMENT
+MEMORY_TURNS = (
+    "we are thinking about moving the whole family next year",
+    "something quiet with a nice view, close to good schools",
+)
+
+# (state, message) - free text the rules alone can't fully handle
+TURNS = [
+    (ConversationState.WARMUP, "we are thinking about moving the whole family next year"),
+    (ConversationState.SLOT_FILLING, "something quiet with a nice view, close to good schools"),
+    (ConversationState.VALUE_PROPOSITION, "does the second one have a private pool?"),
+    (ConversationState.ENGAGEMENT, "how do service charges work for these buildings?"),
+    (ConversationState.COLLECTING_NAME, "which areas do you usually work with?"),
+]
+
+PLAN_ANSWER = json.dumps({
+    "entities": {"goal": "buy"},
+    "intent": {"goal": "living", "transaction_type": "buy"},
+    "sentiment": "neutral",
+    "is_question": True,
+    "reply": "Great question! Which budget range should I check for you?",
+})
+ENTITIES_ANSWER = json.dumps({"goal": "buy"})
+INTENT_ANSWER = json.dumps({"goal": "living", "transaction_type": "buy"})
+REPLY_ANSWER = "Great question! Which budget range should I check for you?"
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    """GeminiClient.model - Brain only checks that one is available"""
+
+
+def prompt_text(contents) -> str:
+    """The prompt of a request: the text itself, or the last turn of a request with history"""
+    if isinstance(contents, str):
+        return contents
+    last = contents[-1]
+    return last["parts"][0] if isinstance(last, dict) else str(last)
+
+
+class StubGeminiClient(GeminiClient):
+    """GeminiClient whose requests never leave the process (call logging still applies)"""
+
+    def __init__(self):
+        super().__init__(model_name="stub", key_pool=GeminiKeyPool([]))
+        self.requests = []  # contents of every upstream request
+
+    @property
+    def current_key(self):
+        return "stub"
+
+    @property
+    def model(self):
+        return StubModel()
+
+    async def _generate_with_retries(self, contents, max_retries, **kwargs):
+        self.requests.append(contents)
+        await asyncio.sleep(STUB_LATENCY_SECONDS)
+        prompt = prompt_text(contents)
+        if "OUTPUT FORMAT (MANDATORY)" in prompt:
+            return StubResponse(PLAN_ANSWER)
+        if "intelligent data extractor" in prompt:
+            return StubResponse(ENTITIES_ANSWER)
+        if "Analyze this real estate inquiry" in prompt:
+            return StubResponse(INTENT_ANSWER)
+        return StubResponse(REPLY_ANSWER)
+
+
+async def seed() -> Tenant:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as session:
+        tenant = Tenant(name="Planner Realty", email=f"planner-{time.time_ns()}@example.com")
+        session.add(tenant)
+        await session.commit()
+        await session.refresh(tenant)
+        return tenant
+
+
+async def new_lead(tenant: Tenant, state: ConversationState) -> Lead:
+    async with async_session() as session:
+        lead = Lead(
+            tenant_id=tenant.id,
+            name=None if state == ConversationState.COLLECTING_NAME else "Sara",
+            language=Language.EN,
+            conversation_state=state,
+            conversation_data={},
+        )
+        session.add(lead)
+        await session.commit()
+        await session.refresh(lead)
+        return lead
+
+
+async def run_turns(tenant: Tenant, enabled: bool) -> TurnPlanner:
+    planner = TurnPlanner(enabled=enabled)
+    brain_module.turn_planner = planner  # Brain reads the module global
+    brain = Brain(tenant)
+    brain.gemini_client = StubGeminiClient()
+
+    for state, message in TURNS:
+        lead = await new_lead(tenant, state)
+        await brain.process_message(lead, message)
+    return planner
+
+
+async def check_memory(tenant: Tenant):
+    """A planned reply is remembered (chat_history) and sent with the lead's next plan"""
+    brain_module.turn_planner = TurnPlanner(enabled=True)
+    brain = Brain(tenant)
+    client = StubGeminiClient()
+    brain.gemini_client = client
+
+    lead = await new_lead(tenant, MEMORY_STATE)
+    first, second = MEMORY_TURNS
+    await brain.process_message(lead, first)
+    client.requests.clear()
+    await brain.process_message(lead, second)
+
+    plans = [c for c in client.requests if "OUTPUT FORMAT (MANDATORY)" in prompt_text(c)]
+    assert plans, "second turn made no planning call"
+    history = plans[0][:-1] if isinstance(plans[0], list) else []
+    expected = [{"role": "user", "parts": [first]}, {"role": "model", "parts": [REPLY_ANSWER]}]
+    assert history == expected, history
+    print(f"✅ Second turn's plan carries the first exchange ({len(history)} history entries)")
+
+
+def run_benchmark():
+    # Brain logs every step at INFO
+    logging.disable(logging.WARNING)
+
+    async def main():
+        tenant = await seed()
+        print(f"🗺️ {len(TURNS)} free-text turns, stub Gemini at {STUB_LATENCY_SECONDS}s per call")
+        results = {}
+        for label, enabled in (("one call per step", False), ("turn planner", True)):
+            started = time.perf_counter()
+            planner = await run_turns(tenant, enabled)
+            elapsed = time.perf_counter() - started
+            stats = planner.stats()
+            results[label] = stats
+            calls = stats["llm_calls_per_turn"]
+            seconds = stats["llm_seconds_per_turn"]
+            print(f"\n{label}: {elapsed:.2f}s total")
+            print(f"  LLM calls per turn (mean {calls['mean']}): {calls['buckets']}")
+            print(f"  LLM seconds per turn (mean {seconds['mean']}): {seconds['buckets']}")
+            if enabled:
+                print(f"  plans={stats['plans']} uses={stats['uses']} reply_misses={stats['reply_misses']}")
+        await check_memory(tenant)
+        await engine.dispose()
+
+        before = results["one call per step"]["llm_calls_per_turn"]["mean"]
+        after = results["turn planner"]["llm_calls_per_turn"]["mean"]
+        assert after <= 1.0 < before, (before, after)
+        print(f"\n✅ {before} → {after} Gemini calls per turn")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,164 @@
+"""
+Text Normalizer
+Persian/Arabic-aware normalisation and tokenisation shared by all rule-based matchers
+
+Users type the same word many ways: Arabic vs Persian yeh/kaf (ي/ی, ك/ک), ZWNJ or a space
+(می‌خواهم / می خواهم - the joined spelling میخواهم is a different token and has to be
+listed as its own keyword), with diacritics or tatweel, and with Persian (۱۲۳) or
+Arabic-Indic (١٢٣) digits. Every keyword/regex matcher runs on `normalize(text)` and
+compares against keywords folded the same way, so these variants hit the rule instead of
+falling through to an LLM call.
+
+normalize() and tokenize() are memoised, so the handlers that look at the same message
+repeatedly in one turn only pay for normalisation once.
+"""
+
+import re
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Pattern, Tuple
+
+# Characters folded to one canonical form (Persian forms win, they are the majority of users)
+_CHAR_MAP = {
+    "ي": "ی",  # Arabic yeh
+    "ى": "ی",  # alef maksura
+    "ئ": "ی",
+    "ك": "ک",  # Arabic kaf
+    "ة": "ه",  # teh marbuta
+    "ۀ": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+    "ؤ": "و",
+    "٫": ".",  # Arabic decimal separator
+    "٬": ",",  # Arabic thousands separator
+    "،": ",",
+    "‌": " ",  # ZWNJ - "می‌خواهم" and "می خواهم" match the same rules
+}
+# Persian and Arabic-Indic digits -> ASCII
+_CHAR_MAP.update({chr(0x06F0 + i): str(i) for i in range(10)})
+_CHAR_MAP.update({chr(0x0660 + i): str(i) for i in range(10)})
+
+# Diacritics (harakat, superscript alef), tatweel and invisible direction/joiner marks
+_STRIP_CHARS = (
+    [chr(c) for c in range(0x064B, 0x0660)]
+    + ["ٰ", "ـ", "‍", "‎", "‏", "﻿"]
+)
+
+_FOLD_TABLE = str.maketrans({**_CHAR_MAP, **{ch: None for ch in _STRIP_CHARS}})
+_STRIP_TABLE = str.maketrans({ch: None for ch in _STRIP_CHARS})
+_DIGIT_TABLE = str.maketrans({k: v for k, v in _CHAR_MAP.items() if v.isdigit()})
+
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+NORMALIZE_CACHE_SIZE = 4096
+
+# Question words - matched as whole tokens, plus the suffixed forms in QUESTION_WORD_FORMS
+# (a bare prefix match made "کیفیت", "چندمین" and "чтобы" questions). Arabic "أين"/"ما"/"كم"
+# are left to QUESTION_PHRASES and "؟": folded they are the Persian words for "this"/"we"/"little".
+# Arabic "كيف" folds to Persian "کیف" (bag), so it is in ARABIC_QUESTION_WORDS instead.
+QUESTION_WORDS = (
+    # FA
+    "چطور", "چگونه", "چه", "چی", "کی", "کجا", "چرا", "آیا", "چند", "کدام",
+    # EN
+    "how", "what", "when", "where", "why", "which",
+    # AR
+    "هل", "متى", "لماذا",
+    # RU
+    "что", "как", "когда", "где", "почему", "сколько",
+)
+# Inflected / colloquial forms of QUESTION_WORDS that also count as question words
+QUESTION_WORD_FORMS = {
+    "چطور": ("چطوره", "چطوری"),
+    "چی": ("چیه", "چیست", "چیا"),
+    "کی": ("کیه", "کیست"),
+    "کجا": ("کجاست", "کجاس", "کجایی", "کجای"),
+    "چند": ("چنده", "چندتا", "چندتاست"),
+    "کدام": ("کدوم", "کدومش", "کدامیک", "کدومه"),
+    "как": ("какой", "какая", "какое", "какие", "каким", "какую", "какого", "каков"),
+    "сколько": ("скольких",),
+}
+# Arabic question words whose folded form is a Persian word - matched in their Arabic spelling
+# (Arabic kaf ك), before folding: "كيف الحال" is a question, "کیف چرمی" (leather bag) is not
+ARABIC_QUESTION_WORDS = ("كيف", "كيفك")
+QUESTION_PHRASES = ("do you", "can you", "is it", "are there", "is there", "ما هو", "ما هي")
+
+
+def fold(text: str) -> str:
+    """Unify letter variants, digits and invisible marks without changing case."""
+    return text.translate(_FOLD_TABLE)
+
+
+def normalize_digits(text: str) -> str:
+    """Convert Persian/Arabic-Indic digits to ASCII, leaving everything else untouched."""
+    return text.translate(_DIGIT_TABLE)
+
+
+def fold_translation() -> Tuple[str, str]:
+    """
+    (from, to) arguments for SQL translate(text, from, to) folding like fold(), so
+    database-side search columns match normalize()d queries. Strip characters only
+    appear in `from`, which makes translate() drop them.
+    """
+    return "".join(_CHAR_MAP) + "".join(_STRIP_CHARS), "".join(_CHAR_MAP.values())
+
+
+def normalize_text(text: str) -> str:
+    """Canonical matching form: folded, lower-cased, single-spaced (uncached, for bulk data)."""
+    if not text:
+        return ""
+    return _WHITESPACE.sub(" ", fold(text).casefold()).strip()
+
+
+def tokenize_text(text: str) -> Tuple[str, ...]:
+    """Word tokens of the normalised text (uncached, for bulk data)."""
+    return tuple(_TOKEN.findall(normalize_text(text)))
+
+
+# Memoised versions for user messages
+normalize = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(normalize_text)
+tokenize = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(tokenize_text)
+
+
+@lru_cache(maxsize=512)
+def _normalized_keywords(keywords: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tuple(k for k in (normalize(k) for k in keywords) if k)
+
+
+def contains_any(text: str, keywords: Iterable[str]) -> bool:
+    """Substring match of any keyword against the text, both normalised."""
+    if not text:
+        return False
+    normalized = normalize(text)
+    return any(k in normalized for k in _normalized_keywords(tuple(keywords)))
+
+
+def compile_pattern(pattern: str, flags: int = 0) -> Pattern:
+    """
+    Compile a regex to run against normalize()d text.
+    The pattern's letters are folded the same way; case is handled with IGNORECASE
+    (lower-casing the pattern itself would turn \\W into \\w).
+    """
+    return re.compile(fold(pattern), flags | re.IGNORECASE)
+
+
+@lru_cache(maxsize=1)
+def _question_tokens() -> FrozenSet[str]:
+    forms = [form for word in QUESTION_WORDS for form in (word, *QUESTION_WORD_FORMS.get(word, ()))]
+    return frozenset(_normalized_keywords(tuple(forms)))
+
+
+def is_question(text: str) -> bool:
+    """Question mark, a question word (or one of its listed suffixed forms) or a question phrase."""
+    if not text:
+        return False
+    if "?" in text or "؟" in text:
+        return True
+
+    question_tokens = _question_tokens()
+    if any(token in question_tokens for token in tokenize(text)):
+        return True
+    if any(token in ARABIC_QUESTION_WORDS for token in _TOKEN.findall(text.translate(_STRIP_TABLE))):
+        return True
+
+    return contains_any(text, QUESTION_PHRASES)
@@ -0,0 +1,277 @@
+"""
+Turn Planner
+One structured Gemini call per conversational turn instead of one per consumer
+
+A free-text turn could call Gemini several times in sequence - extract_user_info_smart
+for the lead details, extract_user_intent in the warmup/slot-filling handlers, then
+generate_ai_response for the reply - each adding a few seconds. The planner asks once
+for a combined JSON object:
+
+- entities: lead details (extract_user_info_smart's fields)
+- intent: qualification slots (extract_user_intent's fields)
+- sentiment: positive / neutral / negative
+- reply: the draft answer, written from the prompt generate_ai_response builds
+
+Brain plans lazily (Brain.plan_turn): the first consumer in a turn that needs the LLM
+makes the call and the others read the stored TurnPlan. A reply asked for with another
+context than the draft was written for still gets its own call.
+
+Personalised plans are sent after the lead's recent exchanges (chat_history.py), and a
+planned reply is recorded there like any other. FAQ-type turns (a question with nothing
+lead-specific in it) are planned from a prompt without the lead's profile or history and
+go through the LLM response cache (llm_cache.py), so a repeated question costs no Gemini
+call at all.
+
+Every Gemini call made while handling a message is logged (gemini_call_log), so stats()
+has per-turn call count and LLM latency histograms. TURN_PLANNER_ENABLED=false restores
+the per-consumer calls to compare against.
+"""
+
+import os
+import re
+import json
+import logging
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable, Iterable
+
+from utils.gemini_utils import GeminiClient, gemini_call_log
+from llm_cache import llm_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Planner Configuration
+TURN_PLANNER_ENABLED = os.getenv("TURN_PLANNER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Histogram bucket upper bounds (plus an overflow bucket)
+CALL_COUNT_BOUNDS = (0, 1, 2, 3)
+LATENCY_BOUNDS_SECONDS = (0.5, 1, 2, 4, 8, 16)
+
+SENTIMENTS = ("positive", "neutral", "negative")
+ENTITY_FIELDS = (
+    "name", "phone", "email", "goal", "budget_min", "budget_max",
+    "location_preference", "property_type", "bedrooms", "urgency",
+)
+INTENT_FIELDS = ("goal", "budget", "bedrooms", "location", "property_type", "transaction_type", "amenities", "urgency")
+
+PLAN_INSTRUCTIONS = """
+==== OUTPUT FORMAT (MANDATORY) ====
+Besides replying, analyse the user's message. Respond with ONLY a JSON object (no markdown, no explanation):
+{{
+    "entities": {{
+        "name": "full name if mentioned",
+        "phone": "phone number in international format +XXX",
+        "email": "email address if mentioned",
+        "goal": "buy/rent/investment/residency/golden_visa",
+        "budget_min": numeric value in USD,
+        "budget_max": numeric value in USD,
+        "location_preference": "area name like Dubai Marina, Downtown, etc",
+        "property_type": "apartment/villa/office/studio/penthouse",
+        "bedrooms": number of bedrooms,
+        "urgency": "urgent/soon/exploring/just_looking"
+    }},
+    "intent": {{
+        "goal": "investment" | "living" | "residency",
+        "budget": number in AED,
+        "bedrooms": number,
+        "location": "area name",
+        "property_type": "apartment" | "villa" | "penthouse" | "townhouse" | "commercial",
+        "transaction_type": "buy" | "rent"
+    }},
+    "sentiment": "positive" | "neutral" | "negative",
+    "is_question": true | false,
+    "reply": "your reply to the user, following every rule above"
+}}
+
+RULES:
+1. Use null for anything the message does not mention - never guess
+2. entities: phones in international format (+971 for UAE, +98 for Iran); budgets in USD
+   (AED/درهم divided by 3.67, تومان divided by 600000)
+3. intent: goal "investment" for ROI/profit/سرمایه/استثمار/инвестиц, "living" for home/family/زندگی/سكن/жилье,
+   "residency" for visa/اقامت/إقامة/виза; budget in AED (750k = 750000); transaction_type "buy" for
+   buy/purchase/خرید/شراء/купить, "rent" for rent/lease/اجاره/إيجار/аренда
+4. sentiment "negative" only for frustration, anger or complaints
+
+CURRENT USER DATA WE HAVE:
+{lead_data}
+LANGUAGE: {lang}
+"""
+
+
+class Histogram:
+    """Counts of observed values per bucket (upper bounds inclusive, last bucket open)."""
+
+    def __init__(self, bounds: Iterable[float], unit: str = ""):
+        self.bounds = tuple(bounds)
+        self.unit = unit
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def _labels(self) -> List[str]:
+        if not self.unit:
+            # Integer counts: "0", "1", ..., "4+"
+            return [str(bound) for bound in self.bounds] + [f"{self.bounds[-1] + 1}+"]
+        return [f"<={bound}{self.unit}" for bound in self.bounds] + [f">{self.bounds[-1]}{self.unit}"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": dict(zip(self._labels(), self.counts)),
+            "count": self.count,
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0,
+        }
+
+
+class TurnPlan:
+    """Parsed result of a turn's planning call."""
+
+    __slots__ = ("context", "entities", "intent", "sentiment", "is_question", "reply")
+
+    def __init__(
+        self,
+        context: str,
+        entities: Dict[str, Any],
+        intent: Dict[str, Any],
+        sentiment: str,
+        is_question: bool,
+        reply: Optional[str]
+    ):
+        self.context = context
+        self.entities = entities
+        self.intent = intent
+        self.sentiment = sentiment
+        self.is_question = is_question
+        self.reply = reply
+
+    def intent_for(self, expected_entities: List[str]) -> Dict[str, Any]:
+        """Intent fields in extract_user_intent's shape"""
+        return {key: self.intent[key] for key in expected_entities if self.intent.get(key) is not None}
+
+
+def _fields(value: Any, allowed: Tuple[str, ...]) -> Dict[str, Any]:
+    if not isinstance(value, dict):
+        return {}
+    return {key: value[key] for key in allowed if value.get(key) not in (None, "", "null")}
+
+
+def parse_plan(text: str, context: str) -> TurnPlan:
+    """TurnPlan from the model's JSON answer (markdown fences tolerated)"""
+    text = re.sub(r'```(?:json)?\s*', '', text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    data = json.loads(text[start:end + 1] if start != -1 else text)
+    sentiment = str(data.get("sentiment") or "neutral").lower()
+    reply = data.get("reply")
+    return TurnPlan(
+        context=context,
+        entities=_fields(data.get("entities"), ENTITY_FIELDS),
+        intent=_fields(data.get("intent"), INTENT_FIELDS),
+        sentiment=sentiment if sentiment in SENTIMENTS else "neutral",
+        is_question=bool(data.get("is_question")),
+        reply=reply.strip() if isinstance(reply, str) and reply.strip() else None,
+    )
+
+
+# Builds generate_ai_response's prompt; returns it with the LLM cache scope
+# (tenant id, context version) when the prompt is the same for every lead, else None
+ReplyPromptBuilder = Callable[[], Awaitable[Tuple[str, Optional[Tuple[Optional[int], int]]]]]
+
+
+class TurnPlanner:
+    """Builds and parses the per-turn planning call; keeps per-turn LLM metrics."""
+
+    def __init__(self, enabled: bool = TURN_PLANNER_ENABLED):
+        self.enabled = enabled
+        self.plans = 0
+        self.cached_plans = 0  # served by the LLM response cache (FAQ-type turns)
+        self.failures = 0
+        self.uses: Dict[str, int] = {"entities": 0, "intent": 0, "reply": 0}
+        self.reply_misses = 0  # reply asked for with another context than the draft's
+        self.sentiments: Dict[str, int] = {sentiment: 0 for sentiment in SENTIMENTS}
+        self.turns = 0
+        self.calls_per_turn = Histogram(CALL_COUNT_BOUNDS)
+        self.llm_seconds_per_turn = Histogram(LATENCY_BOUNDS_SECONDS, unit="s")
+
+    async def plan(
+        self,
+        gemini_client: GeminiClient,
+        reply_prompt: ReplyPromptBuilder,
+        message: str,
+        context: str,
+        lead_data: Dict[str, Any],
+        lang: Any,
+        history: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[TurnPlan]:
+        """
+        One Gemini call for the whole turn.
+        reply_prompt builds generate_ai_response's prompt (tenant data, knowledge, lead profile);
+        prompts that are the same for every lead go through the LLM response cache.
+        history: the lead's earlier exchanges (chat_history.contents) for personalised plans;
+        sent before the prompt, ignored for cached (shared) prompts.
+        Returns None if the call or its JSON fails - consumers then go without the LLM.
+        """
+        try:
+            prompt, cache_scope = await reply_prompt()
+            prompt += PLAN_INSTRUCTIONS.format(lead_data=lead_data, lang=getattr(lang, "value", lang))
+            cache_key = None
+            contents: Any = prompt
+            if cache_scope is not None:
+                tenant_id, context_version = cache_scope
+                cache_key = llm_cache_key(tenant_id, context_version, lang, message, prompt.replace(message, ""))
+            elif history:
+                contents = history + [{"role": "user", "parts": [prompt]}]
+            response = await gemini_client.generate_content_async(contents, max_retries=3, cache_key=cache_key)
+            plan = parse_plan(response.text, context)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"❌ Turn planning failed: {e}")
+            return None
+
+        if getattr(response, "cached", False):
+            self.cached_plans += 1
+        self.plans += 1
+        self.sentiments[plan.sentiment] += 1
+        logger.info(
+            f"🗺️ Turn plan: entities={plan.entities} intent={plan.intent} "
+            f"sentiment={plan.sentiment} reply={'yes' if plan.reply else 'no'}"
+        )
+        return plan
+
+    def record_use(self, consumer: str):
+        self.uses[consumer] += 1
+
+    def record_reply_miss(self):
+        self.reply_misses += 1
+
+    @contextmanager
+    def measure_turn(self):
+        """Count the Gemini calls (and their total latency) of one message"""
+        with gemini_call_log() as calls:
+            try:
+                yield
+            finally:
+                self.turns += 1
+                self.calls_per_turn.observe(len(calls))
+                self.llm_seconds_per_turn.observe(sum(calls))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "turns": self.turns,
+            "plans": self.plans,
+            "cached_plans": self.cached_plans,
+            "failures": self.failures,
+            "uses": dict(self.uses),
+            "reply_misses": self.reply_misses,
+            "sentiments": dict(self.sentiments),
+            "llm_calls_per_turn": self.calls_per_turn.to_dict(),
+            "llm_seconds_per_turn": self.llm_seconds_per_turn.to_dict(),
+        }
+
+
+# Global instance
+turn_planner = TurnPlanner()
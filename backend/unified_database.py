@@ -14,7 +14,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 # ✅ FIX: Import only enums and session factory, not Base/engine
 from database import (
@@ -22,6 +22,11 @@ from database import (
     Purpose, PainPoint, ConversationState, SubscriptionStatus,
     async_session, Base  # Use existing Base from database.py
 )
+from lead_preference_index import unified_lead_index
+from area_gazetteer import resolve_areas
+
+# Leads fetched per IN (...) query when loading property matches
+LEAD_FETCH_BATCH = 1000
 
 
 # ==================== NEW ENUMS ====================
@@ -130,6 +135,7 @@ class UnifiedLead(Base):
     budget_max = Column(DECIMAL(15, 2), nullable=True)
     bedrooms = Column(Integer, nullable=True)
     preferred_locations = Column(JSON, nullable=True)  # ["Dubai Marina", "Downtown"]
+    preferred_area_ids = Column(JSON, nullable=True)  # area_gazetteer ids of preferred_locations
     purpose = Column(SQLEnum(Purpose), nullable=True)  # investment/living/residency
     payment_method = Column(SQLEnum(PaymentMethod), nullable=True)
     
@@ -177,8 +183,15 @@ class UnifiedLead(Base):
         Index('idx_unified_leads_source', 'source'),
         Index('idx_unified_leads_next_followup', 'next_followup_at'),
         Index('idx_unified_leads_tenant_status', 'tenant_id', 'status'),
+        Index('idx_unified_leads_tenant_created', 'tenant_id', 'created_at', 'id'),  # Keyset pagination
     )
     
+    @validates('preferred_locations')
+    def _resolve_preferred_areas(self, key, value):
+        """Keep preferred_area_ids in sync with the free-text preferred locations"""
+        self.preferred_area_ids = resolve_areas(value) or None
+        return value
+    
     def calculate_score(self) -> int:
         """
         Auto-calculate lead score based on multiple factors
@@ -251,9 +264,10 @@ class UnifiedLead(Base):
             return LeadGrade.D
     
     def update_score_and_grade(self):
-        """Convenience method to update both score and grade"""
+        """Convenience method to update both score and grade (and the lead preference index)"""
         self.lead_score = self.calculate_score()
         self.grade = self.assign_grade()
+        unified_lead_index.lead_changed(self)
 
 
 # ==================== LEAD INTERACTIONS ====================
@@ -552,69 +566,37 @@ async def find_matching_leads_for_property(
     if not property:
         return []
     
-    # Build query with proper NULL handling
-    query = select(UnifiedLead).where(
-        UnifiedLead.tenant_id == tenant_id,
-        UnifiedLead.status.not_in([LeadStatus.WON, LeadStatus.LOST])
-    )
+    # One probe on the lead preference index (open, contactable leads; no result cap)
+    listing: Dict[str, Any] = {}
     
-    # ✅ FIX: Filter by budget with NULL checks
+    # Budget: budget_min <= price <= budget_max (leads without a budget don't match)
     prop_price = getattr(property, 'price', None)
     if prop_price and prop_price > 0:
-        query = query.where(
-            UnifiedLead.budget_min.isnot(None),
-            UnifiedLead.budget_max.isnot(None),
-            UnifiedLead.budget_min <= prop_price,
-            UnifiedLead.budget_max >= prop_price
-        )
+        listing["price"] = float(prop_price)
     
-    # ✅ FIX: Filter by property type with NULL check
-    prop_type = getattr(property, 'type', None)
+    # Property type / transaction type must equal the lead's saved preference
+    prop_type = getattr(property, 'property_type', None) or getattr(property, 'type', None)
     if prop_type:
-        query = query.where(
-            UnifiedLead.property_type == prop_type
-        )
+        listing["property_type"] = prop_type
+        listing["any_property_type"] = False
     
-    # ✅ FIX: Filter by transaction type with NULL check
     prop_trans_type = getattr(property, 'transaction_type', None)
     if prop_trans_type:
-        query = query.where(
-            UnifiedLead.transaction_type == prop_trans_type
-        )
+        listing["transaction_type"] = prop_trans_type
     
-    # ✅ FIX: Add limit to prevent performance issues
-    query = query.limit(500)
+    # Location: one of the lead's preferred locations, or no location preference
+    prop_location = getattr(property, 'location', None)
+    if prop_location:
+        listing["location"] = str(prop_location)
     
-    result = await session.execute(query)
-    leads = result.scalars().all()
+    lead_ids = await unified_lead_index.match(tenant_id, **listing)
     
-    # ✅ FIX: Better location matching with NULL checks
     matched_leads = []
-    for lead in leads:
-        # Check if lead has contact method (Telegram or WhatsApp)
-        telegram_id = getattr(lead, 'telegram_user_id', None)
-        whatsapp_num = getattr(lead, 'whatsapp_number', None)
-        
-        if not telegram_id and not whatsapp_num:
-            continue  # Skip leads we can't contact
-        
-        # Check preferred locations
-        prop_location = getattr(property, 'location', None)
-        lead_locations = getattr(lead, 'preferred_locations', None)
-        
-        if prop_location:
-            if lead_locations:
-                # Normalize for comparison (case-insensitive)
-                property_location_lower = str(prop_location).lower().strip()
-                preferred_lower = [str(loc).lower().strip() for loc in lead_locations]
-                if property_location_lower in preferred_lower:
-                    matched_leads.append(lead)
-            else:
-                # No location preference = interested in all locations
-                matched_leads.append(lead)
-        else:
-            # Property has no location, still match
-            matched_leads.append(lead)
+    for i in range(0, len(lead_ids), LEAD_FETCH_BATCH):
+        result = await session.execute(
+            select(UnifiedLead).where(UnifiedLead.id.in_(lead_ids[i:i + LEAD_FETCH_BATCH]))
+        )
+        matched_leads.extend(result.scalars().all())
     
     return matched_leads
 
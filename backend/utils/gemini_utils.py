@@ -1,14 +1,25 @@
 
 import os
+import json
 import time
+import hashlib
 import random
 import logging
 import asyncio
-from typing import Optional, List, Any
+import mimetypes
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List, Any, Dict, Deque, Tuple
 import google.generativeai as genai
+from google.generativeai import client as genai_client
+from google.generativeai.types import file_types
 from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
 
+from llm_cache import llm_response_cache, CachedResponse
+
 # Load environment variables
 load_dotenv()
 
@@ -22,6 +33,20 @@ GEMINI_SAFETY_SETTINGS = [
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"},
 ]
 
+# Key Pool Configuration
+GEMINI_KEY_RPM = float(os.getenv("GEMINI_KEY_RPM", "60"))  # token bucket refill per key (requests/minute)
+GEMINI_KEY_BURST = int(os.getenv("GEMINI_KEY_BURST", "10"))  # token bucket size per key
+GEMINI_KEY_COOLDOWN_SECONDS = float(os.getenv("GEMINI_KEY_COOLDOWN_SECONDS", "30"))  # after a 429, doubles while they repeat
+GEMINI_KEY_WAIT_SECONDS = float(os.getenv("GEMINI_KEY_WAIT_SECONDS", "20"))  # longest a request waits for a free key
+
+MAX_COOLDOWN_SECONDS = 600
+INVALID_KEY_COOLDOWN_SECONDS = 3600  # rejected keys are retried hourly (e.g. after re-enabling in the console)
+RATE_LIMIT_WINDOW_SECONDS = 60  # "recent 429s" window for the health score
+LATENCY_SMOOTHING = 0.2  # EWMA weight of the newest latency sample
+
+# Concurrent identical requests share one upstream call (GeminiClient.generate_content_async)
+GEMINI_COALESCE_ENABLED = os.getenv("GEMINI_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+
 def get_gemini_api_keys() -> List[str]:
     """Get all available Gemini API keys from environment"""
     keys = [
@@ -33,10 +58,10 @@ def get_gemini_api_keys() -> List[str]:
     ]
     # Filter out None and placeholder values
     valid_keys = [k for k in keys if k and k != "your_gemini_api_key" and k.startswith("AIza")]
-    
+
     if not valid_keys:
         logger.error("❌ No valid Gemini API keys found! Please check .env file.")
-    
+
     return valid_keys
 
 
@@ -50,101 +75,448 @@ def get_random_api_key() -> Optional[str]:
     return selected
 
 
+def is_rate_limit_error(error: Exception) -> bool:
+    if isinstance(error, google_exceptions.ResourceExhausted):
+        return True
+    error_str = str(error).lower()
+    return any(x in error_str for x in ['quota', 'resource exhausted', '429'])
+
+
+def is_invalid_key_error(error: Exception) -> bool:
+    if isinstance(error, (google_exceptions.PermissionDenied, google_exceptions.Unauthenticated)):
+        return True
+    error_str = str(error).lower()
+    return any(x in error_str for x in ['api key', 'api_key'])
+
+
+class GeminiKeysUnavailable(Exception):
+    """No key can take a request right now (none configured, or all cooling down / rate limited)."""
+
+
+# ==================== KEY POOL ====================
+
+class GeminiKey:
+    """
+    One API key: its own SDK clients (never the process-global genai.configure() ones),
+    a token bucket and health stats. Mutated under GeminiKeyPool's lock.
+    """
+
+    def __init__(self, api_key: str, rpm: float = GEMINI_KEY_RPM, burst: int = GEMINI_KEY_BURST):
+        self.api_key = api_key
+        self.suffix = api_key[-6:]
+        # The SDK's per-configuration client factory (google-generativeai is pinned in requirements.txt)
+        self._clients = genai_client._ClientManager()
+        self._clients.configure(api_key=api_key)
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        # Token bucket
+        self.rate = rpm / 60.0
+        self.burst = burst
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        # Health
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_rate_limits = 0
+        self.recent_rate_limits: Deque[float] = deque()
+        self.latency_ewma: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+        self.rate_limits = 0
+
+    def model(self, model_name: str) -> genai.GenerativeModel:
+        """GenerativeModel bound to this key"""
+        model = self._models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name=model_name, safety_settings=GEMINI_SAFETY_SETTINGS)
+            model._client = self._clients.get_default_client("generative")
+            self._models[model_name] = model
+        return model
+
+    def file_client(self):
+        return self._clients.get_default_client("file")
+
+    # ---------- scheduling ----------
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def ready_in(self, now: float) -> float:
+        """Seconds until this key may take a request (0 = now)"""
+        self._refill(now)
+        wait = max(0.0, self.cooldown_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate) if self.rate > 0 else float("inf")
+        return wait
+
+    def recent_rate_limit_count(self, now: float) -> int:
+        while self.recent_rate_limits and now - self.recent_rate_limits[0] > RATE_LIMIT_WINDOW_SECONDS:
+            self.recent_rate_limits.popleft()
+        return len(self.recent_rate_limits)
+
+    def score(self, now: float) -> float:
+        """Lower is healthier: expected wait behind in-flight calls, penalised by recent 429s"""
+        latency = self.latency_ewma if self.latency_ewma is not None else 1.0
+        return (self.in_flight + 1) * latency * (1 + self.recent_rate_limit_count(now))
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        self._refill(now)
+        return {
+            "key": f"...{self.suffix}",
+            "in_flight": self.in_flight,
+            "tokens": round(self.tokens, 1),
+            "cooldown_seconds": round(max(0.0, self.cooldown_until - now), 1),
+            "recent_rate_limits": self.recent_rate_limit_count(now),
+            "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "rate_limits": self.rate_limits,
+        }
+
+
+class GeminiKeyPool:
+    """
+    Routes every Gemini request to the healthiest key that has a token and isn't cooling down.
+    A 429 cools down only that key (exponentially while they repeat); callers move on to
+    another key and only wait when every key is busy, for at most GEMINI_KEY_WAIT_SECONDS.
+    """
+
+    def __init__(
+        self,
+        api_keys: Optional[List[str]] = None,
+        rpm: float = GEMINI_KEY_RPM,
+        burst: int = GEMINI_KEY_BURST,
+        cooldown_seconds: float = GEMINI_KEY_COOLDOWN_SECONDS,
+        max_wait_seconds: float = GEMINI_KEY_WAIT_SECONDS,
+    ):
+        api_keys = get_gemini_api_keys() if api_keys is None else api_keys
+        self.keys = [GeminiKey(api_key, rpm, burst) for api_key in dict.fromkeys(api_keys)]
+        self.cooldown_seconds = cooldown_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()  # clients are also used from executor threads / sync wrappers
+        self._file_keys: Dict[str, GeminiKey] = {}  # uploaded file name -> key whose project owns it
+        self.waits = 0
+
+    def _ready_key(self, candidates: List[GeminiKey], now: float):
+        """(healthiest ready key or None, seconds until the next one frees up)"""
+        best, best_score, next_ready = None, 0.0, float("inf")
+        for key in candidates:
+            wait = key.ready_in(now)
+            if wait > 0:
+                next_ready = min(next_ready, wait)
+                continue
+            score = key.score(now)
+            if best is None or score < best_score:
+                best, best_score = key, score
+        return best, next_ready
+
+    async def acquire(self, pinned: Optional[GeminiKey] = None) -> GeminiKey:
+        """Take a token from the healthiest key (or the pinned one). Pair with release()."""
+        candidates = [pinned] if pinned is not None else self.keys
+        if not candidates:
+            raise GeminiKeysUnavailable("Gemini model not initialized and no valid keys")
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                key, next_ready = self._ready_key(candidates, now)
+                if key is not None:
+                    key.tokens -= 1
+                    key.in_flight += 1
+                    key.requests += 1
+                    return key
+            if now + next_ready > deadline:
+                raise GeminiKeysUnavailable(
+                    f"All Gemini keys are rate limited or cooling down (next free in {next_ready:.0f}s)"
+                )
+            self.waits += 1
+            await asyncio.sleep(next_ready)
+
+    def release(self, key: GeminiKey, latency: Optional[float] = None, rate_limited: bool = False,
+                invalid: bool = False, failed: bool = False):
+        """Return a key taken with acquire() and record how the request went."""
+        with self._lock:
+            now = time.monotonic()
+            key.in_flight -= 1
+            if rate_limited:
+                key.rate_limits += 1
+                key.consecutive_rate_limits += 1
+                key.recent_rate_limits.append(now)
+                cooldown = min(MAX_COOLDOWN_SECONDS, self.cooldown_seconds * 2 ** (key.consecutive_rate_limits - 1))
+                key.cooldown_until = now + cooldown
+                logger.warning(f"⚠️ Gemini key ...{key.suffix} rate limited - cooling down for {cooldown:.0f}s")
+            elif invalid:
+                key.failures += 1
+                key.cooldown_until = now + INVALID_KEY_COOLDOWN_SECONDS
+                logger.error(f"❌ Gemini key ...{key.suffix} rejected - disabled for {INVALID_KEY_COOLDOWN_SECONDS}s")
+            elif failed:
+                key.failures += 1
+            else:
+                key.consecutive_rate_limits = 0
+                if latency is not None:
+                    key.latency_ewma = latency if key.latency_ewma is None else (
+                        LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * key.latency_ewma
+                    )
+
+    def healthiest(self) -> Optional[GeminiKey]:
+        """Best key right now without taking a token (file operations, sync callers)"""
+        with self._lock:
+            now = time.monotonic()
+            key, _ = self._ready_key(self.keys, now)
+            if key is None and self.keys:
+                # Everything busy - the one that frees up first
+                key = min(self.keys, key=lambda k: k.ready_in(now))
+            return key
+
+    # ---------- uploaded files (owned by the key that uploaded them) ----------
+
+    def register_file(self, name: str, key: GeminiKey):
+        with self._lock:
+            self._file_keys[name] = key
+
+    def file_owner(self, name: str) -> Optional[GeminiKey]:
+        return self._file_keys.get(name)
+
+    def forget_file(self, name: str):
+        with self._lock:
+            self._file_keys.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "keys": [key.stats(now) for key in self.keys],
+                "waits": self.waits,
+                "tracked_files": len(self._file_keys),
+            }
+
+
+_key_pool: Optional[GeminiKeyPool] = None
+_key_pool_lock = threading.Lock()
+
+
+def get_gemini_key_pool() -> GeminiKeyPool:
+    """Process-wide key pool - quotas are per key, so every client shares it."""
+    global _key_pool
+    if _key_pool is None:
+        with _key_pool_lock:
+            if _key_pool is None:
+                _key_pool = GeminiKeyPool()
+    return _key_pool
+
+
+# ==================== CALL LOG ====================
+
+# Latencies of the Gemini calls made by the current message (set by gemini_call_log)
+_call_log: ContextVar[Optional[List[float]]] = ContextVar("gemini_call_log", default=None)
+
+
+@contextmanager
+def gemini_call_log():
+    """Collect the latency (seconds) of every Gemini call made inside the block"""
+    calls: List[float] = []
+    token = _call_log.set(calls)
+    try:
+        yield calls
+    finally:
+        _call_log.reset(token)
+
+
+def record_gemini_call(seconds: float):
+    """Count a Gemini call in the active call log (no-op outside one)"""
+    calls = _call_log.get()
+    if calls is not None:
+        calls.append(seconds)
+
+
+# ==================== CLIENT ====================
+
 class GeminiClient:
     """
     Wrapper for Gemini API with robust features:
-    - Key Rotation
-    - Retry Logic (Exponential Backoff)
+    - Key Pool (per-key clients, health-based routing, token buckets, 429 cooldowns)
+    - Retry Logic (on another key; backoff only for non-quota errors)
+    - Request Coalescing (concurrent identical prompts share one upstream call)
     - Error Handling
     - Safety Settings
     """
-    
-    def __init__(self, model_name: str = 'gemini-1.5-flash'):
+
+    def __init__(
+        self,
+        model_name: str = 'gemini-1.5-flash',
+        key_pool: Optional[GeminiKeyPool] = None,
+        coalesce: bool = GEMINI_COALESCE_ENABLED
+    ):
         self.model_name = model_name
-        self.api_keys = get_gemini_api_keys()
-        self.current_key = get_random_api_key()
-        self.model = None
-        
-        if self.current_key:
-            self._init_model(self.current_key)
-        else:
+        self.key_pool = key_pool or get_gemini_key_pool()
+        self.coalesce = coalesce
+        # (event loop id, prompt key) -> the upstream call every concurrent caller awaits
+        self._in_flight: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+        if not self.key_pool.keys:
             logger.warning("⚠️ GeminiClient initialized without valid keys - calls will fail")
-            
-    def _init_model(self, api_key: str):
-        """Initialize Gemini model with specific key"""
-        try:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel(
-                model_name=self.model_name,
-                safety_settings=GEMINI_SAFETY_SETTINGS
-            )
-            self.current_key = api_key
-            logger.info(f"✅ Gemini model {self.model_name} initialized")
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Gemini model: {e}")
-            self.model = None
-            
-    def _rotate_key(self) -> bool:
-        """Rotate to a different API key. Returns True if successful."""
-        if len(self.api_keys) <= 1:
-            logger.warning("⚠️ Cannot rotate key - only 1 key available")
-            return False
-        
-        other_keys = [k for k in self.api_keys if k != self.current_key]
-        if other_keys:
-            new_key = random.choice(other_keys)
-            logger.info(f"🔄 Rotating Gemini API key...")
-            self._init_model(new_key)
-            return True
-        return False
-        
-    async def generate_content_async(self, contents: List[Any], max_retries: int = 3, **kwargs):
+
+    @property
+    def api_keys(self) -> List[str]:
+        return [key.api_key for key in self.key_pool.keys]
+
+    @property
+    def current_key(self) -> Optional[str]:
+        """Key the next request would most likely use (None without keys)"""
+        key = self.key_pool.healthiest()
+        return key.api_key if key else None
+
+    @property
+    def model(self) -> Optional[genai.GenerativeModel]:
+        """Model on the healthiest key, for synchronous callers"""
+        key = self.key_pool.healthiest()
+        return key.model(self.model_name) if key else None
+
+    def _pinned_key(self, contents: Any) -> Optional[GeminiKey]:
+        """Uploaded files only exist for the key that uploaded them"""
+        parts = contents if isinstance(contents, (list, tuple)) else [contents]
+        for part in parts:
+            name = getattr(part, "name", None)
+            if isinstance(name, str):
+                key = self.key_pool.file_owner(name)
+                if key is not None:
+                    return key
+        return None
+
+    def _flight_key(self, contents: Any, cache_key: Optional[str], kwargs: Dict[str, Any]) -> Optional[str]:
+        """
+        Prompt key concurrent identical requests are coalesced on: the LLM cache key when
+        the caller has one, else a hash of the text prompt and generation options.
+        Prompts with uploaded files or images are not coalesced.
         """
-        Generate content asynchronously with retry logic and key rotation
+        if not self.coalesce:
+            return None
+        if cache_key is not None:
+            return f"cache:{cache_key}"
+        parts = contents if isinstance(contents, (list, tuple)) else [contents]
+        if not all(isinstance(part, str) for part in parts):
+            return None
+        raw = json.dumps([self.model_name, list(parts), repr(sorted(kwargs.items()))], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def generate_content_async(
+        self, contents: List[Any], max_retries: int = 3, cache_key: Optional[str] = None, **kwargs
+    ):
+        """
+        Generate content asynchronously with retry logic and key rotation.
+        Counted once, retries included, in the active gemini_call_log.
+
+        cache_key (llm_cache.llm_cache_key) opts the prompt into the LLM response cache:
+        a cached answer comes back as a CachedResponse without calling Gemini.
+        Leave it out for personalised prompts.
+
+        Callers that ask for the same prompt while a call for it is in flight await that
+        call instead of making their own (its response or error is shared; only the
+        caller that started it has the call in its gemini_call_log).
         """
+        if cache_key is not None:
+            cached = await llm_response_cache.get(cache_key)
+            if cached is not None:
+                return CachedResponse(cached)
+
+        flight_key = self._flight_key(contents, cache_key, kwargs)
+        if flight_key is None:
+            return await self._generate_upstream(contents, max_retries, cache_key, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        key = (id(loop), flight_key)
+        call = self._in_flight.get(key)
+        if call is not None and call.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            # A task of its own, so a caller giving up doesn't cancel it for the others
+            call = asyncio.ensure_future(self._generate_upstream(contents, max_retries, cache_key, **kwargs))
+            self._in_flight[key] = call
+            call.add_done_callback(lambda done: self._end_flight(key, done))
+        return await asyncio.shield(call)
+
+    def _end_flight(self, key: Tuple[int, str], call: asyncio.Task):
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+        if not call.cancelled():
+            call.exception()  # retrieved here too, in case every caller gave up waiting
+
+    async def _generate_upstream(self, contents: List[Any], max_retries: int, cache_key: Optional[str], **kwargs):
+        """One upstream call (retries included), logged and stored in the LLM cache"""
+        self.upstream_calls += 1
+        call_started = time.monotonic()
+        try:
+            response = await self._generate_with_retries(contents, max_retries, **kwargs)
+        finally:
+            record_gemini_call(time.monotonic() - call_started)
+
+        if cache_key is not None:
+            try:
+                text = response.text
+            except ValueError:
+                text = None  # blocked / empty candidates - nothing worth caching
+            if text:
+                await llm_response_cache.set(cache_key, text)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+
+    async def _generate_with_retries(self, contents: List[Any], max_retries: int, **kwargs):
         wait_time = 2
         last_error = None
-        
+        pinned = self._pinned_key(contents)
+
         for attempt in range(max_retries):
+            key = await self.key_pool.acquire(pinned)
+            started = time.monotonic()
             try:
-                if not self.model:
-                    if not self._init_if_possible():
-                         raise Exception("Gemini model not initialized and no valid keys")
-
+                model = key.model(self.model_name)
                 # Run in executor because genai library is synchronous
                 loop = asyncio.get_event_loop()
                 response = await loop.run_in_executor(
-                    None, 
-                    lambda: self.model.generate_content(contents, **kwargs)
+                    None,
+                    lambda: model.generate_content(contents, **kwargs)
                 )
-                
-                return response
-                
+            except asyncio.CancelledError:
+                # Caller gave up (e.g. asyncio.wait_for timeout) - don't leak the key's in-flight slot
+                self.key_pool.release(key, failed=True)
+                raise
             except Exception as e:
                 last_error = e
-                error_str = str(e).lower()
-                
-                # Check for quota/rate limit errors
-                if any(x in error_str for x in ['quota', 'resource exhausted', '429']):
-                    logger.warning(f"⚠️ Rate limit hit (attempt {attempt + 1}/{max_retries}). Waiting {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                    wait_time *= 2
-                    self._rotate_key()
+
+                # Quota/rate limit: cool this key down, retry straight away on another one
+                if is_rate_limit_error(e):
+                    self.key_pool.release(key, rate_limited=True)
+                    logger.warning(f"⚠️ Rate limit hit (attempt {attempt + 1}/{max_retries}) on key ...{key.suffix}")
                     continue
-                
-                # Check for invalid key
-                if any(x in error_str for x in ['invalid', 'api key', '400']):
-                    logger.error(f"❌ Invalid API key detected (attempt {attempt + 1}). Rotating...")
-                    if not self._rotate_key():
-                        logger.error("❌ No alternative keys available to rotate to")
-                        raise e
+
+                # Invalid key: take it out of rotation
+                if is_invalid_key_error(e):
+                    self.key_pool.release(key, invalid=True)
+                    if pinned is not None:
+                        raise
                     continue
-                    
+
                 # Other errors
+                self.key_pool.release(key, failed=True)
+                if isinstance(e, google_exceptions.InvalidArgument):
+                    raise  # the request itself is bad - no key will accept it
                 logger.error(f"❌ Gemini error (attempt {attempt + 1}): {e}")
                 if attempt < max_retries - 1:
                     await asyncio.sleep(wait_time)
-                
+                    wait_time *= 2
+                continue
+
+            self.key_pool.release(key, latency=time.monotonic() - started)
+            return response
+
         logger.error(f"❌ All {max_retries} retry attempts failed. Last error: {last_error}")
         raise last_error
 
@@ -156,19 +528,64 @@ class GeminiClient:
         asyncio.set_event_loop(loop)
         return loop.run_until_complete(self.generate_content_async(contents, max_retries, **kwargs))
 
-    def _init_if_possible(self):
-        """Try to initialize if keys exist but model is None"""
-        if self.api_keys:
-            self.current_key = get_random_api_key()
-            self._init_model(self.current_key)
-            return True
-        return False
-        
+    # ---------- files ----------
+
     def upload_file(self, file_path: str, mime_type: str = None):
-        """Upload file wrapper"""
-        if not self.current_key:
-             self._rotate_key()
-             
-        # Configure genai with current key before upload
-        genai.configure(api_key=self.current_key)
-        return genai.upload_file(file_path, mime_type=mime_type)
+        """Upload a file with the healthiest key; later calls using the file stay on that key"""
+        key = self.key_pool.healthiest()
+        if key is None:
+            raise GeminiKeysUnavailable("Gemini model not initialized and no valid keys")
+        if mime_type is None:
+            mime_type, _ = mimetypes.guess_type(file_path)
+        uploaded = file_types.File(key.file_client().create_file(
+            path=file_path, mime_type=mime_type, display_name=os.path.basename(file_path)
+        ))
+        self.key_pool.register_file(uploaded.name, key)
+        return uploaded
+
+    def _file_key(self, name: str) -> GeminiKey:
+        key = self.key_pool.file_owner(name) or self.key_pool.healthiest()
+        if key is None:
+            raise GeminiKeysUnavailable("Gemini model not initialized and no valid keys")
+        return key
+
+    def get_file(self, name: str):
+        """Refresh an uploaded file (e.g. to poll its processing state)"""
+        return file_types.File(self._file_key(name).file_client().get_file(name=name))
+
+    def delete_file(self, name: str):
+        """Delete an uploaded file"""
+        try:
+            self._file_key(name).file_client().delete_file(name=name)
+        finally:
+            self.key_pool.forget_file(name)
+
+
+# ==================== SHARED CLIENT POOL ====================
+
+_client_pool: Dict[str, GeminiClient] = {}
+_client_pool_lock = threading.Lock()
+
+
+def get_gemini_client(model_name: str = 'gemini-1.5-flash') -> GeminiClient:
+    """
+    Process-wide GeminiClient for a model, created on first use.
+    Per-message callers share one per model instead of building their own.
+    """
+    client = _client_pool.get(model_name)
+    if client is None:
+        with _client_pool_lock:
+            client = _client_pool.get(model_name)
+            if client is None:
+                client = GeminiClient(model_name=model_name)
+                _client_pool[model_name] = client
+    return client
+
+
+def gemini_client_pool_stats() -> Dict[str, Any]:
+    """Shared clients and the key pool they route through"""
+    return {
+        "models": sorted(_client_pool),
+        "requests": {name: client.stats() for name, client in _client_pool.items()},
+        **get_gemini_key_pool().stats(),
+    }
@@ -33,16 +33,18 @@ from typing import Optional, Dict, List, Any
 from datetime import datetime
 
 from database import (
-    Tenant, Lead, get_tenant_by_whatsapp_phone_id, get_or_create_lead,
+    Tenant, Lead, get_or_create_lead,
     update_lead, ConversationState, book_slot, create_appointment,
-    AppointmentType, async_session, Language
+    AppointmentType, async_session, Language, in_message_turn
 )
-from brain import Brain, BrainResponse
+from brain import BrainResponse
+from brain_registry import brain_registry
 from whatsapp_providers import get_whatsapp_provider, WhatsAppProvider
 from vertical_router import get_vertical_router, VerticalMode, VerticalRouter
 from redis_manager import RedisManager
 from property_presenter import present_all_properties
 from realty_sales_bot import RealtySalesBot
+from tenant_cache import tenant_cache
 
 # Configure logging
 logging.basicConfig(
@@ -61,7 +63,7 @@ class WhatsAppBotHandler:
     
     def __init__(self, tenant: Tenant, redis_manager: Optional[RedisManager] = None):
         self.tenant = tenant
-        self.brain = Brain(tenant)
+        self.brain = brain_registry.get(tenant)
         self.provider = get_whatsapp_provider(tenant)
         self.redis_manager = redis_manager
         self.router: Optional[VerticalRouter] = None
@@ -256,6 +258,7 @@ class WhatsAppBotHandler:
                 logger.warning(f"⚠️ Admin ID not set for tenant {self.tenant.id}. Use /set_admin to configure.")
         # ======================================================================
     
+    @in_message_turn
     async def handle_webhook(self, payload: Dict[str, Any]) -> bool:
         """
         Handle incoming WhatsApp webhook with multi-vertical routing.
@@ -292,22 +295,12 @@ class WhatsAppBotHandler:
                     deep_link_tenant_id = int(tenant_match.group(1))
                     logger.info(f"🔗 Deep link detected: Routing to Tenant ID {deep_link_tenant_id}")
                     
-                    # Get the specific tenant (FIX: Properly close session)
-                    from database import async_session, Tenant
-                    from sqlalchemy import select
-                    
-                    target_tenant = None
-                    async with async_session() as session:
-                        result = await session.execute(
-                            select(Tenant).where(Tenant.id == deep_link_tenant_id)
-                        )
-                        target_tenant = result.scalar_one_or_none()
-                    # Session auto-closed here
+                    # Get the specific tenant
+                    target_tenant = await tenant_cache.get_by_id(deep_link_tenant_id)
                     
                     if target_tenant:
                         # Create handler for this tenant
-                        from brain import Brain
-                        tenant_brain = Brain(target_tenant)
+                        tenant_brain = brain_registry.get(target_tenant)
                         
                         # Get or create lead for this tenant
                         lead = await self._get_or_create_lead_for_tenant(
@@ -362,20 +355,10 @@ class WhatsAppBotHandler:
                 # Route to the mapped tenant
                 logger.info(f"📍 Routing to previously mapped Tenant ID {mapped_tenant_id}")
                 
-                from database import async_session, Tenant
-                from sqlalchemy import select
-                
-                mapped_tenant = None
-                async with async_session() as session:
-                    result = await session.execute(
-                        select(Tenant).where(Tenant.id == int(mapped_tenant_id))
-                    )
-                    mapped_tenant = result.scalar_one_or_none()
-                # Session auto-closed
+                mapped_tenant = await tenant_cache.get_by_id(int(mapped_tenant_id))
                 
                 if mapped_tenant:
-                    from brain import Brain
-                    tenant_brain = Brain(mapped_tenant)
+                    tenant_brain = brain_registry.get(mapped_tenant)
                     
                     lead = await self._get_or_create_lead_for_tenant(
                         from_phone, profile_name, int(mapped_tenant_id)
@@ -804,6 +787,15 @@ class WhatsAppBotManager:
     def __init__(self):
         self.handlers: Dict[str, WhatsAppBotHandler] = {}  # phone_number_id -> handler
         self.redis_managers: Dict[int, RedisManager] = {}  # tenant_id -> RedisManager
+        
+        # Rebuild handlers when their tenant changes (on any worker)
+        tenant_cache.on_invalidate(self.drop_handlers)
+    
+    def drop_handlers(self, tenant_id: Optional[int] = None):
+        """Forget cached handlers for a tenant (or all) so they pick up new settings."""
+        for phone_number_id, handler in list(self.handlers.items()):
+            if tenant_id is None or handler.tenant.id == tenant_id:
+                del self.handlers[phone_number_id]
     
     async def get_redis_manager(self, tenant: Tenant) -> Optional[RedisManager]:
         """Get or create RedisManager for tenant."""
@@ -825,8 +817,8 @@ class WhatsAppBotManager:
         if phone_number_id in self.handlers:
             return self.handlers[phone_number_id]
         
-        # Load tenant from database
-        tenant = await get_tenant_by_whatsapp_phone_id(phone_number_id)
+        # Resolve tenant (cached - no DB hit in the common case)
+        tenant = await tenant_cache.get_by_whatsapp_phone_id(phone_number_id)
         if not tenant:
             logger.warning(f"No tenant found for WhatsApp phone ID: {phone_number_id}")
             return None
@@ -66,13 +66,20 @@ const SuperAdminDashboard = ({ user, onLogout, onImpersonate }) => {
   const fetchTenants = async () => {
     try {
       setLoading(true);
-      const response = await fetch(`${API_BASE_URL}/api/admin/tenants`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      if (response.ok) {
+      // Paged: follow X-Next-Offset until every tenant is loaded
+      const allTenants = [];
+      let offset = 0;
+      while (offset !== null) {
+        const response = await fetch(`${API_BASE_URL}/api/admin/tenants?limit=1000&offset=${offset}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!response.ok) return;
         const data = await response.json();
-        setTenants(Array.isArray(data) ? data : (data.tenants || []));
+        allTenants.push(...(Array.isArray(data) ? data : (data.tenants || [])));
+        const nextOffset = response.headers.get('X-Next-Offset');
+        offset = nextOffset !== null ? Number(nextOffset) : null;
       }
+      setTenants(allTenants);
     } catch (error) {
       console.error('Error fetching tenants:', error);
       // Sample data for demo
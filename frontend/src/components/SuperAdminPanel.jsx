@@ -50,11 +50,19 @@ const SuperAdminPanel = () => {
     const loadTenants = async () => {
         try {
             setLoading(true);
-            const response = await fetch(`${API_BASE_URL}/api/admin/tenants`, {
-                headers: getAuthHeaders(),
-            });
-            const data = await response.json();
-            setTenants(data);
+            // Paged: follow X-Next-Offset until every tenant is loaded
+            const allTenants = [];
+            let offset = 0;
+            while (offset !== null) {
+                const response = await fetch(`${API_BASE_URL}/api/admin/tenants?limit=1000&offset=${offset}`, {
+                    headers: getAuthHeaders(),
+                });
+                const data = await response.json();
+                allTenants.push(...data);
+                const nextOffset = response.headers.get('X-Next-Offset');
+                offset = nextOffset !== null ? Number(nextOffset) : null;
+            }
+            setTenants(allTenants);
         } catch (error) {
             console.error('Failed to load tenants:', error);
             alert('خطا در بارگذاری لیست تنانت‌ها');